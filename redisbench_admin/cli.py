@@ -16,6 +16,8 @@ from redisbench_admin.compare.args import create_compare_arguments
 from redisbench_admin.compare.compare import compare_command_logic
 from redisbench_admin.deploy.args import create_deploy_arguments
 from redisbench_admin.deploy.deploy import deploy_command_logic
+from redisbench_admin.env_pool.args import create_env_pool_arguments
+from redisbench_admin.env_pool.env_pool import env_pool_command_logic
 from redisbench_admin.export.args import create_export_arguments
 from redisbench_admin.export.export import export_command_logic
 from redisbench_admin.extract.args import create_extract_arguments
@@ -93,6 +95,8 @@ def main():
         print_version(project_name, project_version)
     elif requested_tool == "deploy":
         parser = create_deploy_arguments(parser)
+    elif requested_tool == "env-pool":
+        parser = create_env_pool_arguments(parser)
     elif requested_tool == "--help":
         print_help(project_name, project_version)
         sys.exit(0)
@@ -102,6 +106,7 @@ def main():
             "run-local",
             "run-remote",
             "deploy",
+            "env-pool",
             "export",
             "extract",
             "watchdog",
@@ -154,6 +159,8 @@ def main():
         compare_command_logic(args, project_name, project_version)
     if requested_tool == "deploy":
         deploy_command_logic(args, project_name, project_version)
+    if requested_tool == "env-pool":
+        env_pool_command_logic(args, project_name, project_version)
     if requested_tool == "grafana-api":
         grafana_api_command_logic(args, project_name, project_version)
 
@@ -0,0 +1,111 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import os
+
+from redisbench_admin.run_remote.consts import DEFAULT_PRIVATE_KEY
+from redisbench_admin.utils.remote import TERRAFORM_BIN_PATH
+
+ENV_POOL_HOST = os.getenv("ENV_POOL_HOST", None)
+ENV_POOL_PORT = int(os.getenv("ENV_POOL_PORT", 6379))
+ENV_POOL_PASS = os.getenv("ENV_POOL_PASS", None)
+ENV_POOL_LEASE_TTL_SECS = int(os.getenv("ENV_POOL_LEASE_TTL_SECS", 300))
+ENV_POOL_WAIT_SECS = int(os.getenv("ENV_POOL_WAIT_SECS", 60))
+ENV_POOL_SIZE = int(os.getenv("ENV_POOL_SIZE", 1))
+ENV_POOL_DIR = os.getenv("ENV_POOL_DIR", "./env-pool")
+ENV_MAX_AGE_SECS = int(os.getenv("ENV_MAX_AGE_SECS", 6 * 3600))
+ENV_MAX_LEASES = int(os.getenv("ENV_MAX_LEASES", 0))
+ENV_PROVISIONING_TIMEOUT_SECS = int(os.getenv("ENV_PROVISIONING_TIMEOUT_SECS", 1800))
+GIT_ORG = os.getenv("GIT_ORG", None)
+GIT_REPO = os.getenv("GIT_REPO", None)
+
+
+def create_env_pool_connection_arguments(parser):
+    parser.add_argument(
+        "--env_pool_host",
+        type=str,
+        default=ENV_POOL_HOST,
+        help="redis host holding the warm environments pool and its leases",
+    )
+    parser.add_argument("--env_pool_port", type=int, default=ENV_POOL_PORT)
+    parser.add_argument("--env_pool_pass", type=str, default=ENV_POOL_PASS)
+    parser.add_argument(
+        "--env_pool_lease_ttl_secs",
+        type=int,
+        default=ENV_POOL_LEASE_TTL_SECS,
+        help="a lease that is not renewed within this time expires and the env is recycled",
+    )
+    return parser
+
+
+def create_env_pool_arguments(parser):
+    parser = create_env_pool_connection_arguments(parser)
+    parser.add_argument(
+        "--action",
+        type=str,
+        default="maintain",
+        choices=["maintain", "status", "drain"],
+        help="maintain keeps the pool warm, status prints it and drain destroys the non leased envs",
+    )
+    parser.add_argument(
+        "--remote",
+        type=str,
+        required=True,
+        help="comma separated list of <type>:<setup> remote setups to keep warm, "
+        "e.g. oss-standalone:redisearch-m5",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=ENV_POOL_SIZE,
+        help="number of warm (non leased) envs to keep per remote setup",
+    )
+    parser.add_argument(
+        "--max-envs",
+        type=int,
+        default=2 * ENV_POOL_SIZE,
+        help="maximum number of envs (leased or not) per remote setup",
+    )
+    parser.add_argument(
+        "--env-max-age-secs",
+        type=int,
+        default=ENV_MAX_AGE_SECS,
+        help="envs older than this are destroyed and replaced",
+    )
+    parser.add_argument(
+        "--env-max-leases",
+        type=int,
+        default=ENV_MAX_LEASES,
+        help="envs are destroyed and replaced after this many leases (0 means no limit)",
+    )
+    parser.add_argument(
+        "--provisioning-timeout-secs",
+        type=int,
+        default=ENV_PROVISIONING_TIMEOUT_SECS,
+    )
+    parser.add_argument("--pool-dir", type=str, default=ENV_POOL_DIR)
+    parser.add_argument(
+        "--update-interval",
+        type=int,
+        default=60,
+        help="pool update interval in seconds",
+    )
+    parser.add_argument(
+        "--once", default=False, action="store_true", help="do a single pool update"
+    )
+    parser.add_argument(
+        "--private_key",
+        required=False,
+        default=DEFAULT_PRIVATE_KEY,
+        type=str,
+        help="Use this key for ssh connections.",
+    )
+    parser.add_argument("--ssh_port", type=int, default=22)
+    parser.add_argument("--terraform_bin_path", type=str, default=TERRAFORM_BIN_PATH)
+    parser.add_argument("--github_actor", type=str, default="env-pool")
+    parser.add_argument("--github_repo", type=str, default=GIT_REPO)
+    parser.add_argument("--github_org", type=str, default=GIT_ORG)
+    parser.add_argument("--github_sha", type=str, default="env-pool")
+    return parser
@@ -0,0 +1,712 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import concurrent.futures
+import datetime
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+
+import redis
+from pytablewriter import MarkdownTableWriter
+from python_terraform import Terraform, IsNotFlagged
+
+from redisbench_admin.utils.remote import (
+    execute_remote_commands,
+    fetch_remote_setup_from_config,
+    setup_remote_environment,
+)
+
+ENV_POOL_KEY_PREFIX = "redisbench-admin:env-pool"
+ENV_POOL_POLL_INTERVAL_SECS = 5
+# the pool claims the envs it destroys. destroying can take several minutes
+ENV_POOL_CLAIM_TTL_SECS = 3600
+ENV_STATE_PROVISIONING = "provisioning"
+ENV_STATE_READY = "ready"
+ENV_STATE_LEASED = "leased"
+ENV_STATE_RECYCLING = "recycling"
+# terraform destroy failed. the env is kept registered so that the pool retries it
+ENV_STATE_DESTROY_FAILED = "destroy-failed"
+# leftovers of the previous lease. the remote dataset cache is kept on purpose
+ENV_POOL_RECYCLE_COMMANDS = [
+    "sudo pkill -9 -f redis-server || true",
+    "sudo pkill -9 -f memtier_benchmark || true",
+    "sudo pkill -9 -f redis-benchmark || true",
+]
+
+# the lock is only taken if the env is still in the listed state ( ready for jobs ),
+# and the env is flagged as leased atomically
+ENV_LEASE_ACQUIRE_SCRIPT = """
+if redis.call('hget', KEYS[2], 'state') ~= ARGV[5] then
+  return 0
+end
+if not redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  return 0
+end
+redis.call('hset', KEYS[2], 'state', 'leased', 'leased_by', ARGV[3], 'leased_at', ARGV[4])
+redis.call('hincrby', KEYS[2], 'leases', 1)
+return 1
+"""
+ENV_LEASE_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+ENV_LEASE_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  redis.call('del', KEYS[1])
+  redis.call('hset', KEYS[2], 'state', ARGV[2])
+  return 1
+end
+return 0
+"""
+
+
+def get_env_pool_envs_keyname(remote_id):
+    return "{}:{}:envs".format(ENV_POOL_KEY_PREFIX, remote_id)
+
+
+def get_env_pool_env_keyname(remote_id, env_id):
+    return "{}:{}:env:{}".format(ENV_POOL_KEY_PREFIX, remote_id, env_id)
+
+
+def get_env_pool_lease_keyname(remote_id, env_id):
+    return "{}:{}:env:{}:lease".format(ENV_POOL_KEY_PREFIX, remote_id, env_id)
+
+
+def get_env_pool_conn(host, port, password=None):
+    return redis.Redis(host=host, port=port, password=password, decode_responses=True)
+
+
+def get_env_lease_owner():
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+def register_pool_env(conn, remote_id, env_id, fields):
+    env = {"remote_id": remote_id, "env_id": env_id, "leases": 0}
+    env.update(fields)
+    pipe = conn.pipeline(transaction=True)
+    pipe.hset(get_env_pool_env_keyname(remote_id, env_id), mapping=env)
+    pipe.sadd(get_env_pool_envs_keyname(remote_id), env_id)
+    pipe.execute()
+    return env
+
+
+def update_pool_env(conn, remote_id, env_id, fields):
+    conn.hset(get_env_pool_env_keyname(remote_id, env_id), mapping=fields)
+
+
+def unregister_pool_env(conn, remote_id, env_id):
+    pipe = conn.pipeline(transaction=True)
+    pipe.delete(get_env_pool_env_keyname(remote_id, env_id))
+    pipe.delete(get_env_pool_lease_keyname(remote_id, env_id))
+    pipe.srem(get_env_pool_envs_keyname(remote_id), env_id)
+    pipe.execute()
+
+
+def list_pool_envs(conn, remote_id):
+    """Returns the envs of remote_id, oldest first"""
+    envs = []
+    for env_id in conn.smembers(get_env_pool_envs_keyname(remote_id)):
+        env = conn.hgetall(get_env_pool_env_keyname(remote_id, env_id))
+        if len(env) > 0:
+            envs.append(env)
+    return sorted(envs, key=lambda x: (float(x.get("created_at", 0)), x["env_id"]))
+
+
+def acquire_env_lease(conn, remote_id, owner, ttl_secs):
+    """
+    Leases one of the ready envs of remote_id. Returns the lease or None if no env
+    is ready. The lease expires after ttl_secs unless it is renewed.
+    """
+    acquire = conn.register_script(ENV_LEASE_ACQUIRE_SCRIPT)
+    for env in list_pool_envs(conn, remote_id):
+        if env.get("state", None) != ENV_STATE_READY:
+            continue
+        token = uuid.uuid4().hex
+        acquired = acquire(
+            keys=[
+                get_env_pool_lease_keyname(remote_id, env["env_id"]),
+                get_env_pool_env_keyname(remote_id, env["env_id"]),
+            ],
+            args=[token, int(ttl_secs * 1000), owner, time.time(), ENV_STATE_READY],
+        )
+        if acquired == 1:
+            logging.info(
+                "Leased env {} of remote setup {} for {} secs".format(
+                    env["env_id"], remote_id, ttl_secs
+                )
+            )
+            return {
+                "conn": conn,
+                "remote_id": remote_id,
+                "env_id": env["env_id"],
+                "lease_token": token,
+                "ttl_secs": ttl_secs,
+                "env": env,
+                "released": threading.Event(),
+                "lost": threading.Event(),
+                "heartbeat": None,
+            }
+    return None
+
+
+def is_env_lease(remote_env):
+    return type(remote_env) == dict and "lease_token" in remote_env
+
+
+def renew_env_lease(lease):
+    renew = lease["conn"].register_script(ENV_LEASE_RENEW_SCRIPT)
+    renewed = renew(
+        keys=[get_env_pool_lease_keyname(lease["remote_id"], lease["env_id"])],
+        args=[lease["lease_token"], int(lease["ttl_secs"] * 1000)],
+    )
+    return renewed == 1
+
+
+def release_env_lease(lease, state=ENV_STATE_RECYCLING):
+    """Gives the env back to the pool, which recycles it before it is leased again"""
+    lease["released"].set()
+    if lease["heartbeat"] is not None:
+        lease["heartbeat"].join()
+    release = lease["conn"].register_script(ENV_LEASE_RELEASE_SCRIPT)
+    released = release(
+        keys=[
+            get_env_pool_lease_keyname(lease["remote_id"], lease["env_id"]),
+            get_env_pool_env_keyname(lease["remote_id"], lease["env_id"]),
+        ],
+        args=[lease["lease_token"], state],
+    )
+    if released != 1:
+        logging.warning(
+            "The lease of env {} of remote setup {} expired before being released".format(
+                lease["env_id"], lease["remote_id"]
+            )
+        )
+    return released == 1
+
+
+def env_lease_heartbeat(lease):
+    """
+    Renews the lease until it is released. Flags the lease as lost if it was taken
+    over or if it could not be renewed for longer than its ttl.
+    """
+    last_renew = time.time()
+    while lease["released"].wait(lease["ttl_secs"] / 3.0) is False:
+        try:
+            if renew_env_lease(lease) is False:
+                logging.error(
+                    "Lost the lease of env {} of remote setup {}".format(
+                        lease["env_id"], lease["remote_id"]
+                    )
+                )
+                lease["lost"].set()
+                return
+            last_renew = time.time()
+        except redis.exceptions.ConnectionError as e:
+            logging.warning(
+                "Unable to renew the lease of env {}. Error: {}".format(
+                    lease["env_id"], e.__str__()
+                )
+            )
+            if time.time() - last_renew > lease["ttl_secs"]:
+                logging.error(
+                    "The lease of env {} of remote setup {} expired while the env pool was unreachable".format(
+                        lease["env_id"], lease["remote_id"]
+                    )
+                )
+                lease["lost"].set()
+                return
+
+
+def check_env_leases(remote_envs):
+    """Raises if any of the leased envs of the run is no longer ours"""
+    for remote_id, remote_env in remote_envs.items():
+        if is_env_lease(remote_env) and remote_env["lost"].is_set():
+            raise Exception(
+                "Lost the lease of env {} of remote setup {}. The env might be in use by another job.".format(
+                    remote_env["env_id"], remote_id
+                )
+            )
+
+
+def start_env_lease_heartbeat(lease):
+    """Renews the lease in the background until it is released"""
+    lease["heartbeat"] = threading.Thread(
+        target=env_lease_heartbeat,
+        args=(lease,),
+        name="env-lease-heartbeat",
+        daemon=True,
+    )
+    lease["heartbeat"].start()
+    return lease
+
+
+def wait_for_env_lease(conn, remote_id, owner, ttl_secs, timeout_secs):
+    deadline = time.time() + timeout_secs
+    while True:
+        lease = acquire_env_lease(conn, remote_id, owner, ttl_secs)
+        if lease is not None or time.time() >= deadline:
+            return lease
+        time.sleep(min(ENV_POOL_POLL_INTERVAL_SECS, max(0, deadline - time.time())))
+
+
+def get_env_lease_connection_vars(lease):
+    env = lease["env"]
+    return (
+        0,
+        env["username"],
+        env["server_private_ip"],
+        env["server_public_ip"],
+        int(env["server_plaintext_port"]),
+        env["client_private_ip"],
+        env["client_public_ip"],
+    )
+
+
+def get_env_pool_settings(args):
+    """Returns the env pool settings of run-remote, or None if the pool is not used"""
+    if args.env_pool_host is None:
+        return None
+    return {
+        "host": args.env_pool_host,
+        "port": args.env_pool_port,
+        "password": args.env_pool_pass,
+        "ttl_secs": args.env_pool_lease_ttl_secs,
+        "wait_secs": args.env_pool_wait_secs,
+    }
+
+
+def lease_env_from_pool(env_pool, remote_id):
+    """Returns a heartbeated lease of a warm env, or None to provision one as usual"""
+    try:
+        conn = get_env_pool_conn(
+            env_pool["host"], env_pool["port"], env_pool["password"]
+        )
+        lease = wait_for_env_lease(
+            conn,
+            remote_id,
+            get_env_lease_owner(),
+            env_pool["ttl_secs"],
+            env_pool["wait_secs"],
+        )
+    except redis.exceptions.ConnectionError as e:
+        logging.warning(
+            "Unable to reach the env pool at {}:{}. Error: {}".format(
+                env_pool["host"], env_pool["port"], e.__str__()
+            )
+        )
+        return None
+    if lease is None:
+        logging.info(
+            "No warm env of remote setup {} was available within {} secs.".format(
+                remote_id, env_pool["wait_secs"]
+            )
+        )
+        return None
+    return start_env_lease_heartbeat(lease)
+
+
+def get_pool_env_age_secs(env, now=None):
+    if now is None:
+        now = time.time()
+    return now - float(env.get("created_at", now))
+
+
+def expire_dangling_leases(conn, remote_id):
+    """Leased envs whose lock expired belong to a job that died. Returns their ids."""
+    expired = []
+    for env in list_pool_envs(conn, remote_id):
+        if env.get("state", None) != ENV_STATE_LEASED:
+            continue
+        if conn.exists(get_env_pool_lease_keyname(remote_id, env["env_id"])) == 0:
+            logging.warning(
+                "The lease of env {} by {} expired. Recycling it.".format(
+                    env["env_id"], env.get("leased_by", "n/a")
+                )
+            )
+            update_pool_env(
+                conn, remote_id, env["env_id"], {"state": ENV_STATE_RECYCLING}
+            )
+            expired.append(env["env_id"])
+    return expired
+
+
+def health_check_pool_env(env, private_key, ssh_port=22):
+    for host in [env["server_public_ip"], env["client_public_ip"]]:
+        try:
+            recv_exit_status, _, _ = execute_remote_commands(
+                host, env["username"], private_key, ["true"], ssh_port
+            )[0]
+        except Exception as e:
+            logging.warning(
+                "Health check of env {} host {} failed with error: {}".format(
+                    env["env_id"], host, e.__str__()
+                )
+            )
+            return False
+        if recv_exit_status != 0:
+            return False
+    return True
+
+
+def recycle_pool_env(env, private_key, ssh_port=22):
+    for host in [env["server_public_ip"], env["client_public_ip"]]:
+        try:
+            execute_remote_commands(
+                host,
+                env["username"],
+                private_key,
+                ENV_POOL_RECYCLE_COMMANDS,
+                ssh_port,
+            )
+        except Exception as e:
+            logging.warning(
+                "Recycling env {} host {} failed with error: {}".format(
+                    env["env_id"], host, e.__str__()
+                )
+            )
+            return False
+    return health_check_pool_env(env, private_key, ssh_port)
+
+
+def parse_env_pool_remote(remote):
+    """Parses a "<type>:<setup>" remote setup, e.g. "oss-standalone:redisearch-m5" """
+    if remote.count(":") != 1:
+        raise Exception(
+            "Invalid remote setup {}. Expected the format <type>:<setup>.".format(
+                remote
+            )
+        )
+    setup_type, setup = remote.split(":")
+    return [{"type": setup_type}, {"setup": setup}]
+
+
+def provision_pool_env(conn, remote_config, args):
+    """Creates a terraform env on its own working dir copy and state, and registers it"""
+    remote_setup, _, remote_id = fetch_remote_setup_from_config(remote_config)
+    env_id = uuid.uuid4().hex[:8]
+    tf_setup_name = "{}-pool-{}".format(remote_id, env_id)
+    working_dir = os.path.abspath(os.path.join(args.pool_dir, tf_setup_name))
+    register_pool_env(
+        conn,
+        remote_id,
+        env_id,
+        {
+            "state": ENV_STATE_PROVISIONING,
+            "created_at": time.time(),
+            "tf_working_dir": working_dir,
+        },
+    )
+    logging.info("Provisioning env {} of remote setup {}".format(env_id, remote_id))
+    try:
+        shutil.copytree(remote_setup, working_dir)
+        tf = Terraform(
+            working_dir=working_dir, terraform_bin_path=args.terraform_bin_path
+        )
+        (
+            _,
+            username,
+            server_private_ip,
+            server_public_ip,
+            server_plaintext_port,
+            client_private_ip,
+            client_public_ip,
+        ) = setup_remote_environment(
+            tf,
+            args.github_sha,
+            args.github_actor,
+            tf_setup_name,
+            args.github_org,
+            args.github_repo,
+            "env-pool",
+            args.env_max_age_secs + args.env_pool_lease_ttl_secs,
+        )
+    except Exception as e:
+        logging.error(
+            "Provisioning env {} of remote setup {} failed with error: {}".format(
+                env_id, remote_id, e.__str__()
+            )
+        )
+        destroy_pool_env(
+            conn,
+            {"remote_id": remote_id, "env_id": env_id, "tf_working_dir": working_dir},
+            args.terraform_bin_path,
+        )
+        return None
+    env = {
+        "state": ENV_STATE_READY,
+        "username": username,
+        "server_private_ip": server_private_ip,
+        "server_public_ip": server_public_ip,
+        "server_plaintext_port": server_plaintext_port,
+        "client_private_ip": client_private_ip,
+        "client_public_ip": client_public_ip,
+    }
+    update_pool_env(conn, remote_id, env_id, env)
+    logging.info(
+        "Env {} of remote setup {} is ready after {:.1f} secs".format(
+            env_id,
+            remote_id,
+            get_pool_env_age_secs(
+                conn.hgetall(get_env_pool_env_keyname(remote_id, env_id))
+            ),
+        )
+    )
+    return env_id
+
+
+def destroy_pool_env(conn, env, terraform_bin_path):
+    """
+    Destroys the env and unregisters it. If terraform fails the env stays registered
+    (flagged as destroy-failed) along with its working dir, so that it is retried.
+    """
+    logging.info(
+        "Destroying env {} of remote setup {}".format(env["env_id"], env["remote_id"])
+    )
+    working_dir = env.get("tf_working_dir", "")
+    if working_dir != "" and os.path.exists(working_dir):
+        tf = Terraform(working_dir=working_dir, terraform_bin_path=terraform_bin_path)
+        return_code, _, stderr = tf.destroy(
+            capture_output="yes",
+            no_color=IsNotFlagged,
+            force=IsNotFlagged,
+            auto_approve=True,
+        )
+        if return_code != 0:
+            logging.error(
+                "Unable to destroy env {} of remote setup {}. Will retry. Error: {}".format(
+                    env["env_id"], env["remote_id"], stderr
+                )
+            )
+            update_pool_env(
+                conn,
+                env["remote_id"],
+                env["env_id"],
+                {"state": ENV_STATE_DESTROY_FAILED},
+            )
+            return False
+        shutil.rmtree(working_dir, ignore_errors=True)
+    unregister_pool_env(conn, env["remote_id"], env["env_id"])
+    return True
+
+
+def claim_pool_env(conn, env, owner="env-pool"):
+    """
+    Leases an env on behalf of the pool itself so that no job takes it. Fails if the
+    env is no longer in the state it was listed with.
+    """
+    acquire = conn.register_script(ENV_LEASE_ACQUIRE_SCRIPT)
+    return (
+        acquire(
+            keys=[
+                get_env_pool_lease_keyname(env["remote_id"], env["env_id"]),
+                get_env_pool_env_keyname(env["remote_id"], env["env_id"]),
+            ],
+            args=[
+                uuid.uuid4().hex,
+                ENV_POOL_CLAIM_TTL_SECS * 1000,
+                owner,
+                time.time(),
+                env.get("state", None),
+            ],
+        )
+        == 1
+    )
+
+
+def get_pool_env_verdict(env, args, now=None):
+    """Returns what the pool needs to do with the env: keep, recycle or destroy"""
+    state = env.get("state", None)
+    age = get_pool_env_age_secs(env, now)
+    if state == ENV_STATE_PROVISIONING:
+        # provisioning dangling from a pool manager that died
+        if age > args.provisioning_timeout_secs:
+            return "destroy"
+        return "keep"
+    if state == ENV_STATE_LEASED:
+        return "keep"
+    if state == ENV_STATE_DESTROY_FAILED:
+        return "destroy"
+    if age > args.env_max_age_secs:
+        return "destroy"
+    if args.env_max_leases > 0 and int(env.get("leases", 0)) >= args.env_max_leases:
+        return "destroy"
+    if state == ENV_STATE_RECYCLING:
+        return "recycle"
+    return "health-check"
+
+
+def env_pool_reconcile(conn, remote_config, args):
+    """One pass of the pool manager over the envs of a remote setup"""
+    remote_id = [x["setup"] for x in remote_config if "setup" in x][0]
+    expire_dangling_leases(conn, remote_id)
+    for env in list_pool_envs(conn, remote_id):
+        verdict = get_pool_env_verdict(env, args)
+        if verdict == "keep":
+            continue
+        if verdict == "recycle":
+            if recycle_pool_env(env, args.private_key, args.ssh_port):
+                update_pool_env(
+                    conn, remote_id, env["env_id"], {"state": ENV_STATE_READY}
+                )
+                continue
+            verdict = "destroy"
+        if verdict == "health-check":
+            if health_check_pool_env(env, args.private_key, args.ssh_port):
+                continue
+            logging.warning(
+                "Env {} of remote setup {} failed the health check".format(
+                    env["env_id"], remote_id
+                )
+            )
+            verdict = "destroy"
+        if verdict == "destroy":
+            if env.get("state", None) == ENV_STATE_READY:
+                if claim_pool_env(conn, env) is False:
+                    continue
+            destroy_pool_env(conn, env, args.terraform_bin_path)
+    envs = list_pool_envs(conn, remote_id)
+    # envs we failed to destroy still count towards max_envs, but they are not warm
+    warm = len(
+        [
+            x
+            for x in envs
+            if x.get("state", None) not in [ENV_STATE_LEASED, ENV_STATE_DESTROY_FAILED]
+        ]
+    )
+    missing = min(args.pool_size - warm, args.max_envs - len(envs))
+    if missing > 0:
+        logging.info(
+            "Remote setup {} has {} warm envs out of {}. Provisioning {} envs.".format(
+                remote_id, warm, args.pool_size, missing
+            )
+        )
+        with concurrent.futures.ThreadPoolExecutor(max_workers=missing) as pool:
+            list(
+                pool.map(
+                    lambda _: provision_pool_env(conn, remote_config, args),
+                    range(missing),
+                )
+            )
+
+
+def drain_env_pool(conn, remote_id, terraform_bin_path):
+    """Destroys the envs of a remote setup that are neither leased nor provisioning"""
+    for env in list_pool_envs(conn, remote_id):
+        state = env.get("state", None)
+        if state in [ENV_STATE_LEASED, ENV_STATE_PROVISIONING]:
+            logging.warning(
+                "Env {} is {}{}. Not destroying it.".format(
+                    env["env_id"],
+                    state,
+                    " by {}".format(env.get("leased_by", "n/a"))
+                    if state == ENV_STATE_LEASED
+                    else "",
+                )
+            )
+            continue
+        # the listing may be stale. a job could have leased the env meanwhile
+        if claim_pool_env(conn, env) is False:
+            logging.warning(
+                "Env {} changed state while draining. Not destroying it.".format(
+                    env["env_id"]
+                )
+            )
+            continue
+        destroy_pool_env(conn, env, terraform_bin_path)
+
+
+def print_env_pool_status(conn, remote_ids):
+    rows = []
+    now = time.time()
+    for remote_id in remote_ids:
+        for env in list_pool_envs(conn, remote_id):
+            rows.append(
+                [
+                    remote_id,
+                    env["env_id"],
+                    env.get("state", "n/a"),
+                    "{:.0f}".format(get_pool_env_age_secs(env, now)),
+                    env.get("leases", 0),
+                    env.get("leased_by", ""),
+                    env.get("server_public_ip", ""),
+                    env.get("client_public_ip", ""),
+                ]
+            )
+    writer = MarkdownTableWriter(
+        table_name="Remote environments pool",
+        headers=[
+            "Remote setup",
+            "Env",
+            "State",
+            "Age (secs)",
+            "Leases",
+            "Leased by",
+            "Server public IP",
+            "Client public IP",
+        ],
+        value_matrix=rows,
+    )
+    writer.write_table()
+
+
+def env_pool_command_logic(args, project_name, project_version):
+    logging.info(
+        "Using: {project_name} {project_version}".format(
+            project_name=project_name, project_version=project_version
+        )
+    )
+    if args.env_pool_host is None:
+        logging.error("The env pool requires --env_pool_host (or ENV_POOL_HOST).")
+        exit(1)
+    remote_configs = [parse_env_pool_remote(x) for x in args.remote.split(",")]
+    remote_ids = [x[1]["setup"] for x in remote_configs]
+    logging.info(
+        "Checking connection to the env pool redis at {}:{}".format(
+            args.env_pool_host, args.env_pool_port
+        )
+    )
+    conn = get_env_pool_conn(args.env_pool_host, args.env_pool_port, args.env_pool_pass)
+    conn.ping()
+    if args.action == "status":
+        print_env_pool_status(conn, remote_ids)
+        return
+    if args.action == "drain":
+        for remote_id in remote_ids:
+            drain_env_pool(conn, remote_id, args.terraform_bin_path)
+        print_env_pool_status(conn, remote_ids)
+        return
+    update_interval = args.update_interval
+    logging.info(
+        "Keeping {} warm envs of remote setups {}. Ticking every {} secs".format(
+            args.pool_size, remote_ids, update_interval
+        )
+    )
+    while True:
+        starttime = datetime.datetime.now()
+        for remote_config in remote_configs:
+            try:
+                env_pool_reconcile(conn, remote_config, args)
+            except redis.exceptions.ConnectionError as e:
+                logging.error(
+                    "Detected an error while reconciling the env pool: {}".format(
+                        e.__str__()
+                    )
+                )
+        print_env_pool_status(conn, remote_ids)
+        if args.once:
+            return
+        sleep_time_secs = float(update_interval) - (
+            (datetime.datetime.now() - starttime).total_seconds()
+            % float(update_interval)
+        )
+        logging.info("Sleeping for {} secs".format(sleep_time_secs))
+        time.sleep(sleep_time_secs)
@@ -9,6 +9,7 @@ from time import sleep
 
 import redis
 
+from redisbench_admin.utils.affinity import get_affinity_spawn_args
 from redisbench_admin.utils.utils import (
     wait_for_conn,
     redis_server_config_module_part,
@@ -27,6 +28,7 @@ def spin_up_local_redis_cluster(
     dataset_load_timeout_secs=60,
     modules_configuration_parameters_map={},
     redis_7=True,
+    shards_placement=None,
 ):
     redis_processes = []
     redis_conns = []
@@ -56,9 +58,13 @@ def spin_up_local_redis_cluster(
                 " ".join(command)
             )
         )
-        redis_process = subprocess.Popen(command)
+        placement = None
+        if shards_placement is not None:
+            placement = shards_placement[master_shard_id - 1]
+        command_prefix = get_affinity_spawn_args(placement)
+        redis_process = subprocess.Popen(command_prefix + command)
         r = redis.Redis(port=shard_port)
-        result = wait_for_conn(r, dataset_load_timeout_secs)
+        result = wait_for_conn(r, dataset_load_timeout_secs, process=redis_process)
         if result is True:
             logging.info("Redis available. pid={}".format(redis_process.pid))
             r.client_setname("redisbench-admin-cluster-#{}".format(master_shard_id))
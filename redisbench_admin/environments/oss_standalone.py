@@ -4,10 +4,12 @@
 #  All rights reserved.
 #
 import logging
+import os
 import subprocess
 
 import redis
 
+from redisbench_admin.utils.affinity import get_affinity_spawn_args
 from redisbench_admin.utils.utils import (
     wait_for_conn,
     redis_server_config_module_part,
@@ -25,6 +27,7 @@ def spin_up_local_redis(
     dataset_load_timeout_secs=120,
     modules_configuration_parameters_map={},
     redis_7=True,
+    placement=None,
 ):
     command = generate_standalone_redis_server_args(
         binary,
@@ -38,13 +41,23 @@ def spin_up_local_redis(
         redis_7,
     )
 
+    # the daemonized server is tracked via its pidfile while we wait for it
+    pidfile = os.path.join(os.path.abspath(dbdir), "redis-{}.pid".format(port))
+    command.extend(["--pidfile", pidfile])
+
     logging.info(
         "Running local redis-server with the following args: {}".format(
             " ".join(command)
         )
     )
-    redis_process = subprocess.Popen(command)
-    result = wait_for_conn(redis.Redis(port=port), dataset_load_timeout_secs)
+    command_prefix = get_affinity_spawn_args(placement)
+    redis_process = subprocess.Popen(command_prefix + command)
+    result = wait_for_conn(
+        redis.Redis(port=port),
+        dataset_load_timeout_secs,
+        process=redis_process,
+        pidfile=pidfile,
+    )
     if result is True:
         logging.info("Redis available")
     return [redis_process]
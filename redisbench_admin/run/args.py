@@ -40,6 +40,26 @@ PROFILE_FREQ = os.getenv("PROFILE_FREQ", PROFILE_FREQ_DEFAULT)
 KEEP_ENV = bool(os.getenv("KEEP_ENV", False))
 ALLOWED_TOOLS_DEFAULT = "memtier_benchmark,redis-benchmark,redisgraph-benchmark-go,ycsb,go-ycsb,tsbs_run_queries_redistimeseries,tsbs_load_redistimeseries,ftsb_redisearch,aibench_run_inference_redisai_vision,ann-benchmarks"
 ALLOWED_BENCH_TOOLS = os.getenv("ALLOWED_BENCH_TOOLS", ALLOWED_TOOLS_DEFAULT)
+DATASET_SNAPSHOTS = bool(int(os.getenv("DATASET_SNAPSHOTS", 0)))
+REUSE_WRITE_SETUPS = bool(int(os.getenv("REUSE_WRITE_SETUPS", 0)))
+TESTS_DURATIONS_FILE = os.getenv("TESTS_DURATIONS_FILE", "")
+ADAPTIVE_REPETITIONS = bool(int(os.getenv("ADAPTIVE_REPETITIONS", 0)))
+MIN_REPETITIONS = int(os.getenv("MIN_REPETITIONS", 3))
+MAX_REPETITIONS = int(os.getenv("MAX_REPETITIONS", 10))
+ADAPTIVE_KPI = os.getenv("ADAPTIVE_KPI", "$.'ALL STATS'.Totals.'Ops/sec'")
+ADAPTIVE_TARGET_CV = float(os.getenv("ADAPTIVE_TARGET_CV", 0.02))
+ADAPTIVE_TARGET_CI = float(os.getenv("ADAPTIVE_TARGET_CI", 0.0))
+STEADY_STATE_ANALYSIS = bool(int(os.getenv("STEADY_STATE_ANALYSIS", 0)))
+RESUME = bool(int(os.getenv("RESUME", 0)))
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "./journals")
+FORCE_RERUN = bool(int(os.getenv("FORCE_RERUN", 0)))
+RESULTS_ARCHIVE_DIR = os.getenv("RESULTS_ARCHIVE_DIR", "")
+CGROUP_ISOLATION = bool(int(os.getenv("CGROUP_ISOLATION", 0)))
+CGROUP_PARENT = os.getenv("CGROUP_PARENT", "redisbench-admin")
+SUITE_SHARD = os.getenv("SUITE_SHARD", "")
+SUITE_SHARD_DIR = os.getenv("SUITE_SHARD_DIR", "./suite-shards")
+SUITE_SHARD_RUN_ID = os.getenv("SUITE_SHARD_RUN_ID", "")
+SUITE_SHARD_DURATIONS_FILE = os.getenv("SUITE_SHARD_DURATIONS_FILE", "")
 
 
 def common_run_args(parser):
@@ -173,6 +193,160 @@ def common_run_args(parser):
         default=SETUP,
         help="Comma delimited allowed setups. By default all setups are allowed.",
     )
+    parser.add_argument(
+        "--dataset-snapshots",
+        default=DATASET_SNAPSHOTS,
+        action="store_true",
+        help="Snapshot (SAVE) the dataset generated via client tool on dbconfig and "
+        "restore it on the next runs with the same dbconfig, tool, modules and topology,"
+        " instead of re-running the loader.",
+    )
+    parser.add_argument(
+        "--reuse-write-setups",
+        default=REUSE_WRITE_SETUPS,
+        action="store_true",
+        help="Reuse the spinned setup across write benchmarks with the same dbconfig. "
+        "In between tests the state is reset via FLUSHALL and DEBUG RELOAD of the dataset RDB,"
+        " or only FLUSHALL for tests that declare no dataset.",
+    )
+    parser.add_argument(
+        "--adaptive-repetitions",
+        default=ADAPTIVE_REPETITIONS,
+        action="store_true",
+        help="Repeat each test until the --adaptive-kpi is statistically stable, "
+        "in between --min-repetitions and --max-repetitions. "
+        "When enabled BENCHMARK_REPETITIONS is ignored.",
+    )
+    parser.add_argument(
+        "--min-repetitions",
+        type=int,
+        default=MIN_REPETITIONS,
+        help="Minimum repetitions of each test when using --adaptive-repetitions.",
+    )
+    parser.add_argument(
+        "--max-repetitions",
+        type=int,
+        default=MAX_REPETITIONS,
+        help="Maximum repetitions of each test when using --adaptive-repetitions.",
+    )
+    parser.add_argument(
+        "--adaptive-kpi",
+        type=str,
+        default=ADAPTIVE_KPI,
+        help="jsonpath of the results KPI used to check the stability of the repetitions.",
+    )
+    parser.add_argument(
+        "--adaptive-target-cv",
+        type=float,
+        default=ADAPTIVE_TARGET_CV,
+        help="Target coefficient of variation (fraction, e.g. 0.02 for 2%%) of the KPI. "
+        "Set to 0 to disable.",
+    )
+    parser.add_argument(
+        "--adaptive-target-ci",
+        type=float,
+        default=ADAPTIVE_TARGET_CI,
+        help="Target 95%% confidence interval half-width of the KPI mean (fraction of the mean). "
+        "Set to 0 to disable.",
+    )
+    parser.add_argument(
+        "--steady-state-analysis",
+        default=STEADY_STATE_ANALYSIS,
+        action="store_true",
+        help="Detect the end of the warm-up on the tool per-second timeseries (memtier 'Time-Serie') "
+        "and export the trimmed steady-state KPIs (ops/sec, average latency and warm-up seconds) "
+        "alongside the raw ones.",
+    )
+    parser.add_argument(
+        "--resume",
+        default=RESUME,
+        action="store_true",
+        help="Resume a previous run of the same suite and git sha from its checkpoint journal, "
+        "skipping the completed tests and re-exporting the results that did not reach the datasink.",
+    )
+    parser.add_argument(
+        "--journal-dir",
+        type=str,
+        default=JOURNAL_DIR,
+        help="Directory of the suite checkpoint journals. Set to empty to disable the journal.",
+    )
+    parser.add_argument(
+        "--force-rerun",
+        default=FORCE_RERUN,
+        action="store_true",
+        help="Run the tests even if an identical run (same redis binary, modules, benchmark config, "
+        "tool version and setup) was already measured on the datasink or on the local results archive.",
+    )
+    parser.add_argument(
+        "--results-archive-dir",
+        type=str,
+        default=RESULTS_ARCHIVE_DIR,
+        help="Local archive of the measured results, keyed by the run fingerprint. "
+        "Used alongside the datasink to skip already measured runs. Empty disables it.",
+    )
+    parser.add_argument(
+        "--cgroup-isolation",
+        default=CGROUP_ISOLATION,
+        action="store_true",
+        help="Run each redis-server shard and the client tool on its own cgroup v2, with the cpuset, "
+        "cpu.max and memory.max limits of the setup isolation spec. Only applies to run-local.",
+    )
+    parser.add_argument(
+        "--cgroup-parent",
+        type=str,
+        default=CGROUP_PARENT,
+        help="cgroup v2 (relative to the cgroup root) under which the isolation cgroups are created.",
+    )
+    parser.add_argument(
+        "--suite-shard",
+        type=str,
+        default=SUITE_SHARD,
+        help="Only run the tests of suite shard i/N (1-based). Tests are deterministically partitioned "
+        "into N buckets balanced by the durations of --suite-shard-durations-file.",
+    )
+    parser.add_argument(
+        "--suite-shard-durations-file",
+        type=str,
+        default=SUITE_SHARD_DURATIONS_FILE,
+        help="Pinned JSON snapshot of the per-test durations (same format as --tests-durations-file) "
+        "used to partition the suite. It needs to be identical across suite shards and must not be "
+        "updated by the run. If empty every test is expected to take the same time.",
+    )
+    parser.add_argument(
+        "--suite-shard-run-id",
+        type=str,
+        default=SUITE_SHARD_RUN_ID,
+        help="Identifier of the sharded suite run (e.g. the CI run id). The manifests are kept "
+        "under --suite-shard-dir/<run id> so that the ones of other runs are never merged.",
+    )
+    parser.add_argument(
+        "--suite-shard-dir",
+        type=str,
+        default=SUITE_SHARD_DIR,
+        help="Directory of the suite shard manifests, holding each shard tests and their status.",
+    )
+    parser.add_argument(
+        "--suite-shard-merge",
+        default=False,
+        action="store_true",
+        help="Do not run anything. Verify, from the manifests of all the N suite shards of "
+        "--suite-shard i/N on --suite-shard-dir (and --suite-shard-run-id), that every test ran exactly once.",
+    )
+    parser.add_argument(
+        "--plan-only",
+        default=False,
+        action="store_true",
+        help="Only print the scheduled benchmark plan, its expected total time and the "
+        "number of setup spins saved against the unscheduled plan, without running it.",
+    )
+    parser.add_argument(
+        "--tests-durations-file",
+        type=str,
+        default=TESTS_DURATIONS_FILE,
+        help="Local JSON file with the historical per-test durations used to estimate "
+        "the benchmark plan cost. It is updated with the durations of the tests we run."
+        " If pushing to the datasink, the datasink durations are also used.",
+    )
     parser.add_argument(
         "--grafana-profile-dashboard",
         type=str,
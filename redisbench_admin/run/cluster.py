@@ -5,7 +5,7 @@
 #
 import logging
 
-from redisbench_admin.utils.remote import execute_remote_commands
+from redisbench_admin.utils.remote import execute_remote_commands_parallel
 
 from redisbench_admin.environments.oss_cluster import generate_cluster_redis_server_args
 from redisbench_admin.utils.utils import wait_for_conn
@@ -142,16 +142,22 @@ def spin_up_redis_cluster_remote_redis(
         )
         logfiles.append(logfile)
         redis_process_commands.append(" ".join(command))
-    res = execute_remote_commands(
+    res = execute_remote_commands_parallel(
         server_public_ip, username, private_key, redis_process_commands, ssh_port
     )
     for pos, res_pos in enumerate(res):
-        [recv_exit_status, stdout, stderr] = res_pos
+        [recv_exit_status, stdout, stderr, duration] = res_pos
         if recv_exit_status != 0:
             logging.error(
                 "Remote primary shard {} command returned exit code {}. stdout {}. stderr {}".format(
                     pos, recv_exit_status, stdout, stderr
                 )
             )
+        else:
+            logging.info(
+                "Remote primary shard {} started in {:.3f} secs".format(
+                    pos + 1, duration
+                )
+            )
 
     return logfiles
@@ -19,6 +19,7 @@ from redisbench_admin.run.ann.ann import (
     prepare_ann_benchmark_command,
     ANN_MULTIRUN_PATH,
 )
+from redisbench_admin.run.cluster import debug_reload_rdb
 from redisbench_admin.run.ftsb.ftsb import prepare_ftsb_benchmark_command
 from redisbench_admin.run.memtier_benchmark.memtier_benchmark import (
     prepare_memtier_benchmark_command,
@@ -394,6 +395,48 @@ def check_dbconfig_tool_requirement(benchmark_config, dbconfig_keyname="dbconfig
     return required
 
 
+def check_dbconfig_dataset_requirement(benchmark_config, dbconfig_keyname="dbconfig"):
+    required = False
+    if dbconfig_keyname in benchmark_config:
+        if type(benchmark_config[dbconfig_keyname]) == list:
+            for k in benchmark_config[dbconfig_keyname]:
+                if "dataset" in k:
+                    required = True
+        if type(benchmark_config[dbconfig_keyname]) == dict:
+            if "dataset" in benchmark_config[dbconfig_keyname]:
+                required = True
+    return required
+
+
+def reset_setup_state(benchmark_config, redis_conns, dataset_load_timeout_secs):
+    """Bring a reused setup back to the state it had right after the dataset load"""
+    reset_start_time = datetime.datetime.now()
+    for primary_n, conn in enumerate(redis_conns):
+        logging.info("Flushing all data of primary #{}".format(primary_n))
+        conn.flushall()
+    if check_dbconfig_dataset_requirement(
+        benchmark_config
+    ) or check_dbconfig_tool_requirement(benchmark_config):
+        # the dbdir RDB holds the post-load dataset. given the setup runs with
+        # --save '' it was not overwritten by the previous benchmark
+        debug_reload_rdb(dataset_load_timeout_secs, redis_conns)
+    else:
+        logging.info("Given the benchmark declares no dataset, skipping the restore.")
+    reset_duration_seconds = (datetime.datetime.now() - reset_start_time).seconds
+    logging.info("Setup state reset took {} secs.".format(reset_duration_seconds))
+    return reset_duration_seconds
+
+
+def save_setup_state(redis_conns):
+    for primary_n, conn in enumerate(redis_conns):
+        logging.info(
+            "Saving the post-load dataset of primary #{} to be able to reset the setup state".format(
+                primary_n
+            )
+        )
+        conn.save()
+
+
 def check_dbconfig_keyspacelen_requirement(
     benchmark_config, dbconfig_keyname="dbconfig"
 ):
@@ -0,0 +1,203 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import json
+import logging
+import os
+
+from redisbench_admin.run.redistimeseries import timeseries_test_sucess_flow
+from redisbench_admin.utils.utils import dict_sha256
+
+TEST_STATUS_RUNNING = "running"
+TEST_STATUS_FAILED = "failed"
+TEST_STATUS_COMPLETED = "completed"
+
+
+def get_journal_filename(journal_dir, command_name, test_names, git_sha):
+    suite_hash = dict_sha256({"tests": sorted(test_names)})[:12]
+    if git_sha is None or git_sha == "":
+        git_sha = "unknown-sha"
+    return os.path.join(
+        journal_dir, "{}-{}-{}.json".format(command_name, suite_hash, git_sha)
+    )
+
+
+def get_journal_test_key(test_name, setup_name, benchmark_config):
+    return "{}/{}/{}".format(test_name, setup_name, dict_sha256(benchmark_config)[:12])
+
+
+def init_journal(journal_dir, command_name, test_names, git_sha, resume=False):
+    """
+    Returns the suite checkpoint journal. When resuming, the previous journal of the same
+    suite (set of tests) and git sha is loaded. Otherwise we start a new one.
+    Returns None if the journal is disabled (empty journal dir).
+    """
+    if journal_dir is None or journal_dir == "":
+        return None
+    journal_filename = get_journal_filename(
+        journal_dir, command_name, test_names, git_sha
+    )
+    journal = {"filename": journal_filename, "git_sha": git_sha, "tests": {}}
+    if resume:
+        if os.path.exists(journal_filename):
+            with open(journal_filename, "r") as journal_file:
+                journal = json.load(journal_file)
+            completed = len(
+                [
+                    x
+                    for x in journal["tests"].values()
+                    if x["status"] == TEST_STATUS_COMPLETED
+                ]
+            )
+            logging.info(
+                "Resuming suite from journal {}. {} tests already completed.".format(
+                    journal_filename, completed
+                )
+            )
+        else:
+            logging.warning(
+                "Requested to resume but no journal was found at {}. Starting from scratch.".format(
+                    journal_filename
+                )
+            )
+    else:
+        logging.info("Using suite checkpoint journal {}".format(journal_filename))
+    store_journal(journal)
+    return journal
+
+
+def store_journal(journal):
+    journal_filename = journal["filename"]
+    journal_dir = os.path.dirname(journal_filename)
+    if journal_dir != "":
+        # concurrent runs can create the journal dir at the same time
+        os.makedirs(journal_dir, exist_ok=True)
+    inflight_filename = "{}.{}.tmp".format(journal_filename, os.getpid())
+    with open(inflight_filename, "w") as journal_file:
+        json.dump(journal, journal_file, indent=2)
+    os.replace(inflight_filename, journal_filename)
+
+
+def is_test_completed(journal, test_key):
+    if journal is None or test_key not in journal["tests"]:
+        return False
+    return journal["tests"][test_key]["status"] == TEST_STATUS_COMPLETED
+
+
+def journal_test_start(journal, test_key):
+    if journal is None:
+        return
+    journal["tests"][test_key] = {
+        "status": TEST_STATUS_RUNNING,
+        "started_at": datetime.datetime.now().isoformat(),
+        "results": [],
+    }
+    store_journal(journal)
+
+
+def journal_test_failed(journal, test_key):
+    if journal is None or test_key not in journal["tests"]:
+        return
+    journal["tests"][test_key]["status"] = TEST_STATUS_FAILED
+    store_journal(journal)
+
+
+def journal_test_end(journal, test_key):
+    """Marks the test as completed, unless one of its repetitions failed"""
+    if journal is None or test_key not in journal["tests"]:
+        return
+    test_entry = journal["tests"][test_key]
+    if test_entry["status"] == TEST_STATUS_RUNNING and len(test_entry["results"]) > 0:
+        test_entry["status"] = TEST_STATUS_COMPLETED
+        test_entry["completed_at"] = datetime.datetime.now().isoformat()
+        store_journal(journal)
+
+
+def journal_record_result(
+    journal, test_key, result_file, exported, export_context=None
+):
+    """Records a repetition result file. Returns its position on the test results"""
+    if journal is None or test_key not in journal["tests"]:
+        return None
+    if export_context is None:
+        export_context = {}
+    results = journal["tests"][test_key]["results"]
+    results.append(
+        {
+            "result_file": os.path.abspath(result_file),
+            "exported": exported,
+            "export_context": export_context,
+        }
+    )
+    store_journal(journal)
+    return len(results) - 1
+
+
+def journal_result_exported(journal, test_key, result_pos):
+    if journal is None or result_pos is None or test_key not in journal["tests"]:
+        return
+    journal["tests"][test_key]["results"][result_pos]["exported"] = True
+    store_journal(journal)
+
+
+def reexport_pending_results(
+    journal,
+    test_key,
+    test_name,
+    benchmark_config,
+    default_metrics,
+    exporter_timemetric_path,
+    rts,
+    tf_github_branch,
+    tf_github_org,
+    tf_github_repo,
+    tf_triggering_env,
+):
+    """Exports the results of a completed test that had not yet reached the datasink"""
+    reexported = 0
+    if journal is None or rts is None or test_key not in journal["tests"]:
+        return reexported
+    for result_pos, result in enumerate(journal["tests"][test_key]["results"]):
+        if result["exported"]:
+            continue
+        if not os.path.exists(result["result_file"]):
+            logging.warning(
+                "Unable to re-export result of test {} given the file {} does not exist.".format(
+                    test_name, result["result_file"]
+                )
+            )
+            continue
+        logging.info(
+            "Re-exporting result {} of test {} to the datasink.".format(
+                result["result_file"], test_name
+            )
+        )
+        with open(result["result_file"], "r") as json_file:
+            results_dict = json.load(json_file)
+        export_context = result["export_context"]
+        timeseries_test_sucess_flow(
+            True,
+            export_context["artifact_version"],
+            benchmark_config,
+            export_context["benchmark_duration_seconds"],
+            export_context["dataset_load_duration_seconds"],
+            default_metrics,
+            export_context["setup_name"],
+            export_context["setup_type"],
+            exporter_timemetric_path,
+            results_dict,
+            rts,
+            export_context["start_time_ms"],
+            test_name,
+            tf_github_branch,
+            tf_github_org,
+            tf_github_repo,
+            tf_triggering_env,
+            export_context["metadata_tags"],
+        )
+        journal_result_exported(journal, test_key, result_pos)
+        reexported = reexported + 1
+    return reexported
@@ -11,6 +11,32 @@ import shlex
 from redisbench_admin.utils.remote import execute_remote_commands
 
 
+MEMTIER_PROGRESS_REGEX = re.compile(
+    r"\[RUN #(\d+) +(\d+)%, +(\d+) secs\] +(\d+) threads: +(\d+) ops, +(\d+) \(avg: +(\d+)\) ops/sec"
+)
+MEMTIER_PROGRESS_LATENCY_REGEX = re.compile(r"([\d.]+) \(avg: +([\d.]+)\) msec latency")
+
+
+def memtier_progress_line_to_metrics(line):
+    """Parses a memtier_benchmark progress line into live metrics. Returns None for other lines"""
+    metrics = None
+    match = MEMTIER_PROGRESS_REGEX.search(line)
+    if match is not None:
+        metrics = {
+            "run": int(match.group(1)),
+            "progress %": int(match.group(2)),
+            "secs": int(match.group(3)),
+            "ops": int(match.group(5)),
+            "ops/sec": int(match.group(6)),
+            "avg ops/sec": int(match.group(7)),
+        }
+        latency_match = MEMTIER_PROGRESS_LATENCY_REGEX.search(line)
+        if latency_match is not None:
+            metrics["msec latency"] = float(latency_match.group(1))
+            metrics["avg msec latency"] = float(latency_match.group(2))
+    return metrics
+
+
 def prepare_memtier_benchmark_command(
     executable_path: str,
     server_private_ip: object,
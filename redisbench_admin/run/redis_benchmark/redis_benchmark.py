@@ -14,6 +14,26 @@ import subprocess
 from redisbench_admin.utils.remote import execute_remote_commands
 
 
+REDIS_BENCHMARK_PROGRESS_REGEX = re.compile(
+    r"^(.+): rps=([\d.]+) \(overall: ([\d.]+)\) avg_msec=([\d.]+) \(overall: ([\d.]+)\)"
+)
+
+
+def redis_benchmark_progress_line_to_metrics(line):
+    """Parses a redis-benchmark progress line into live metrics. Returns None for other lines"""
+    metrics = None
+    match = REDIS_BENCHMARK_PROGRESS_REGEX.match(line.strip())
+    if match is not None:
+        metrics = {
+            "test": match.group(1),
+            "rps": float(match.group(2)),
+            "overall rps": float(match.group(3)),
+            "avg_msec": float(match.group(4)),
+            "overall avg_msec": float(match.group(5)),
+        }
+    return metrics
+
+
 def redis_benchmark_from_stdout_csv_to_json(
     csv_data, start_time_ms, start_time_str, overload_test_name=None
 ):
@@ -22,7 +42,8 @@ def redis_benchmark_from_stdout_csv_to_json(
         "StartTime": start_time_ms,
         "StartTimeHuman": start_time_str,
     }
-    csv_data = csv_data.splitlines()
+    if type(csv_data) is not list:
+        csv_data = csv_data.splitlines()
     if len(csv_data) > 0:
         if "WARNING:" in csv_data[0]:
             csv_data = csv_data[1:]
@@ -0,0 +1,177 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import logging
+import math
+import statistics
+
+from jsonpath_ng import parse
+from pytablewriter import MarkdownTableWriter
+
+# two-sided 95% Student's t critical values by degrees of freedom
+T_CRITICAL_VALUES_95 = {
+    1: 12.706,
+    2: 4.303,
+    3: 3.182,
+    4: 2.776,
+    5: 2.571,
+    6: 2.447,
+    7: 2.365,
+    8: 2.306,
+    9: 2.262,
+    10: 2.228,
+    11: 2.201,
+    12: 2.179,
+    13: 2.160,
+    14: 2.145,
+    15: 2.131,
+    16: 2.120,
+    17: 2.110,
+    18: 2.101,
+    19: 2.093,
+    20: 2.086,
+    25: 2.060,
+    30: 2.042,
+}
+Z_CRITICAL_VALUE_95 = 1.960
+
+
+def get_max_repetitions(args, benchmark_repetitions):
+    if args.adaptive_repetitions:
+        return args.max_repetitions
+    return benchmark_repetitions
+
+
+def extract_kpi_value(results_dict, kpi_jsonpath):
+    kpi_value = None
+    try:
+        find_res = parse(kpi_jsonpath).find(results_dict)
+        if len(find_res) > 0:
+            kpi_value = float(find_res[0].value)
+    except Exception as e:
+        logging.warning(
+            "Unable to extract the KPI {} from the results. Error: {}".format(
+                kpi_jsonpath, e.__str__()
+            )
+        )
+    return kpi_value
+
+
+def get_t_critical_value(degrees_of_freedom):
+    t_value = Z_CRITICAL_VALUE_95
+    for df in sorted(T_CRITICAL_VALUES_95.keys()):
+        if degrees_of_freedom <= df:
+            t_value = T_CRITICAL_VALUES_95[df]
+            break
+    return t_value
+
+
+def compute_repetitions_stats(kpi_values):
+    """
+    Returns the mean, the coefficient of variation and the 95% confidence
+    interval half-width (relative to the mean) of the KPI values.
+    """
+    mean = None
+    cv = None
+    ci = None
+    if len(kpi_values) > 0:
+        mean = statistics.mean(kpi_values)
+    if len(kpi_values) > 1 and mean != 0:
+        stdev = statistics.stdev(kpi_values)
+        cv = stdev / abs(mean)
+        ci = (
+            get_t_critical_value(len(kpi_values) - 1)
+            * stdev
+            / math.sqrt(len(kpi_values))
+            / abs(mean)
+        )
+    return mean, cv, ci
+
+
+def is_repetitions_stable(kpi_values, target_cv, target_ci):
+    _, cv, ci = compute_repetitions_stats(kpi_values)
+    if cv is None or (target_cv <= 0 and target_ci <= 0):
+        return False
+    stable = True
+    if target_cv > 0 and cv > target_cv:
+        stable = False
+    if target_ci > 0 and ci > target_ci:
+        stable = False
+    return stable
+
+
+def check_adaptive_repetitions_stop(
+    args, test_name, repetitions_state, fixed_repetitions=1
+):
+    """
+    Check, before running the next repetition, if the test is already stable.
+    If the KPI is missing from the results we fall back to the fixed repetitions.
+    """
+    if args.adaptive_repetitions is False:
+        return False
+    completed_repetitions = repetitions_state["repetitions"]
+    kpi_values = repetitions_state["kpi_values"]
+    if len(kpi_values) < completed_repetitions:
+        if repetitions_state.get("kpi_missing", False) is False:
+            logging.warning(
+                "The KPI {} was not present on all repetitions of test {}. Will run the fixed {} repetitions.".format(
+                    args.adaptive_kpi, test_name, fixed_repetitions
+                )
+            )
+            repetitions_state["kpi_missing"] = True
+        return completed_repetitions >= fixed_repetitions
+    if completed_repetitions < args.min_repetitions:
+        return False
+    stop = is_repetitions_stable(
+        kpi_values, args.adaptive_target_cv, args.adaptive_target_ci
+    )
+    if stop:
+        _, cv, ci = compute_repetitions_stats(kpi_values)
+        logging.info(
+            "Test {} is stable after {} repetitions (CV={:.2f} %, CI=+-{:.2f} %). Skipping the remaining ones.".format(
+                test_name, completed_repetitions, cv * 100.0, ci * 100.0
+            )
+        )
+    return stop
+
+
+def append_repetition_result(args, results_dict, repetitions_state):
+    repetitions_state["repetitions"] = repetitions_state["repetitions"] + 1
+    if args.adaptive_repetitions:
+        kpi_value = extract_kpi_value(results_dict, args.adaptive_kpi)
+        if kpi_value is not None:
+            repetitions_state["kpi_values"].append(kpi_value)
+
+
+def get_repetitions_summary_row(setup_name, test_name, repetitions_state):
+    mean, cv, ci = compute_repetitions_stats(repetitions_state["kpi_values"])
+    mean_str = "N/A"
+    cv_str = "N/A"
+    ci_str = "N/A"
+    if mean is not None:
+        mean_str = "{:.3f}".format(mean)
+    if cv is not None:
+        cv_str = "{:.2f} %".format(cv * 100.0)
+        ci_str = "+-{:.2f} %".format(ci * 100.0)
+    return [
+        setup_name,
+        test_name,
+        repetitions_state["repetitions"],
+        mean_str,
+        cv_str,
+        ci_str,
+    ]
+
+
+def print_repetitions_summary_table(args, repetitions_summary):
+    if args.adaptive_repetitions and len(repetitions_summary) > 0:
+        writer = MarkdownTableWriter(
+            table_name="Adaptive repetitions summary for KPI {}".format(
+                args.adaptive_kpi
+            ),
+            headers=["Setup", "Test-case", "Repetitions", "Mean", "CV", "95% CI"],
+            value_matrix=repetitions_summary,
+        )
+        writer.write_table()
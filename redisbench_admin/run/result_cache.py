@@ -0,0 +1,240 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+from redisbench_admin.utils.benchmark_config import extract_benchmark_tool_settings
+from redisbench_admin.utils.remote import execute_remote_commands
+from redisbench_admin.utils.utils import dict_sha256, file_sha256
+
+TOOL_VERSION_TIMEOUT_SECS = 10
+
+
+def get_file_or_name_fingerprint(name):
+    """sha256 of the file content when it's resolvable locally, the name otherwise"""
+    path = name
+    if not os.path.isfile(path):
+        path = shutil.which(name)
+    if path is not None and os.path.isfile(path):
+        return file_sha256(path)
+    return name
+
+
+def get_redis_binary_fingerprint(redis_binary):
+    # the binary can be a command line like "valgrind redis-server"
+    if type(redis_binary) == str:
+        redis_binary = redis_binary.split(" ")
+    return [get_file_or_name_fingerprint(x) for x in redis_binary if x != ""]
+
+
+def get_modules_fingerprint(module_files):
+    if module_files is None:
+        return []
+    if type(module_files) == str:
+        module_files = [module_files]
+    modules = []
+    for module_file in module_files:
+        # module paths can carry module load arguments
+        module_path = module_file.split(" ")[0]
+        modules.append(
+            " ".join(
+                [get_file_or_name_fingerprint(module_path)] + module_file.split(" ")[1:]
+            )
+        )
+    return modules
+
+
+def get_benchmark_tool_version(
+    benchmark_config, local=True, benchmark_tool_path=None, config_key="clientconfig"
+):
+    """
+    benchmark_tool_path is the binary the run resolved ( e.g. fetched into ./binaries ),
+    the tool is looked up on the PATH otherwise
+    """
+    (
+        _,
+        _,
+        _,
+        _,
+        benchmark_tool,
+        tool_source,
+        _,
+        _,
+    ) = extract_benchmark_tool_settings(benchmark_config, config_key)
+    tool_version = {"tool": benchmark_tool, "source": tool_source}
+    which_benchmark_tool = None
+    if local and benchmark_tool is not None:
+        which_benchmark_tool = benchmark_tool_path
+        if which_benchmark_tool is None or not os.path.isfile(which_benchmark_tool):
+            which_benchmark_tool = shutil.which(benchmark_tool)
+    if which_benchmark_tool is not None:
+        # not every tool supports --version, in that case we rely on the binary hash
+        tool_version["sha256"] = file_sha256(which_benchmark_tool)
+        try:
+            output = subprocess.run(
+                [which_benchmark_tool, "--version"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                timeout=TOOL_VERSION_TIMEOUT_SECS,
+            ).stdout.decode("utf-8", errors="replace")
+            if output.strip() != "":
+                tool_version["version"] = output.strip().splitlines()[0]
+        except Exception as e:
+            logging.warning(
+                "Unable to retrieve {} version. Error: {}".format(
+                    benchmark_tool, e.__str__()
+                )
+            )
+    return tool_version
+
+
+def get_remote_benchmark_tool_version(
+    benchmark_config,
+    client_public_ip,
+    username,
+    private_key,
+    client_ssh_port=22,
+    config_key="clientconfig",
+):
+    """
+    Same as get_benchmark_tool_version for the tool on the client PATH of a remote
+    setup. Tools fetched from their source on each run are identified by the source.
+    """
+    tool_version = get_benchmark_tool_version(benchmark_config, False, None, config_key)
+    benchmark_tool = tool_version["tool"]
+    if benchmark_tool is None:
+        return tool_version
+    [
+        [sha256_exit_status, sha256_stdout, _],
+        [version_exit_status, version_stdout, _],
+    ] = execute_remote_commands(
+        client_public_ip,
+        username,
+        private_key,
+        [
+            'sha256sum "$(command -v {})"'.format(benchmark_tool),
+            "{} --version 2>&1".format(benchmark_tool),
+        ],
+        client_ssh_port,
+    )
+    if sha256_exit_status == 0 and len(sha256_stdout) > 0:
+        tool_version["sha256"] = sha256_stdout[0].split(" ")[0].strip()
+    if version_exit_status == 0 and len(version_stdout) > 0:
+        tool_version["version"] = version_stdout[0].strip()
+    return tool_version
+
+
+def compute_run_fingerprint(
+    redis_binary_fingerprint,
+    modules_fingerprint,
+    benchmark_config,
+    tool_version,
+    setup_name,
+    setup_settings,
+):
+    return dict_sha256(
+        {
+            "redis-binary": redis_binary_fingerprint,
+            "modules": modules_fingerprint,
+            "benchmark-config": benchmark_config,
+            "tool": tool_version,
+            "setup-name": setup_name,
+            "setup": setup_settings,
+        }
+    )
+
+
+def get_results_fingerprints_keyname(tf_github_org, tf_github_repo, tf_triggering_env):
+    return "ci.benchmarks.redislabs/{}/{}/{}:results_fingerprints".format(
+        tf_triggering_env, tf_github_org, tf_github_repo
+    )
+
+
+def lookup_measured_result(fingerprint, archive_dir, rts=None, keyname=None):
+    """
+    Returns the previous result entry of the given fingerprint, checking first the
+    local results archive and then the datasink. Returns None if it was never measured.
+    """
+    if archive_dir is not None and archive_dir != "":
+        entry_filename = os.path.join(archive_dir, "{}.json".format(fingerprint))
+        if os.path.exists(entry_filename):
+            with open(entry_filename, "r") as entry_file:
+                return json.load(entry_file)
+    if rts is not None and keyname is not None:
+        entry = rts.hget(keyname, fingerprint)
+        if entry is not None:
+            return json.loads(entry)
+    return None
+
+
+def record_measured_result(
+    fingerprint,
+    test_name,
+    setup_name,
+    git_sha,
+    result_files,
+    archive_dir,
+    rts=None,
+    keyname=None,
+):
+    entry = {
+        "fingerprint": fingerprint,
+        "test_name": test_name,
+        "setup_name": setup_name,
+        "git_sha": git_sha,
+        "recorded_at": datetime.datetime.now().isoformat(),
+        "result_files": [os.path.basename(x) for x in result_files],
+    }
+    if archive_dir is not None and archive_dir != "":
+        fingerprint_dir = os.path.join(archive_dir, fingerprint)
+        if not os.path.exists(fingerprint_dir):
+            os.makedirs(fingerprint_dir)
+        for result_file in result_files:
+            if os.path.exists(result_file):
+                shutil.copy(result_file, fingerprint_dir)
+        entry_filename = os.path.join(archive_dir, "{}.json".format(fingerprint))
+        inflight_filename = "{}.{}.tmp".format(entry_filename, os.getpid())
+        with open(inflight_filename, "w") as entry_file:
+            json.dump(entry, entry_file, indent=2)
+        os.replace(inflight_filename, entry_filename)
+    if rts is not None and keyname is not None:
+        rts.hset(keyname, fingerprint, json.dumps(entry))
+    return entry
+
+
+def check_already_measured(
+    args, fingerprint, test_name, setup_name, rts=None, keyname=None
+):
+    """Returns True if the test should be skipped given an identical run was already measured"""
+    if args.force_rerun:
+        return False
+    entry = None
+    try:
+        entry = lookup_measured_result(
+            fingerprint, args.results_archive_dir, rts, keyname
+        )
+    except Exception as e:
+        logging.warning(
+            "Unable to check for previous results of test {}. Error: {}".format(
+                test_name, e.__str__()
+            )
+        )
+    if entry is None:
+        return False
+    logging.info(
+        "Skipping test {} on setup {} given an identical run (fingerprint {}) was already measured at {} on git sha {}. Use --force-rerun to run it anyway.".format(
+            test_name,
+            setup_name,
+            fingerprint[:12],
+            entry["recorded_at"],
+            entry["git_sha"],
+        )
+    )
+    return True
@@ -11,6 +11,7 @@ from redisbench_admin.utils.benchmark_config import (
     extract_benchmark_type_from_config,
     extract_redis_dbconfig_parameters,
 )
+from redisbench_admin.utils.utils import dict_sha256
 
 
 def calculate_client_tool_duration_and_check(
@@ -30,7 +31,9 @@ def calculate_client_tool_duration_and_check(
     return benchmark_duration_seconds
 
 
-def define_benchmark_plan(benchmark_definitions, default_specs):
+def define_benchmark_plan(
+    benchmark_definitions, default_specs, reuse_write_setups=False
+):
     benchmark_runs_plan = {}
     for test_name, benchmark_config in benchmark_definitions.items():
         # extract benchmark-type
@@ -45,6 +48,15 @@ def define_benchmark_plan(benchmark_definitions, default_specs):
         dbconfig_present, dataset_name, _, _, _ = extract_redis_dbconfig_parameters(
             benchmark_config, "dbconfig"
         )
+        if reuse_write_setups and benchmark_type != "read-only":
+            # write tests can only share a setup that is reset to the same initial state,
+            # so we group them by the full dbconfig instead of by test name
+            dataset_name = get_write_reuse_dataset_key(benchmark_config, dataset_name)
+            logging.info(
+                "Given setups are reused across write benchmarks, using {} as key for the dataset reference of test {}".format(
+                    dataset_name, test_name
+                )
+            )
         if dataset_name is None:
             dataset_name = test_name
             logging.info(
@@ -85,3 +97,12 @@ def define_benchmark_plan(benchmark_definitions, default_specs):
                 ][test_name] = benchmark_config
 
     return benchmark_runs_plan
+
+
+def get_write_reuse_dataset_key(benchmark_config, dataset_name=None):
+    dbconfig = None
+    if "dbconfig" in benchmark_config:
+        dbconfig = benchmark_config["dbconfig"]
+    if dataset_name is None:
+        dataset_name = "dataset"
+    return "{}-{}".format(dataset_name, dict_sha256({"dbconfig": dbconfig})[:12])
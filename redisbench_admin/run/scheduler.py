@@ -0,0 +1,445 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import json
+import logging
+import os
+
+import redis
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.utils.benchmark_config import extract_redis_dbconfig_parameters
+from redisbench_admin.utils.utils import dict_sha256
+
+# used to estimate the plan cost of tests without historical data
+DEFAULT_TEST_DURATION_SECS = int(os.getenv("DEFAULT_TEST_DURATION_SECS", 300))
+DEFAULT_SETUP_SPIN_DURATION_SECS = int(
+    os.getenv("DEFAULT_SETUP_SPIN_DURATION_SECS", 30)
+)
+# number of latest datapoints averaged when fetching durations from the datasink
+DURATIONS_DATASINK_SAMPLES = int(os.getenv("DURATIONS_DATASINK_SAMPLES", 5))
+# a topology change is more expensive than a server configuration change
+TOPOLOGY_CHANGE_COST = 2
+SERVER_CONFIG_CHANGE_COST = 1
+
+
+def get_plan_groups(benchmark_runs_plan):
+    """Flatten the benchmark plan into an ordered list of setup groups"""
+    groups = []
+    for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
+        for (
+            dataset_name,
+            bench_by_dataset_and_setup_map,
+        ) in bench_by_dataset_map.items():
+            for setup_name, setup_details in bench_by_dataset_and_setup_map.items():
+                groups.append(
+                    {
+                        "benchmark_type": benchmark_type,
+                        "dataset_name": dataset_name,
+                        "setup_name": setup_name,
+                        "server": get_group_server_key(setup_details["benchmarks"]),
+                        "benchmarks": setup_details["benchmarks"],
+                    }
+                )
+    return groups
+
+
+def get_plan_group_key(group):
+    return group["benchmark_type"], group["dataset_name"], group["setup_name"]
+
+
+def get_group_server_key(benchmarks_map):
+    """
+    Everything, but the dataset, that requires spinning a new setup: the redis and
+    modules configuration parameters and the remote environment.
+    """
+    server_settings = set()
+    for benchmark_config in benchmarks_map.values():
+        (
+            _,
+            _,
+            redis_configuration_parameters,
+            _,
+            modules_configuration_parameters_map,
+        ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+        server_settings.add(
+            dict_sha256(
+                {
+                    "configuration-parameters": redis_configuration_parameters,
+                    "module-configuration-parameters": modules_configuration_parameters_map,
+                    "remote": benchmark_config.get("remote", None),
+                }
+            )
+        )
+    return ",".join(sorted(server_settings))
+
+
+def get_transition_cost(previous_group, group):
+    cost = 0
+    if previous_group is None:
+        return cost
+    if previous_group["setup_name"] != group["setup_name"]:
+        cost += TOPOLOGY_CHANGE_COST
+    if previous_group["server"] != group["server"]:
+        cost += SERVER_CONFIG_CHANGE_COST
+    return cost
+
+
+def schedule_benchmark_plan(benchmark_runs_plan):
+    """
+    Reorder the benchmark plan to minimize the topology and server configuration changes
+    in between consecutive setups, so that the runners can keep a setup alive across
+    groups (see get_setup_carry_overs). The plan structure is kept (test-type,
+    dataset-name, setup-name), only the order of datasets and setups is changed.
+    Ties keep the original order.
+    """
+    scheduled_plan = {}
+    previous_group = None
+    for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
+        scheduled_plan[benchmark_type] = {}
+        remaining_datasets = list(bench_by_dataset_map.keys())
+        while len(remaining_datasets) > 0:
+            best_dataset_name = None
+            best_groups = None
+            best_cost = None
+            for dataset_name in remaining_datasets:
+                dataset_groups = schedule_dataset_setups(
+                    benchmark_type,
+                    dataset_name,
+                    bench_by_dataset_map[dataset_name],
+                    previous_group,
+                )
+                cost = get_transition_cost(previous_group, dataset_groups[0])
+                if best_cost is None or cost < best_cost:
+                    best_cost = cost
+                    best_dataset_name = dataset_name
+                    best_groups = dataset_groups
+            remaining_datasets.remove(best_dataset_name)
+            scheduled_plan[benchmark_type][best_dataset_name] = {}
+            for group in best_groups:
+                scheduled_plan[benchmark_type][best_dataset_name][
+                    group["setup_name"]
+                ] = bench_by_dataset_map[best_dataset_name][group["setup_name"]]
+            previous_group = best_groups[-1]
+    return scheduled_plan
+
+
+def schedule_dataset_setups(
+    benchmark_type, dataset_name, bench_by_setup_map, previous_group
+):
+    groups = get_plan_groups({benchmark_type: {dataset_name: bench_by_setup_map}})
+    scheduled_groups = []
+    while len(groups) > 0:
+        best_group = groups[0]
+        for group in groups:
+            if get_transition_cost(previous_group, group) < get_transition_cost(
+                previous_group, best_group
+            ):
+                best_group = group
+        groups.remove(best_group)
+        scheduled_groups.append(best_group)
+        previous_group = best_group
+    return scheduled_groups
+
+
+def is_reusable_setup(benchmark_type, reuse_write_setups=False):
+    return benchmark_type == "read-only" or reuse_write_setups
+
+
+def can_carry_setup(previous_group, group, reuse_write_setups=False):
+    """
+    A setup kept alive for reuse can be handed over to the next group if it has the
+    same topology and server configuration. Only the dataset is reloaded.
+    """
+    if previous_group is None:
+        return False
+    if not is_reusable_setup(previous_group["benchmark_type"], reuse_write_setups):
+        return False
+    if not is_reusable_setup(group["benchmark_type"], reuse_write_setups):
+        return False
+    return get_transition_cost(previous_group, group) == 0
+
+
+def get_setup_carry_overs(benchmark_runs_plan, reuse_write_setups=False):
+    """
+    Returns a map of plan group key (benchmark-type, dataset-name, setup-name) to the
+    key of the next group, for the groups whose setup is kept alive for the next one.
+    """
+    carry_overs = {}
+    previous_group = None
+    for group in get_plan_groups(benchmark_runs_plan):
+        if can_carry_setup(previous_group, group, reuse_write_setups):
+            carry_overs[get_plan_group_key(previous_group)] = get_plan_group_key(group)
+        previous_group = group
+    return carry_overs
+
+
+def estimate_benchmark_plan(
+    benchmark_runs_plan, tests_durations, repetitions=1, reuse_write_setups=False
+):
+    """
+    Estimate the total duration and the number of setup spins of a benchmark plan.
+    Read-only setups ( and write ones with reuse_write_setups ) are spinned once per
+    group, the remaining ones once per test repetition. A group that gets the setup of
+    the previous group spins nothing, it only reloads its dataset.
+    """
+    groups = get_plan_groups(benchmark_runs_plan)
+    carry_overs = get_setup_carry_overs(benchmark_runs_plan, reuse_write_setups)
+    carried_groups = set(carry_overs.values())
+    total_duration_secs = 0
+    setup_spins = 0
+    tests_without_history = set()
+    rows = []
+    for group in groups:
+        total_tests = len(group["benchmarks"])
+        group_setup_spins = total_tests * repetitions
+        group_dataset_loads = group_setup_spins
+        if is_reusable_setup(group["benchmark_type"], reuse_write_setups):
+            group_setup_spins = 1
+            group_dataset_loads = 1
+        carried = get_plan_group_key(group) in carried_groups
+        if carried:
+            group_setup_spins = 0
+        setup_spin_duration_secs = None
+        benchmarks_duration_secs = 0
+        for test_name in group["benchmarks"].keys():
+            test_durations = {}
+            if test_name in tests_durations:
+                test_durations = tests_durations[test_name]
+            else:
+                tests_without_history.add(test_name)
+            if "dataset_load_duration" in test_durations:
+                setup_spin_duration_secs = max(
+                    setup_spin_duration_secs or 0,
+                    test_durations["dataset_load_duration"],
+                )
+            benchmarks_duration_secs += (
+                test_durations.get("benchmark_duration", DEFAULT_TEST_DURATION_SECS)
+                * repetitions
+            )
+        if setup_spin_duration_secs is None:
+            setup_spin_duration_secs = DEFAULT_SETUP_SPIN_DURATION_SECS
+        # the historical dataset load duration includes the spin. we keep it as
+        # the dataset reload cost of a carried setup
+        group_duration_secs = (
+            setup_spin_duration_secs * group_dataset_loads + benchmarks_duration_secs
+        )
+        setup_spins += group_setup_spins
+        total_duration_secs += group_duration_secs
+        rows.append(
+            [
+                group["benchmark_type"],
+                group["dataset_name"],
+                group["setup_name"],
+                total_tests,
+                group_setup_spins,
+                "yes" if carried else "no",
+                int(group_duration_secs),
+            ]
+        )
+    return {
+        "total_duration_secs": int(total_duration_secs),
+        "setup_spins": setup_spins,
+        "setup_carry_overs": carry_overs,
+        "tests_without_history": sorted(tests_without_history),
+        "rows": rows,
+    }
+
+
+def print_benchmark_plan_estimate(plan_estimate):
+    writer = MarkdownTableWriter(
+        table_name="Benchmark plan",
+        headers=[
+            "Benchmark type",
+            "Dataset",
+            "Setup",
+            "Tests",
+            "Setup spins",
+            "Reuses previous setup",
+            "Expected duration (secs)",
+        ],
+        value_matrix=plan_estimate["rows"],
+    )
+    writer.write_table()
+    writer = MarkdownTableWriter(
+        table_name="Benchmark plan summary",
+        headers=["Property", "Value"],
+        value_matrix=[
+            ["Expected total time (secs)", plan_estimate["total_duration_secs"]],
+            ["Setup spins", plan_estimate["setup_spins"]],
+            [
+                "Setup spins saved (vs the unscheduled plan)",
+                plan_estimate["setup_spins_saved"],
+            ],
+            [
+                "Tests without historical durations",
+                len(plan_estimate["tests_without_history"]),
+            ],
+        ],
+    )
+    writer.write_table()
+
+
+def load_tests_durations_file(durations_filename):
+    tests_durations = {}
+    if durations_filename is not None and os.path.exists(durations_filename):
+        with open(durations_filename, "r") as durations_file:
+            tests_durations = json.load(durations_file)
+        logging.info(
+            "Loaded historical durations of {} tests from {}".format(
+                len(tests_durations.keys()), durations_filename
+            )
+        )
+    return tests_durations
+
+
+def update_tests_durations_file(
+    durations_filename,
+    test_name,
+    benchmark_duration_seconds=None,
+    dataset_load_duration_seconds=None,
+):
+    tests_durations = load_tests_durations_file(durations_filename)
+    if test_name not in tests_durations:
+        tests_durations[test_name] = {}
+    if benchmark_duration_seconds is not None:
+        tests_durations[test_name]["benchmark_duration"] = benchmark_duration_seconds
+    if dataset_load_duration_seconds is not None:
+        tests_durations[test_name][
+            "dataset_load_duration"
+        ] = dataset_load_duration_seconds
+    store_tests_durations_file(durations_filename, tests_durations)
+
+
+def store_tests_durations_file(durations_filename, tests_durations):
+    inflight_filename = "{}.{}.tmp".format(durations_filename, os.getpid())
+    with open(inflight_filename, "w") as durations_file:
+        json.dump(tests_durations, durations_file, indent=2)
+    os.replace(inflight_filename, durations_filename)
+
+
+def merge_tests_durations_file(durations_filename, partial_filename, test_names):
+    """
+    Merges into durations_filename the durations of test_names recorded on
+    partial_filename, the private durations file of a concurrent child process.
+    """
+    tests_durations = load_tests_durations_file(durations_filename)
+    partial_durations = load_tests_durations_file(partial_filename)
+    for test_name in test_names:
+        if test_name in partial_durations:
+            if test_name not in tests_durations:
+                tests_durations[test_name] = {}
+            tests_durations[test_name].update(partial_durations[test_name])
+    store_tests_durations_file(durations_filename, tests_durations)
+
+
+def get_tests_durations_from_datasink(
+    rts, test_names, tf_github_org, tf_github_repo, tf_triggering_env
+):
+    tests_durations = {}
+    for test_name in test_names:
+        for metric_name in ["benchmark_duration", "dataset_load_duration"]:
+            filters = [
+                "metric={}".format(metric_name),
+                "test_name={}".format(test_name),
+                "github_org={}".format(tf_github_org),
+                "github_repo={}".format(tf_github_repo),
+                "triggering_env={}".format(tf_triggering_env),
+            ]
+            try:
+                values = []
+                for ts_name in rts.ts().queryindex(filters):
+                    datapoints = rts.ts().revrange(
+                        ts_name, "-", "+", count=DURATIONS_DATASINK_SAMPLES
+                    )
+                    values.extend([float(value) for _, value in datapoints])
+                if len(values) > 0:
+                    if test_name not in tests_durations:
+                        tests_durations[test_name] = {}
+                    tests_durations[test_name][metric_name] = sum(values) / len(values)
+            except redis.exceptions.ResponseError as e:
+                logging.warning(
+                    "Error while fetching the {} of test {} from the datasink: {}".format(
+                        metric_name, test_name, e.__str__()
+                    )
+                )
+    logging.info(
+        "Fetched historical durations of {} tests from the datasink".format(
+            len(tests_durations.keys())
+        )
+    )
+    return tests_durations
+
+
+def get_tests_durations(
+    durations_filename,
+    rts,
+    test_names,
+    tf_github_org,
+    tf_github_repo,
+    tf_triggering_env,
+):
+    """Merge the historical durations of the datasink (if any) with the local file ones"""
+    tests_durations = {}
+    if rts is not None:
+        tests_durations = get_tests_durations_from_datasink(
+            rts, test_names, tf_github_org, tf_github_repo, tf_triggering_env
+        )
+    if durations_filename is not None and durations_filename != "":
+        for test_name, test_durations in load_tests_durations_file(
+            durations_filename
+        ).items():
+            if test_name not in tests_durations:
+                tests_durations[test_name] = {}
+            tests_durations[test_name].update(test_durations)
+    return tests_durations
+
+
+def schedule_benchmark_plan_and_estimate(
+    args,
+    benchmark_runs_plan,
+    test_names,
+    rts,
+    tf_github_org,
+    tf_github_repo,
+    tf_triggering_env,
+    repetitions=1,
+):
+    """
+    Returns the scheduled plan and its estimate. The setup spins saved are the ones
+    we avoid in comparison with running the plan on its original order.
+    """
+    tests_durations = get_tests_durations(
+        args.tests_durations_file,
+        rts,
+        test_names,
+        tf_github_org,
+        tf_github_repo,
+        tf_triggering_env,
+    )
+    unscheduled_estimate = estimate_benchmark_plan(
+        benchmark_runs_plan,
+        tests_durations,
+        repetitions,
+        args.reuse_write_setups,
+    )
+    benchmark_runs_plan = schedule_benchmark_plan(benchmark_runs_plan)
+    plan_estimate = estimate_benchmark_plan(
+        benchmark_runs_plan,
+        tests_durations,
+        repetitions,
+        args.reuse_write_setups,
+    )
+    plan_estimate["setup_spins_saved"] = (
+        unscheduled_estimate["setup_spins"] - plan_estimate["setup_spins"]
+    )
+    logging.info(
+        "Scheduled benchmark plan. Expected total time {} secs. Setup spins {} (saved {}).".format(
+            plan_estimate["total_duration_secs"],
+            plan_estimate["setup_spins"],
+            plan_estimate["setup_spins_saved"],
+        )
+    )
+    return benchmark_runs_plan, plan_estimate
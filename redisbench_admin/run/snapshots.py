@@ -0,0 +1,272 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import json
+import logging
+import os
+import shlex
+import shutil
+
+from redisbench_admin.run.cluster import debug_reload_rdb
+from redisbench_admin.run_remote.consts import REMOTE_CACHE_DIR
+from redisbench_admin.utils.benchmark_config import extract_benchmark_tool_settings
+from redisbench_admin.utils.remote import execute_remote_commands
+from redisbench_admin.utils.utils import dict_sha256, file_sha256, link_or_copy_file
+
+LOCAL_SNAPSHOTS_DIR = os.getenv("DATASET_SNAPSHOTS_DIR", "./datasets/snapshots")
+REMOTE_SNAPSHOTS_DIR = "{}/snapshots".format(REMOTE_CACHE_DIR)
+SNAPSHOT_METADATA_FILENAME = "snapshot.json"
+
+
+def get_tool_dataset_snapshot_key(
+    benchmark_config,
+    setup_type,
+    shard_count,
+    module_files=None,
+    dbconfig_keyname="dbconfig",
+    tool_version=None,
+):
+    """
+    tool_version is the fingerprint of the loading tool binary
+    ( see get_benchmark_tool_version ). The config only states a minimum version.
+    """
+    (
+        benchmark_min_tool_version,
+        _,
+        _,
+        _,
+        benchmark_tool,
+        benchmark_tool_source,
+        benchmark_tool_source_inner_path,
+        _,
+    ) = extract_benchmark_tool_settings(benchmark_config, dbconfig_keyname)
+    modules = []
+    if module_files is not None:
+        if isinstance(module_files, str):
+            module_files = [module_files]
+        for module_file in module_files:
+            module_hash = None
+            if os.path.isfile(module_file):
+                module_hash = file_sha256(module_file)
+            modules.append([os.path.basename(module_file), module_hash])
+    snapshot_spec = {
+        "dbconfig": benchmark_config[dbconfig_keyname],
+        "tool": [
+            benchmark_tool,
+            benchmark_tool_source,
+            benchmark_tool_source_inner_path,
+            benchmark_min_tool_version,
+        ],
+        "tool-version": tool_version,
+        "modules": modules,
+        "topology": [setup_type, shard_count],
+    }
+    return dict_sha256(snapshot_spec)
+
+
+def get_snapshot_metadata(snapshot_key, load_duration_seconds, shard_files):
+    return {
+        "snapshot_key": snapshot_key,
+        "load_duration_seconds": load_duration_seconds,
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "shard_files": shard_files,
+    }
+
+
+def get_conn_rdb_path(conn):
+    rdb_dir = conn.config_get("dir")["dir"]
+    rdb_filename = conn.config_get("dbfilename")["dbfilename"]
+    return "{}/{}".format(rdb_dir, rdb_filename)
+
+
+def local_snapshot_store(
+    snapshot_key,
+    redis_conns,
+    load_duration_seconds,
+    snapshots_dir=LOCAL_SNAPSHOTS_DIR,
+):
+    snapshot_dir = "{}/{}".format(snapshots_dir, snapshot_key)
+    inflight_dir = "{}.{}.tmp".format(snapshot_dir, os.getpid())
+    os.makedirs(inflight_dir, exist_ok=True)
+    shard_files = []
+    for shard_n, conn in enumerate(redis_conns, start=1):
+        logging.info("Saving the dataset of shard #{} to disk".format(shard_n))
+        conn.save()
+        shard_file = "shard-{}.rdb".format(shard_n)
+        link_or_copy_file(
+            get_conn_rdb_path(conn), "{}/{}".format(inflight_dir, shard_file)
+        )
+        shard_files.append(shard_file)
+    with open("{}/{}".format(inflight_dir, SNAPSHOT_METADATA_FILENAME), "w") as fd:
+        json.dump(
+            get_snapshot_metadata(snapshot_key, load_duration_seconds, shard_files), fd
+        )
+    metadata_file = "{}/{}".format(snapshot_dir, SNAPSHOT_METADATA_FILENAME)
+    # a concurrent run may have stored ( and be restoring from ) the same snapshot
+    if os.path.exists(metadata_file) is False:
+        # leftovers without metadata are incomplete
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        try:
+            os.rename(inflight_dir, snapshot_dir)
+        except OSError:
+            if os.path.exists(metadata_file) is False:
+                raise
+    if os.path.exists(inflight_dir):
+        logging.info(
+            "Dataset snapshot {} was already stored by a concurrent run.".format(
+                snapshot_key
+            )
+        )
+        shutil.rmtree(inflight_dir, ignore_errors=True)
+    else:
+        logging.info(
+            "Stored the dataset snapshot {} into {}".format(snapshot_key, snapshot_dir)
+        )
+    return snapshot_dir
+
+
+def local_snapshot_restore(
+    snapshot_key,
+    redis_conns,
+    dataset_load_timeout_secs,
+    snapshots_dir=LOCAL_SNAPSHOTS_DIR,
+):
+    snapshot_dir = "{}/{}".format(snapshots_dir, snapshot_key)
+    metadata_file = "{}/{}".format(snapshot_dir, SNAPSHOT_METADATA_FILENAME)
+    if os.path.exists(metadata_file) is False:
+        logging.info("No dataset snapshot {} available.".format(snapshot_key))
+        return None
+    with open(metadata_file, "r") as fd:
+        metadata = json.load(fd)
+    if len(metadata["shard_files"]) != len(redis_conns):
+        logging.warning(
+            "Dataset snapshot {} has {} shard files and the setup has {} shards. Ignoring it.".format(
+                snapshot_key, len(metadata["shard_files"]), len(redis_conns)
+            )
+        )
+        return None
+    for conn, shard_file in zip(redis_conns, metadata["shard_files"]):
+        link_or_copy_file(
+            "{}/{}".format(snapshot_dir, shard_file), get_conn_rdb_path(conn)
+        )
+    debug_reload_rdb(dataset_load_timeout_secs, redis_conns)
+    logging.info(
+        "Restored dataset snapshot {}. The original load took {} secs.".format(
+            snapshot_key, metadata["load_duration_seconds"]
+        )
+    )
+    return metadata
+
+
+def remote_snapshot_store(
+    snapshot_key,
+    redis_conns,
+    load_duration_seconds,
+    server_public_ip,
+    username,
+    private_key,
+    db_ssh_port,
+    snapshots_dir=REMOTE_SNAPSHOTS_DIR,
+):
+    snapshot_dir = "{}/{}".format(snapshots_dir, snapshot_key)
+    inflight_dir = "{}.tmp".format(snapshot_dir)
+    commands = ["rm -rf {}".format(inflight_dir), "mkdir -p {}".format(inflight_dir)]
+    shard_files = []
+    for shard_n, conn in enumerate(redis_conns, start=1):
+        logging.info("Saving the dataset of shard #{} to disk".format(shard_n))
+        conn.save()
+        shard_file = "shard-{}.rdb".format(shard_n)
+        commands.append(
+            remote_link_or_copy_cmd(
+                get_conn_rdb_path(conn), "{}/{}".format(inflight_dir, shard_file)
+            )
+        )
+        shard_files.append(shard_file)
+    metadata = get_snapshot_metadata(snapshot_key, load_duration_seconds, shard_files)
+    commands.append(
+        "echo {} > {}/{}".format(
+            shlex.quote(json.dumps(metadata)), inflight_dir, SNAPSHOT_METADATA_FILENAME
+        )
+    )
+    commands.append("rm -rf {}".format(snapshot_dir))
+    commands.append("mv {} {}".format(inflight_dir, snapshot_dir))
+    res = execute_remote_commands(
+        server_public_ip, username, private_key, commands, db_ssh_port
+    )
+    status = all([x[0] == 0 for x in res])
+    if status:
+        logging.info(
+            "Stored the dataset snapshot {} into remote dir {}".format(
+                snapshot_key, snapshot_dir
+            )
+        )
+    else:
+        logging.warning(
+            "Unable to store the dataset snapshot {} into remote dir {}".format(
+                snapshot_key, snapshot_dir
+            )
+        )
+    return status
+
+
+def remote_snapshot_restore(
+    snapshot_key,
+    redis_conns,
+    dataset_load_timeout_secs,
+    server_public_ip,
+    username,
+    private_key,
+    db_ssh_port,
+    snapshots_dir=REMOTE_SNAPSHOTS_DIR,
+):
+    snapshot_dir = "{}/{}".format(snapshots_dir, snapshot_key)
+    recv_exit_status, stdout, _ = execute_remote_commands(
+        server_public_ip,
+        username,
+        private_key,
+        ["cat {}/{}".format(snapshot_dir, SNAPSHOT_METADATA_FILENAME)],
+        db_ssh_port,
+    )[0]
+    if recv_exit_status != 0:
+        logging.info("No remote dataset snapshot {} available.".format(snapshot_key))
+        return None
+    metadata = json.loads("".join(stdout))
+    if len(metadata["shard_files"]) != len(redis_conns):
+        logging.warning(
+            "Dataset snapshot {} has {} shard files and the setup has {} shards. Ignoring it.".format(
+                snapshot_key, len(metadata["shard_files"]), len(redis_conns)
+            )
+        )
+        return None
+    commands = []
+    for conn, shard_file in zip(redis_conns, metadata["shard_files"]):
+        commands.append(
+            remote_link_or_copy_cmd(
+                "{}/{}".format(snapshot_dir, shard_file), get_conn_rdb_path(conn)
+            )
+        )
+    res = execute_remote_commands(
+        server_public_ip, username, private_key, commands, db_ssh_port
+    )
+    # redis did not reload anything yet, so the regular loader can still be used
+    if not all([x[0] == 0 for x in res]):
+        logging.warning(
+            "Unable to link the remote dataset snapshot {} shard files. Ignoring it. Errors: {}".format(
+                snapshot_key, [x[2] for x in res if x[0] != 0]
+            )
+        )
+        return None
+    debug_reload_rdb(dataset_load_timeout_secs, redis_conns)
+    logging.info(
+        "Restored remote dataset snapshot {}. The original load took {} secs.".format(
+            snapshot_key, metadata["load_duration_seconds"]
+        )
+    )
+    return metadata
+
+
+def remote_link_or_copy_cmd(src, dst):
+    return "ln -f {src} {dst} || cp {src} {dst}".format(src=src, dst=dst)
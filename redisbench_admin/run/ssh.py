@@ -10,7 +10,8 @@ import paramiko
 import redis
 from sshtunnel import SSHTunnelForwarder
 
-from redisbench_admin.utils.remote import check_and_fix_pem_str, connect_remote_ssh
+from redisbench_admin.utils.remote import check_and_fix_pem_str
+from redisbench_admin.utils.ssh_pool import get_pooled_ssh_client
 
 
 def ssh_tunnel_redisconn(
@@ -22,9 +23,40 @@ def ssh_tunnel_redisconn(
     private_key,
     redis_pass=None,
 ):
+    redis_conns, ssh_tunel = ssh_tunnel_redisconns(
+        [server_plaintext_port],
+        server_private_ip,
+        server_public_ip,
+        username,
+        ssh_port,
+        private_key,
+        redis_pass,
+    )
+    redis_conn = redis_conns[0]
+    redis_conn.ping()
+    return redis_conn, ssh_tunel
+
+
+def ssh_tunnel_redisconns(
+    server_plaintext_ports,
+    server_private_ip,
+    server_public_ip,
+    username,
+    ssh_port,
+    private_key,
+    redis_pass=None,
+):
+    """
+    Forwards all the given remote ports over a single SSH transport.
+    Returns one redis connection per port, in the same order, and the tunnel.
+    The redis connections only connect on first use and the tunnel close tears
+    all the forwards down together.
+    """
     ssh_pkey = paramiko.RSAKey.from_private_key_file(private_key)
     logging.info("Checking we're able to connect to remote host")
-    connection = connect_remote_ssh(ssh_port, private_key, server_public_ip, username)
+    connection = get_pooled_ssh_client(
+        server_public_ip, username, private_key, ssh_port
+    )
     if check_connection(connection):
         logging.info("All good!")
     else:
@@ -36,19 +68,24 @@ def ssh_tunnel_redisconn(
         ssh_username=username,
         ssh_pkey=ssh_pkey,
         logger=logging.getLogger(),
-        remote_bind_address=(
-            server_private_ip,
-            server_plaintext_port,
-        ),  # remote redis server
-        # Bind the socket to port 0. A random free port from 1024 to 65535 will be selected.
-        local_bind_address=("0.0.0.0", 0),  # enable local forwarding port
+        # remote redis servers
+        remote_bind_addresses=[(server_private_ip, x) for x in server_plaintext_ports],
+        # Bind the sockets to port 0. A random free port from 1024 to 65535 will be selected.
+        local_bind_addresses=[
+            ("0.0.0.0", 0) for _ in server_plaintext_ports
+        ],  # enable local forwarding ports
     )
     ssh_tunel.start()  # start tunnel
-    redis_conn = redis.Redis(
-        host="localhost", port=ssh_tunel.local_bind_port, password=redis_pass
+    logging.info(
+        "Forwarding {} remote ports over a single SSH transport to local ports {}".format(
+            len(server_plaintext_ports), ssh_tunel.local_bind_ports
+        )
     )
-    redis_conn.ping()
-    return redis_conn, ssh_tunel
+    redis_conns = [
+        redis.Redis(host="localhost", port=x, password=redis_pass)
+        for x in ssh_tunel.local_bind_ports
+    ]
+    return redis_conns, ssh_tunel
 
 
 def check_connection(ssh_conn):
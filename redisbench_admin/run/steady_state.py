@@ -0,0 +1,163 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import json
+import logging
+import math
+import os
+
+STEADY_STATE_KEY = "Steady-State"
+# minimum per-second datapoints required to run the change-point test
+STEADY_STATE_MIN_DATAPOINTS = int(os.getenv("STEADY_STATE_MIN_DATAPOINTS", 5))
+# the warm-up can at most take this fraction of the run
+STEADY_STATE_MAX_WARMUP_FRACTION = float(
+    os.getenv("STEADY_STATE_MAX_WARMUP_FRACTION", 0.5)
+)
+# t-statistic above which the mean shift is considered significant
+STEADY_STATE_T_THRESHOLD = float(os.getenv("STEADY_STATE_T_THRESHOLD", 3.0))
+STEADY_STATE_METRICS = [
+    "$.'ALL STATS'.Totals.'Steady-State'.'Ops/sec'",
+    "$.'ALL STATS'.Totals.'Steady-State'.'Average Latency'",
+    "$.'ALL STATS'.Totals.'Steady-State'.'Warm-up seconds'",
+]
+
+
+def detect_warmup_end(
+    values,
+    t_threshold=STEADY_STATE_T_THRESHOLD,
+    max_warmup_fraction=STEADY_STATE_MAX_WARMUP_FRACTION,
+    min_datapoints=STEADY_STATE_MIN_DATAPOINTS,
+):
+    """
+    Single mean-shift change-point test. Finds the split that minimizes the sum of
+    squared errors of a two-segment mean model, restricted to the first part of the
+    run, and accepts it if the shift is significant. Returns the index of the first
+    steady-state datapoint (0 if no warm-up was detected).
+    """
+    n = len(values)
+    if n < min_datapoints:
+        return 0
+    max_split = int(n * max_warmup_fraction)
+    best_split = 0
+    best_sse = None
+    for split in range(1, max_split + 1):
+        head = values[:split]
+        tail = values[split:]
+        head_mean = sum(head) / len(head)
+        tail_mean = sum(tail) / len(tail)
+        sse = sum([(x - head_mean) ** 2 for x in head]) + sum(
+            [(x - tail_mean) ** 2 for x in tail]
+        )
+        if best_sse is None or sse < best_sse:
+            best_sse = sse
+            best_split = split
+    if best_split == 0:
+        return 0
+    head = values[:best_split]
+    tail = values[best_split:]
+    head_mean = sum(head) / len(head)
+    tail_mean = sum(tail) / len(tail)
+    pooled_variance = best_sse / (n - 2)
+    if pooled_variance == 0:
+        return best_split if head_mean != tail_mean else 0
+    t_stat = abs(tail_mean - head_mean) / math.sqrt(
+        pooled_variance * (1.0 / len(head) + 1.0 / len(tail))
+    )
+    if t_stat < t_threshold:
+        return 0
+    return best_split
+
+
+def get_time_serie_datapoints(time_serie):
+    return [time_serie[k] for k in sorted(time_serie.keys(), key=lambda x: int(x))]
+
+
+def get_last_datapoint_seconds(all_stats, total_datapoints):
+    """The last per-second datapoint usually covers only part of a second"""
+    last_datapoint_seconds = 1.0
+    if "Runtime" in all_stats and "Total duration" in all_stats["Runtime"]:
+        total_duration_seconds = all_stats["Runtime"]["Total duration"] / 1000.0
+        remainder = total_duration_seconds - (total_datapoints - 1)
+        if 0 < remainder <= 1:
+            last_datapoint_seconds = remainder
+    return last_datapoint_seconds
+
+
+def compute_steady_state_kpis(datapoints, warmup_end, last_datapoint_seconds=1.0):
+    """
+    Compute the KPIs of the steady-state window. The average latency is the
+    count-weighted average of the per-second ones. Percentiles are not exported given
+    they can't be derived from the per-second percentiles without histograms.
+    """
+    steady_datapoints = datapoints[warmup_end:]
+    total_count = sum([x["Count"] for x in steady_datapoints])
+    duration_seconds = len(steady_datapoints) - 1 + last_datapoint_seconds
+    kpis = {
+        "Warm-up seconds": warmup_end,
+        "Duration seconds": duration_seconds,
+        "Count": total_count,
+        "Ops/sec": float(total_count) / duration_seconds,
+    }
+    if total_count > 0 and "Average Latency" in steady_datapoints[0]:
+        kpis["Average Latency"] = (
+            sum([x["Count"] * x["Average Latency"] for x in steady_datapoints])
+            / total_count
+        )
+    return kpis
+
+
+def add_steady_state_kpis(results_dict):
+    """
+    Detect the end of warm-up on the Totals per-second ops and add the trimmed
+    steady-state KPIs alongside the raw ones of every stats section.
+    Returns the detected warm-up seconds or None if the results have no timeseries.
+    """
+    if "ALL STATS" not in results_dict:
+        return None
+    all_stats = results_dict["ALL STATS"]
+    if "Totals" not in all_stats or "Time-Serie" not in all_stats["Totals"]:
+        return None
+    totals_datapoints = get_time_serie_datapoints(all_stats["Totals"]["Time-Serie"])
+    if len(totals_datapoints) == 0:
+        return None
+    last_datapoint_seconds = get_last_datapoint_seconds(
+        all_stats, len(totals_datapoints)
+    )
+    ops_per_sec = [x["Count"] for x in totals_datapoints]
+    ops_per_sec[-1] = ops_per_sec[-1] / last_datapoint_seconds
+    warmup_end = detect_warmup_end(ops_per_sec)
+    logging.info(
+        "Detected {} warm-up seconds out of a total of {} seconds.".format(
+            warmup_end, len(totals_datapoints)
+        )
+    )
+    for _, section in all_stats.items():
+        if type(section) == dict and "Time-Serie" in section:
+            datapoints = get_time_serie_datapoints(section["Time-Serie"])
+            if len(datapoints) == len(totals_datapoints):
+                section[STEADY_STATE_KEY] = compute_steady_state_kpis(
+                    datapoints, warmup_end, last_datapoint_seconds
+                )
+    return warmup_end
+
+
+def steady_state_analysis(results_dict, local_benchmark_output_filename=None):
+    warmup_end = add_steady_state_kpis(results_dict)
+    if warmup_end is None:
+        logging.warning(
+            "Skipping the steady-state analysis given the results have no per-second timeseries."
+        )
+    elif local_benchmark_output_filename is not None:
+        with open(local_benchmark_output_filename, "w") as json_file:
+            json.dump(results_dict, json_file, indent=True)
+    return warmup_end
+
+
+def get_steady_state_metrics(default_metrics):
+    if default_metrics is None:
+        default_metrics = []
+    return default_metrics + [
+        x for x in STEADY_STATE_METRICS if x not in default_metrics
+    ]
@@ -0,0 +1,248 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import json
+import logging
+import os
+
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.run.scheduler import (
+    DEFAULT_TEST_DURATION_SECS,
+    load_tests_durations_file,
+)
+from redisbench_admin.utils.utils import dict_sha256
+
+# durations are rounded so that small drifts between runners don't change the partition
+SUITE_SHARD_DURATION_ROUNDING_SECS = 10
+TEST_STATUS_ASSIGNED = "assigned"
+TEST_STATUS_SKIPPED = "skipped"
+TEST_STATUS_FAILED = "failed"
+TEST_STATUS_COMPLETED = "completed"
+
+
+def parse_suite_shard(suite_shard):
+    """Parses a 1-based "i/N" suite shard specification"""
+    try:
+        shard_id, total_shards = [int(x) for x in suite_shard.split("/")]
+    except ValueError:
+        raise Exception(
+            "Invalid suite shard {}. Expected the format i/N.".format(suite_shard)
+        )
+    if total_shards < 1 or shard_id < 1 or shard_id > total_shards:
+        raise Exception(
+            "Invalid suite shard {}. i needs to be within [1,N].".format(suite_shard)
+        )
+    return shard_id, total_shards
+
+
+def get_test_expected_duration(tests_durations, test_name):
+    duration = DEFAULT_TEST_DURATION_SECS
+    if test_name in tests_durations:
+        test_durations = tests_durations[test_name]
+        duration = test_durations.get(
+            "benchmark_duration", DEFAULT_TEST_DURATION_SECS
+        ) + test_durations.get("dataset_load_duration", 0)
+    return int(
+        round(duration / SUITE_SHARD_DURATION_ROUNDING_SECS)
+        * SUITE_SHARD_DURATION_ROUNDING_SECS
+    )
+
+
+def partition_tests(test_names, tests_durations, total_shards):
+    """
+    Longest processing time first: the longest test goes to the least loaded shard.
+    Ties are broken by test name and shard position so every runner computes the
+    same partition given the same durations.
+    """
+    shards = [[] for _ in range(total_shards)]
+    shards_load = [0] * total_shards
+    tests = sorted(
+        [(get_test_expected_duration(tests_durations, x), x) for x in test_names],
+        key=lambda x: (-x[0], x[1]),
+    )
+    for duration, test_name in tests:
+        shard_pos = shards_load.index(min(shards_load))
+        shards[shard_pos].append(test_name)
+        shards_load[shard_pos] = shards_load[shard_pos] + duration
+    return shards, shards_load
+
+
+def get_suite_shard_run_dir(suite_shard_dir, run_id=""):
+    """Each suite run keeps its manifests apart, so that stale ones are never merged"""
+    if run_id == "":
+        return suite_shard_dir
+    return os.path.join(suite_shard_dir, run_id)
+
+
+def get_suite_shard_manifest_filename(suite_shard_dir, shard_id, total_shards):
+    return os.path.join(
+        suite_shard_dir, "suite-shard-{}-of-{}.json".format(shard_id, total_shards)
+    )
+
+
+def store_suite_shard_manifest(manifest):
+    manifest_dir = os.path.dirname(manifest["filename"])
+    if manifest_dir != "" and not os.path.exists(manifest_dir):
+        os.makedirs(manifest_dir)
+    inflight_filename = "{}.{}.tmp".format(manifest["filename"], os.getpid())
+    with open(inflight_filename, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(inflight_filename, manifest["filename"])
+
+
+def get_suite_shard_tests_durations(durations_filename):
+    """
+    Every runner needs to see the very same durations, otherwise they compute different
+    partitions. Only a pinned durations snapshot, which the run does not update, is used.
+    """
+    if durations_filename == "":
+        logging.warning(
+            "No --suite-shard-durations-file was specified. Every test is expected to take {} secs.".format(
+                DEFAULT_TEST_DURATION_SECS
+            )
+        )
+        return {}
+    if not os.path.exists(durations_filename):
+        raise Exception(
+            "The suite shard durations file {} does not exist. All suite shards need the same durations snapshot.".format(
+                durations_filename
+            )
+        )
+    return load_tests_durations_file(durations_filename)
+
+
+def select_suite_shard_definitions(args, benchmark_definitions):
+    """
+    Keeps only the tests of this runner suite shard. Returns the filtered benchmark
+    definitions and the shard manifest (None if the suite is not sharded).
+    """
+    if args.suite_shard == "":
+        return benchmark_definitions, None
+    shard_id, total_shards = parse_suite_shard(args.suite_shard)
+    test_names = sorted(benchmark_definitions.keys())
+    tests_durations = get_suite_shard_tests_durations(args.suite_shard_durations_file)
+    shards, shards_load = partition_tests(test_names, tests_durations, total_shards)
+    partition_hash = dict_sha256({"shards": shards})[:12]
+    logging.info(
+        "Running suite shard {} out of {} (partition {}). {} out of {} tests, with an expected duration of {} secs.".format(
+            shard_id,
+            total_shards,
+            partition_hash,
+            len(shards[shard_id - 1]),
+            len(test_names),
+            shards_load[shard_id - 1],
+        )
+    )
+    manifest = {
+        "filename": get_suite_shard_manifest_filename(
+            get_suite_shard_run_dir(args.suite_shard_dir, args.suite_shard_run_id),
+            shard_id,
+            total_shards,
+        ),
+        "suite_shard": args.suite_shard,
+        "partition": partition_hash,
+        "tests": {x: TEST_STATUS_ASSIGNED for x in shards[shard_id - 1]},
+    }
+    store_suite_shard_manifest(manifest)
+    shard_definitions = {
+        k: v for k, v in benchmark_definitions.items() if k in manifest["tests"]
+    }
+    return shard_definitions, manifest
+
+
+def suite_shard_test_status(manifest, test_name, status):
+    if manifest is None:
+        return
+    # a test runs on several setups. once failed it stays failed
+    if manifest["tests"].get(test_name, None) == TEST_STATUS_FAILED:
+        return
+    manifest["tests"][test_name] = status
+    store_suite_shard_manifest(manifest)
+
+
+def merge_suite_shards(suite_shard_dir, total_shards, expected_test_names):
+    """
+    Verifies, from the manifests of the total_shards suite shards, that every test ran
+    exactly once. Returns a boolean and the per test rows.
+    """
+    ok = True
+    occurrences = {x: [] for x in expected_test_names}
+    partitions = set()
+    for shard_id in range(1, total_shards + 1):
+        manifest_filename = get_suite_shard_manifest_filename(
+            suite_shard_dir, shard_id, total_shards
+        )
+        if not os.path.exists(manifest_filename):
+            logging.error(
+                "Missing the manifest of suite shard {}/{} ({}).".format(
+                    shard_id, total_shards, manifest_filename
+                )
+            )
+            ok = False
+            continue
+        with open(manifest_filename, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+        partitions.add(manifest["partition"])
+        for test_name, status in manifest["tests"].items():
+            if test_name not in occurrences:
+                occurrences[test_name] = []
+            occurrences[test_name].append((manifest["suite_shard"], status))
+    if len(partitions) > 1:
+        logging.error(
+            "The suite shards computed different partitions: {}. Check the durations source.".format(
+                sorted(partitions)
+            )
+        )
+        ok = False
+    rows = []
+    for test_name in sorted(occurrences.keys()):
+        test_occurrences = occurrences[test_name]
+        ran = [x for x in test_occurrences if x[1] != TEST_STATUS_ASSIGNED]
+        verdict = "OK"
+        if test_name not in expected_test_names:
+            verdict = "UNEXPECTED"
+        elif len(ran) == 0:
+            verdict = "NOT RUN"
+        elif len(test_occurrences) > 1:
+            verdict = "RAN {} TIMES".format(len(test_occurrences))
+        if verdict != "OK":
+            ok = False
+        rows.append(
+            [
+                test_name,
+                ",".join([x[0] for x in test_occurrences]),
+                ",".join([x[1] for x in test_occurrences]),
+                verdict,
+            ]
+        )
+    return ok, rows
+
+
+def print_suite_shards_merge_table(rows):
+    writer = MarkdownTableWriter(
+        table_name="Suite shards merge",
+        headers=["Test-case", "Suite shard", "Status", "Verdict"],
+        value_matrix=rows,
+    )
+    writer.write_table()
+
+
+def suite_shards_merge_command(args, benchmark_definitions):
+    if args.suite_shard == "":
+        logging.error("The suite shards merge requires --suite-shard i/N to know N.")
+        return 1
+    _, total_shards = parse_suite_shard(args.suite_shard)
+    ok, rows = merge_suite_shards(
+        get_suite_shard_run_dir(args.suite_shard_dir, args.suite_shard_run_id),
+        total_shards,
+        benchmark_definitions.keys(),
+    )
+    print_suite_shards_merge_table(rows)
+    if ok:
+        logging.info("Every test of the suite ran exactly once.")
+        return 0
+    logging.error("The suite shards merge verification failed.")
+    return 1
@@ -157,6 +157,24 @@ def prepare_go_ycsb_benchmark_command(
     return command_arr, command_str
 
 
+YCSB_PROGRESS_REGEX = re.compile(
+    r"(\d+) sec: (\d+) operations; ([\d.]+) current ops/sec"
+)
+
+
+def ycsb_progress_line_to_metrics(line):
+    """Parses a ycsb status line into live metrics. Returns None for other lines"""
+    metrics = None
+    match = YCSB_PROGRESS_REGEX.search(line)
+    if match is not None:
+        metrics = {
+            "secs": int(match.group(1)),
+            "operations": int(match.group(2)),
+            "current ops/sec": float(match.group(3)),
+        }
+    return metrics
+
+
 def post_process_ycsb_results(stdout, start_time_ms, start_time_str):
     results_dict = {
         "Tests": {},
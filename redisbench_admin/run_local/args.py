@@ -3,13 +3,31 @@
 #  Copyright (c) 2021., Redis Labs Modules
 #  All rights reserved.
 #
+import os
 
 from redisbench_admin.run.args import common_run_args
 from redisbench_admin.run.common import REDIS_BINARY
 
+MAX_PARALLEL_TESTS = int(os.getenv("MAX_PARALLEL_TESTS", 1))
+
 
 def create_run_local_arguments(parser):
     parser = common_run_args(parser)
     parser.add_argument("--port", type=int, default=6379)
     parser.add_argument("--redis-binary", type=str, default=REDIS_BINARY)
+    parser.add_argument(
+        "--max-parallel-tests",
+        type=int,
+        default=MAX_PARALLEL_TESTS,
+        help="Run up to this number of test files concurrently, each pinned to a disjoint core set "
+        "and port range sized from the test shard count and client cpus/threads, and guarded against "
+        "memory oversubscription. 0 runs as many as the host cores allow. 1 runs them sequentially.",
+    )
+    parser.add_argument(
+        "--parallel-test-cpus",
+        type=str,
+        default="",
+        help="Cores assigned to this test by a concurrent run ( set by --max-parallel-tests on its "
+        "child processes ). The cpus of the setup affinity spec are remapped into them.",
+    )
     return parser
@@ -9,9 +9,11 @@ import datetime
 
 import redis
 
+from redisbench_admin.run.result_cache import get_benchmark_tool_version
 from redisbench_admin.run.run import calculate_client_tool_duration_and_check
 from redisbench_admin.run_local.local_helpers import (
     check_benchmark_binaries_local_requirements,
+    get_local_benchmark_tool_path,
     run_local_benchmark,
 )
 
@@ -20,18 +22,24 @@ from redisbench_admin.environments.oss_cluster import (
     setup_redis_cluster_from_conns,
 )
 from redisbench_admin.environments.oss_standalone import spin_up_local_redis
-from redisbench_admin.run.cluster import cluster_init_steps
+from redisbench_admin.run.cluster import cluster_init_steps, debug_reload_rdb
+from redisbench_admin.run.snapshots import (
+    get_tool_dataset_snapshot_key,
+    local_snapshot_restore,
+    local_snapshot_store,
+)
 from redisbench_admin.run.common import (
     run_redis_pre_steps,
     check_dbconfig_tool_requirement,
     prepare_benchmark_parameters,
     dbconfig_keyspacelen_check,
+    save_setup_state,
+    reset_setup_state,
 )
 from redisbench_admin.utils.benchmark_config import extract_redis_dbconfig_parameters
-from redisbench_admin.utils.local import (
-    check_dataset_local_requirements,
-    is_process_alive,
-)
+from redisbench_admin.utils.teardown import track_temporary_dir
+from redisbench_admin.utils.local import check_dataset_local_requirements
+from redisbench_admin.utils.utils import is_process_alive
 
 
 def local_db_spin(
@@ -46,10 +54,12 @@ def local_db_spin(
     required_modules,
     setup_type,
     shard_count,
+    cpu_placement=None,
 ):
     # setup Redis
     # copy the rdb to DB machine
     temporary_dir = tempfile.mkdtemp()
+    track_temporary_dir(temporary_dir)
     redis_7 = args.redis_7
     logging.info(
         "Using local temporary dir to spin up Redis Instance. Path: {}".format(
@@ -77,6 +87,11 @@ def local_db_spin(
         "Using a dataset load timeout of {} seconds.".format(dataset_load_timeout_secs)
     )
     redis_conns = []
+    shards_placement = None
+    client_placement = None
+    if cpu_placement is not None:
+        shards_placement = cpu_placement["shards"]
+        client_placement = cpu_placement["client"]
     if setup_type == "oss-cluster":
         cluster_api_enabled = True
         shard_host = "127.0.0.1"
@@ -91,6 +106,7 @@ def local_db_spin(
             dataset_load_timeout_secs,
             modules_configuration_parameters_map,
             redis_7,
+            shards_placement,
         )
 
         status = setup_redis_cluster_from_conns(
@@ -107,6 +123,8 @@ def local_db_spin(
         "dbconfig",
         shard_count,
         cluster_api_enabled,
+        False,
+        args.port,
     )
     if setup_type == "oss-standalone":
         redis_processes = spin_up_local_redis(
@@ -119,6 +137,7 @@ def local_db_spin(
             dataset_load_timeout_secs,
             modules_configuration_parameters_map,
             redis_7,
+            None if shards_placement is None else shards_placement[0],
         )
 
         r = redis.Redis(port=args.port)
@@ -139,42 +158,74 @@ def local_db_spin(
 
         cluster_init_steps(clusterconfig, redis_conns, local_module_file)
 
-    if check_dbconfig_tool_requirement(benchmark_config):
-        logging.info("Detected the requirements to load data via client tool")
-        local_benchmark_output_filename = "{}/load-data.txt".format(temporary_dir)
-        (
-            benchmark_tool,
-            full_benchmark_path,
-            benchmark_tool_workdir,
-        ) = check_benchmark_binaries_local_requirements(
-            benchmark_config, args.allowed_tools, "./binaries", "dbconfig"
-        )
+    local_db_load_dataset(
+        args,
+        benchmark_config,
+        redis_conns,
+        cluster_api_enabled,
+        temporary_dir,
+        local_module_file,
+        required_modules,
+        setup_type,
+        shard_count,
+        dataset_load_timeout_secs,
+        client_placement,
+    )
 
-        # prepare the benchmark command
-        command, command_str = prepare_benchmark_parameters(
-            benchmark_config,
-            full_benchmark_path,
-            args.port,
-            "localhost",
-            local_benchmark_output_filename,
-            False,
-            benchmark_tool_workdir,
-            cluster_api_enabled,
-            "dbconfig",
-        )
+    return cluster_api_enabled, redis_conns, redis_processes
 
-        # run the benchmark
-        load_via_benchmark_start_time = datetime.datetime.now()
-        run_local_benchmark(benchmark_tool, command)
-        load_via_benchmark_end_time = datetime.datetime.now()
-        load_via_benchmark_duration_seconds = calculate_client_tool_duration_and_check(
-            load_via_benchmark_end_time, load_via_benchmark_start_time
-        )
-        logging.info(
-            "Loading data via benchmark tool took {} secs.".format(
-                load_via_benchmark_duration_seconds
+
+def local_db_load_dataset(
+    args,
+    benchmark_config,
+    redis_conns,
+    cluster_api_enabled,
+    temporary_dir,
+    local_module_file,
+    required_modules,
+    setup_type,
+    shard_count,
+    dataset_load_timeout_secs,
+    client_placement=None,
+):
+    if check_dbconfig_tool_requirement(benchmark_config):
+        logging.info("Detected the requirements to load data via client tool")
+        snapshot_key = None
+        snapshot_metadata = None
+        if args.dataset_snapshots:
+            tool_version = get_benchmark_tool_version(
+                benchmark_config,
+                True,
+                get_local_benchmark_tool_path(
+                    benchmark_config, args.allowed_tools, "dbconfig"
+                ),
+                "dbconfig",
             )
-        )
+            snapshot_key = get_tool_dataset_snapshot_key(
+                benchmark_config,
+                setup_type,
+                shard_count,
+                local_module_file,
+                "dbconfig",
+                tool_version,
+            )
+            snapshot_metadata = local_snapshot_restore(
+                snapshot_key, redis_conns, dataset_load_timeout_secs
+            )
+        if snapshot_metadata is None:
+            load_via_benchmark_duration_seconds = local_db_load_via_tool(
+                args,
+                benchmark_config,
+                cluster_api_enabled,
+                temporary_dir,
+                client_placement,
+            )
+            if snapshot_key is not None:
+                local_snapshot_store(
+                    snapshot_key, redis_conns, load_via_benchmark_duration_seconds
+                )
+            elif args.reuse_write_setups:
+                save_setup_state(redis_conns)
 
     dbconfig_keyspacelen_check(
         benchmark_config,
@@ -183,4 +234,112 @@ def local_db_spin(
 
     run_redis_pre_steps(benchmark_config, redis_conns[0], required_modules)
 
-    return cluster_api_enabled, redis_conns, redis_processes
+
+def local_db_reload_dataset(
+    args,
+    benchmark_config,
+    redis_conns,
+    cluster_api_enabled,
+    local_module_file,
+    required_modules,
+    setup_type,
+    shard_count,
+    client_placement=None,
+):
+    """
+    Replace the dataset of a setup kept alive from a previous plan group with the
+    dataset of the current benchmark, without spinning a new setup.
+    """
+    (
+        _,
+        _,
+        _,
+        dataset_load_timeout_secs,
+        _,
+    ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+    temporary_dir = redis_conns[0].config_get("dir")["dir"]
+    for primary_n, conn in enumerate(redis_conns):
+        logging.info("Flushing all data of primary #{}".format(primary_n))
+        conn.flushall()
+    dataset, _, _, _ = check_dataset_local_requirements(
+        benchmark_config,
+        temporary_dir,
+        ".",
+        "./datasets",
+        "dbconfig",
+        shard_count,
+        cluster_api_enabled,
+        False,
+        args.port,
+    )
+    if dataset is not None:
+        debug_reload_rdb(dataset_load_timeout_secs, redis_conns)
+    local_db_load_dataset(
+        args,
+        benchmark_config,
+        redis_conns,
+        cluster_api_enabled,
+        temporary_dir,
+        local_module_file,
+        required_modules,
+        setup_type,
+        shard_count,
+        dataset_load_timeout_secs,
+        client_placement,
+    )
+
+
+def local_db_load_via_tool(
+    args, benchmark_config, cluster_api_enabled, temporary_dir, client_placement=None
+):
+    local_benchmark_output_filename = "{}/load-data.txt".format(temporary_dir)
+    (
+        benchmark_tool,
+        full_benchmark_path,
+        benchmark_tool_workdir,
+    ) = check_benchmark_binaries_local_requirements(
+        benchmark_config, args.allowed_tools, "./binaries", "dbconfig"
+    )
+
+    # prepare the benchmark command
+    command, command_str = prepare_benchmark_parameters(
+        benchmark_config,
+        full_benchmark_path,
+        args.port,
+        "localhost",
+        local_benchmark_output_filename,
+        False,
+        benchmark_tool_workdir,
+        cluster_api_enabled,
+        "dbconfig",
+    )
+
+    # run the benchmark
+    load_via_benchmark_start_time = datetime.datetime.now()
+    run_local_benchmark(benchmark_tool, command, client_placement)
+    load_via_benchmark_end_time = datetime.datetime.now()
+    load_via_benchmark_duration_seconds = calculate_client_tool_duration_and_check(
+        load_via_benchmark_end_time, load_via_benchmark_start_time
+    )
+    logging.info(
+        "Loading data via benchmark tool took {} secs.".format(
+            load_via_benchmark_duration_seconds
+        )
+    )
+    return load_via_benchmark_duration_seconds
+
+
+def reset_local_setup_state(benchmark_config, redis_conns, required_modules):
+    (
+        _,
+        _,
+        _,
+        dataset_load_timeout_secs,
+        _,
+    ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+    reset_setup_state(benchmark_config, redis_conns, dataset_load_timeout_secs)
+    dbconfig_keyspacelen_check(
+        benchmark_config,
+        redis_conns,
+    )
+    run_redis_pre_steps(benchmark_config, redis_conns[0], required_modules)
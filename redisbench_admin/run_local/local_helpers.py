@@ -3,30 +3,108 @@
 #  Copyright (c) 2021., Redis Labs Modules
 #  All rights reserved.
 #
+import codecs
 import logging
 import os
+import re
 import shutil
 import subprocess
 import sys
+import time
 
 import wget
 
+from redisbench_admin.run.memtier_benchmark.memtier_benchmark import (
+    memtier_progress_line_to_metrics,
+)
 from redisbench_admin.run.redis_benchmark.redis_benchmark import (
     redis_benchmark_ensure_min_version_local,
+    redis_benchmark_progress_line_to_metrics,
 )
+from redisbench_admin.run.ycsb.ycsb import ycsb_progress_line_to_metrics
+from redisbench_admin.utils.affinity import get_affinity_spawn_args
 from redisbench_admin.utils.benchmark_config import extract_benchmark_tool_settings
 from redisbench_admin.utils.utils import get_decompressed_filename, decompress_file
 
+LIVE_METRICS_LOG_INTERVAL_SECS = int(os.getenv("LIVE_METRICS_LOG_INTERVAL_SECS", 5))
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def get_progress_line_parser(benchmark_tool):
+    progress_line_parser = None
+    if benchmark_tool == "redis-benchmark":
+        progress_line_parser = redis_benchmark_progress_line_to_metrics
+    if benchmark_tool == "ycsb":
+        progress_line_parser = ycsb_progress_line_to_metrics
+    if benchmark_tool == "memtier_benchmark":
+        progress_line_parser = memtier_progress_line_to_metrics
+    return progress_line_parser
+
 
-def run_local_benchmark(benchmark_tool, command):
+def stream_benchmark_output(
+    stream,
+    progress_line_parser,
+    log_interval_secs=LIVE_METRICS_LOG_INTERVAL_SECS,
+    chunk_size=STREAM_CHUNK_SIZE,
+):
+    """
+    Reads the client output as it's produced, splitting it on line feeds and carriage
+    returns (progress lines are usually refreshed via carriage return).
+    Progress lines are turned into live metrics and logged every log_interval_secs,
+    while all other lines are kept and returned for the final results parsing.
+    """
+    output_lines = []
+    live_metrics = None
+    last_log_time = time.time()
+    pending = ""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = stream.read1(chunk_size)
+        if not chunk:
+            break
+        pending = pending + decoder.decode(chunk)
+        lines = re.split(r"[\r\n]", pending)
+        pending = lines[-1]
+        for line in lines[:-1]:
+            if line.strip() == "":
+                continue
+            metrics = None
+            if progress_line_parser is not None:
+                metrics = progress_line_parser(line)
+            if metrics is not None:
+                live_metrics = metrics
+                if time.time() - last_log_time >= log_interval_secs:
+                    logging.info("Live client metrics: {}".format(live_metrics))
+                    last_log_time = time.time()
+            else:
+                output_lines.append(line)
+    pending = pending + decoder.decode(b"", final=True)
+    if pending.strip() != "":
+        output_lines.append(pending)
+    if live_metrics is not None:
+        logging.info("Last live client metrics: {}".format(live_metrics))
+    return output_lines
+
+
+def run_local_benchmark(benchmark_tool, command, placement=None):
+    stdout = None
+    sterr = None
     try:
-        if benchmark_tool == "redis-benchmark" or benchmark_tool == "ycsb":
+        progress_line_parser = get_progress_line_parser(benchmark_tool)
+        command_prefix = get_affinity_spawn_args(placement)
+        if progress_line_parser is not None:
             benchmark_client_process = subprocess.Popen(
-                args=command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+                args=command_prefix + command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            stdout = stream_benchmark_output(
+                benchmark_client_process.stdout, progress_line_parser
             )
+            benchmark_client_process.wait()
         else:
-            benchmark_client_process = subprocess.Popen(args=command)
-        (stdout, sterr) = benchmark_client_process.communicate()
+            benchmark_client_process = subprocess.Popen(args=command_prefix + command)
+            (stdout, sterr) = benchmark_client_process.communicate()
         if sterr:
             logging.critical(
                 "Error while running {}. Error: {}".format(command, sterr.strip())
@@ -113,6 +191,23 @@ def check_benchmark_binaries_local_requirements(
     return benchmark_tool, which_benchmark_tool, benchmark_tool_workdir
 
 
+def get_local_benchmark_tool_path(
+    benchmark_config, allowed_tools, config_key="clientconfig"
+):
+    """The benchmark tool binary a local run uses. None when it can't be resolved"""
+    try:
+        _, which_benchmark_tool, _ = check_benchmark_binaries_local_requirements(
+            benchmark_config, allowed_tools, "./binaries", config_key
+        )
+    except Exception as e:
+        # the test run itself will fail and report it
+        logging.warning(
+            "Unable to resolve the benchmark tool binary. Error: {}".format(e.__str__())
+        )
+        return None
+    return which_benchmark_tool
+
+
 def fetch_benchmark_tool_from_source_to_local(
     benchmark_tool,
     benchmark_tool_workdir,
@@ -0,0 +1,354 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import logging
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import yaml
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.run.common import extract_test_feasible_setups
+from redisbench_admin.run.scheduler import merge_tests_durations_file
+from redisbench_admin.run.suite_shard import (
+    suite_shard_test_status,
+    TEST_STATUS_COMPLETED,
+    TEST_STATUS_FAILED,
+)
+from redisbench_admin.utils.affinity import (
+    format_cpu_list,
+    get_affinity_spawn_args,
+    get_available_cpus,
+)
+from redisbench_admin.utils.benchmark_config import (
+    get_defaults,
+    get_testfiles_to_process,
+)
+from redisbench_admin.utils.cgroups import MEMORY_UNITS
+
+# distance between the base ports of concurrent tests. cluster shards use base port + shard
+PARALLEL_PORT_STRIDE = int(os.getenv("PARALLEL_PORT_STRIDE", 100))
+# fraction of the host memory that the concurrent tests can request
+PARALLEL_MEMORY_FRACTION = float(os.getenv("PARALLEL_MEMORY_FRACTION", 0.8))
+PARALLEL_LOGS_DIR = os.getenv("PARALLEL_LOGS_DIR", "./parallel-logs")
+PARALLEL_POLL_INTERVAL_SECS = 0.5
+
+
+def parse_cpus_request(value):
+    """Accepts k8s style cpu requests ( e.g. "2", 1.5 or "1500m" ). Returns whole cores."""
+    value = "{}".format(value).strip()
+    if value.endswith("m"):
+        cpus = float(value[:-1]) / 1000.0
+    else:
+        cpus = float(value)
+    return max(1, int(math.ceil(cpus)))
+
+
+def parse_memory_request(value):
+    """Accepts bytes or k8s style memory requests ( e.g. "10g" or "10Gi" ). Returns bytes."""
+    value = "{}".format(value).strip().lower()
+    if value.isdigit():
+        return int(value)
+    for suffix in ["ib", "i", "b"]:
+        if value.endswith(suffix):
+            value = value[: -len(suffix)]
+            break
+    return int(float(value[:-1]) * MEMORY_UNITS[value[-1]])
+
+
+def get_resources_requests(config):
+    requests = {}
+    if type(config) == dict and "resources" in config:
+        requests = config["resources"].get("requests", {})
+    return requests
+
+
+def get_client_cpus_request(benchmark_config):
+    clientconfig = benchmark_config.get("clientconfig", {})
+    if type(clientconfig) == list:
+        merged = {}
+        for entry in clientconfig:
+            merged.update(entry)
+        clientconfig = merged
+    requests = get_resources_requests(clientconfig)
+    if "cpus" in requests:
+        return parse_cpus_request(requests["cpus"])
+    for parameter in clientconfig.get("parameters", []):
+        if type(parameter) == dict:
+            for k, v in parameter.items():
+                if k in ["threads", "t", "workers"]:
+                    return parse_cpus_request(v)
+    return 1
+
+
+def get_test_resources_request(benchmark_config, default_specs):
+    """
+    Returns the cores and memory (bytes) a test requires, given the shard count and
+    resources requests of its setups and the client threads/cpus requests.
+    """
+    db_cpus = 1
+    memory = 0
+    setups = extract_test_feasible_setups(benchmark_config, "setups", default_specs)
+    for setup_settings in setups.values():
+        requests = get_resources_requests(setup_settings)
+        setup_cpus = 1
+        if "redis_topology" in setup_settings:
+            setup_cpus = int(setup_settings["redis_topology"].get("primaries", 1))
+        if "cpus" in requests:
+            setup_cpus = max(setup_cpus, parse_cpus_request(requests["cpus"]))
+        db_cpus = max(db_cpus, setup_cpus)
+        if "memory" in requests:
+            memory = max(memory, parse_memory_request(requests["memory"]))
+    return db_cpus + get_client_cpus_request(benchmark_config), memory
+
+
+def get_host_memory_bytes():
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def get_available_memory_bytes(meminfo_filename="/proc/meminfo"):
+    if not os.path.exists(meminfo_filename):
+        return None
+    with open(meminfo_filename, "r") as meminfo:
+        for line in meminfo.read().splitlines():
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def get_parallel_tests_plan(args, test_names=None):
+    """Returns a list of [test_filename, test_name, cores, memory] sorted by cores/memory"""
+    defaults_filename, files = get_testfiles_to_process(args)
+    _, _, _, default_specs, _ = get_defaults(defaults_filename)
+    tests = []
+    for test_filename in files:
+        with open(test_filename, "r", encoding="utf8") as stream:
+            benchmark_config = yaml.safe_load(stream)
+        cores, memory = get_test_resources_request(benchmark_config, default_specs)
+        if test_names is not None and benchmark_config["name"] not in test_names:
+            continue
+        tests.append([test_filename, benchmark_config["name"], cores, memory])
+    # largest first packs better, the filename keeps the order deterministic
+    return sorted(tests, key=lambda x: (-x[2], -x[3], x[0]))
+
+
+def pick_next_test(pending, free_cpus, free_memory, running_count):
+    """
+    Returns the position of the first pending test that fits on the free cores and
+    memory. If nothing is running, the head is always picked so that tests that are
+    larger than the host still run (alone).
+    """
+    for pos, (_, _, cores, memory) in enumerate(pending):
+        if cores <= len(free_cpus) and memory <= free_memory:
+            return pos
+    if running_count == 0 and len(pending) > 0:
+        return 0
+    return None
+
+
+def get_child_command(
+    test_filename,
+    port,
+    journal_dir="",
+    tests_durations_file="",
+    test_cpus=None,
+    cgroup_parent=None,
+):
+    # last occurrence of an argument wins, so we just override the parent ones.
+    # the children share the cwd, so each one gets its own journal and durations file
+    command = (
+        [sys.executable, "-c", "from redisbench_admin.cli import main; main()"]
+        + sys.argv[1:]
+        + [
+            "--test",
+            test_filename,
+            "--port",
+            "{}".format(port),
+            "--max-parallel-tests",
+            "1",
+            "--suite-shard",
+            "",
+            "--journal-dir",
+            journal_dir,
+            "--tests-durations-file",
+            tests_durations_file,
+        ]
+    )
+    # the setup affinity is remapped into the cores of the child
+    if test_cpus is not None:
+        command.extend(["--parallel-test-cpus", format_cpu_list(test_cpus)])
+    # children on the same setup would otherwise share the isolation cgroups
+    if cgroup_parent is not None:
+        command.extend(["--cgroup-parent", cgroup_parent])
+    return command
+
+
+def run_local_tests_in_parallel(
+    args, test_names=None, suite_shard_manifest=None, logs_dir=PARALLEL_LOGS_DIR
+):
+    tests = get_parallel_tests_plan(args, test_names)
+    available_cpus = get_available_cpus()
+    memory_budget = int(get_host_memory_bytes() * PARALLEL_MEMORY_FRACTION)
+    max_parallel = args.max_parallel_tests
+    if max_parallel <= 0:
+        max_parallel = len(available_cpus)
+    logging.info(
+        "Running {} tests concurrently (at most {} at a time) on {} cores with a memory budget of {} MB.".format(
+            len(tests), max_parallel, len(available_cpus), memory_budget // (1024**2)
+        )
+    )
+    if not os.path.exists(logs_dir):
+        os.makedirs(logs_dir)
+    free_cpus = list(available_cpus)
+    free_memory = memory_budget
+    free_port_slots = list(range(max_parallel))
+    pending = list(tests)
+    running = []
+    summary = []
+    return_code = 0
+    suite_start_time = datetime.datetime.now()
+    while len(pending) > 0 or len(running) > 0:
+        while len(pending) > 0 and len(running) < max_parallel:
+            pos = pick_next_test(pending, free_cpus, free_memory, len(running))
+            if pos is None:
+                break
+            available_memory = get_available_memory_bytes()
+            if (
+                len(running) > 0
+                and available_memory is not None
+                and pending[pos][3] > available_memory
+            ):
+                logging.info(
+                    "Waiting for memory to be released prior to starting test {}.".format(
+                        pending[pos][1]
+                    )
+                )
+                break
+            test_filename, test_name, cores, memory = pending.pop(pos)
+            if cores > len(free_cpus):
+                logging.warning(
+                    "Test {} requires {} cores but only {} are available. Running it alone.".format(
+                        test_name, cores, len(free_cpus)
+                    )
+                )
+            test_cpus = free_cpus[:cores]
+            free_cpus = free_cpus[cores:]
+            free_memory = free_memory - memory
+            port_slot = free_port_slots.pop(0)
+            port = args.port + port_slot * PARALLEL_PORT_STRIDE
+            log_filename = os.path.join(logs_dir, "{}.log".format(test_name))
+            journal_dir = ""
+            if args.journal_dir != "":
+                journal_dir = os.path.join(args.journal_dir, test_name)
+            tests_durations_file = ""
+            if args.tests_durations_file != "":
+                tests_durations_file = os.path.join(
+                    logs_dir, "{}-tests-durations.json".format(test_name)
+                )
+                if os.path.exists(args.tests_durations_file):
+                    shutil.copyfile(args.tests_durations_file, tests_durations_file)
+            logging.info(
+                "Starting test {} on cores {} and base port {}. Logs at {}".format(
+                    test_name, test_cpus, port, log_filename
+                )
+            )
+            command_prefix = get_affinity_spawn_args(
+                {"cpus": test_cpus, "numa_node": None}
+            )
+            log_file = open(log_filename, "w")
+            process = subprocess.Popen(
+                command_prefix
+                + get_child_command(
+                    test_filename,
+                    port,
+                    journal_dir,
+                    tests_durations_file,
+                    test_cpus,
+                    os.path.join(
+                        args.cgroup_parent, "parallel-slot-{}".format(port_slot)
+                    ),
+                ),
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+            running.append(
+                {
+                    "process": process,
+                    "log_file": log_file,
+                    "test_name": test_name,
+                    "cpus": test_cpus,
+                    "memory": memory,
+                    "port_slot": port_slot,
+                    "port": port,
+                    "tests_durations_file": tests_durations_file,
+                    "start_time": datetime.datetime.now(),
+                }
+            )
+        time.sleep(PARALLEL_POLL_INTERVAL_SECS)
+        still_running = []
+        for test in running:
+            test_return_code = test["process"].poll()
+            if test_return_code is None:
+                still_running.append(test)
+                continue
+            test["log_file"].close()
+            duration = (datetime.datetime.now() - test["start_time"]).total_seconds()
+            status = "OK"
+            test_status = TEST_STATUS_COMPLETED
+            if test_return_code != 0:
+                status = "FAILED ({})".format(test_return_code)
+                test_status = TEST_STATUS_FAILED
+                return_code |= 1
+            suite_shard_test_status(
+                suite_shard_manifest, test["test_name"], test_status
+            )
+            # the parent is the only writer of the shared durations file
+            if test["tests_durations_file"] != "":
+                merge_tests_durations_file(
+                    args.tests_durations_file,
+                    test["tests_durations_file"],
+                    [test["test_name"]],
+                )
+            logging.info(
+                "Test {} finished after {:.1f} secs with status {}.".format(
+                    test["test_name"], duration, status
+                )
+            )
+            free_cpus = sorted(free_cpus + test["cpus"])
+            free_memory = free_memory + test["memory"]
+            free_port_slots = sorted(free_port_slots + [test["port_slot"]])
+            summary.append(
+                [
+                    test["test_name"],
+                    ",".join(["{}".format(x) for x in test["cpus"]]),
+                    test["port"],
+                    "{:.1f}".format(duration),
+                    status,
+                ]
+            )
+        running = still_running
+    print_parallel_tests_summary(summary, suite_start_time)
+    return return_code
+
+
+def print_parallel_tests_summary(summary, suite_start_time):
+    wall_clock = (datetime.datetime.now() - suite_start_time).total_seconds()
+    tests_duration = sum([float(x[3]) for x in summary])
+    packing_factor = 1.0
+    if wall_clock > 0:
+        packing_factor = tests_duration / wall_clock
+    writer = MarkdownTableWriter(
+        table_name="Concurrent tests summary. Wall clock {:.1f} secs, sum of test durations {:.1f} secs (x{:.2f})".format(
+            wall_clock, tests_duration, packing_factor
+        ),
+        headers=["Test-case", "Cores", "Base port", "Duration (secs)", "Status"],
+        value_matrix=summary,
+    )
+    writer.write_table()
@@ -31,14 +31,69 @@ from redisbench_admin.run.metrics import (
     collect_cpu_data,
 )
 from redisbench_admin.run.redistimeseries import datasink_profile_tabular_data
+from redisbench_admin.run.repetitions import (
+    get_max_repetitions,
+    check_adaptive_repetitions_stop,
+    append_repetition_result,
+    get_repetitions_summary_row,
+    print_repetitions_summary_table,
+)
+from redisbench_admin.run.steady_state import (
+    steady_state_analysis,
+    get_steady_state_metrics,
+)
+from redisbench_admin.run.journal import (
+    init_journal,
+    get_journal_test_key,
+    is_test_completed,
+    journal_test_start,
+    journal_test_failed,
+    journal_test_end,
+    journal_record_result,
+)
+from redisbench_admin.run.result_cache import (
+    get_redis_binary_fingerprint,
+    get_modules_fingerprint,
+    get_benchmark_tool_version,
+    compute_run_fingerprint,
+    get_results_fingerprints_keyname,
+    check_already_measured,
+    record_measured_result,
+)
+from redisbench_admin.run.suite_shard import (
+    select_suite_shard_definitions,
+    suite_shard_test_status,
+    suite_shards_merge_command,
+    TEST_STATUS_SKIPPED,
+    TEST_STATUS_FAILED,
+    TEST_STATUS_COMPLETED,
+)
+from redisbench_admin.run.scheduler import (
+    schedule_benchmark_plan_and_estimate,
+    print_benchmark_plan_estimate,
+    update_tests_durations_file,
+)
 from redisbench_admin.run.run import (
     calculate_client_tool_duration_and_check,
     define_benchmark_plan,
 )
-from redisbench_admin.run_local.local_db import local_db_spin
+from redisbench_admin.run_local.local_db import (
+    local_db_reload_dataset,
+    local_db_spin,
+    reset_local_setup_state,
+)
+from redisbench_admin.utils.teardown import (
+    kill_redis_processes,
+    shutdown_redis_conns,
+    reap_redis_processes,
+    release_temporary_dirs,
+    wait_for_pending_removals,
+)
+from redisbench_admin.run_local.parallel import run_local_tests_in_parallel
 from redisbench_admin.run_local.local_helpers import (
     run_local_benchmark,
     check_benchmark_binaries_local_requirements,
+    get_local_benchmark_tool_path,
 )
 from redisbench_admin.profilers.profilers_local import (
     profilers_stop_if_required,
@@ -46,6 +101,20 @@ from redisbench_admin.profilers.profilers_local import (
     check_compatible_system_and_kernel_and_prepare_profile,
     local_profilers_platform_checks,
 )
+from redisbench_admin.utils.affinity import (
+    get_setup_cpu_placement,
+    parse_cpu_list,
+    check_cpu_placement_collisions,
+    get_cpu_placement_metadata_tags,
+)
+from redisbench_admin.utils.cgroups import (
+    get_setup_isolation_settings,
+    setup_isolation_cgroups,
+    add_cgroups_to_placement,
+    collect_cgroups_stats,
+    get_cgroups_stats_delta,
+    remove_isolation_cgroups,
+)
 from redisbench_admin.utils.benchmark_config import (
     prepare_benchmark_definitions,
     results_dict_kpi_check,
@@ -130,10 +199,60 @@ def run_local_command_logic(args, project_name, project_version):
         clusterconfig,
     ) = prepare_benchmark_definitions(args)
 
+    if args.steady_state_analysis:
+        default_metrics = get_steady_state_metrics(default_metrics)
+    if args.suite_shard_merge:
+        exit(suite_shards_merge_command(args, benchmark_definitions))
+    benchmark_definitions, suite_shard_manifest = select_suite_shard_definitions(
+        args, benchmark_definitions
+    )
+
     return_code = 0
     profilers_artifacts_matrix = []
     # we have a map of test-type, dataset-name, topology, test-name
-    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
+    max_repetitions = get_max_repetitions(args, BENCHMARK_REPETITIONS)
+    # set on the child processes of a concurrent run
+    parallel_test_cpus = None
+    if args.parallel_test_cpus != "":
+        parallel_test_cpus = parse_cpu_list(args.parallel_test_cpus)
+    repetitions_summary = []
+    benchmark_runs_plan = define_benchmark_plan(
+        benchmark_definitions, default_specs, args.reuse_write_setups
+    )
+    benchmark_runs_plan, plan_estimate = schedule_benchmark_plan_and_estimate(
+        args,
+        benchmark_runs_plan,
+        benchmark_definitions.keys(),
+        rts,
+        github_org_name,
+        github_repo_name,
+        tf_triggering_env,
+        max_repetitions,
+    )
+    if args.plan_only:
+        print_benchmark_plan_estimate(plan_estimate)
+        exit(0)
+    if args.max_parallel_tests != 1:
+        exit(
+            run_local_tests_in_parallel(
+                args, benchmark_definitions.keys(), suite_shard_manifest
+            )
+        )
+    journal = init_journal(
+        args.journal_dir,
+        "run-local",
+        benchmark_definitions.keys(),
+        github_sha,
+        args.resume,
+    )
+    redis_binary_fingerprint = get_redis_binary_fingerprint(args.redis_binary)
+    modules_fingerprint = get_modules_fingerprint(local_module_file)
+    results_fingerprints_keyname = get_results_fingerprints_keyname(
+        github_org_name, github_repo_name, tf_triggering_env
+    )
+    setup_carry_overs = plan_estimate["setup_carry_overs"]
+    # setup kept alive by the previous plan group for the next one
+    carried_setup = None
     for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
         for (
             dataset_name,
@@ -142,13 +261,78 @@ def run_local_command_logic(args, project_name, project_version):
             for setup_name, setup_details in bench_by_dataset_and_setup_map.items():
                 setup_settings = setup_details["setup_settings"]
                 benchmarks_map = setup_details["benchmarks"]
+                group_key = (benchmark_type, dataset_name, setup_name)
                 # we start with an empty per bench-type/setup-name
                 setup_details["env"] = None
+                if carried_setup is not None:
+                    if carried_setup["to"] == group_key:
+                        logging.info(
+                            "Reusing the setup named {} kept alive by the previous plan group. Only the dataset {} will be loaded.".format(
+                                setup_name, dataset_name
+                            )
+                        )
+                        setup_details["env"] = carried_setup["env"]
+                        setup_details["env"]["dataset_reload"] = True
+                    elif args.keep_env_and_topo is False:
+                        teardown_local_setup(
+                            carried_setup["env"]["redis_conns"],
+                            carried_setup["env"]["redis_processes"],
+                            setup_name,
+                            carried_setup["env"]["cgroups"],
+                        )
+                    carried_setup = None
                 for test_name, benchmark_config in benchmarks_map.items():
-                    for repetition in range(1, BENCHMARK_REPETITIONS + 1):
+                    test_key = get_journal_test_key(
+                        test_name, setup_name, benchmark_config
+                    )
+                    if args.resume and is_test_completed(journal, test_key):
+                        logging.info(
+                            "Skipping test {} on setup {} given it was already completed according to the suite journal.".format(
+                                test_name, setup_name
+                            )
+                        )
+                        suite_shard_test_status(
+                            suite_shard_manifest, test_name, TEST_STATUS_SKIPPED
+                        )
+                        continue
+                    run_fingerprint = compute_run_fingerprint(
+                        redis_binary_fingerprint,
+                        modules_fingerprint,
+                        benchmark_config,
+                        get_benchmark_tool_version(
+                            benchmark_config,
+                            True,
+                            get_local_benchmark_tool_path(
+                                benchmark_config, args.allowed_tools
+                            ),
+                        ),
+                        setup_name,
+                        setup_settings,
+                    )
+                    if check_already_measured(
+                        args,
+                        run_fingerprint,
+                        test_name,
+                        setup_name,
+                        rts,
+                        results_fingerprints_keyname,
+                    ):
+                        suite_shard_test_status(
+                            suite_shard_manifest, test_name, TEST_STATUS_SKIPPED
+                        )
+                        continue
+                    journal_test_start(journal, test_key)
+                    test_result_files = []
+                    test_failed = False
+                    repetitions_state = {"repetitions": 0, "kpi_values": []}
+                    for repetition in range(1, max_repetitions + 1):
+                        if check_adaptive_repetitions_stop(
+                            args, test_name, repetitions_state, BENCHMARK_REPETITIONS
+                        ):
+                            break
                         logging.info(
                             "Repetition {} of {}. Running test {}".format(
-                                repetition, BENCHMARK_REPETITIONS, test_name
+                                repetition, max_repetitions, test_name
                             )
                         )
 
@@ -167,22 +351,44 @@ def run_local_command_logic(args, project_name, project_version):
                                 )
                                 continue
                         if setup_type in args.allowed_envs:
+                            cpu_placement = get_setup_cpu_placement(
+                                setup_settings,
+                                shard_count,
+                                parallel_test_cpus,
+                            )
                             redis_processes = []
                             redis_conns = []
+                            cgroups = None
                             # after we've spinned Redis, even on error we should always teardown
                             # in case of some unexpected error we fail the test
                             # noinspection PyBroadException
                             try:
                                 dirname = "."
+                                dataset_load_duration_seconds = None
                                 if setup_details["env"] is None:
                                     logging.info(
                                         "Starting setup named {} of topology type {}. Total primaries: {}".format(
                                             setup_name, setup_type, shard_count
                                         )
                                     )
+                                    cpu_placement_collisions = (
+                                        check_cpu_placement_collisions(cpu_placement)
+                                    )
+                                    if args.cgroup_isolation:
+                                        cgroups = setup_isolation_cgroups(
+                                            get_setup_isolation_settings(
+                                                setup_settings, shard_count
+                                            ),
+                                            setup_name,
+                                            args.cgroup_parent,
+                                        )
+                                        cpu_placement = add_cgroups_to_placement(
+                                            cpu_placement, cgroups, shard_count
+                                        )
                                     binary = args.redis_binary
                                     if " " in binary:
                                         binary = binary.split(" ")
+                                    setup_spin_start_time = datetime.datetime.now()
                                     (
                                         cluster_api_enabled,
                                         redis_conns,
@@ -199,10 +405,24 @@ def run_local_command_logic(args, project_name, project_version):
                                         required_modules,
                                         setup_type,
                                         shard_count,
+                                        cpu_placement,
                                     )
-                                    if benchmark_type == "read-only":
+                                    dataset_load_duration_seconds = (
+                                        datetime.datetime.now() - setup_spin_start_time
+                                    ).seconds
+                                    if (
+                                        benchmark_type == "read-only"
+                                        or args.reuse_write_setups
+                                    ):
+                                        reuse_reason = benchmark_type
+                                        if benchmark_type != "read-only":
+                                            reuse_reason = "{} and --reuse-write-setups is set".format(
+                                                benchmark_type
+                                            )
                                         logging.info(
-                                            "Given the benchmark for this setup is ready-only we will prepare to reuse it on the next read-only benchmarks (if any )."
+                                            "Given the benchmark for this setup is {} we will prepare to reuse it on the next benchmarks of this setup (if any ).".format(
+                                                reuse_reason
+                                            )
                                         )
                                         setup_details["env"] = {}
                                         setup_details["env"][
@@ -214,10 +434,19 @@ def run_local_command_logic(args, project_name, project_version):
                                         setup_details["env"][
                                             "redis_processes"
                                         ] = redis_processes
+                                        setup_details["env"][
+                                            "cpu_placement_collisions"
+                                        ] = cpu_placement_collisions
+                                        setup_details["env"]["cgroups"] = cgroups
                                 else:
-                                    assert benchmark_type == "read-only"
+                                    assert (
+                                        benchmark_type == "read-only"
+                                        or args.reuse_write_setups
+                                    )
                                     logging.info(
-                                        "Given the benchmark for this setup is ready-only, and this setup was already spinned we will reuse the previous, conns and process info."
+                                        "Given the benchmark for this setup is {}, and this setup was already spinned we will reuse the previous, conns and process info.".format(
+                                            benchmark_type
+                                        )
                                     )
                                     cluster_api_enabled = setup_details["env"][
                                         "cluster_api_enabled"
@@ -226,6 +455,41 @@ def run_local_command_logic(args, project_name, project_version):
                                     redis_processes = setup_details["env"][
                                         "redis_processes"
                                     ]
+                                    cpu_placement_collisions = setup_details["env"][
+                                        "cpu_placement_collisions"
+                                    ]
+                                    cgroups = setup_details["env"]["cgroups"]
+                                    cpu_placement = add_cgroups_to_placement(
+                                        cpu_placement, cgroups, shard_count
+                                    )
+                                    if setup_details["env"].get(
+                                        "dataset_reload", False
+                                    ):
+                                        setup_spin_start_time = datetime.datetime.now()
+                                        local_db_reload_dataset(
+                                            args,
+                                            benchmark_config,
+                                            redis_conns,
+                                            cluster_api_enabled,
+                                            local_module_file,
+                                            required_modules,
+                                            setup_type,
+                                            shard_count,
+                                            None
+                                            if cpu_placement is None
+                                            else cpu_placement["client"],
+                                        )
+                                        setup_details["env"]["dataset_reload"] = False
+                                        dataset_load_duration_seconds = (
+                                            datetime.datetime.now()
+                                            - setup_spin_start_time
+                                        ).seconds
+                                    elif benchmark_type != "read-only":
+                                        reset_local_setup_state(
+                                            benchmark_config,
+                                            redis_conns,
+                                            required_modules,
+                                        )
 
                                 # setup the benchmark
                                 (
@@ -294,11 +558,19 @@ def run_local_command_logic(args, project_name, project_version):
                                     True
                                 )
                                 cpu_stats_thread.start()
+                                cgroups_stats_before = collect_cgroups_stats(cgroups)
                                 benchmark_start_time = datetime.datetime.now()
                                 stdout, stderr = run_local_benchmark(
-                                    benchmark_tool, command
+                                    benchmark_tool,
+                                    command,
+                                    None
+                                    if cpu_placement is None
+                                    else cpu_placement["client"],
                                 )
                                 benchmark_end_time = datetime.datetime.now()
+                                cgroups_stats = get_cgroups_stats_delta(
+                                    cgroups_stats_before, collect_cgroups_stats(cgroups)
+                                )
                                 redisbench_admin.run.metrics.BENCHMARK_RUNNING_GLOBAL = (
                                     False
                                 )
@@ -377,6 +649,24 @@ def run_local_command_logic(args, project_name, project_version):
                                     local_benchmark_output_filename, "r"
                                 ) as json_file:
                                     results_dict = json.load(json_file)
+                                    if cpu_placement is not None:
+                                        add_cpu_placement_metadata(
+                                            results_dict,
+                                            cpu_placement,
+                                            cpu_placement_collisions,
+                                            local_benchmark_output_filename,
+                                        )
+                                    if cgroups is not None:
+                                        add_cgroups_stats(
+                                            results_dict,
+                                            cgroups_stats,
+                                            local_benchmark_output_filename,
+                                        )
+                                    if args.steady_state_analysis:
+                                        steady_state_analysis(
+                                            results_dict,
+                                            local_benchmark_output_filename,
+                                        )
                                     print_results_table_stdout(
                                         benchmark_config,
                                         default_metrics,
@@ -387,8 +677,33 @@ def run_local_command_logic(args, project_name, project_version):
                                     )
 
                                     # check KPIs
-                                    return_code = results_dict_kpi_check(
-                                        benchmark_config, results_dict, return_code
+                                    test_return_code = results_dict_kpi_check(
+                                        benchmark_config, results_dict, 0
+                                    )
+                                    return_code |= test_return_code
+                                    if test_return_code != 0:
+                                        # the results of a failed KPI check are kept, but
+                                        # the test is not completed nor measured
+                                        test_failed = True
+                                        journal_test_failed(journal, test_key)
+                                    append_repetition_result(
+                                        args, results_dict, repetitions_state
+                                    )
+                                    journal_record_result(
+                                        journal,
+                                        test_key,
+                                        local_benchmark_output_filename,
+                                        True,
+                                    )
+                                    test_result_files.append(
+                                        local_benchmark_output_filename
+                                    )
+                                if args.tests_durations_file != "":
+                                    update_tests_durations_file(
+                                        args.tests_durations_file,
+                                        test_name,
+                                        benchmark_duration_seconds,
+                                        dataset_load_duration_seconds,
                                     )
                                 if setup_details["env"] is None:
                                     if args.keep_env_and_topo is False:
@@ -401,6 +716,8 @@ def run_local_command_logic(args, project_name, project_version):
 
                             except:
                                 return_code |= 1
+                                test_failed = True
+                                journal_test_failed(journal, test_key)
                                 logging.critical(
                                     "Some unexpected exception was caught "
                                     "during local work. Failing test...."
@@ -415,7 +732,10 @@ def run_local_command_logic(args, project_name, project_version):
                             if setup_details["env"] is None:
                                 if args.keep_env_and_topo is False:
                                     teardown_local_setup(
-                                        redis_conns, redis_processes, setup_name
+                                        redis_conns,
+                                        redis_processes,
+                                        setup_name,
+                                        cgroups,
                                     )
                                 else:
                                     logging.info(
@@ -428,9 +748,47 @@ def run_local_command_logic(args, project_name, project_version):
                                     setup_type, args.allowed_envs
                                 )
                             )
+                    repetitions_summary.append(
+                        get_repetitions_summary_row(
+                            setup_name, test_name, repetitions_state
+                        )
+                    )
+                    journal_test_end(journal, test_key)
+                    suite_shard_test_status(
+                        suite_shard_manifest,
+                        test_name,
+                        TEST_STATUS_FAILED if test_failed else TEST_STATUS_COMPLETED,
+                    )
+                    if test_failed is False and len(test_result_files) > 0:
+                        record_measured_result(
+                            run_fingerprint,
+                            test_name,
+                            setup_name,
+                            github_sha,
+                            test_result_files,
+                            args.results_archive_dir,
+                            rts,
+                            results_fingerprints_keyname,
+                        )
                 if setup_details["env"] is not None:
-                    if args.keep_env_and_topo is False:
-                        teardown_local_setup(redis_conns, redis_processes, setup_name)
+                    if group_key in setup_carry_overs:
+                        logging.info(
+                            "Keeping the setup named {} alive for the next plan group given it has the same topology and configuration.".format(
+                                setup_name
+                            )
+                        )
+                        carried_setup = {
+                            "to": setup_carry_overs[group_key],
+                            "env": setup_details["env"],
+                        }
+                        setup_details["env"] = None
+                    elif args.keep_env_and_topo is False:
+                        teardown_local_setup(
+                            setup_details["env"]["redis_conns"],
+                            setup_details["env"]["redis_processes"],
+                            setup_name,
+                            setup_details["env"]["cgroups"],
+                        )
                         setup_details["env"] = None
                     else:
                         logging.info(
@@ -439,14 +797,37 @@ def run_local_command_logic(args, project_name, project_version):
 
     if profilers_enabled:
         local_profilers_print_artifacts_table(profilers_artifacts_matrix)
+    print_repetitions_summary_table(args, repetitions_summary)
+    wait_for_pending_removals()
     exit(return_code)
 
 
-def teardown_local_setup(redis_conns, redis_processes, setup_name):
+def add_cpu_placement_metadata(
+    results_dict, cpu_placement, cpu_placement_collisions, filename
+):
+    metadata_tags = get_cpu_placement_metadata_tags(cpu_placement)
+    metadata_tags["cpu_placement_collisions"] = "{}".format(
+        len(cpu_placement_collisions)
+    )
+    if "metadata" not in results_dict:
+        results_dict["metadata"] = {}
+    results_dict["metadata"].update(metadata_tags)
+    with open(filename, "w") as json_file:
+        json.dump(results_dict, json_file, indent=True)
+
+
+def add_cgroups_stats(results_dict, cgroups_stats, filename):
+    results_dict["Cgroups"] = cgroups_stats
+    with open(filename, "w") as json_file:
+        json.dump(results_dict, json_file, indent=True)
+
+
+def teardown_local_setup(redis_conns, redis_processes, setup_name, cgroups=None):
     logging.info("Tearing down setup {}".format(setup_name))
-    for redis_process in redis_processes:
-        if redis_process is not None:
-            redis_process.kill()
-    for conn in redis_conns:
-        conn.shutdown(nosave=True)
+    kill_redis_processes(redis_processes)
+    shutdown_redis_conns(redis_conns, nosave=True)
+    reap_redis_processes(redis_processes)
+    remove_isolation_cgroups(cgroups)
+    # the removal overlaps with the next setup
+    release_temporary_dirs()
     logging.info("Tear-down completed")
@@ -6,6 +6,10 @@
 import os
 
 # environment variables
+from redisbench_admin.env_pool.args import (
+    create_env_pool_connection_arguments,
+    ENV_POOL_WAIT_SECS,
+)
 from redisbench_admin.run.args import common_run_args
 from redisbench_admin.run_remote.consts import (
     SERVER_PRV_IP_KEY,
@@ -28,6 +32,11 @@ IGNORE_KEYSPACE_ERRORS = bool(int(os.getenv("IGNORE_KEYSPACE_ERRORS", "0")))
 TF_OVERRIDE_REMOTE = os.getenv("TF_OVERRIDE_REMOTE", None)
 REMOTE_USER = os.getenv("REMOTE_USER", "ubuntu")
 OVERRIDE_MODULES = os.getenv("OVERRIDE_MODULES", None)
+EXTRA_CLIENT_PUBLIC_IPS = os.getenv("EXTRA_CLIENT_PUBLIC_IPS", "")
+LOOKAHEAD_PROVISIONING_DEPTH = int(os.getenv("LOOKAHEAD_PROVISIONING_DEPTH", 1))
+MAX_CONCURRENT_VMS = int(os.getenv("MAX_CONCURRENT_VMS", 4))
+MAX_PARALLEL_REMOTE_SETUPS = int(os.getenv("MAX_PARALLEL_REMOTE_SETUPS", 1))
+REMOTE_SKIP_MEASURED = bool(int(os.getenv("REMOTE_SKIP_MEASURED", "0")))
 
 
 def create_run_remote_arguments(parser):
@@ -98,7 +107,52 @@ def create_run_remote_arguments(parser):
         type=str,
         help="Use this key for ssh connections.",
     )
+    parser.add_argument(
+        "--extra_client_public_ips",
+        required=False,
+        default=EXTRA_CLIENT_PUBLIC_IPS,
+        type=str,
+        help="comma separated public IPs of additional client hosts, used by the tests "
+        "that request a distributed client ( clientconfig.distributed.hosts > 1 ).",
+    )
     parser.add_argument("--terraform_bin_path", type=str, default=TERRAFORM_BIN_PATH)
+    parser.add_argument(
+        "--lookahead_provisioning_depth",
+        type=int,
+        default=LOOKAHEAD_PROVISIONING_DEPTH,
+        help="number of upcoming remote setups provisioned in the background while the "
+        "current one runs. 0 provisions each remote setup only when required.",
+    )
+    parser.add_argument(
+        "--max_concurrent_vms",
+        type=int,
+        default=MAX_CONCURRENT_VMS,
+        help="budget of VMs that can be up at the same time due to look-ahead "
+        "provisioning or concurrent remote setups. 0 means no budget.",
+    )
+    parser.add_argument(
+        "--max_parallel_remote_setups",
+        type=int,
+        default=MAX_PARALLEL_REMOTE_SETUPS,
+        help="Split the tests per remote setup and run up to this number of remote setups "
+        "concurrently, each on its own process and log file. 0 runs all remote setups at once "
+        "(within --max_concurrent_vms). 1 runs them sequentially.",
+    )
+    parser.add_argument(
+        "--remote_skip_measured",
+        default=REMOTE_SKIP_MEASURED,
+        action="store_true",
+        help="skip the tests whose identical run was already measured. The remote redis binary "
+        "and benchmark tool can't be hashed from here, so they're identified only by the git sha. "
+        "Only enable it when the remote artifacts are pinned to the git sha.",
+    )
+    parser = create_env_pool_connection_arguments(parser)
+    parser.add_argument(
+        "--env_pool_wait_secs",
+        type=int,
+        default=ENV_POOL_WAIT_SECS,
+        help="time to wait for a warm env of the pool prior to provisioning one",
+    )
     parser.add_argument("--setup_name_sufix", type=str, default="")
     parser.add_argument(
         "--skip-env-vars-verify",
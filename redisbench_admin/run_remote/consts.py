@@ -11,3 +11,4 @@ min_recommended_benchmark_duration = 60
 SERVER_PRV_IP_KEY = "server_private_ip"
 SERVER_PUB_IP_KEY = "server_public_ip"
 CLIENT_PUB_IP_KEY = "client_public_ip"
+REMOTE_CACHE_DIR = "/tmp/redisbench-admin-cache"
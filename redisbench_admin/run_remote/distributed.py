@@ -0,0 +1,552 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import concurrent.futures
+import csv
+import json
+import logging
+import os
+import time
+
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.utils.remote import (
+    execute_remote_commands,
+    execute_remote_commands_parallel,
+    fetch_files_from_remote_setup,
+    REMOTE_COMMANDS_MAX_PARALLEL,
+)
+
+# time between dispatching the client processes and their common start.
+# needs to be larger than the time it takes to reach every client host
+DISTRIBUTED_START_DELAY_SECS = float(os.getenv("DISTRIBUTED_START_DELAY_SECS", 5))
+DISTRIBUTED_SUPPORTED_TOOLS = ["memtier_benchmark", "redis-benchmark"]
+# memtier_benchmark sections that are summed across client processes
+MEMTIER_SUMMED_METRICS = ["Count", "Ops/sec", "Hits/sec", "Misses/sec", "KB/sec"]
+MEMTIER_AVERAGED_METRICS = ["Latency", "Average Latency"]
+# redis-benchmark only reports a few quantiles, which are used as the distribution points
+REDIS_BENCHMARK_CSV_QUANTILES = {
+    "min_latency_ms": 0.0,
+    "p50_latency_ms": 50.0,
+    "p95_latency_ms": 95.0,
+    "p99_latency_ms": 99.0,
+    "max_latency_ms": 100.0,
+}
+REDIS_BENCHMARK_CSV_DEFAULT_HEADER = ["test", "rps"]
+
+
+def get_distributed_client_settings(benchmark_config, config_key="clientconfig"):
+    """
+    Reads the optional distributed section of the client config, e.g.:
+      clientconfig:
+        distributed:
+          hosts: 2
+          processes_per_host: 4
+    Returns the number of client hosts and of processes per host.
+    """
+    clientconfig = benchmark_config.get(config_key, {})
+    if type(clientconfig) == list:
+        merged = {}
+        for entry in clientconfig:
+            merged.update(entry)
+        clientconfig = merged
+    distributed = clientconfig.get("distributed", {})
+    hosts = int(distributed.get("hosts", 1))
+    processes_per_host = int(distributed.get("processes_per_host", 1))
+    if hosts < 1 or processes_per_host < 1:
+        raise Exception(
+            "Invalid distributed client settings {}. hosts and processes_per_host need to be >= 1.".format(
+                distributed
+            )
+        )
+    # each process holds a channel for the whole run and they all need to start at once,
+    # so they can't be queued behind the cap that keeps us under sshd MaxSessions
+    if processes_per_host > REMOTE_COMMANDS_MAX_PARALLEL:
+        raise Exception(
+            "Invalid distributed client settings {}. processes_per_host can't be larger than {} (REMOTE_COMMANDS_MAX_PARALLEL).".format(
+                distributed, REMOTE_COMMANDS_MAX_PARALLEL
+            )
+        )
+    return hosts, processes_per_host
+
+
+def is_distributed_client_run(benchmark_tool, hosts, processes_per_host):
+    if hosts * processes_per_host == 1:
+        return False
+    if benchmark_tool not in DISTRIBUTED_SUPPORTED_TOOLS:
+        logging.warning(
+            "Distributed client runs are only supported for {}. Running a single {} process.".format(
+                DISTRIBUTED_SUPPORTED_TOOLS, benchmark_tool
+            )
+        )
+        return False
+    return True
+
+
+def get_distributed_client_slots(client_public_ips, hosts, processes_per_host):
+    """Returns one [host_n, process_n, client_public_ip] entry per client process"""
+    if hosts > len(client_public_ips):
+        logging.warning(
+            "Requested {} client hosts but only {} are available ({}). Using the available ones.".format(
+                hosts, len(client_public_ips), client_public_ips
+            )
+        )
+        hosts = len(client_public_ips)
+    slots = []
+    for host_n, client_public_ip in enumerate(client_public_ips[:hosts]):
+        for process_n in range(processes_per_host):
+            slots.append([host_n + 1, process_n + 1, client_public_ip])
+    return slots
+
+
+def get_distributed_results_filename(filename, host_n, process_n):
+    root, ext = os.path.splitext(filename)
+    return "{}-client-{}-{}{}".format(root, host_n, process_n, ext)
+
+
+def get_remote_clock_offset(client_public_ip, username, private_key, ssh_port=22):
+    """Estimates the remote clock minus the local clock, in seconds"""
+    start_time = time.time()
+    recv_exit_status, stdout, _ = execute_remote_commands(
+        client_public_ip, username, private_key, ["date +%s.%N"], ssh_port
+    )[0]
+    end_time = time.time()
+    if recv_exit_status != 0 or len(stdout) == 0:
+        logging.warning(
+            "Unable to read the clock of {}. Assuming it is in sync.".format(
+                client_public_ip
+            )
+        )
+        return 0.0
+    return float(stdout[0].strip()) - (start_time + end_time) / 2.0
+
+
+def get_synchronized_start_command(command_str, start_timestamp):
+    """Prefixes the command with a sleep until the (remote clock) start timestamp"""
+    return (
+        "sleep $(awk -v t={:.3f} -v n=$(date +%s.%N) "
+        "'BEGIN {{ d = t - n; printf \"%.3f\", (d > 0 ? d : 0) }}') && {}".format(
+            start_timestamp, command_str
+        )
+    )
+
+
+def get_slots_by_host(slots):
+    slots_by_host = {}
+    for slot_n, (_, _, client_public_ip) in enumerate(slots):
+        if client_public_ip not in slots_by_host:
+            slots_by_host[client_public_ip] = []
+        slots_by_host[client_public_ip].append(slot_n)
+    return slots_by_host
+
+
+def run_distributed_remote_benchmark(
+    benchmark_tool,
+    slots,
+    commands,
+    remote_results_files,
+    local_results_file,
+    username,
+    private_key,
+    ssh_port=22,
+    do_post_process=True,
+):
+    """
+    Starts all client processes at the same instant, across every client host, and
+    merges their results into local_results_file.
+    """
+    slots_by_host = get_slots_by_host(slots)
+    hosts = list(slots_by_host.keys())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(hosts)) as pool:
+        offsets = list(
+            pool.map(
+                lambda x: get_remote_clock_offset(x, username, private_key, ssh_port),
+                hosts,
+            )
+        )
+    start_timestamp = time.time() + DISTRIBUTED_START_DELAY_SECS
+    logging.info(
+        "Starting {} client processes on {} hosts in {} secs. Clock offsets (secs): {}".format(
+            len(slots),
+            len(hosts),
+            DISTRIBUTED_START_DELAY_SECS,
+            ["{:.3f}".format(x) for x in offsets],
+        )
+    )
+
+    def run_host_commands(host_pos):
+        client_public_ip = hosts[host_pos]
+        host_commands = [
+            get_synchronized_start_command(
+                commands[slot_n], start_timestamp + offsets[host_pos]
+            )
+            for slot_n in slots_by_host[client_public_ip]
+        ]
+        return execute_remote_commands_parallel(
+            client_public_ip,
+            username,
+            private_key,
+            host_commands,
+            ssh_port,
+            max_parallel=min(len(host_commands), REMOTE_COMMANDS_MAX_PARALLEL),
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(hosts)) as pool:
+        hosts_res = list(pool.map(run_host_commands, range(len(hosts))))
+    res = [None] * len(slots)
+    for host_pos, client_public_ip in enumerate(hosts):
+        for slot_n, slot_res in zip(
+            slots_by_host[client_public_ip], hosts_res[host_pos]
+        ):
+            res[slot_n] = slot_res
+    remote_run_result = True
+    stderr = []
+    for slot_n, [recv_exit_status, _, slot_stderr, _] in enumerate(res):
+        if recv_exit_status != 0:
+            host_n, process_n, client_public_ip = slots[slot_n]
+            logging.error(
+                "Client process {} of host #{} ({}) exited with status {}. stderr: {}".format(
+                    process_n, host_n, client_public_ip, recv_exit_status, slot_stderr
+                )
+            )
+            stderr.extend(slot_stderr)
+            remote_run_result = False
+    print_distributed_client_summary(slots, res)
+    if remote_run_result is True and do_post_process is True:
+        local_results_files = [
+            get_distributed_results_filename(local_results_file, host_n, process_n)
+            for host_n, process_n, _ in slots
+        ]
+
+        def fetch_host_results(client_public_ip):
+            fetch_files_from_remote_setup(
+                client_public_ip,
+                username,
+                private_key,
+                [
+                    (local_results_files[x], remote_results_files[x])
+                    for x in slots_by_host[client_public_ip]
+                ],
+                ssh_port,
+            )
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(hosts)) as pool:
+            list(pool.map(fetch_host_results, hosts))
+        merge_distributed_results_files(
+            benchmark_tool, local_results_files, local_results_file
+        )
+    return remote_run_result, "", stderr
+
+
+def print_distributed_client_summary(slots, res):
+    rows = []
+    for (host_n, process_n, client_public_ip), slot_res in zip(slots, res):
+        rows.append(
+            [
+                "#{} ({})".format(host_n, client_public_ip),
+                process_n,
+                slot_res[0],
+                "{:.1f}".format(slot_res[3]),
+            ]
+        )
+    writer = MarkdownTableWriter(
+        table_name="Distributed client processes",
+        headers=["Host", "Process", "Exit status", "Duration (secs)"],
+        value_matrix=rows,
+    )
+    writer.write_table()
+
+
+def merge_distributed_results_files(benchmark_tool, results_files, merged_filename):
+    logging.info(
+        "Merging the results of {} client processes into {}".format(
+            len(results_files), merged_filename
+        )
+    )
+    if benchmark_tool == "memtier_benchmark":
+        results = []
+        for results_file in results_files:
+            with open(results_file, "r") as fd:
+                results.append(json.load(fd))
+        with open(merged_filename, "w") as fd:
+            json.dump(merge_memtier_json_results(results), fd)
+    if benchmark_tool == "redis-benchmark":
+        csv_outputs = []
+        for results_file in results_files:
+            with open(results_file, "r") as fd:
+                csv_outputs.append(fd.read())
+        with open(merged_filename, "w") as fd:
+            fd.write(merge_redis_benchmark_csv_results(csv_outputs))
+
+
+def get_distribution_cumulative_percent(distribution, latency):
+    """distribution is a memtier like list of {"<=msec": x, "percent": cumulative %}"""
+    cumulative_percent = 0.0
+    for entry in distribution:
+        if entry["<=msec"] > latency:
+            break
+        cumulative_percent = max(cumulative_percent, entry["percent"])
+    return cumulative_percent
+
+
+def merge_latency_distributions(distributions, weights):
+    """
+    Merges cumulative latency distributions, each weighted by its number of requests.
+    The merged cumulative percent at each latency point is the weighted sum of the
+    cumulative percent of every distribution at that point.
+    """
+    distributions = [
+        sorted(x, key=lambda entry: entry["<=msec"]) for x in distributions
+    ]
+    total_weight = float(sum(weights))
+    latencies = sorted(set([entry["<=msec"] for x in distributions for entry in x]))
+    merged = []
+    if total_weight == 0:
+        return merged
+    for latency in latencies:
+        cumulative_percent = 0.0
+        for distribution, weight in zip(distributions, weights):
+            cumulative_percent = cumulative_percent + weight * (
+                get_distribution_cumulative_percent(distribution, latency)
+            )
+        merged.append({"<=msec": latency, "percent": cumulative_percent / total_weight})
+    return merged
+
+
+def get_distribution_percentile(distribution, percentile):
+    """Returns the lowest latency point at which the cumulative percent reaches percentile"""
+    for entry in distribution:
+        # tolerate the rounding error of the weighted sums
+        if entry["percent"] >= percentile - 1e-9:
+            return entry["<=msec"]
+    if len(distribution) > 0:
+        return distribution[-1]["<=msec"]
+    return 0.0
+
+
+def get_memtier_section_distribution_key(all_stats, section_name):
+    """The distribution of the "Sets" section is stored under "SET" """
+    for key in [section_name.upper(), section_name[:-1].upper()]:
+        if type(all_stats.get(key, None)) == list:
+            return key
+    return None
+
+
+def merge_memtier_sections(sections, distribution):
+    """Merges one "ALL STATS" section ( e.g. "Totals" ) across the client processes"""
+    merged = dict(sections[0])
+    counts = [x.get("Count", x.get("Ops/sec", 0)) for x in sections]
+    total_count = sum(counts)
+    for metric in MEMTIER_SUMMED_METRICS:
+        if metric in merged:
+            merged[metric] = sum([x[metric] for x in sections])
+    for metric in MEMTIER_AVERAGED_METRICS:
+        if metric in merged:
+            merged[metric] = 0.0
+            if total_count > 0:
+                merged[metric] = (
+                    sum([x[metric] * c for x, c in zip(sections, counts)]) / total_count
+                )
+    active = [x for x, c in zip(sections, counts) if c > 0]
+    if len(active) == 0:
+        active = sections
+    if "Min Latency" in merged:
+        merged["Min Latency"] = min([x["Min Latency"] for x in active])
+    if "Max Latency" in merged:
+        merged["Max Latency"] = max([x["Max Latency"] for x in sections])
+    if "Percentile Latencies" in merged:
+        percentiles = {}
+        for name in sections[0]["Percentile Latencies"].keys():
+            # the compressed hdr histogram of a single process no longer applies
+            if not name.startswith("p"):
+                continue
+            if distribution is not None and total_count > 0:
+                percentiles[name] = get_distribution_percentile(
+                    distribution, float(name[1:])
+                )
+            else:
+                percentiles[name] = max(
+                    [x["Percentile Latencies"][name] for x in sections]
+                )
+        merged["Percentile Latencies"] = percentiles
+    if "Time-Serie" in merged:
+        merged["Time-Serie"] = merge_memtier_time_series(
+            [x["Time-Serie"] for x in sections]
+        )
+    return merged
+
+
+def is_percentile_metric(metric):
+    """memtier percentile names, e.g. "p99.00" """
+    if not metric.startswith("p"):
+        return False
+    try:
+        float(metric[1:])
+    except ValueError:
+        return False
+    return True
+
+
+def merge_memtier_time_series(time_series):
+    """
+    Merges the per second datapoints. Given there are no per second distributions,
+    the per second percentiles can't be merged and are dropped.
+    """
+    merged = {}
+    seconds = sorted(set([k for x in time_series for k in x.keys()]), key=int)
+    for second in seconds:
+        datapoints = [x[second] for x in time_series if second in x]
+        count = sum([x.get("Count", 0) for x in datapoints])
+        datapoint = {}
+        for metric in datapoints[0].keys():
+            if is_percentile_metric(metric):
+                continue
+            if metric == "Count":
+                datapoint[metric] = count
+            elif metric == "Average Latency":
+                datapoint[metric] = 0.0
+                if count > 0:
+                    datapoint[metric] = (
+                        sum([x[metric] * x.get("Count", 0) for x in datapoints]) / count
+                    )
+            elif metric == "Min Latency":
+                active = [x for x in datapoints if x.get("Count", 0) > 0]
+                if len(active) == 0:
+                    active = datapoints
+                datapoint[metric] = min([x[metric] for x in active])
+            else:
+                datapoint[metric] = max([x.get(metric, 0) for x in datapoints])
+        merged[second] = datapoint
+    return merged
+
+
+def merge_memtier_json_results(results):
+    """
+    Merges the memtier_benchmark json outputs of all client processes. Throughputs are
+    summed and the percentiles are computed from the merged latency distributions.
+    """
+    merged = dict(results[0])
+    if len(results) == 1:
+        return merged
+    all_stats_list = [x["ALL STATS"] for x in results]
+    if any([type(x) != dict for x in all_stats_list]):
+        raise Exception("Unable to merge memtier_benchmark results without ALL STATS")
+    merged_all_stats = {}
+    sections_weights = {}
+    for name, value in all_stats_list[0].items():
+        if name == "Runtime":
+            start_time = min([x[name]["Start time"] for x in all_stats_list])
+            finish_time = max([x[name]["Finish time"] for x in all_stats_list])
+            merged_all_stats[name] = dict(value)
+            merged_all_stats[name]["Start time"] = start_time
+            merged_all_stats[name]["Finish time"] = finish_time
+            merged_all_stats[name]["Total duration"] = finish_time - start_time
+        elif type(value) == dict and name != "Totals":
+            sections = [x[name] for x in all_stats_list]
+            distribution = None
+            distribution_key = get_memtier_section_distribution_key(
+                all_stats_list[0], name
+            )
+            weights = [x.get("Count", x.get("Ops/sec", 0)) for x in sections]
+            if distribution_key is not None:
+                distribution = merge_latency_distributions(
+                    [x[distribution_key] for x in all_stats_list], weights
+                )
+                merged_all_stats[distribution_key] = distribution
+                sections_weights[distribution_key] = weights
+            merged_all_stats[name] = merge_memtier_sections(sections, distribution)
+    if "Totals" in all_stats_list[0]:
+        sections = [x["Totals"] for x in all_stats_list]
+        distributions = []
+        weights = []
+        for distribution_key, section_weights in sections_weights.items():
+            for all_stats, weight in zip(all_stats_list, section_weights):
+                distributions.append(all_stats[distribution_key])
+                weights.append(weight)
+        distribution = None
+        if len(distributions) > 0:
+            distribution = merge_latency_distributions(distributions, weights)
+        merged_all_stats["Totals"] = merge_memtier_sections(sections, distribution)
+    merged["ALL STATS"] = merged_all_stats
+    return merged
+
+
+def parse_redis_benchmark_csv(csv_output):
+    """Returns the header and the rows of a redis-benchmark --csv output"""
+    lines = [
+        x for x in csv_output.splitlines() if x.strip() != "" and "WARNING:" not in x
+    ]
+    rows = list(csv.reader(lines))
+    header = None
+    if len(rows) > 0 and rows[0][0] == "test":
+        header = rows[0]
+        rows = rows[1:]
+    return header, rows
+
+
+def merge_redis_benchmark_csv_results(csv_outputs):
+    """
+    Merges the redis-benchmark --csv outputs of all client processes. The rps are
+    summed and the latency quantiles are computed from the merged distributions,
+    given each process distribution is known at the reported quantiles.
+    """
+    parsed = [parse_redis_benchmark_csv(x) for x in csv_outputs]
+    header = parsed[0][0]
+    columns = header
+    if columns is None:
+        columns = REDIS_BENCHMARK_CSV_DEFAULT_HEADER
+    tests = {}
+    tests_order = []
+    for _, rows in parsed:
+        for row in rows:
+            test_name = row[0]
+            if test_name not in tests:
+                tests[test_name] = []
+                tests_order.append(test_name)
+            tests[test_name].append({k: float(v) for k, v in zip(columns[1:], row[1:])})
+    lines = []
+    if header is not None:
+        lines.append(",".join(['"{}"'.format(x) for x in header]))
+    for test_name in tests_order:
+        test_rows = tests[test_name]
+        weights = [x["rps"] for x in test_rows]
+        total_weight = sum(weights)
+        distribution = merge_latency_distributions(
+            [
+                [
+                    {"<=msec": x[column], "percent": percent}
+                    for column, percent in REDIS_BENCHMARK_CSV_QUANTILES.items()
+                    if column in x
+                ]
+                for x in test_rows
+            ],
+            weights,
+        )
+        merged = {}
+        for column in columns[1:]:
+            values = [x[column] for x in test_rows]
+            if column == "rps":
+                merged[column] = total_weight
+            elif column == "min_latency_ms":
+                merged[column] = min(values)
+            elif column == "max_latency_ms":
+                merged[column] = max(values)
+            elif column in REDIS_BENCHMARK_CSV_QUANTILES and total_weight > 0:
+                merged[column] = get_distribution_percentile(
+                    distribution, REDIS_BENCHMARK_CSV_QUANTILES[column]
+                )
+            elif total_weight > 0:
+                merged[column] = (
+                    sum([v * w for v, w in zip(values, weights)]) / total_weight
+                )
+            else:
+                merged[column] = max(values)
+        lines.append(
+            ",".join(
+                ['"{}"'.format(test_name)]
+                + ['"{:.3f}"'.format(merged[x]) for x in columns[1:]]
+            )
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,225 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import datetime
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import yaml
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.run.suite_shard import (
+    suite_shard_test_status,
+    TEST_STATUS_COMPLETED,
+    TEST_STATUS_FAILED,
+)
+from redisbench_admin.run.scheduler import merge_tests_durations_file
+from redisbench_admin.run_local.parallel import PARALLEL_POLL_INTERVAL_SECS
+from redisbench_admin.run_remote.provisioning import REMOTE_SETUP_VMS
+from redisbench_admin.utils.benchmark_config import get_testfiles_to_process
+from redisbench_admin.utils.remote import fetch_remote_id_from_config
+
+PARALLEL_REMOTE_LOGS_DIR = os.getenv("PARALLEL_REMOTE_LOGS_DIR", "./parallel-logs")
+
+
+def get_remote_partitions(args, test_names=None):
+    """
+    Splits the test files per remote_id, keeping the run order. Tests without remote
+    config are kept in the None partition. Returns a dict of
+    remote_id -> [[test_filename, test_name], ...]
+    """
+    _, files = get_testfiles_to_process(args)
+    partitions = {}
+    for test_filename in sorted(files):
+        with open(test_filename, "r", encoding="utf8") as stream:
+            benchmark_config = yaml.safe_load(stream)
+        test_name = benchmark_config["name"]
+        if test_names is not None and test_name not in test_names:
+            continue
+        remote_id = None
+        if "remote" in benchmark_config:
+            remote_id = fetch_remote_id_from_config(benchmark_config["remote"])
+        if remote_id not in partitions:
+            partitions[remote_id] = []
+        partitions[remote_id].append([test_filename, test_name])
+    return partitions
+
+
+def get_max_parallel_partitions(max_parallel, max_concurrent_vms, total_partitions):
+    """0 means as many as the partitions. The VMs budget, if any, has the last word."""
+    if max_parallel <= 0:
+        max_parallel = total_partitions
+    if max_concurrent_vms > 0:
+        max_parallel = min(max_parallel, max(1, max_concurrent_vms // REMOTE_SETUP_VMS))
+    return max(1, min(max_parallel, total_partitions))
+
+
+def get_partition_name(remote_id):
+    return remote_id if remote_id else "no-remote"
+
+
+def get_partition_child_command(
+    test_filenames, journal_dir="", tests_durations_file=""
+):
+    # last occurrence of an argument wins, so we just override the parent ones.
+    # the children share the cwd, so each one gets its own journal and durations file
+    return (
+        [sys.executable, "-c", "from redisbench_admin.cli import main; main()"]
+        + sys.argv[1:]
+        + [
+            "--test",
+            ",".join(test_filenames),
+            "--max_parallel_remote_setups",
+            "1",
+            "--suite-shard",
+            "",
+            "--journal-dir",
+            journal_dir,
+            "--tests-durations-file",
+            tests_durations_file,
+        ]
+    )
+
+
+def run_remote_setups_in_parallel(
+    args,
+    partitions,
+    suite_shard_manifest=None,
+    logs_dir=PARALLEL_REMOTE_LOGS_DIR,
+):
+    """
+    Runs each remote setup partition on its own run-remote process. Each process
+    provisions, uses and tears down its own remote setup and exports to the same
+    datasink. A failing partition does not stop the others.
+    """
+    max_parallel = get_max_parallel_partitions(
+        args.max_parallel_remote_setups, args.max_concurrent_vms, len(partitions)
+    )
+    logging.info(
+        "Running {} remote setups concurrently (at most {} at a time, budget of {} concurrent VMs).".format(
+            len(partitions), max_parallel, args.max_concurrent_vms
+        )
+    )
+    if not os.path.exists(logs_dir):
+        os.makedirs(logs_dir)
+    pending = list(partitions.items())
+    running = []
+    summary = []
+    return_code = 0
+    suite_start_time = datetime.datetime.now()
+    try:
+        while len(pending) > 0 or len(running) > 0:
+            while len(pending) > 0 and len(running) < max_parallel:
+                remote_id, tests = pending.pop(0)
+                partition_name = get_partition_name(remote_id)
+                log_filename = os.path.join(logs_dir, "{}.log".format(partition_name))
+                journal_dir = ""
+                if args.journal_dir != "":
+                    journal_dir = os.path.join(args.journal_dir, partition_name)
+                tests_durations_file = ""
+                if args.tests_durations_file != "":
+                    tests_durations_file = os.path.join(
+                        logs_dir, "{}-tests-durations.json".format(partition_name)
+                    )
+                    if os.path.exists(args.tests_durations_file):
+                        shutil.copyfile(args.tests_durations_file, tests_durations_file)
+                logging.info(
+                    "Starting the {} tests of remote setup {}. Logs at {}".format(
+                        len(tests), remote_id, log_filename
+                    )
+                )
+                log_file = open(log_filename, "w")
+                process = subprocess.Popen(
+                    get_partition_child_command(
+                        [x[0] for x in tests], journal_dir, tests_durations_file
+                    ),
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                )
+                running.append(
+                    {
+                        "process": process,
+                        "log_file": log_file,
+                        "remote_id": remote_id,
+                        "tests": tests,
+                        "tests_durations_file": tests_durations_file,
+                        "start_time": datetime.datetime.now(),
+                    }
+                )
+            time.sleep(PARALLEL_POLL_INTERVAL_SECS)
+            still_running = []
+            for partition in running:
+                partition_return_code = partition["process"].poll()
+                if partition_return_code is None:
+                    still_running.append(partition)
+                    continue
+                partition["log_file"].close()
+                duration = (
+                    datetime.datetime.now() - partition["start_time"]
+                ).total_seconds()
+                status = "OK"
+                test_status = TEST_STATUS_COMPLETED
+                if partition_return_code != 0:
+                    status = "FAILED ({})".format(partition_return_code)
+                    test_status = TEST_STATUS_FAILED
+                    return_code |= 1
+                for _, test_name in partition["tests"]:
+                    suite_shard_test_status(
+                        suite_shard_manifest, test_name, test_status
+                    )
+                # the parent is the only writer of the shared durations file
+                if partition["tests_durations_file"] != "":
+                    merge_tests_durations_file(
+                        args.tests_durations_file,
+                        partition["tests_durations_file"],
+                        [x[1] for x in partition["tests"]],
+                    )
+                logging.info(
+                    "Remote setup {} finished after {:.1f} secs with status {}.".format(
+                        partition["remote_id"], duration, status
+                    )
+                )
+                summary.append(
+                    [
+                        partition["remote_id"],
+                        len(partition["tests"]),
+                        "{:.1f}".format(duration),
+                        status,
+                    ]
+                )
+            running = still_running
+    except KeyboardInterrupt:
+        # the children got the interrupt as well. Let them tear down their setups
+        logging.critical(
+            "Detected Keyboard interrupt. Waiting for {} remote setups to tear down.".format(
+                len(running)
+            )
+        )
+        for partition in running:
+            partition["process"].wait()
+            partition["log_file"].close()
+        return_code |= 1
+    print_parallel_remote_setups_summary(summary, suite_start_time)
+    return return_code
+
+
+def print_parallel_remote_setups_summary(summary, suite_start_time):
+    wall_clock = (datetime.datetime.now() - suite_start_time).total_seconds()
+    partitions_duration = sum([float(x[2]) for x in summary])
+    packing_factor = 1.0
+    if wall_clock > 0:
+        packing_factor = partitions_duration / wall_clock
+    writer = MarkdownTableWriter(
+        table_name="Concurrent remote setups summary. Wall clock {:.1f} secs, sum of remote setup durations {:.1f} secs (x{:.2f})".format(
+            wall_clock, partitions_duration, packing_factor
+        ),
+        headers=["Remote setup", "Tests", "Duration (secs)", "Status"],
+        value_matrix=summary,
+    )
+    writer.write_table()
@@ -0,0 +1,235 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import logging
+import os
+import threading
+import time
+
+from pytablewriter import MarkdownTableWriter
+
+from redisbench_admin.run_remote.terraform import (
+    terraform_destroy,
+    terraform_spin_or_reuse_env,
+)
+from redisbench_admin.utils.remote import fetch_remote_id_from_config
+
+# one DB host and one client host per remote setup
+REMOTE_SETUP_VMS = int(os.getenv("REMOTE_SETUP_VMS", 2))
+
+
+def get_plan_remote_ids(benchmark_runs_plan):
+    """
+    Returns the (setup name, test name) key and remote_id of each test in run order
+    (None for tests without remote config) and the first test config and name of
+    each remote_id.
+    """
+    plan_keys = []
+    plan_remote_ids = []
+    remote_configs = {}
+    for bench_by_dataset_map in benchmark_runs_plan.values():
+        for bench_by_dataset_and_setup_map in bench_by_dataset_map.values():
+            for setup_name, setup_details in bench_by_dataset_and_setup_map.items():
+                for test_name, benchmark_config in setup_details["benchmarks"].items():
+                    remote_id = None
+                    if "remote" in benchmark_config:
+                        remote_id = fetch_remote_id_from_config(
+                            benchmark_config["remote"]
+                        )
+                        if remote_id not in remote_configs:
+                            remote_configs[remote_id] = (benchmark_config, test_name)
+                    plan_keys.append((setup_name, test_name))
+                    plan_remote_ids.append(remote_id)
+    return plan_keys, plan_remote_ids, remote_configs
+
+
+def init_lookahead_provisioning(
+    benchmark_runs_plan,
+    depth,
+    max_concurrent_vms,
+    remote_envs,
+    remote_envs_timeout,
+    spin_args,
+    env_pool=None,
+    keep_env=False,
+):
+    """
+    spin_args are the terraform_spin_or_reuse_env arguments from tf_bin_path to
+    tf_triggering_env. Returns None if look-ahead provisioning is disabled.
+    """
+    if depth <= 0:
+        return None
+    plan_keys, plan_remote_ids, remote_configs = get_plan_remote_ids(
+        benchmark_runs_plan
+    )
+    logging.info(
+        "Look-ahead provisioning of {} remote setups with a depth of {} and a budget of {} concurrent VMs.".format(
+            len(remote_configs), depth, max_concurrent_vms
+        )
+    )
+    return {
+        "depth": depth,
+        "max_concurrent_vms": max_concurrent_vms,
+        "plan_keys": plan_keys,
+        "plan_remote_ids": plan_remote_ids,
+        "remote_configs": remote_configs,
+        "remote_envs": remote_envs,
+        "remote_envs_timeout": remote_envs_timeout,
+        "spin_args": spin_args,
+        "env_pool": env_pool,
+        "keep_env": keep_env,
+        "inflight": {},
+        "stats": {},
+        "lock": threading.Lock(),
+    }
+
+
+def get_remaining_remote_ids(state, position):
+    """Distinct remote_ids required from plan position onwards, in first-use order"""
+    remaining = []
+    for remote_id in state["plan_remote_ids"][position:]:
+        if remote_id is not None and remote_id not in remaining:
+            remaining.append(remote_id)
+    return remaining
+
+
+def get_concurrent_vms(state):
+    with state["lock"]:
+        inflight = [
+            x for x in state["inflight"].keys() if x not in state["remote_envs"]
+        ]
+        return (len(state["remote_envs"]) + len(inflight)) * REMOTE_SETUP_VMS
+
+
+def lookahead_provision(state, remote_id):
+    benchmark_config, test_name = state["remote_configs"][remote_id]
+    start_time = time.time()
+    try:
+        terraform_spin_or_reuse_env(
+            benchmark_config,
+            state["remote_envs"],
+            1,
+            test_name,
+            *state["spin_args"],
+            state["remote_envs_timeout"][remote_id],
+            None,
+            None,
+            state["env_pool"],
+        )
+    except Exception as e:
+        logging.error(
+            "Look-ahead provisioning of remote setup {} failed with error: {}. It will be provisioned when required.".format(
+                remote_id, e.__str__()
+            )
+        )
+    state["stats"][remote_id]["provisioning"] = time.time() - start_time
+
+
+def lookahead_advance(state, setup_name, test_name):
+    """
+    Called prior to running a test. Tears down the envs no longer required and
+    starts provisioning the next ones, within the depth and the VMs budget.
+    """
+    if state is None:
+        return
+    position = state["plan_keys"].index((setup_name, test_name))
+    remaining = get_remaining_remote_ids(state, position)
+    if state["keep_env"] is False:
+        for remote_id in list(state["remote_envs"].keys()):
+            if remote_id in remaining or remote_id in state["inflight"]:
+                continue
+            logging.info(
+                "Remote setup {} is not required by the remaining tests. Tearing it down.".format(
+                    remote_id
+                )
+            )
+            with state["lock"]:
+                remote_env = state["remote_envs"].pop(remote_id)
+            terraform_destroy({remote_id: remote_env}, False)
+    # the first remaining remote_id is the current one, provisioned on demand if needed
+    for remote_id in remaining[: state["depth"] + 1]:
+        if remote_id in state["remote_envs"] or remote_id in state["inflight"]:
+            continue
+        if (
+            state["max_concurrent_vms"] > 0
+            and get_concurrent_vms(state) + REMOTE_SETUP_VMS
+            > state["max_concurrent_vms"]
+        ):
+            logging.info(
+                "Not provisioning remote setup {} ahead of time given it would exceed the budget of {} concurrent VMs.".format(
+                    remote_id, state["max_concurrent_vms"]
+                )
+            )
+            break
+        logging.info("Provisioning remote setup {} ahead of time.".format(remote_id))
+        state["stats"][remote_id] = {"provisioning": None, "waited": 0.0}
+        thread = threading.Thread(
+            target=lookahead_provision,
+            args=(state, remote_id),
+            name="lookahead-provisioning-{}".format(remote_id),
+            daemon=True,
+        )
+        with state["lock"]:
+            state["inflight"][remote_id] = thread
+        thread.start()
+
+
+def wait_for_lookahead_env(state, remote_id):
+    """Blocks until the look-ahead provisioning of remote_id, if any, is done"""
+    if state is None or remote_id not in state["inflight"]:
+        return
+    thread = state["inflight"][remote_id]
+    if thread.is_alive():
+        logging.info(
+            "Waiting for the ahead of time provisioning of remote setup {}".format(
+                remote_id
+            )
+        )
+    start_time = time.time()
+    thread.join()
+    state["stats"][remote_id]["waited"] = (
+        state["stats"][remote_id]["waited"] + time.time() - start_time
+    )
+    with state["lock"]:
+        del state["inflight"][remote_id]
+
+
+def wait_for_lookahead_envs(state):
+    """Called prior to the final tear-down so that no env is left behind"""
+    if state is None:
+        return
+    for remote_id in list(state["inflight"].keys()):
+        wait_for_lookahead_env(state, remote_id)
+    print_lookahead_provisioning_summary(state)
+
+
+def print_lookahead_provisioning_summary(state):
+    rows = []
+    for remote_id, stats in state["stats"].items():
+        provisioning = stats["provisioning"]
+        overlapped = 0.0
+        if provisioning is not None:
+            overlapped = max(0.0, provisioning - stats["waited"])
+        rows.append(
+            [
+                remote_id,
+                "n/a" if provisioning is None else "{:.1f}".format(provisioning),
+                "{:.1f}".format(stats["waited"]),
+                "{:.1f}".format(overlapped),
+            ]
+        )
+    if len(rows) == 0:
+        return
+    writer = MarkdownTableWriter(
+        table_name="Look-ahead provisioning",
+        headers=[
+            "Remote setup",
+            "Provisioning (secs)",
+            "Waited (secs)",
+            "Overlapped with benchmarks (secs)",
+        ],
+        value_matrix=rows,
+    )
+    writer.write_table()
@@ -5,6 +5,7 @@
 #
 import datetime
 import logging
+import os
 import threading
 
 import redisbench_admin
@@ -13,6 +14,13 @@ from redisbench_admin.run.common import (
 )
 from redisbench_admin.run.metrics import collect_cpu_data
 from redisbench_admin.run.run import calculate_client_tool_duration_and_check
+from redisbench_admin.run_remote.distributed import (
+    get_distributed_client_settings,
+    get_distributed_client_slots,
+    get_distributed_results_filename,
+    is_distributed_client_run,
+    run_distributed_remote_benchmark,
+)
 from redisbench_admin.run_remote.remote_helpers import (
     benchmark_tools_sanity_check,
     remote_tool_pre_bench_step,
@@ -24,7 +32,7 @@ from redisbench_admin.utils.redisgraph_benchmark_go import (
 )
 from redisbench_admin.utils.remote import (
     execute_remote_commands,
-    fetch_file_from_remote_setup,
+    fetch_files_from_remote_setup,
 )
 
 
@@ -53,6 +61,7 @@ def run_remote_client_tool(
     redis_conns=[],
     do_post_process=True,
     redis_password=None,
+    client_public_ips=None,
 ):
     (
         benchmark_min_tool_version,
@@ -67,23 +76,36 @@ def run_remote_client_tool(
     benchmark_tools_sanity_check(allowed_tools, benchmark_tool)
     local_output_artifacts = []
     remote_output_artifacts = []
-    # setup the benchmark tool
-    remote_tool_pre_bench_step(
-        benchmark_config,
-        benchmark_min_tool_version,
-        benchmark_min_tool_version_major,
-        benchmark_min_tool_version_minor,
-        benchmark_min_tool_version_patch,
-        benchmark_tool,
-        client_public_ip,
-        username,
-        benchmark_tool_source,
-        config_key,
-        os_str,
-        arch_str,
-        client_ssh_port,
-        private_key,
+    if client_public_ips is None:
+        client_public_ips = [client_public_ip]
+    hosts, processes_per_host = get_distributed_client_settings(
+        benchmark_config, config_key
     )
+    distributed_slots = None
+    distributed_hosts = [client_public_ip]
+    if is_distributed_client_run(benchmark_tool, hosts, processes_per_host):
+        distributed_slots = get_distributed_client_slots(
+            client_public_ips, hosts, processes_per_host
+        )
+        distributed_hosts = client_public_ips[: distributed_slots[-1][0]]
+    # setup the benchmark tool
+    for tool_public_ip in distributed_hosts:
+        remote_tool_pre_bench_step(
+            benchmark_config,
+            benchmark_min_tool_version,
+            benchmark_min_tool_version_major,
+            benchmark_min_tool_version_minor,
+            benchmark_min_tool_version_patch,
+            benchmark_tool,
+            tool_public_ip,
+            username,
+            benchmark_tool_source,
+            config_key,
+            os_str,
+            arch_str,
+            client_ssh_port,
+            private_key,
+        )
     if "ann-benchmarks" in benchmark_tool:
         logging.info(
             "Ensuring that the ann-benchmark being used is the latest version release within the redisbench-admin package"
@@ -108,10 +130,36 @@ def run_remote_client_tool(
         client_ssh_port,
         redis_password,
     )
+    distributed_commands = []
+    distributed_remote_results_files = []
+    if distributed_slots is not None:
+        for host_n, process_n, slot_public_ip in distributed_slots:
+            slot_remote_results_file = get_distributed_results_filename(
+                remote_results_file, host_n, process_n
+            )
+            _, slot_command_str = prepare_benchmark_parameters(
+                benchmark_config,
+                benchmark_tool,
+                server_plaintext_port,
+                server_private_ip,
+                slot_remote_results_file,
+                True,
+                None,
+                cluster_api_enabled,
+                config_key,
+                slot_public_ip,
+                username,
+                private_key,
+                client_ssh_port,
+                redis_password,
+            )
+            distributed_commands.append(slot_command_str)
+            distributed_remote_results_files.append(slot_remote_results_file)
     tmp = None
     if benchmark_tool == "redis-benchmark":
         tmp = local_bench_fname
-        local_bench_fname = "result.csv"
+        # named after the test given concurrent run-remote processes share the cwd
+        local_bench_fname = "{}.csv".format(os.path.splitext(tmp)[0])
     commands = [command_str]
     post_commands = []
     if "ann" in benchmark_tool:
@@ -150,16 +198,29 @@ def run_remote_client_tool(
 
     benchmark_start_time = datetime.datetime.now()
     # run the benchmark
-    remote_run_result, stdout, _ = run_remote_benchmark(
-        client_public_ip,
-        username,
-        private_key,
-        remote_results_file,
-        local_bench_fname,
-        commands,
-        client_ssh_port,
-        do_post_process,
-    )
+    if distributed_slots is not None:
+        remote_run_result, stdout, _ = run_distributed_remote_benchmark(
+            benchmark_tool,
+            distributed_slots,
+            distributed_commands,
+            distributed_remote_results_files,
+            local_bench_fname,
+            username,
+            private_key,
+            client_ssh_port,
+            do_post_process,
+        )
+    else:
+        remote_run_result, stdout, _ = run_remote_benchmark(
+            client_public_ip,
+            username,
+            private_key,
+            remote_results_file,
+            local_bench_fname,
+            commands,
+            client_ssh_port,
+            do_post_process,
+        )
     benchmark_end_time = datetime.datetime.now()
     if cpu_stats_thread is not None:
         logging.info("Stopping CPU collecting thread")
@@ -208,6 +269,7 @@ def run_remote_client_tool(
                 start_time_str,
                 stdout,
                 tmp,
+                local_bench_fname,
             )
     else:
         logging.error(
@@ -229,6 +291,7 @@ def run_remote_client_tool(
                     len(remote_output_artifacts)
                 )
             )
+        artifacts = []
         for client_artifact_n, client_remote_artifact in enumerate(
             remote_output_artifacts
         ):
@@ -238,14 +301,15 @@ def run_remote_client_tool(
                     client_remote_artifact, client_local_artifact
                 )
             )
-            fetch_file_from_remote_setup(
-                client_public_ip,
-                username,
-                private_key,
-                client_local_artifact,
-                client_remote_artifact,
-            )
+            artifacts.append((client_local_artifact, client_remote_artifact))
             final_local_output_artifacts.append(client_local_artifact)
+        fetch_files_from_remote_setup(
+            client_public_ip,
+            username,
+            private_key,
+            artifacts,
+            client_ssh_port,
+        )
 
     return (
         artifact_version,
@@ -361,24 +425,22 @@ def run_remote_benchmark(
             if type(local_results_files) == str:
                 local_results_file = local_results_files
                 remote_results_file = remote_results_files
-                fetch_file_from_remote_setup(
+                fetch_files_from_remote_setup(
                     client_public_ip,
                     username,
                     private_key,
-                    local_results_file,
-                    remote_results_file,
+                    [(local_results_file, remote_results_file)],
+                    ssh_port,
                 )
             if type(local_results_files) == list:
                 assert len(local_results_files) == len(remote_results_files)
-                for pos, local_results_file in enumerate(local_results_files):
-                    remote_results_file = remote_results_files[pos]
-                    fetch_file_from_remote_setup(
-                        client_public_ip,
-                        username,
-                        private_key,
-                        local_results_file,
-                        remote_results_file,
-                    )
+                fetch_files_from_remote_setup(
+                    client_public_ip,
+                    username,
+                    private_key,
+                    list(zip(local_results_files, remote_results_files)),
+                    ssh_port,
+                )
         else:
             logging.info(
                 "Given the bellow commands list:\n\t{}\nwe've skipped result fetching".format(
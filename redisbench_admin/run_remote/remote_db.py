@@ -5,6 +5,7 @@
 #
 import datetime
 import logging
+import os
 
 import redis
 
@@ -19,8 +20,16 @@ from redisbench_admin.run.common import (
     get_start_time_vars,
     dbconfig_keyspacelen_check,
     run_redis_pre_steps,
+    reset_setup_state,
+    save_setup_state,
 )
-from redisbench_admin.run.ssh import ssh_tunnel_redisconn
+from redisbench_admin.run.result_cache import get_remote_benchmark_tool_version
+from redisbench_admin.run.snapshots import (
+    get_tool_dataset_snapshot_key,
+    remote_snapshot_restore,
+    remote_snapshot_store,
+)
+from redisbench_admin.run.ssh import ssh_tunnel_redisconn, ssh_tunnel_redisconns
 from redisbench_admin.run_remote.consts import (
     remote_module_file_dir,
 )
@@ -36,25 +45,39 @@ from redisbench_admin.utils.remote import (
     execute_remote_commands,
     check_dataset_remote_requirements,
     get_run_full_filename,
+    remote_dataset_cache_prune_command,
+    REMOTE_DATASET_CACHE_DIR,
 )
 
 
 def remote_tmpdir_prune(
     server_public_ip, ssh_port, temporary_dir, username, private_key
 ):
+    commands = [
+        "mkdir -p {}".format(temporary_dir),
+        "rm -rf {}/*.log".format(temporary_dir),
+        "rm -rf {}/*.config".format(temporary_dir),
+        # the test rdbs are hardlinks, the dataset cache entries are kept
+        "rm -rf {}/*.rdb".format(temporary_dir),
+        "rm -rf {}/*.out".format(temporary_dir),
+        "rm -rf {}/*.data".format(temporary_dir),
+        "pkill -9 redis-server",
+    ]
+    if REMOTE_DATASET_CACHE_DIR != "":
+        if os.path.normpath(REMOTE_DATASET_CACHE_DIR) == os.path.normpath(
+            temporary_dir
+        ):
+            raise Exception(
+                "The remote dataset cache dir {} can't be the test temporary dir.".format(
+                    REMOTE_DATASET_CACHE_DIR
+                )
+            )
+        commands.append(remote_dataset_cache_prune_command())
     execute_remote_commands(
         server_public_ip,
         username,
         private_key,
-        [
-            "mkdir -p {}".format(temporary_dir),
-            "rm -rf {}/*.log".format(temporary_dir),
-            "rm -rf {}/*.config".format(temporary_dir),
-            "rm -rf {}/*.rdb".format(temporary_dir),
-            "rm -rf {}/*.out".format(temporary_dir),
-            "rm -rf {}/*.data".format(temporary_dir),
-            "pkill -9 redis-server",
-        ],
+        commands,
         ssh_port,
     )
 
@@ -102,6 +125,8 @@ def remote_db_spin(
     redis_password=None,
     flushall_on_every_test_start=False,
     ignore_keyspace_errors=False,
+    dataset_snapshots=False,
+    reuse_write_setups=False,
 ):
     (
         _,
@@ -122,6 +147,7 @@ def remote_db_spin(
             server_public_ip,
             temporary_dir,
             username,
+            db_ssh_port,
         )
         logging.info("Checking if there are modules we need to cp to remote host...")
         remote_module_files = remote_module_files_cp(
@@ -133,7 +159,6 @@ def remote_db_spin(
             username,
         )
     # setup Redis
-    redis_setup_result = True
     redis_conns = []
     topology_setup_start_time = datetime.datetime.now()
     if setup_type == "oss-cluster":
@@ -154,18 +179,17 @@ def remote_db_spin(
                 redis_7,
             )
         try:
-            for p in range(cluster_start_port, cluster_start_port + shard_count):
-                local_redis_conn, ssh_tunnel = ssh_tunnel_redisconn(
-                    p,
-                    server_private_ip,
-                    server_public_ip,
-                    username,
-                    db_ssh_port,
-                    private_key,
-                    redis_password,
-                )
+            redis_conns, ssh_tunnel = ssh_tunnel_redisconns(
+                list(range(cluster_start_port, cluster_start_port + shard_count)),
+                server_private_ip,
+                server_public_ip,
+                username,
+                db_ssh_port,
+                private_key,
+                redis_password,
+            )
+            for local_redis_conn in redis_conns:
                 local_redis_conn.ping()
-                redis_conns.append(local_redis_conn)
         except redis.exceptions.ConnectionError as e:
             logging.error("A error occurred while spinning DB: {}".format(e.__str__()))
             logfile = logfiles[0]
@@ -246,6 +270,117 @@ def remote_db_spin(
     logging.info(
         "Topology setup duration {} secs.".format(topology_setup_duration_seconds)
     )
+    (
+        artifact_version,
+        dataset_load_duration_seconds,
+        return_code,
+    ) = remote_db_load_dataset(
+        allowed_tools,
+        benchmark_config,
+        client_public_ip,
+        clusterconfig,
+        dirname,
+        full_logfiles,
+        local_module_files,
+        logname,
+        redis_conns,
+        required_modules,
+        return_code,
+        server_plaintext_port,
+        server_private_ip,
+        server_public_ip,
+        setup_name,
+        setup_type,
+        shard_count,
+        db_ssh_port,
+        client_ssh_port,
+        temporary_dir,
+        test_name,
+        testcase_start_time_str,
+        tf_github_branch,
+        tf_github_org,
+        tf_github_repo,
+        tf_github_sha,
+        username,
+        private_key,
+        s3_bucket_name,
+        s3_bucket_path,
+        skip_redis_setup,
+        cluster_start_port,
+        redis_password,
+        flushall_on_every_test_start,
+        ignore_keyspace_errors,
+        dataset_snapshots,
+        reuse_write_setups,
+    )
+    return (
+        artifact_version,
+        cluster_enabled,
+        dataset_load_duration_seconds,
+        full_logfiles,
+        redis_conns,
+        return_code,
+        server_plaintext_port,
+        ssh_tunnel,
+    )
+
+
+def remote_db_load_dataset(
+    allowed_tools,
+    benchmark_config,
+    client_public_ip,
+    clusterconfig,
+    dirname,
+    full_logfiles,
+    local_module_files,
+    logname,
+    redis_conns,
+    required_modules,
+    return_code,
+    server_plaintext_port,
+    server_private_ip,
+    server_public_ip,
+    setup_name,
+    setup_type,
+    shard_count,
+    db_ssh_port,
+    client_ssh_port,
+    temporary_dir,
+    test_name,
+    testcase_start_time_str,
+    tf_github_branch,
+    tf_github_org,
+    tf_github_repo,
+    tf_github_sha,
+    username,
+    private_key,
+    s3_bucket_name,
+    s3_bucket_path,
+    skip_redis_setup=False,
+    cluster_start_port=20000,
+    redis_password=None,
+    flushall_on_every_test_start=False,
+    ignore_keyspace_errors=False,
+    dataset_snapshots=False,
+    reuse_write_setups=False,
+    cluster_init=True,
+):
+    """
+    Load the benchmark dataset into a spinned setup. Also used to replace the dataset
+    of a setup kept alive from a previous plan group ( flushing it first and without
+    repeating the cluster init steps ). temporary_dir is the setup dbdir.
+    """
+    (
+        _,
+        _,
+        _,
+        dataset_load_timeout_secs,
+        _,
+    ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+    cluster_enabled = False
+    if setup_type == "oss-cluster":
+        cluster_enabled = True
+    redis_setup_result = True
     if flushall_on_every_test_start:
         logging.info(
             "FLUSHING ALL given you've specified to do it on every write test start"
@@ -273,11 +408,43 @@ def remote_db_spin(
         # contents of an existing RDB file
         debug_reload_rdb(dataset_load_timeout_secs, redis_conns)
 
-    if setup_type == "oss-cluster":
+    if setup_type == "oss-cluster" and cluster_init:
         cluster_init_steps(clusterconfig, redis_conns, local_module_files)
         redis_setup_result = True
 
-    if check_dbconfig_tool_requirement(benchmark_config):
+    snapshot_key = None
+    snapshot_metadata = None
+    if (
+        check_dbconfig_tool_requirement(benchmark_config)
+        and dataset_snapshots
+        and skip_redis_setup is False
+    ):
+        tool_version = get_remote_benchmark_tool_version(
+            benchmark_config,
+            client_public_ip,
+            username,
+            private_key,
+            client_ssh_port,
+            "dbconfig",
+        )
+        snapshot_key = get_tool_dataset_snapshot_key(
+            benchmark_config,
+            setup_type,
+            shard_count,
+            local_module_files,
+            "dbconfig",
+            tool_version,
+        )
+        snapshot_metadata = remote_snapshot_restore(
+            snapshot_key,
+            redis_conns,
+            dataset_load_timeout_secs,
+            server_public_ip,
+            username,
+            private_key,
+            db_ssh_port,
+        )
+    if check_dbconfig_tool_requirement(benchmark_config) and snapshot_metadata is None:
         logging.info("Detected the requirements to load data via client tool")
         (
             start_time,
@@ -336,6 +503,18 @@ def remote_db_spin(
             )
         )
         redis_setup_result &= remote_run_result
+        if snapshot_key is not None and remote_run_result is True:
+            remote_snapshot_store(
+                snapshot_key,
+                redis_conns,
+                (datetime.datetime.now() - dataset_load_start_time).seconds,
+                server_public_ip,
+                username,
+                private_key,
+                db_ssh_port,
+            )
+        elif reuse_write_setups and remote_run_result is True:
+            save_setup_state(redis_conns)
     dataset_load_end_time = datetime.datetime.now()
     if redis_setup_result is True:
         logging.info("Redis available")
@@ -361,6 +540,13 @@ def remote_db_spin(
     logging.info(
         "Dataset loading duration {} secs.".format(dataset_load_duration_seconds)
     )
+    if snapshot_metadata is not None:
+        dataset_load_duration_seconds = snapshot_metadata["load_duration_seconds"]
+        logging.info(
+            "Reporting the dataset loading duration of the original load: {} secs.".format(
+                dataset_load_duration_seconds
+            )
+        )
     dbconfig_keyspacelen_check(
         benchmark_config,
         redis_conns,
@@ -369,16 +555,29 @@ def remote_db_spin(
     artifact_version = run_redis_pre_steps(
         benchmark_config, redis_conns[0], required_modules
     )
-    return (
-        artifact_version,
-        cluster_enabled,
-        dataset_load_duration_seconds,
-        full_logfiles,
+    return artifact_version, dataset_load_duration_seconds, return_code
+
+
+def remote_db_reset(
+    benchmark_config, redis_conns, required_modules, ignore_keyspace_errors=False
+):
+    (
+        _,
+        _,
+        _,
+        dataset_load_timeout_secs,
+        _,
+    ) = extract_redis_dbconfig_parameters(benchmark_config, "dbconfig")
+    reset_setup_state(benchmark_config, redis_conns, dataset_load_timeout_secs)
+    dbconfig_keyspacelen_check(
+        benchmark_config,
         redis_conns,
-        return_code,
-        server_plaintext_port,
-        ssh_tunnel,
+        ignore_keyspace_errors,
     )
+    artifact_version = run_redis_pre_steps(
+        benchmark_config, redis_conns[0], required_modules
+    )
+    return artifact_version
 
 
 def db_error_artifacts(
@@ -405,26 +604,21 @@ def db_error_artifacts(
         ],
         db_ssh_port,
     )
+    remote_files = [remote_zipfile]
+    local_files = [local_zipfile]
+    if len(full_logfiles) > 0:
+        remote_files.append(full_logfiles[0])
+        local_files.append(logname)
+    # the zip and the log are fetched in parallel, the log compressed
     failed_remote_run_artifact_store(
         upload_s3,
         server_public_ip,
         dirname,
-        remote_zipfile,
-        local_zipfile,
+        remote_files,
+        local_files,
         s3_bucket_name,
         s3_bucket_path,
         username,
         private_key,
+        db_ssh_port,
     )
-    if len(full_logfiles) > 0:
-        failed_remote_run_artifact_store(
-            upload_s3,
-            server_public_ip,
-            dirname,
-            full_logfiles[0],
-            logname,
-            s3_bucket_name,
-            s3_bucket_path,
-            username,
-            private_key,
-        )
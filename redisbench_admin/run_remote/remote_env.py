@@ -5,6 +5,7 @@
 #
 import logging
 
+from redisbench_admin.env_pool.env_pool import get_env_pool_settings
 from redisbench_admin.run_remote.terraform import (
     retrieve_inventory_info,
     terraform_spin_or_reuse_env,
@@ -49,6 +50,10 @@ def remote_env_setup(
         logging.info("server_public_ip={}".format(server_public_ip))
         logging.info("server_private_ip={}".format(server_private_ip))
     else:
+        env_pool = None
+        # overridden setups are custom, so they can't be taken from the pool
+        if tf_override_name is None and tf_folder_path is None:
+            env_pool = get_env_pool_settings(args)
         (
             client_public_ip,
             _,
@@ -71,6 +76,7 @@ def remote_env_setup(
             tf_timeout_secs,
             tf_override_name,
             tf_folder_path,
+            env_pool,
         )
     return (
         client_public_ip,
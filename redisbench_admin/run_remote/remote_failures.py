@@ -4,8 +4,9 @@
 #  All rights reserved.
 #
 import logging
+import os
 
-from redisbench_admin.utils.remote import fetch_file_from_remote_setup
+from redisbench_admin.utils.remote import fetch_files_from_remote_setup
 from redisbench_admin.utils.utils import upload_artifacts_to_s3
 
 
@@ -19,31 +20,36 @@ def failed_remote_run_artifact_store(
     s3_bucket_path,
     username,
     private_key,
+    port=22,
 ):
-    local_file_fullpath = "{}/{}".format(dirname, local_file)
+    # remote_file and local_file can either be a single file or a list of files
+    if type(remote_file) == str:
+        remote_file = [remote_file]
+        local_file = [local_file]
+    local_files_fullpath = ["{}/{}".format(dirname, x) for x in local_file]
     logging.error(
-        "The benchmark returned an error exit status. Fetching remote file {} into {}".format(
-            remote_file, local_file_fullpath
+        "The benchmark returned an error exit status. Fetching remote files {} into {}".format(
+            remote_file, local_files_fullpath
         )
     )
     try:
-        fetch_file_from_remote_setup(
+        fetch_files_from_remote_setup(
             client_public_ip,
             username,
             private_key,
-            local_file_fullpath,
-            remote_file,
+            list(zip(local_files_fullpath, remote_file)),
+            port,
         )
     except FileNotFoundError as f:
         logging.error("Unable to fetch remote file: {}".format(f.__str__()))
     finally:
         if upload_results_s3:
             logging.info(
-                "Uploading file {} to s3. s3 bucket name: {}. s3 bucket path: {}".format(
-                    local_file_fullpath, s3_bucket_name, s3_bucket_path
+                "Uploading files {} to s3. s3 bucket name: {}. s3 bucket path: {}".format(
+                    local_files_fullpath, s3_bucket_name, s3_bucket_path
                 )
             )
-            artifacts = [local_file_fullpath]
+            artifacts = [x for x in local_files_fullpath if os.path.exists(x)]
             artifacts_map = upload_artifacts_to_s3(
                 artifacts, s3_bucket_name, s3_bucket_path
             )
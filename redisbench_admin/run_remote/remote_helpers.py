@@ -25,6 +25,7 @@ from redisbench_admin.utils.redisgraph_benchmark_go import (
 )
 from redisbench_admin.utils.remote import (
     execute_remote_commands,
+    execute_remote_commands_parallel,
     extract_redisgraph_version_from_resultdict,
 )
 from redisbench_admin.utils.results import post_process_benchmark_results
@@ -194,14 +195,21 @@ def setup_remote_benchmark_tool_requirements_ftsb(
     remote_input_file,
     client_ssh_port,
 ):
+    # both downloads are independent
     commands = [
         "wget {} -q -O {}".format(tool_link, remote_tool_link),
         "wget {} -q -O {}".format(queries_file_link, remote_input_file),
-        "chmod 755 {}".format(remote_tool_link),
     ]
-    execute_remote_commands(
+    execute_remote_commands_parallel(
         client_public_ip, username, private_key, commands, client_ssh_port
     )
+    execute_remote_commands(
+        client_public_ip,
+        username,
+        private_key,
+        ["chmod 755 {}".format(remote_tool_link)],
+        client_ssh_port,
+    )
 
 
 def setup_remote_benchmark_tool_requirements_tsbs(
@@ -214,14 +222,21 @@ def setup_remote_benchmark_tool_requirements_tsbs(
     remote_input_file,
     client_ssh_port,
 ):
+    # both downloads are independent
     commands = [
         "wget {} -q -O {}".format(tool_link, remote_tool_link),
         "wget {} -q -O {}".format(queries_file_link, remote_input_file),
-        "chmod 755 {}".format(remote_tool_link),
     ]
-    execute_remote_commands(
+    execute_remote_commands_parallel(
         client_public_ip, username, private_key, commands, client_ssh_port
     )
+    execute_remote_commands(
+        client_public_ip,
+        username,
+        private_key,
+        ["chmod 755 {}".format(remote_tool_link)],
+        client_ssh_port,
+    )
 
 
 def extract_artifact_version_remote(
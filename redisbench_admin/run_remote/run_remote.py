@@ -39,8 +39,55 @@ from redisbench_admin.run.redistimeseries import (
     timeseries_test_sucess_flow,
     timeseries_test_failure_flow,
 )
+from redisbench_admin.run.repetitions import (
+    get_max_repetitions,
+    check_adaptive_repetitions_stop,
+    append_repetition_result,
+    get_repetitions_summary_row,
+    print_repetitions_summary_table,
+)
+from redisbench_admin.run.steady_state import (
+    steady_state_analysis,
+    get_steady_state_metrics,
+)
+from redisbench_admin.run.result_cache import (
+    get_modules_fingerprint,
+    get_benchmark_tool_version,
+    compute_run_fingerprint,
+    get_results_fingerprints_keyname,
+    check_already_measured,
+    record_measured_result,
+)
+from redisbench_admin.run.suite_shard import (
+    select_suite_shard_definitions,
+    suite_shard_test_status,
+    suite_shards_merge_command,
+    TEST_STATUS_SKIPPED,
+    TEST_STATUS_FAILED,
+    TEST_STATUS_COMPLETED,
+)
+from redisbench_admin.run.journal import (
+    init_journal,
+    get_journal_test_key,
+    is_test_completed,
+    journal_test_start,
+    journal_test_failed,
+    journal_test_end,
+    journal_record_result,
+    journal_result_exported,
+    reexport_pending_results,
+)
+from redisbench_admin.run.scheduler import (
+    schedule_benchmark_plan_and_estimate,
+    print_benchmark_plan_estimate,
+    update_tests_durations_file,
+)
 from redisbench_admin.run.run import define_benchmark_plan
 from redisbench_admin.run.s3 import get_test_s3_bucket_path
+from redisbench_admin.env_pool.env_pool import (
+    check_env_leases,
+    get_env_pool_settings,
+)
 from redisbench_admin.run.ssh import ssh_pem_check
 from redisbench_admin.run_remote.args import TF_OVERRIDE_NAME, TF_OVERRIDE_REMOTE
 from redisbench_admin.run_remote.consts import min_recommended_benchmark_duration
@@ -48,9 +95,21 @@ from redisbench_admin.run_remote.notifications import generate_failure_notificat
 from redisbench_admin.run_remote.remote_client import run_remote_client_tool
 from redisbench_admin.run_remote.remote_db import (
     remote_tmpdir_prune,
+    remote_db_load_dataset,
     remote_db_spin,
+    remote_db_reset,
     db_error_artifacts,
 )
+from redisbench_admin.run_remote.parallel import (
+    get_remote_partitions,
+    run_remote_setups_in_parallel,
+)
+from redisbench_admin.run_remote.provisioning import (
+    init_lookahead_provisioning,
+    lookahead_advance,
+    wait_for_lookahead_env,
+    wait_for_lookahead_envs,
+)
 from redisbench_admin.run_remote.remote_env import remote_env_setup
 from redisbench_admin.run_remote.remote_failures import failed_remote_run_artifact_store
 from redisbench_admin.run_remote.terraform import (
@@ -71,6 +130,8 @@ from redisbench_admin.utils.remote import (
     fetch_remote_id_from_config,
 )
 
+from redisbench_admin.utils.ssh_pool import close_ssh_pool
+from redisbench_admin.utils.teardown import shutdown_redis_conns
 from redisbench_admin.utils.utils import (
     EC2_PRIVATE_PEM,
     upload_artifacts_to_s3,
@@ -127,6 +188,16 @@ def run_remote_command_logic(args, project_name, project_version):
     local_module_files = args.module_path
     dbdir_folder = args.dbdir_folder
     private_key = args.private_key
+    extra_client_public_ips = [
+        x for x in args.extra_client_public_ips.split(",") if x != ""
+    ]
+    if len(extra_client_public_ips) > 0 and args.max_parallel_remote_setups != 1:
+        logging.critical(
+            "The extra client hosts {} can't be shared by concurrent remote setups. Use --max_parallel_remote_setups 1. Exiting right away!".format(
+                extra_client_public_ips
+            )
+        )
+        exit(1)
     grafana_profile_dashboard = args.grafana_profile_dashboard
     profilers_enabled = args.enable_profilers
     keep_env_and_topo = args.keep_env_and_topo
@@ -214,6 +285,8 @@ def run_remote_command_logic(args, project_name, project_version):
         default_specs,
         clusterconfig,
     ) = prepare_benchmark_definitions(args)
+    if args.steady_state_analysis:
+        default_metrics = get_steady_state_metrics(default_metrics)
 
     return_code = 0
     if benchmark_defs_result is False:
@@ -269,6 +342,12 @@ def run_remote_command_logic(args, project_name, project_version):
         )
         rts.ping()
 
+    if args.suite_shard_merge:
+        exit(suite_shards_merge_command(args, benchmark_definitions))
+    benchmark_definitions, suite_shard_manifest = select_suite_shard_definitions(
+        args, benchmark_definitions
+    )
+
     remote_envs_timeout = process_benchmark_definitions_remote_timeouts(
         benchmark_definitions
     )
@@ -281,7 +360,72 @@ def run_remote_command_logic(args, project_name, project_version):
         )
 
     # we have a map of test-type, dataset-name, topology, test-name
-    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
+    max_repetitions = get_max_repetitions(args, BENCHMARK_REPETITIONS)
+    repetitions_summary = []
+    benchmark_runs_plan = define_benchmark_plan(
+        benchmark_definitions, default_specs, args.reuse_write_setups
+    )
+    benchmark_runs_plan, plan_estimate = schedule_benchmark_plan_and_estimate(
+        args,
+        benchmark_runs_plan,
+        benchmark_definitions.keys(),
+        rts,
+        tf_github_org,
+        tf_github_repo,
+        tf_triggering_env,
+        max_repetitions,
+    )
+    if args.plan_only:
+        print_benchmark_plan_estimate(plan_estimate)
+        exit(0)
+    lookahead_state = None
+    # overridden setups share a single terraform setup name, so they can't be provisioned concurrently
+    if (
+        args.inventory is None
+        and TF_OVERRIDE_NAME is None
+        and TF_OVERRIDE_REMOTE is None
+    ):
+        if args.max_parallel_remote_setups != 1:
+            partitions = get_remote_partitions(args, benchmark_definitions.keys())
+            if len(partitions) > 1:
+                exit(
+                    run_remote_setups_in_parallel(
+                        args, partitions, suite_shard_manifest
+                    )
+                )
+        lookahead_state = init_lookahead_provisioning(
+            benchmark_runs_plan,
+            args.lookahead_provisioning_depth,
+            args.max_concurrent_vms,
+            remote_envs,
+            remote_envs_timeout,
+            [
+                tf_bin_path,
+                tf_github_actor,
+                tf_github_org,
+                tf_github_repo,
+                tf_github_sha,
+                tf_setup_name_sufix,
+                tf_triggering_env,
+            ],
+            get_env_pool_settings(args),
+            keep_env_and_topo,
+        )
+    journal = init_journal(
+        args.journal_dir,
+        "run-remote",
+        benchmark_definitions.keys(),
+        tf_github_sha,
+        args.resume,
+    )
+    # the remote redis binary is not reachable from here. It's identified by the
+    # git sha alongside the remote environment spec present on the benchmark config,
+    # which is why skipping already measured runs is opt-in (--remote_skip_measured)
+    redis_binary_fingerprint = ["remote", tf_github_sha]
+    modules_fingerprint = get_modules_fingerprint(local_module_files)
+    results_fingerprints_keyname = get_results_fingerprints_keyname(
+        tf_github_org, tf_github_repo, tf_triggering_env
+    )
 
     profiler_dashboard_table_name = "Profiler dashboard links"
     profiler_dashboard_table_headers = ["Setup", "Test-case", "Grafana Dashboard"]
@@ -294,6 +438,12 @@ def run_remote_command_logic(args, project_name, project_version):
     # contains the overall target-tables ( if any target is defined )
     overall_tables = {}
 
+    setup_carry_overs = plan_estimate["setup_carry_overs"]
+    if skip_remote_db_setup:
+        # we don't own the DB setup, so there is no dataset to swap
+        setup_carry_overs = {}
+    # setup kept alive by the previous plan group for the next one
+    carried_setup = None
     for benchmark_type, bench_by_dataset_map in benchmark_runs_plan.items():
         if return_code != 0 and args.fail_fast:
             logging.warning(
@@ -326,8 +476,19 @@ def run_remote_command_logic(args, project_name, project_version):
 
                 setup_settings = setup_details["setup_settings"]
                 benchmarks_map = setup_details["benchmarks"]
+                group_key = (benchmark_type, dataset_name, setup_name)
                 # we start with an empty per bench-type/setup-name
                 setup_details["env"] = None
+                if carried_setup is not None and carried_setup["to"] == group_key:
+                    logging.info(
+                        "Reusing the setup named {} kept alive by the previous plan group. Only the dataset {} will be loaded.".format(
+                            setup_name, dataset_name
+                        )
+                    )
+                    setup_details["env"] = carried_setup["env"]
+                    setup_details["env"]["dataset_reload"] = True
+                # a setup not handed over is pruned by the next setup spin
+                carried_setup = None
 
                 # map from setup name to overall target-tables ( if any target is defined )
                 overall_tables[setup_name] = {}
@@ -340,13 +501,70 @@ def run_remote_command_logic(args, project_name, project_version):
                             )
                         )
                         continue
+                    lookahead_advance(lookahead_state, setup_name, test_name)
                     metadata_tags = get_metadata_tags(benchmark_config)
                     logging.info(
                         "Including the extra metadata tags into this test generated time-series: {}".format(
                             metadata_tags
                         )
                     )
-                    for repetition in range(1, BENCHMARK_REPETITIONS + 1):
+                    test_key = get_journal_test_key(
+                        test_name, setup_name, benchmark_config
+                    )
+                    if args.resume and is_test_completed(journal, test_key):
+                        logging.info(
+                            "Skipping test {} on setup {} given it was already completed according to the suite journal.".format(
+                                test_name, setup_name
+                            )
+                        )
+                        if args.push_results_redistimeseries:
+                            reexport_pending_results(
+                                journal,
+                                test_key,
+                                test_name,
+                                benchmark_config,
+                                default_metrics,
+                                exporter_timemetric_path,
+                                rts,
+                                tf_github_branch,
+                                tf_github_org,
+                                tf_github_repo,
+                                tf_triggering_env,
+                            )
+                        suite_shard_test_status(
+                            suite_shard_manifest, test_name, TEST_STATUS_SKIPPED
+                        )
+                        continue
+                    run_fingerprint = compute_run_fingerprint(
+                        redis_binary_fingerprint,
+                        modules_fingerprint,
+                        benchmark_config,
+                        get_benchmark_tool_version(benchmark_config, False),
+                        setup_name,
+                        setup_settings,
+                    )
+                    # opt-in, the fingerprint does not cover the remote artifacts
+                    if args.remote_skip_measured and check_already_measured(
+                        args,
+                        run_fingerprint,
+                        test_name,
+                        setup_name,
+                        rts,
+                        results_fingerprints_keyname,
+                    ):
+                        suite_shard_test_status(
+                            suite_shard_manifest, test_name, TEST_STATUS_SKIPPED
+                        )
+                        continue
+                    journal_test_start(journal, test_key)
+                    test_result_files = []
+                    test_failed = False
+                    repetitions_state = {"repetitions": 0, "kpi_values": []}
+                    for repetition in range(1, max_repetitions + 1):
+                        if check_adaptive_repetitions_stop(
+                            args, test_name, repetitions_state, BENCHMARK_REPETITIONS
+                        ):
+                            break
                         if return_code != 0 and args.fail_fast:
                             logging.warning(
                                 "Given you've selected fail fast skipping repetition {}".format(
@@ -357,7 +575,7 @@ def run_remote_command_logic(args, project_name, project_version):
                         remote_perf = None
                         logging.info(
                             "Repetition {} of {}. Running test {}".format(
-                                repetition, BENCHMARK_REPETITIONS, test_name
+                                repetition, max_repetitions, test_name
                             )
                         )
                         (
@@ -389,6 +607,7 @@ def run_remote_command_logic(args, project_name, project_version):
                                     benchmark_config["remote"]
                                 )
                                 tf_timeout_secs = remote_envs_timeout[remote_id]
+                                wait_for_lookahead_env(lookahead_state, remote_id)
                                 client_artifacts = []
                                 client_artifacts_map = {}
                                 temporary_dir = get_tmp_folder_rnd()
@@ -421,6 +640,8 @@ def run_remote_command_logic(args, project_name, project_version):
                                 # after we've created the env, even on error we should always teardown
                                 # in case of some unexpected error we fail the test
                                 try:
+                                    # a leased env we lost might be in use by another job
+                                    check_env_leases(remote_envs)
 
                                     (
                                         _,
@@ -500,9 +721,15 @@ def run_remote_command_logic(args, project_name, project_version):
                                             redis_password,
                                             flushall_on_every_test_start,
                                             ignore_keyspace_errors,
+                                            args.dataset_snapshots,
+                                            args.reuse_write_setups,
                                         )
-                                        if benchmark_type == "read-only":
+                                        if (
+                                            benchmark_type == "read-only"
+                                            or args.reuse_write_setups
+                                        ):
                                             ro_benchmark_set(
+                                                benchmark_type,
                                                 artifact_version,
                                                 cluster_enabled,
                                                 dataset_load_duration_seconds,
@@ -512,6 +739,7 @@ def run_remote_command_logic(args, project_name, project_version):
                                                 setup_details,
                                                 ssh_tunnel,
                                                 full_logfiles,
+                                                temporary_dir,
                                             )
                                     else:
                                         (
@@ -534,7 +762,71 @@ def run_remote_command_logic(args, project_name, project_version):
                                             server_plaintext_port,
                                             setup_details,
                                             ssh_tunnel,
+                                            args.reuse_write_setups,
                                         )
+                                        if setup_details["env"].get(
+                                            "dataset_reload", False
+                                        ):
+                                            (
+                                                artifact_version,
+                                                dataset_load_duration_seconds,
+                                                return_code,
+                                            ) = remote_db_load_dataset(
+                                                allowed_tools,
+                                                benchmark_config,
+                                                client_public_ip,
+                                                clusterconfig,
+                                                dirname,
+                                                full_logfiles,
+                                                local_module_files,
+                                                logname,
+                                                redis_conns,
+                                                required_modules,
+                                                return_code,
+                                                server_plaintext_port,
+                                                server_private_ip,
+                                                server_public_ip,
+                                                setup_name,
+                                                setup_type,
+                                                shard_count,
+                                                db_ssh_port,
+                                                client_ssh_port,
+                                                setup_details["env"]["temporary_dir"],
+                                                test_name,
+                                                testcase_start_time_str,
+                                                tf_github_branch,
+                                                tf_github_org,
+                                                tf_github_repo,
+                                                tf_github_sha,
+                                                username,
+                                                private_key,
+                                                s3_bucket_name,
+                                                s3_bucket_path,
+                                                skip_remote_db_setup,
+                                                cluster_start_port,
+                                                redis_password,
+                                                True,
+                                                ignore_keyspace_errors,
+                                                args.dataset_snapshots,
+                                                args.reuse_write_setups,
+                                                False,
+                                            )
+                                            setup_details["env"][
+                                                "dataset_reload"
+                                            ] = False
+                                            setup_details["env"][
+                                                "artifact_version"
+                                            ] = artifact_version
+                                            setup_details["env"][
+                                                "dataset_load_duration_seconds"
+                                            ] = dataset_load_duration_seconds
+                                        elif benchmark_type != "read-only":
+                                            artifact_version = remote_db_reset(
+                                                benchmark_config,
+                                                redis_conns,
+                                                required_modules,
+                                                ignore_keyspace_errors,
+                                            )
 
                                     if profilers_enabled:
                                         setup_remote_benchmark_agent(
@@ -618,7 +910,7 @@ def run_remote_command_logic(args, project_name, project_version):
                                         local_bench_fname,
                                         remote_run_result,
                                         results_dict,
-                                        return_code,
+                                        test_return_code,
                                         client_output_artifacts,
                                     ) = run_remote_client_tool(
                                         allowed_tools,
@@ -628,7 +920,7 @@ def run_remote_command_logic(args, project_name, project_version):
                                         cluster_enabled,
                                         local_bench_fname,
                                         remote_results_file,
-                                        return_code,
+                                        0,
                                         server_plaintext_port,
                                         server_private_ip,
                                         start_time_ms,
@@ -645,7 +937,9 @@ def run_remote_command_logic(args, project_name, project_version):
                                         redis_conns,
                                         True,
                                         redis_password,
+                                        [client_public_ip] + extra_client_public_ips,
                                     )
+                                    return_code |= test_return_code
 
                                     if profilers_enabled:
                                         logging.info("Stopping remote profiler")
@@ -748,6 +1042,43 @@ def run_remote_command_logic(args, project_name, project_version):
                                         )
 
                                     else:
+                                        # don't record nor export results of a shared env
+                                        check_env_leases(remote_envs)
+                                        if test_return_code != 0:
+                                            # the results of a failed KPI check are kept, but
+                                            # the test is not completed nor measured
+                                            test_failed = True
+                                            journal_test_failed(journal, test_key)
+                                        if args.steady_state_analysis:
+                                            steady_state_analysis(
+                                                results_dict, local_bench_fname
+                                            )
+                                        append_repetition_result(
+                                            args, results_dict, repetitions_state
+                                        )
+                                        result_pos = journal_record_result(
+                                            journal,
+                                            test_key,
+                                            local_bench_fname,
+                                            args.push_results_redistimeseries is False,
+                                            {
+                                                "artifact_version": artifact_version,
+                                                "benchmark_duration_seconds": benchmark_duration_seconds,
+                                                "dataset_load_duration_seconds": dataset_load_duration_seconds,
+                                                "setup_name": setup_name,
+                                                "setup_type": setup_type,
+                                                "start_time_ms": start_time_ms,
+                                                "metadata_tags": metadata_tags,
+                                            },
+                                        )
+                                        test_result_files.append(local_bench_fname)
+                                        if args.tests_durations_file != "":
+                                            update_tests_durations_file(
+                                                args.tests_durations_file,
+                                                test_name,
+                                                benchmark_duration_seconds,
+                                                dataset_load_duration_seconds,
+                                            )
                                         if (
                                             args.push_results_redistimeseries
                                             and is_important_data(
@@ -863,6 +1194,10 @@ def run_remote_command_logic(args, project_name, project_version):
                                             tf_triggering_env,
                                             metadata_tags,
                                         )
+                                        if args.push_results_redistimeseries:
+                                            journal_result_exported(
+                                                journal, test_key, result_pos
+                                            )
                                         if branch_target_tables is not None:
                                             for (
                                                 branch_tt_keyname,
@@ -963,11 +1298,14 @@ def run_remote_command_logic(args, project_name, project_version):
                                         "Detected Keyboard interruput...Destroy all remote envs and exiting right away!"
                                     )
                                     if args.inventory is None:
+                                        wait_for_lookahead_envs(lookahead_state)
                                         terraform_destroy(
                                             remote_envs, keep_env_and_topo
                                         )
                                     exit(1)
                                 except:
+                                    test_failed = True
+                                    journal_test_failed(journal, test_key)
                                     (
                                         start_time,
                                         start_time_ms,
@@ -1003,7 +1341,41 @@ def run_remote_command_logic(args, project_name, project_version):
                                         test_name
                                     )
                                 )
+                    repetitions_summary.append(
+                        get_repetitions_summary_row(
+                            setup_name, test_name, repetitions_state
+                        )
+                    )
+                    journal_test_end(journal, test_key)
+                    suite_shard_test_status(
+                        suite_shard_manifest,
+                        test_name,
+                        TEST_STATUS_FAILED if test_failed else TEST_STATUS_COMPLETED,
+                    )
+                    if test_failed is False and len(test_result_files) > 0:
+                        record_measured_result(
+                            run_fingerprint,
+                            test_name,
+                            setup_name,
+                            tf_github_sha,
+                            test_result_files,
+                            args.results_archive_dir,
+                            rts,
+                            results_fingerprints_keyname,
+                        )
+                if setup_details["env"] is not None and group_key in setup_carry_overs:
+                    logging.info(
+                        "Keeping the setup named {} alive for the next plan group given it has the same topology and configuration.".format(
+                            setup_name
+                        )
+                    )
+                    carried_setup = {
+                        "to": setup_carry_overs[group_key],
+                        "env": setup_details["env"],
+                    }
+                    setup_details["env"] = None
 
+    print_repetitions_summary_table(args, repetitions_summary)
     if len(benchmark_artifacts_links) > 0:
         writer = MarkdownTableWriter(
             table_name=benchmark_artifacts_table_name,
@@ -1020,6 +1392,7 @@ def run_remote_command_logic(args, project_name, project_version):
         )
         writer.write_table()
     if args.inventory is None:
+        wait_for_lookahead_envs(lookahead_state)
         terraform_destroy(remote_envs, keep_env_and_topo)
 
     if args.push_results_redistimeseries:
@@ -1070,6 +1443,7 @@ def run_remote_command_logic(args, project_name, project_version):
             tf_github_branch,
             None,
         )
+    close_ssh_pool()
     exit(return_code)
 
 
@@ -1091,10 +1465,13 @@ def ro_benchmark_reuse(
     server_plaintext_port,
     setup_details,
     ssh_tunnel,
+    reuse_write_setups=False,
 ):
-    assert benchmark_type == "read-only"
+    assert benchmark_type == "read-only" or reuse_write_setups
     logging.info(
-        "Given the benchmark for this setup is ready-only, and this setup was already spinned we will reuse the previous, conns and process info."
+        "Given the benchmark for this setup is {}, and this setup was already spinned we will reuse the previous, conns and process info.".format(
+            benchmark_type
+        )
     )
     artifact_version = setup_details["env"]["artifact_version"]
     cluster_enabled = setup_details["env"]["cluster_enabled"]
@@ -1103,7 +1480,8 @@ def ro_benchmark_reuse(
     ]
     full_logfiles = setup_details["env"]["full_logfiles"]
     redis_conns = setup_details["env"]["redis_conns"]
-    return_code = setup_details["env"]["return_code"]
+    # a previous test failure on this setup must not be masked
+    return_code |= setup_details["env"]["return_code"]
     server_plaintext_port = setup_details["env"]["server_plaintext_port"]
     ssh_tunnel = setup_details["env"]["ssh_tunnel"]
     return (
@@ -1119,6 +1497,7 @@ def ro_benchmark_reuse(
 
 
 def ro_benchmark_set(
+    benchmark_type,
     artifact_version,
     cluster_enabled,
     dataset_load_duration_seconds,
@@ -1128,9 +1507,15 @@ def ro_benchmark_set(
     setup_details,
     ssh_tunnel,
     full_logfiles,
+    temporary_dir=None,
 ):
+    reuse_reason = benchmark_type
+    if benchmark_type != "read-only":
+        reuse_reason = "{} and --reuse-write-setups is set".format(benchmark_type)
     logging.info(
-        "Given the benchmark for this setup is ready-only we will prepare to reuse it on the next read-only benchmarks (if any )."
+        "Given the benchmark for this setup is {} we will prepare to reuse it on the next benchmarks of this setup (if any ).".format(
+            reuse_reason
+        )
     )
     setup_details["env"] = {}
     setup_details["env"]["full_logfiles"] = full_logfiles
@@ -1144,6 +1529,7 @@ def ro_benchmark_set(
     setup_details["env"]["return_code"] = return_code
     setup_details["env"]["server_plaintext_port"] = server_plaintext_port
     setup_details["env"]["ssh_tunnel"] = ssh_tunnel
+    setup_details["env"]["temporary_dir"] = temporary_dir
 
 
 def export_redis_metrics(
@@ -1235,6 +1621,7 @@ def export_redis_metrics(
 
 def shutdown_remote_redis(redis_conns, ssh_tunnel):
     logging.info("Shutting down remote redis.")
+    shutdown_redis_conns(redis_conns, save=False)
     for conn in redis_conns:
-        conn.shutdown(save=False)
+        conn.connection_pool.disconnect()
     ssh_tunnel.close()  # Close the tunnel
@@ -8,10 +8,11 @@ import logging
 import os
 
 from redisbench_admin.utils.remote import (
-    copy_file_to_remote_setup,
+    copy_dir_to_remote_setup,
+    copy_files_to_remote_setup,
     execute_remote_commands,
+    execute_remote_commands_parallel,
 )
-from redisbench_admin.utils.ssh import SSHSession
 from redisbench_admin.utils.utils import redis_server_config_module_part
 
 
@@ -54,7 +55,7 @@ def spin_up_standalone_remote_redis(
 
 
 def cp_local_dbdir_to_remote(
-    dbdir_folder, private_key, server_public_ip, temporary_dir, username
+    dbdir_folder, private_key, server_public_ip, temporary_dir, username, port=22
 ):
     if dbdir_folder is not None:
         logging.info(
@@ -62,8 +63,9 @@ def cp_local_dbdir_to_remote(
                 dbdir_folder, temporary_dir
             )
         )
-        ssh = SSHSession(server_public_ip, username, key_file=open(private_key, "r"))
-        ssh.put_all(dbdir_folder, temporary_dir)
+        copy_dir_to_remote_setup(
+            server_public_ip, username, private_key, dbdir_folder, temporary_dir, port
+        )
 
 
 def remote_module_files_cp(
@@ -76,28 +78,28 @@ def remote_module_files_cp(
 ):
     remote_module_files = []
     if local_module_files is not None:
+        chmod_commands = []
         for local_module_file in local_module_files:
             remote_module_file = "{}/{}".format(
                 remote_module_file_dir, os.path.basename(local_module_file)
             )
-            # copy the module to the DB machine
-            copy_file_to_remote_setup(
-                server_public_ip,
-                username,
-                private_key,
-                local_module_file,
-                remote_module_file,
-                None,
-                port,
-            )
-            execute_remote_commands(
-                server_public_ip,
-                username,
-                private_key,
-                ["chmod 755 {}".format(remote_module_file)],
-                port,
-            )
+            chmod_commands.append("chmod 755 {}".format(remote_module_file))
             remote_module_files.append(remote_module_file)
+        # copy the modules to the DB machine
+        copy_files_to_remote_setup(
+            server_public_ip,
+            username,
+            private_key,
+            list(zip(local_module_files, remote_module_files)),
+            port,
+        )
+        execute_remote_commands_parallel(
+            server_public_ip,
+            username,
+            private_key,
+            chmod_commands,
+            port,
+        )
     return remote_module_files
 
 
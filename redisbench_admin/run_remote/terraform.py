@@ -7,6 +7,12 @@ import logging
 
 from python_terraform import Terraform, IsNotFlagged
 
+from redisbench_admin.env_pool.env_pool import (
+    get_env_lease_connection_vars,
+    is_env_lease,
+    lease_env_from_pool,
+    release_env_lease,
+)
 from redisbench_admin.run.common import BENCHMARK_REPETITIONS
 from redisbench_admin.utils.remote import (
     fetch_remote_setup_from_config,
@@ -30,6 +36,7 @@ def terraform_spin_or_reuse_env(
     tf_timeout_secs=7200,
     tf_override_name=None,
     tf_folder_path=None,
+    env_pool=None,
 ):
     (remote_setup, deployment_type, remote_id,) = fetch_remote_setup_from_config(
         benchmark_config["remote"],
@@ -47,6 +54,10 @@ def terraform_spin_or_reuse_env(
     else:
         tf_setup_name = tf_override_name
     logging.info("Using full setup name: {}".format(tf_setup_name))
+    if remote_id not in remote_envs and env_pool is not None:
+        lease = lease_env_from_pool(env_pool, remote_id)
+        if lease is not None:
+            remote_envs[remote_id] = lease
     if remote_id not in remote_envs:
         # check if terraform is present
         tf = Terraform(
@@ -75,6 +86,10 @@ def terraform_spin_or_reuse_env(
     else:
         logging.info("Reusing remote setup {}".format(remote_id))
         tf = remote_envs[remote_id]
+        if is_env_lease(tf):
+            connection_vars = get_env_lease_connection_vars(tf)
+        else:
+            connection_vars = retrieve_tf_connection_vars(None, tf)
         (
             tf_return_code,
             username,
@@ -83,7 +98,7 @@ def terraform_spin_or_reuse_env(
             server_plaintext_port,
             client_private_ip,
             client_public_ip,
-        ) = retrieve_tf_connection_vars(None, tf)
+        ) = connection_vars
     return (
         client_public_ip,
         deployment_type,
@@ -95,6 +110,16 @@ def terraform_spin_or_reuse_env(
 
 
 def terraform_destroy(remote_envs, keep_env=False):
+    # leased envs go back to the pool, which owns them
+    for remote_setup_name, tf in list(remote_envs.items()):
+        if is_env_lease(tf):
+            logging.info(
+                "Releasing leased env {} of remote setup {}".format(
+                    tf["env_id"], remote_setup_name
+                )
+            )
+            release_env_lease(tf)
+            del remote_envs[remote_setup_name]
     if keep_env is False:
         for remote_setup_name, tf in remote_envs.items():
             # tear-down
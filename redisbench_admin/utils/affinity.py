@@ -0,0 +1,260 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import logging
+import os
+import shutil
+import sys
+
+NUMA_NODES_SYSFS_PATH = "/sys/devices/system/node"
+
+
+def parse_cpu_list(cpus):
+    """Parses a cpu list in taskset format ( e.g. "0-3,8" ) into a sorted list of cpu ids"""
+    if cpus is None:
+        return None
+    if type(cpus) == int:
+        return [cpus]
+    if type(cpus) == list:
+        return sorted(set([int(x) for x in cpus]))
+    cpu_ids = set()
+    for part in str(cpus).split(","):
+        part = part.strip()
+        if part == "":
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpu_ids.update(range(int(start), int(end) + 1))
+        else:
+            cpu_ids.add(int(part))
+    return sorted(cpu_ids)
+
+
+def format_cpu_list(cpu_ids):
+    """Inverse of parse_cpu_list, collapsing consecutive ids into ranges"""
+    ranges = []
+    for cpu_id in sorted(cpu_ids):
+        if len(ranges) > 0 and ranges[-1][1] == cpu_id - 1:
+            ranges[-1][1] = cpu_id
+        else:
+            ranges.append([cpu_id, cpu_id])
+    return ",".join(
+        [
+            "{}".format(x[0]) if x[0] == x[1] else "{}-{}".format(x[0], x[1])
+            for x in ranges
+        ]
+    )
+
+
+def get_numa_node_cpus(numa_node, sysfs_path=NUMA_NODES_SYSFS_PATH):
+    cpulist_filename = "{}/node{}/cpulist".format(sysfs_path, numa_node)
+    if not os.path.exists(cpulist_filename):
+        return None
+    with open(cpulist_filename, "r") as cpulist_file:
+        return parse_cpu_list(cpulist_file.read().strip())
+
+
+def get_available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+def parse_placement_entry(entry):
+    if entry is None:
+        return None
+    numa_node = entry.get("numa_node", None)
+    cpus = parse_cpu_list(entry.get("cpus", None))
+    if cpus is None and numa_node is not None:
+        cpus = get_numa_node_cpus(numa_node)
+    if cpus is None and numa_node is None:
+        return None
+    return {"cpus": cpus, "numa_node": numa_node}
+
+
+def get_setup_cpu_placement(setup_settings, shard_count, assigned_cpus=None):
+    """
+    Reads the optional affinity section of a setup spec, e.g.:
+      affinity:
+        shards:
+          - cpus: "0-1"
+            numa_node: 0
+          - cpus: "2-3"
+        client:
+          cpus: "4-7"
+    Returns None when no affinity was requested. assigned_cpus are the cores a
+    concurrent test was given, the spec cpus are remapped into them.
+    """
+    if setup_settings is None or "affinity" not in setup_settings:
+        return None
+    affinity = setup_settings["affinity"]
+    shards = affinity.get("shards", [])
+    if type(shards) == dict:
+        shards = [shards]
+    shards_placement = [parse_placement_entry(x) for x in shards[:shard_count]]
+    if len(shards) < shard_count:
+        logging.warning(
+            "Affinity was only specified for {} out of {} shards. The remaining ones will not be pinned.".format(
+                len(shards), shard_count
+            )
+        )
+        shards_placement.extend([None] * (shard_count - len(shards)))
+    cpu_placement = {
+        "shards": shards_placement,
+        "client": parse_placement_entry(affinity.get("client", None)),
+    }
+    if assigned_cpus is not None:
+        cpu_placement = remap_cpu_placement(cpu_placement, assigned_cpus)
+    return cpu_placement
+
+
+def remap_cpu_placement(cpu_placement, assigned_cpus):
+    """
+    Maps the spec cpus, in order, into the assigned ones. Distinct spec cpus stay
+    distinct as long as there are enough assigned cpus.
+    """
+    entries = cpu_placement["shards"] + [cpu_placement["client"]]
+    spec_cpus = set()
+    for entry in entries:
+        if entry is not None and entry["cpus"] is not None:
+            spec_cpus.update(entry["cpus"])
+    spec_cpus = sorted(spec_cpus)
+    if len(spec_cpus) > len(assigned_cpus):
+        logging.warning(
+            "The setup affinity requests {} cpus but the test was assigned only {} ({}). Some cpus will be shared.".format(
+                len(spec_cpus), len(assigned_cpus), format_cpu_list(assigned_cpus)
+            )
+        )
+    cpus_map = {
+        cpu_id: assigned_cpus[pos % len(assigned_cpus)]
+        for pos, cpu_id in enumerate(spec_cpus)
+    }
+
+    def remap_entry(entry):
+        if entry is None or entry["cpus"] is None:
+            return entry
+        entry = entry.copy()
+        entry["cpus"] = sorted(set([cpus_map[x] for x in entry["cpus"]]))
+        return entry
+
+    remapped = {
+        "shards": [remap_entry(x) for x in cpu_placement["shards"]],
+        "client": remap_entry(cpu_placement["client"]),
+    }
+    logging.info(
+        "Remapped the setup affinity cpus {} into the test assigned cpus {}.".format(
+            format_cpu_list(spec_cpus), format_cpu_list(assigned_cpus)
+        )
+    )
+    return remapped
+
+
+def check_cpu_placement_collisions(cpu_placement, available_cpus=None):
+    """Returns the list of detected collisions between the shards and the client cores"""
+    collisions = []
+    if cpu_placement is None:
+        return collisions
+    if available_cpus is None:
+        available_cpus = get_available_cpus()
+    owners = [
+        ("shard #{}".format(pos + 1), x)
+        for pos, x in enumerate(cpu_placement["shards"])
+    ]
+    owners.append(("client", cpu_placement["client"]))
+    cpu_owners = {}
+    for owner_name, placement in owners:
+        if placement is None or placement["cpus"] is None:
+            continue
+        unavailable = [x for x in placement["cpus"] if x not in available_cpus]
+        if len(unavailable) > 0:
+            collisions.append(
+                "{} is placed on cpus {} which are not available".format(
+                    owner_name, format_cpu_list(unavailable)
+                )
+            )
+        for cpu_id in placement["cpus"]:
+            if cpu_id in cpu_owners:
+                collisions.append(
+                    "{} and {} share cpu {}".format(
+                        cpu_owners[cpu_id], owner_name, cpu_id
+                    )
+                )
+            else:
+                cpu_owners[cpu_id] = owner_name
+    for collision in collisions:
+        logging.warning("CPU placement collision: {}".format(collision))
+    return collisions
+
+
+def get_affinity_spawn_args(placement):
+    """
+    Returns the command prefix required to spawn a process with the given placement.
+    Everything is done by the prefix, prior to exec, so that daemonized processes
+    inherit it and no python code runs in the forked child ( which can deadlock while
+    other threads are running ). NUMA memory binding requires numactl. If the placement
+    has a cgroup the process joins it before anything else.
+    """
+    command_prefix = []
+    if placement is None:
+        return command_prefix
+    cpus = placement["cpus"]
+    numa_node = placement["numa_node"]
+    cgroup_path = placement.get("cgroup", None)
+    if cgroup_path is not None:
+        # the shell pid is kept by exec
+        command_prefix = [
+            "sh",
+            "-c",
+            'echo $$ > "$0" && exec "$@"',
+            os.path.join(cgroup_path, "cgroup.procs"),
+        ]
+    affinity_prefix = []
+    if numa_node is not None:
+        numactl = shutil.which("numactl")
+        if numactl is not None:
+            cpu_bind = "--cpunodebind={}".format(numa_node)
+            if cpus is not None:
+                cpu_bind = "--physcpubind={}".format(format_cpu_list(cpus))
+            affinity_prefix = [numactl, cpu_bind, "--membind={}".format(numa_node)]
+        else:
+            logging.warning(
+                "numactl is not available. NUMA node {} memory will not be bound, only its cpus.".format(
+                    numa_node
+                )
+            )
+    if cpus is not None and len(affinity_prefix) == 0:
+        if shutil.which("taskset") is not None:
+            affinity_prefix = [shutil.which("taskset"), "-c", format_cpu_list(cpus)]
+        elif hasattr(os, "sched_setaffinity"):
+            affinity_prefix = [
+                sys.executable,
+                "-c",
+                "import os, sys; os.sched_setaffinity(0, {}); os.execvp(sys.argv[1], sys.argv[1:])".format(
+                    list(cpus)
+                ),
+            ]
+    return command_prefix + affinity_prefix
+
+
+def get_cpu_placement_metadata_tags(cpu_placement):
+    metadata_tags = {}
+    if cpu_placement is None:
+        return metadata_tags
+    owners = [
+        ("shard_{}".format(pos + 1), x) for pos, x in enumerate(cpu_placement["shards"])
+    ]
+    owners.append(("client", cpu_placement["client"]))
+    for owner_name, placement in owners:
+        if placement is None:
+            continue
+        if placement["cpus"] is not None:
+            metadata_tags["{}_cpus".format(owner_name)] = format_cpu_list(
+                placement["cpus"]
+            )
+        if placement["numa_node"] is not None:
+            metadata_tags["{}_numa_node".format(owner_name)] = "{}".format(
+                placement["numa_node"]
+            )
+    return metadata_tags
@@ -0,0 +1,226 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import logging
+import os
+import time
+
+CGROUP_V2_ROOT = os.getenv("CGROUP_V2_ROOT", "/sys/fs/cgroup")
+CGROUP_CONTROLLERS = ["cpuset", "cpu", "memory"]
+CGROUP_CPU_MAX_PERIOD_USECS = 100000
+CGROUP_REMOVE_TIMEOUT_SECS = 5
+MEMORY_UNITS = {"k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def is_cgroup_v2(cgroup_root=CGROUP_V2_ROOT):
+    return os.path.exists(os.path.join(cgroup_root, "cgroup.controllers"))
+
+
+def parse_memory_max(value):
+    """Accepts bytes, 'max' or a human readable size ( e.g. '4g' )"""
+    value = "{}".format(value).strip().lower()
+    if value == "max" or value.isdigit():
+        return value
+    if value.endswith("b"):
+        value = value[:-1]
+    unit = value[-1]
+    if unit not in MEMORY_UNITS:
+        raise Exception("Unable to parse memory limit {}".format(value))
+    return "{}".format(int(float(value[:-1]) * MEMORY_UNITS[unit]))
+
+
+def parse_cpu_max(value, period=CGROUP_CPU_MAX_PERIOD_USECS):
+    """Accepts the cgroup format ( '<quota> <period>' or 'max' ) or a number of cpus"""
+    value = "{}".format(value).strip()
+    if value == "max" or " " in value:
+        return value
+    return "{} {}".format(int(float(value) * period), period)
+
+
+def get_setup_isolation_settings(setup_settings, shard_count):
+    """
+    Reads the optional isolation section of a setup spec, e.g.:
+      isolation:
+        shards:
+          cpuset: "0-1"
+          cpu_max: 2
+          memory_max: "4g"
+        client:
+          cpuset: "2-3"
+    shards can either be a single entry applied to all shards or a list with one
+    entry per shard. Missing entries result in cgroups without limits, which are
+    still used for accounting.
+    """
+    isolation = {}
+    if setup_settings is not None and "isolation" in setup_settings:
+        isolation = setup_settings["isolation"]
+    shards = isolation.get("shards", {})
+    if type(shards) == list:
+        shards_settings = shards[:shard_count]
+        shards_settings.extend([{}] * (shard_count - len(shards_settings)))
+    else:
+        shards_settings = [shards] * shard_count
+    return {"shards": shards_settings, "client": isolation.get("client", {})}
+
+
+def enable_subtree_controllers(cgroup_path, controllers=CGROUP_CONTROLLERS):
+    with open(os.path.join(cgroup_path, "cgroup.controllers"), "r") as fd:
+        available = fd.read().split()
+    enabled = [x for x in controllers if x in available]
+    missing = [x for x in controllers if x not in available]
+    if len(missing) > 0:
+        logging.warning(
+            "cgroup controllers {} are not available on {}".format(missing, cgroup_path)
+        )
+    with open(os.path.join(cgroup_path, "cgroup.subtree_control"), "w") as fd:
+        fd.write(" ".join(["+{}".format(x) for x in enabled]))
+
+
+def create_cgroup(cgroup_path, settings):
+    if not os.path.exists(cgroup_path):
+        os.makedirs(cgroup_path)
+    limits = {}
+    if "cpuset" in settings:
+        limits["cpuset.cpus"] = "{}".format(settings["cpuset"])
+    if "cpuset_mems" in settings:
+        limits["cpuset.mems"] = "{}".format(settings["cpuset_mems"])
+    if "cpu_max" in settings:
+        limits["cpu.max"] = parse_cpu_max(settings["cpu_max"])
+    if "memory_max" in settings:
+        limits["memory.max"] = parse_memory_max(settings["memory_max"])
+    for filename, value in limits.items():
+        logging.info(
+            "Setting {} of cgroup {} to {}".format(filename, cgroup_path, value)
+        )
+        with open(os.path.join(cgroup_path, filename), "w") as fd:
+            fd.write(value)
+    return cgroup_path
+
+
+def setup_isolation_cgroups(
+    isolation_settings, setup_name, cgroup_parent, cgroup_root=CGROUP_V2_ROOT
+):
+    """Creates one cgroup per redis-server shard and one for the client tool"""
+    if not is_cgroup_v2(cgroup_root):
+        raise Exception(
+            "cgroup isolation requires cgroup v2 to be mounted at {}".format(
+                cgroup_root
+            )
+        )
+    parent_path = os.path.join(cgroup_root, cgroup_parent)
+    if not os.path.exists(parent_path):
+        os.makedirs(parent_path)
+    # nested parents ( e.g. one per concurrent test ) need the controllers on every level
+    level_path = cgroup_root
+    enable_subtree_controllers(level_path)
+    for level in os.path.normpath(cgroup_parent).split(os.sep):
+        if level in ["", "."]:
+            continue
+        level_path = os.path.join(level_path, level)
+        enable_subtree_controllers(level_path)
+    cgroups = {"shards": [], "client": None}
+    for shard_n, shard_settings in enumerate(isolation_settings["shards"]):
+        cgroups["shards"].append(
+            create_cgroup(
+                os.path.join(
+                    parent_path, "{}-shard-{}".format(setup_name, shard_n + 1)
+                ),
+                shard_settings,
+            )
+        )
+    cgroups["client"] = create_cgroup(
+        os.path.join(parent_path, "{}-client".format(setup_name)),
+        isolation_settings["client"],
+    )
+    return cgroups
+
+
+def add_cgroups_to_placement(cpu_placement, cgroups, shard_count):
+    """Attaches the cgroups to the spawn placement of each shard and of the client"""
+    if cgroups is None:
+        return cpu_placement
+    if cpu_placement is None:
+        cpu_placement = {"shards": [None] * shard_count, "client": None}
+    placement = {"shards": [], "client": None}
+    for shard_n, shard_placement in enumerate(cpu_placement["shards"]):
+        placement["shards"].append(
+            add_cgroup_to_placement_entry(shard_placement, cgroups["shards"][shard_n])
+        )
+    placement["client"] = add_cgroup_to_placement_entry(
+        cpu_placement["client"], cgroups["client"]
+    )
+    return placement
+
+
+def add_cgroup_to_placement_entry(placement, cgroup_path):
+    if placement is None:
+        placement = {"cpus": None, "numa_node": None}
+    placement = placement.copy()
+    placement["cgroup"] = cgroup_path
+    return placement
+
+
+def read_cgroup_stat_file(filename):
+    stats = {}
+    if not os.path.exists(filename):
+        return stats
+    with open(filename, "r") as fd:
+        for line in fd.read().splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[1].isdigit():
+                stats[parts[0]] = int(parts[1])
+    return stats
+
+
+def collect_cgroup_stats(cgroup_path):
+    return {
+        "cpu.stat": read_cgroup_stat_file(os.path.join(cgroup_path, "cpu.stat")),
+        "memory.stat": read_cgroup_stat_file(os.path.join(cgroup_path, "memory.stat")),
+    }
+
+
+def collect_cgroups_stats(cgroups):
+    stats = {}
+    if cgroups is None:
+        return stats
+    for cgroup_path in cgroups["shards"] + [cgroups["client"]]:
+        stats[os.path.basename(cgroup_path)] = collect_cgroup_stats(cgroup_path)
+    return stats
+
+
+def get_cgroups_stats_delta(stats_before, stats_after):
+    """cpu.stat holds counters so we keep the test delta. memory.stat is a snapshot."""
+    stats = {}
+    for cgroup_name, cgroup_stats in stats_after.items():
+        cpu_stat_before = stats_before.get(cgroup_name, {}).get("cpu.stat", {})
+        stats[cgroup_name] = {
+            "cpu.stat": {
+                k: v - cpu_stat_before.get(k, 0)
+                for k, v in cgroup_stats["cpu.stat"].items()
+            },
+            "memory.stat": cgroup_stats["memory.stat"],
+        }
+    return stats
+
+
+def remove_isolation_cgroups(cgroups, timeout_secs=CGROUP_REMOVE_TIMEOUT_SECS):
+    if cgroups is None:
+        return
+    for cgroup_path in cgroups["shards"] + [cgroups["client"]]:
+        # the daemonized servers can take a bit to exit after the shutdown
+        start_time = time.time()
+        while True:
+            try:
+                os.rmdir(cgroup_path)
+                break
+            except OSError as e:
+                if time.time() - start_time > timeout_secs:
+                    logging.warning(
+                        "Unable to remove cgroup {}. Error: {}".format(
+                            cgroup_path, e.__str__()
+                        )
+                    )
+                    break
+                time.sleep(0.1)
@@ -11,6 +11,13 @@ from shutil import copyfile
 import wget
 
 from redisbench_admin.environments.oss_cluster import get_cluster_dbfilename
+from redisbench_admin.utils.utils import (
+    decompress_file_cached,
+    get_compression_suffix,
+    link_or_copy_file,
+)
+
+DECOMPRESSED_CACHE_DIRNAME = "decompressed"
 
 
 def check_dataset_local_requirements(
@@ -22,6 +29,7 @@ def check_dataset_local_requirements(
     number_primaries=1,
     is_cluster=False,
     is_remote=False,
+    start_port=6379,
 ):
     dataset = None
     dataset_name = None
@@ -47,13 +55,20 @@ def check_dataset_local_requirements(
             full_path = check_if_needs_remote_fetch(
                 dataset, datasets_localtemp_dir, dirname, None, is_remote
             )
+            place_file = copyfile
+            if get_compression_suffix(full_path) is not None:
+                # decompressed once into the cache and hardlinked into the dbdir
+                full_path = decompress_file_cached(
+                    full_path,
+                    "{}/{}".format(datasets_localtemp_dir, DECOMPRESSED_CACHE_DIRNAME),
+                )
+                place_file = link_or_copy_file
 
             if is_cluster is False:
                 tmp_path = "{}/dump.rdb".format(redis_dbdir)
                 logging.info("Copying rdb from {} to {}".format(full_path, tmp_path))
-                copyfile(full_path, tmp_path)
+                place_file(full_path, tmp_path)
             else:
-                start_port = 6379
                 for primary_number in range(number_primaries):
                     primary_port = start_port + primary_number
                     tmp_path = "{}/{}".format(
@@ -62,7 +77,7 @@ def check_dataset_local_requirements(
                     logging.info(
                         "Copying rdb from {} to {}".format(full_path, tmp_path)
                     )
-                    copyfile(full_path, tmp_path)
+                    place_file(full_path, tmp_path)
 
     return dataset, dataset_name, full_path, tmp_path
 
@@ -71,8 +86,7 @@ def check_if_needs_remote_fetch(
     property, localtemp_dir, dirname, full_path=None, is_remote=False
 ):
     if property.startswith("http"):
-        if not os.path.isdir(localtemp_dir):
-            os.mkdir(localtemp_dir)
+        os.makedirs(localtemp_dir, exist_ok=True)
         if full_path is None:
             filename = property.split("/")[-1]
             full_path = "{}/{}".format(localtemp_dir, filename)
@@ -82,7 +96,10 @@ def check_if_needs_remote_fetch(
                     property, full_path, localtemp_dir
                 )
             )
-            wget.download(property, full_path)
+            # concurrent runs only ever see complete downloads
+            inflight_path = "{}.{}.inflight".format(full_path, os.getpid())
+            wget.download(property, inflight_path)
+            os.replace(inflight_path, full_path)
         else:
             logging.info(
                 "Reusing cached remote file (located at {} ).".format(full_path)
@@ -95,16 +112,6 @@ def check_if_needs_remote_fetch(
     return full_path
 
 
-def is_process_alive(process):
-    if not process:
-        return False
-    # Check if child process has terminated. Set and return returncode
-    # attribute
-    if process.poll() is None:
-        return True
-    return False
-
-
 def get_local_run_full_filename(
     start_time_str,
     github_branch,
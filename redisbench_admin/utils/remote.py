@@ -4,16 +4,22 @@
 #  All rights reserved.
 #
 
+import concurrent.futures
 import configparser
+import gzip
+import hashlib
 import logging
 import os
+import shutil
 import sys
 import tempfile
+import threading
+import time
 
 import git
 import paramiko
-import pysftp
 import redis
+import requests
 from git import Repo
 from jsonpath_ng import parse
 from python_terraform import Terraform
@@ -22,8 +28,14 @@ from tqdm import tqdm
 from redisbench_admin.environments.oss_cluster import get_cluster_dbfilename
 from redisbench_admin.run.metrics import extract_results_table
 from redisbench_admin.utils.local import check_dataset_local_requirements
+from redisbench_admin.utils.ssh_pool import (
+    close_pooled_sftp_clients,
+    run_with_ssh_reconnect,
+)
 from redisbench_admin.utils.utils import (
     get_ts_metric_name,
+    get_compression_suffix,
+    file_sha256_cached,
     EC2_REGION,
     EC2_SECRET_KEY,
     EC2_ACCESS_KEY,
@@ -41,6 +53,27 @@ REDIS_AUTH_SERVER_PORT = int(os.getenv("REDIS_AUTH_SERVER_PORT", "6380"))
 REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "15"))
 REDIS_SOCKET_TIMEOUT = int(os.getenv("REDIS_SOCKET_TIMEOUT", "300"))
 TERRAFORM_BIN_PATH = os.getenv("TERRAFORM_BIN_PATH", "terraform")
+# sshd MaxSessions defaults to 10 channels per connection
+REMOTE_COMMANDS_MAX_PARALLEL = int(os.getenv("REMOTE_COMMANDS_MAX_PARALLEL", 8))
+REMOTE_TRANSFERS_MAX_PARALLEL = int(os.getenv("REMOTE_TRANSFERS_MAX_PARALLEL", 4))
+# fetched files above this size are gzipped on the remote prior to the transfer
+REMOTE_FETCH_COMPRESS_MIN_BYTES = int(
+    os.getenv("REMOTE_FETCH_COMPRESS_MIN_BYTES", 1024 * 1024)
+)
+# copied files above this size are gzipped locally prior to the transfer, unless they
+# are already compressed ( archives and rdbs )
+REMOTE_COPY_COMPRESS_MIN_BYTES = int(
+    os.getenv("REMOTE_COPY_COMPRESS_MIN_BYTES", 1024 * 1024)
+)
+REMOTE_COPY_UNCOMPRESSIBLE_SUFFIXES = [".rdb", ".gz", ".zip", ".zst"]
+# content addressed dataset cache on the DB hosts. An empty dir disables it
+REMOTE_DATASET_CACHE_DIR = os.getenv(
+    "REMOTE_DATASET_CACHE_DIR", "/tmp/redisbench-admin-datasets-cache"
+)
+REMOTE_DATASET_CACHE_MAX_BYTES = int(
+    os.getenv("REMOTE_DATASET_CACHE_MAX_BYTES", 50 * 1024**3)
+)
+REMOTE_DATASET_HEAD_TIMEOUT_SECS = 10
 
 
 def get_git_root(path):
@@ -63,6 +96,7 @@ def copy_file_to_remote_setup(
     remote_file,
     dirname=None,
     port=22,
+    callback=view_bar_simple,
 ):
     full_local_path = local_file
     if dirname is not None:
@@ -76,17 +110,35 @@ def copy_file_to_remote_setup(
         )
     )
     if os.path.exists(full_local_path):
-        cnopts = pysftp.CnOpts()
-        cnopts.hostkeys = None
-        srv = pysftp.Connection(
-            host=server_public_ip,
-            username=username,
-            private_key=private_key,
-            cnopts=cnopts,
-            port=port,
+        local_sha256 = file_sha256_cached(full_local_path)
+        remote_sha256 = get_remote_file_sha256(
+            server_public_ip, username, private_key, remote_file, port
         )
-        srv.put(full_local_path, remote_file, callback=view_bar_simple)
-        srv.close()
+        if local_sha256 == remote_sha256:
+            logging.info(
+                "Skipping the copy of {} given remote file {} has the same sha256 ({}).".format(
+                    full_local_path, remote_file, local_sha256[:12]
+                )
+            )
+            return True
+        if is_compressible_remote_copy(full_local_path):
+            copy_compressed_file_to_remote_setup(
+                server_public_ip,
+                username,
+                private_key,
+                full_local_path,
+                remote_file,
+                port,
+            )
+        else:
+            run_with_ssh_reconnect(
+                lambda sftp: sftp.put(full_local_path, remote_file, callback=callback),
+                server_public_ip,
+                username,
+                private_key,
+                port,
+                sftp=True,
+            )
         logging.info(
             "Finished Copying file {} to remote server {} ".format(
                 full_local_path, remote_file
@@ -103,21 +155,169 @@ def copy_file_to_remote_setup(
     return res
 
 
+def is_compressible_remote_copy(local_file, min_bytes=REMOTE_COPY_COMPRESS_MIN_BYTES):
+    if os.path.getsize(local_file) < min_bytes:
+        return False
+    if get_compression_suffix(local_file) is not None:
+        return False
+    for suffix in REMOTE_COPY_UNCOMPRESSIBLE_SUFFIXES:
+        if local_file.endswith(suffix):
+            return False
+    return True
+
+
+def copy_compressed_file_to_remote_setup(
+    server_public_ip, username, private_key, local_file, remote_file, port=22
+):
+    """Gzips local_file, copies it and decompresses it on the remote"""
+    remote_compressed_file = "{}.copy.gz".format(remote_file)
+    local_compressed_file = os.path.join(
+        tempfile.mkdtemp(), "{}.copy.gz".format(os.path.basename(local_file))
+    )
+    try:
+        with open(local_file, "rb") as fd:
+            with gzip.open(local_compressed_file, "wb", compresslevel=1) as gz_fd:
+                shutil.copyfileobj(fd, gz_fd)
+        run_with_ssh_reconnect(
+            lambda sftp: sftp.put(local_compressed_file, remote_compressed_file),
+            server_public_ip,
+            username,
+            private_key,
+            port,
+            sftp=True,
+        )
+        recv_exit_status, _, stderr = exec_pooled_remote_command(
+            server_public_ip,
+            username,
+            private_key,
+            "gunzip -c {} > {} && rm -f {}".format(
+                remote_compressed_file, remote_file, remote_compressed_file
+            ),
+            port,
+        )
+        if recv_exit_status != 0:
+            raise Exception(
+                "Unable to decompress {} on remote server {}. Error: {}".format(
+                    remote_compressed_file, server_public_ip, stderr
+                )
+            )
+        logging.info(
+            "Copied {} compressed to {} bytes ( {} bytes decompressed )".format(
+                local_file,
+                os.path.getsize(local_compressed_file),
+                os.path.getsize(local_file),
+            )
+        )
+    finally:
+        shutil.rmtree(os.path.dirname(local_compressed_file), ignore_errors=True)
+
+
+def get_remote_file_sha256(
+    server_public_ip, username, private_key, remote_file, port=22
+):
+    """Returns the sha256 of the remote file or None if it does not exist"""
+    recv_exit_status, stdout, _ = exec_pooled_remote_command(
+        server_public_ip,
+        username,
+        private_key,
+        "sha256sum {}".format(remote_file),
+        port,
+    )
+    if recv_exit_status != 0 or len(stdout) == 0:
+        return None
+    return stdout[0].split(" ")[0].strip()
+
+
+def copy_files_to_remote_setup(
+    server_public_ip,
+    username,
+    private_key,
+    files,
+    port=22,
+    max_parallel=REMOTE_TRANSFERS_MAX_PARALLEL,
+):
+    """
+    Copies the list of (local_file, remote_file) concurrently, each on its own SFTP
+    channel of the pooled transport. Files that are identical on the remote are skipped.
+    """
+    if len(files) == 0:
+        return []
+    start_time = time.time()
+    thread_ids = set()
+
+    def copy_file(x):
+        thread_ids.add(threading.get_ident())
+        return copy_file_to_remote_setup(
+            server_public_ip, username, private_key, x[0], x[1], None, port, None
+        )
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(max_parallel, len(files))
+        ) as pool:
+            res = list(pool.map(copy_file, files))
+    finally:
+        close_pooled_sftp_clients(
+            server_public_ip, username, private_key, port, thread_ids
+        )
+    logging.info(
+        "Copied {} files to remote server {} in {:.3f} secs".format(
+            len(files), server_public_ip, time.time() - start_time
+        )
+    )
+    return res
+
+
+def copy_dir_to_remote_setup(
+    server_public_ip, username, private_key, local_dir, remote_dir, port=22
+):
+    """Copies the content of local_dir into remote_dir, skipping identical files"""
+    files = []
+    remote_dirs = set([remote_dir])
+    for root, _, filenames in os.walk(local_dir):
+        relative_root = os.path.relpath(root, local_dir)
+        remote_root = remote_dir
+        if relative_root != ".":
+            remote_root = "{}/{}".format(remote_dir, relative_root)
+            remote_dirs.add(remote_root)
+        for filename in filenames:
+            files.append(
+                (os.path.join(root, filename), "{}/{}".format(remote_root, filename))
+            )
+    execute_remote_commands(
+        server_public_ip,
+        username,
+        private_key,
+        ["mkdir -p {}".format(" ".join(sorted(remote_dirs)))],
+        port,
+    )
+    return copy_files_to_remote_setup(
+        server_public_ip, username, private_key, files, port
+    )
+
+
 def fetch_file_from_remote_setup(
-    server_public_ip, username, private_key, local_file, remote_file
+    server_public_ip,
+    username,
+    private_key,
+    local_file,
+    remote_file,
+    port=22,
+    callback=view_bar_simple,
 ):
     logging.info(
         "Retrieving remote file {} from remote server {} ".format(
             remote_file, server_public_ip
         )
     )
-    cnopts = pysftp.CnOpts()
-    cnopts.hostkeys = None
-    srv = pysftp.Connection(
-        host=server_public_ip, username=username, private_key=private_key, cnopts=cnopts
+    run_with_ssh_reconnect(
+        lambda sftp: sftp.get(remote_file, local_file, callback=callback),
+        server_public_ip,
+        username,
+        private_key,
+        port,
+        sftp=True,
     )
-    srv.get(remote_file, local_file, callback=view_bar_simple)
-    srv.close()
     logging.info(
         "Finished retrieving remote file {} from remote server {} ".format(
             remote_file, server_public_ip
@@ -125,17 +325,115 @@ def fetch_file_from_remote_setup(
     )
 
 
+def fetch_compressed_file_from_remote_setup(
+    server_public_ip,
+    username,
+    private_key,
+    local_file,
+    remote_file,
+    port=22,
+    min_bytes=REMOTE_FETCH_COMPRESS_MIN_BYTES,
+):
+    """
+    Files larger than min_bytes are gzipped on the remote, fetched and decompressed
+    locally. Smaller ( or missing ) files are fetched as is.
+    """
+    remote_compressed_file = "{}.fetch.gz".format(remote_file)
+    recv_exit_status, _, _ = exec_pooled_remote_command(
+        server_public_ip,
+        username,
+        private_key,
+        "test $(stat -c %s {}) -ge {} && gzip -1 -c {} > {}".format(
+            remote_file, min_bytes, remote_file, remote_compressed_file
+        ),
+        port,
+    )
+    if recv_exit_status != 0:
+        fetch_file_from_remote_setup(
+            server_public_ip, username, private_key, local_file, remote_file, port, None
+        )
+        return
+    local_compressed_file = "{}.fetch.gz".format(local_file)
+    try:
+        fetch_file_from_remote_setup(
+            server_public_ip,
+            username,
+            private_key,
+            local_compressed_file,
+            remote_compressed_file,
+            port,
+            None,
+        )
+        with gzip.open(local_compressed_file, "rb") as compressed_fd:
+            with open(local_file, "wb") as fd:
+                shutil.copyfileobj(compressed_fd, fd)
+        logging.info(
+            "Fetched {} compressed to {} bytes ( {} bytes decompressed )".format(
+                remote_file,
+                os.path.getsize(local_compressed_file),
+                os.path.getsize(local_file),
+            )
+        )
+    finally:
+        if os.path.exists(local_compressed_file):
+            os.remove(local_compressed_file)
+        exec_pooled_remote_command(
+            server_public_ip,
+            username,
+            private_key,
+            "rm -f {}".format(remote_compressed_file),
+            port,
+        )
+
+
+def fetch_files_from_remote_setup(
+    server_public_ip,
+    username,
+    private_key,
+    files,
+    port=22,
+    max_parallel=REMOTE_TRANSFERS_MAX_PARALLEL,
+):
+    """
+    Fetches the list of (local_file, remote_file) concurrently, each on its own SFTP
+    channel of the pooled transport, compressing the large files on the remote.
+    """
+    if len(files) == 0:
+        return
+    start_time = time.time()
+    thread_ids = set()
+
+    def fetch_file(x):
+        thread_ids.add(threading.get_ident())
+        fetch_compressed_file_from_remote_setup(
+            server_public_ip, username, private_key, x[0], x[1], port
+        )
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(max_parallel, len(files))
+        ) as pool:
+            list(pool.map(fetch_file, files))
+    finally:
+        close_pooled_sftp_clients(
+            server_public_ip, username, private_key, port, thread_ids
+        )
+    logging.info(
+        "Fetched {} files from remote server {} in {:.3f} secs".format(
+            len(files), server_public_ip, time.time() - start_time
+        )
+    )
+
+
 def execute_remote_commands(
     server_public_ip, username, private_key, commands, port, get_pty=False
 ):
     res = []
-    c = connect_remote_ssh(port, private_key, server_public_ip, username)
     for command in commands:
         logging.info('Executing remote command "{}"'.format(command))
-        stdin, stdout, stderr = c.exec_command(command, get_pty=get_pty)
-        recv_exit_status = stdout.channel.recv_exit_status()  # status is 0
-        stdout = stdout.readlines()
-        stderr = stderr.readlines()
+        recv_exit_status, stdout, stderr = exec_pooled_remote_command(
+            server_public_ip, username, private_key, command, port, get_pty
+        )
         if recv_exit_status != 0:
             logging.warning(
                 "Exit status: {} for command {}.\n\tSTDERR: {}\n\tSTDOUT: {}".format(
@@ -143,10 +441,88 @@ def execute_remote_commands(
                 )
             )
         res.append([recv_exit_status, stdout, stderr])
-    c.close()
     return res
 
 
+def execute_remote_commands_parallel(
+    server_public_ip,
+    username,
+    private_key,
+    commands,
+    port,
+    get_pty=False,
+    max_parallel=REMOTE_COMMANDS_MAX_PARALLEL,
+):
+    """
+    Runs independent commands concurrently, each on its own channel of the pooled
+    transport. Results keep the commands order, as [exit_status, stdout, stderr, secs].
+    """
+    if len(commands) == 0:
+        return []
+
+    def execute_timed(command):
+        start_time = time.time()
+        recv_exit_status, stdout, stderr = exec_pooled_remote_command(
+            server_public_ip, username, private_key, command, port, get_pty
+        )
+        return [recv_exit_status, stdout, stderr, time.time() - start_time]
+
+    start_time = time.time()
+    for command in commands:
+        logging.info('Executing remote command "{}"'.format(command))
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_parallel, len(commands))
+    ) as pool:
+        res = list(pool.map(execute_timed, commands))
+    for command, [recv_exit_status, stdout, stderr, duration] in zip(commands, res):
+        if recv_exit_status != 0:
+            logging.warning(
+                "Exit status: {} for command {}.\n\tSTDERR: {}\n\tSTDOUT: {}".format(
+                    recv_exit_status, command, stdout, stderr
+                )
+            )
+    logging.info(
+        "Executed {} remote commands in {:.3f} secs (sum of command durations {:.3f} secs)".format(
+            len(commands), time.time() - start_time, sum([x[3] for x in res])
+        )
+    )
+    return res
+
+
+def exec_remote_command(c, command, get_pty=False):
+    return exec_remote_command_on_channel(
+        c.get_transport().open_session(), command, get_pty
+    )
+
+
+def exec_remote_command_on_channel(channel, command, get_pty=False):
+    if get_pty:
+        channel.get_pty()
+    channel.exec_command(command)
+    stdout = channel.makefile("r")
+    stderr = channel.makefile_stderr("r")
+    recv_exit_status = channel.recv_exit_status()  # status is 0
+    return recv_exit_status, stdout.readlines(), stderr.readlines()
+
+
+def exec_pooled_remote_command(
+    server_public_ip, username, private_key, command, port=22, get_pty=False
+):
+    """
+    Runs command on its own channel of the pooled transport. Only opening the
+    channel is retried on a dropped transport: once the command was sent it may
+    have run ( e.g. starting redis or the benchmark ) so it's never repeated.
+    """
+    channel = run_with_ssh_reconnect(
+        lambda c: c.get_transport().open_session(),
+        server_public_ip,
+        username,
+        private_key,
+        port,
+    )
+    return exec_remote_command_on_channel(channel, command, get_pty)
+
+
 def connect_remote_ssh(port, private_key, server_public_ip, username):
     k = paramiko.RSAKey.from_private_key_file(private_key)
     c = paramiko.SSHClient()
@@ -198,6 +574,39 @@ def check_dataset_remote_requirements(
                 fullpath, server_public_ip, remote_dataset_file
             )
         )
+        remote_dataset_files = [remote_dataset_file]
+        if is_cluster:
+            for master_shard_id in range(2, number_primaries + 1):
+                primary_port = master_shard_id + start_port - 1
+                second_forward_remote_dataset_file = "{}/{}".format(
+                    remote_dataset_folder, get_cluster_dbfilename(primary_port)
+                )
+                logging.info(
+                    "For primary #{}, reusing the already present rdb in {} and duplicating it into :{}".format(
+                        master_shard_id,
+                        remote_dataset_file,
+                        second_forward_remote_dataset_file,
+                    )
+                )
+                remote_dataset_files.append(second_forward_remote_dataset_file)
+        if REMOTE_DATASET_CACHE_DIR != "":
+            cached_dataset_file = remote_dataset_cache_fetch(
+                server_public_ip,
+                username,
+                private_key,
+                dataset,
+                fullpath,
+                db_ssh_port,
+            )
+            remote_dataset_cache_link(
+                server_public_ip,
+                username,
+                private_key,
+                cached_dataset_file,
+                remote_dataset_files,
+                db_ssh_port,
+            )
+            return res, dataset, fullpath, tmppath
         if "https" in dataset:
             logging.info(
                 "Given dataset is a remote one ( {} ), copying it directly to DB machine ( {} ).".format(
@@ -207,9 +616,15 @@ def check_dataset_remote_requirements(
             )
             commands = []
             commands.append("wget -O {} {}".format(remote_dataset_file, dataset))
-            execute_remote_commands(
+            [[recv_exit_status, _, stderr]] = execute_remote_commands(
                 server_public_ip, username, private_key, commands, db_ssh_port
             )
+            if recv_exit_status != 0:
+                raise Exception(
+                    "Unable to retrieve dataset {} into {}. Error: {}".format(
+                        dataset, remote_dataset_file, stderr
+                    )
+                )
         else:
             res = copy_file_to_remote_setup(
                 server_public_ip,
@@ -220,33 +635,218 @@ def check_dataset_remote_requirements(
                 None,
                 db_ssh_port,
             )
-        if is_cluster:
-            commands = []
-            for master_shard_id in range(2, number_primaries + 1):
-                primary_port = master_shard_id + start_port - 1
-                second_forward_remote_dataset_file = "{}/{}".format(
-                    remote_dataset_folder, get_cluster_dbfilename(primary_port)
-                )
-                logging.info(
-                    "For primary #{}, reusing the already present rdb in {} and duplicating it into :{}".format(
-                        master_shard_id,
-                        remote_dataset_file,
-                        second_forward_remote_dataset_file,
-                    )
-                )
-                # start redis-server
-                commands.append(
-                    "cp {} {}".format(
-                        remote_dataset_file, second_forward_remote_dataset_file
+            if res is False:
+                raise Exception(
+                    "Unable to copy dataset {} into {}".format(
+                        fullpath, remote_dataset_file
                     )
                 )
-            execute_remote_commands(
-                server_public_ip, username, private_key, commands, db_ssh_port
+        if is_cluster:
+            remote_commands_check(
+                execute_remote_commands_parallel(
+                    server_public_ip,
+                    username,
+                    private_key,
+                    [
+                        "cp {} {}".format(remote_dataset_file, x)
+                        for x in remote_dataset_files[1:]
+                    ],
+                    db_ssh_port,
+                ),
+                "Unable to duplicate the dataset into the cluster primaries",
             )
 
     return res, dataset, fullpath, tmppath
 
 
+def remote_commands_check(res, error_message):
+    """Raises if any of the remote commands results has a non-zero exit status"""
+    errors = [x[2] for x in res if x[0] != 0]
+    if len(errors) > 0:
+        raise Exception("{}. Error: {}".format(error_message, errors))
+
+
+def get_remote_dataset_cache_filename(
+    dataset, fullpath, cache_dir=REMOTE_DATASET_CACHE_DIR
+):
+    """
+    Local datasets are addressed by their content sha256. Remote ( https ) datasets
+    are not available locally, so they're addressed by the sha256 of their url and of
+    the ETag/Last-Modified the server reports. Without those, a changed upstream file
+    under the same url is not fetched again.
+    """
+    if "https" in dataset:
+        key = "url-{}".format(
+            hashlib.sha256(
+                "{}\n{}".format(dataset, get_remote_dataset_version(dataset)).encode(
+                    "utf-8"
+                )
+            ).hexdigest()
+        )
+    else:
+        key = file_sha256_cached(fullpath)
+    return "{}/{}.rdb".format(cache_dir, key)
+
+
+def get_remote_dataset_version(dataset, timeout=REMOTE_DATASET_HEAD_TIMEOUT_SECS):
+    """The ETag, or else the Last-Modified, of an https dataset. Empty if unknown."""
+    try:
+        response = requests.head(dataset, allow_redirects=True, timeout=timeout)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logging.warning(
+            "Unable to retrieve the version of dataset {}. Error: {}".format(
+                dataset, e.__str__()
+            )
+        )
+        return ""
+    version = response.headers.get("ETag", response.headers.get("Last-Modified", ""))
+    if version == "":
+        logging.warning(
+            "Dataset {} has no ETag nor Last-Modified. The remote dataset cache won't detect its changes.".format(
+                dataset
+            )
+        )
+    return version
+
+
+def remote_dataset_cache_fetch(
+    server_public_ip,
+    username,
+    private_key,
+    dataset,
+    fullpath,
+    port=22,
+    cache_dir=REMOTE_DATASET_CACHE_DIR,
+):
+    """Ensures the dataset is present on the remote cache. Returns the cached file."""
+    cached_dataset_file = get_remote_dataset_cache_filename(
+        dataset, fullpath, cache_dir
+    )
+    # touch refreshes the LRU position of the entry
+    [[recv_exit_status, _, _]] = execute_remote_commands(
+        server_public_ip,
+        username,
+        private_key,
+        [
+            "mkdir -p {} && test -f {} && touch -c {}".format(
+                cache_dir, cached_dataset_file, cached_dataset_file
+            )
+        ],
+        port,
+    )
+    if recv_exit_status == 0:
+        logging.info(
+            "Dataset {} is already present on the remote dataset cache ({}). Skipping the transfer.".format(
+                dataset, cached_dataset_file
+            )
+        )
+        return cached_dataset_file
+    # the entry is only visible once complete and verified
+    inflight_dataset_file = "{}.{}.inflight".format(cached_dataset_file, os.getpid())
+    if "https" in dataset:
+        logging.info(
+            "Given dataset is a remote one ( {} ), copying it directly to DB machine ( {} ).".format(
+                dataset,
+                cached_dataset_file,
+            )
+        )
+        [[recv_exit_status, _, stderr]] = execute_remote_commands(
+            server_public_ip,
+            username,
+            private_key,
+            ["wget -O {} {}".format(inflight_dataset_file, dataset)],
+            port,
+        )
+        transfer_ok = recv_exit_status == 0
+        # the url content is unknown upfront. we can only refuse empty files
+        verify_command = "test -s {}".format(inflight_dataset_file)
+    else:
+        transfer_ok = copy_file_to_remote_setup(
+            server_public_ip,
+            username,
+            private_key,
+            fullpath,
+            inflight_dataset_file,
+            None,
+            port,
+        )
+        stderr = ""
+        verify_command = "echo '{}  {}' | sha256sum -c --status".format(
+            file_sha256_cached(fullpath), inflight_dataset_file
+        )
+    if transfer_ok:
+        [[recv_exit_status, _, stderr]] = execute_remote_commands(
+            server_public_ip,
+            username,
+            private_key,
+            [
+                "{} && mv -f {} {}".format(
+                    verify_command, inflight_dataset_file, cached_dataset_file
+                )
+            ],
+            port,
+        )
+        transfer_ok = recv_exit_status == 0
+    if transfer_ok is False:
+        execute_remote_commands(
+            server_public_ip,
+            username,
+            private_key,
+            ["rm -f {}".format(inflight_dataset_file)],
+            port,
+        )
+        raise Exception(
+            "Unable to transfer dataset {} into the remote dataset cache ({}). Error: {}".format(
+                dataset, cached_dataset_file, stderr
+            )
+        )
+    return cached_dataset_file
+
+
+def remote_dataset_cache_link(
+    server_public_ip,
+    username,
+    private_key,
+    cached_dataset_file,
+    remote_dataset_files,
+    port=22,
+):
+    """
+    Hardlinks the cached dataset into the test dir(s). redis replaces its rdb via rename
+    so the cache entry is never modified. Falls back to cp across filesystems.
+    """
+    remote_commands_check(
+        execute_remote_commands_parallel(
+            server_public_ip,
+            username,
+            private_key,
+            [
+                "ln -f {} {} || cp {} {}".format(
+                    cached_dataset_file, x, cached_dataset_file, x
+                )
+                for x in remote_dataset_files
+            ],
+            port,
+        ),
+        "Unable to link the cached dataset {}".format(cached_dataset_file),
+    )
+
+
+def remote_dataset_cache_prune_command(
+    cache_dir=REMOTE_DATASET_CACHE_DIR, max_bytes=REMOTE_DATASET_CACHE_MAX_BYTES
+):
+    """
+    Keeps the most recently used entries up to max_bytes. Entries linked into a test
+    dir keep their data until that dir is pruned.
+    """
+    return (
+        "mkdir -p {} && find {} -maxdepth 1 -type f -name '*.rdb' -printf '%T@ %s %p\\n' "
+        "| sort -rn | awk -v limit={} '{{total+=$2; if (total>limit) print $3}}' "
+        "| xargs -r rm -f".format(cache_dir, cache_dir, max_bytes)
+    )
+
+
 def setup_remote_environment(
     tf: Terraform,
     tf_github_sha,
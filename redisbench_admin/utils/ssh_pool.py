@@ -0,0 +1,261 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import atexit
+import logging
+import os
+import threading
+import time
+
+import paramiko
+from pytablewriter import MarkdownTableWriter
+
+SSH_KEEPALIVE_INTERVAL_SECS = int(os.getenv("SSH_KEEPALIVE_INTERVAL_SECS", 30))
+SSH_CONNECT_TIMEOUT_SECS = int(os.getenv("SSH_CONNECT_TIMEOUT_SECS", 60))
+# zlib compression of the whole transport ( commands, sftp and tunnels ). Off by default
+# given rdbs, modules and archives don't compress and paramiko's zlib is single threaded.
+# Large transfers are compressed per file instead
+SSH_COMPRESSION = bool(int(os.getenv("SSH_COMPRESSION", "0")))
+
+_ssh_pool = {}
+_ssh_pool_lock = threading.Lock()
+_ssh_pool_atexit_registered = False
+
+
+def get_ssh_pool_key(server_public_ip, port, username):
+    return (server_public_ip, int(port), username)
+
+
+def get_ssh_pool_entry(server_public_ip, username, private_key, port=22):
+    """Returns the pool entry of host/port/user, creating it on first use"""
+    global _ssh_pool_atexit_registered
+    key = get_ssh_pool_key(server_public_ip, port, username)
+    with _ssh_pool_lock:
+        if key not in _ssh_pool:
+            _ssh_pool[key] = {
+                "private_key": private_key,
+                "client": None,
+                # SFTPClients are not shared across threads
+                "sftp": {},
+                "handshakes": 0,
+                "handshakes_duration": 0.0,
+                "reuses": 0,
+                "lock": threading.Lock(),
+            }
+        if _ssh_pool_atexit_registered is False:
+            atexit.register(close_ssh_pool)
+            _ssh_pool_atexit_registered = True
+        return _ssh_pool[key]
+
+
+def is_ssh_client_active(client):
+    if client is None:
+        return False
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def ssh_pool_connect(entry, server_public_ip, username, port):
+    if entry["client"] is not None:
+        logging.info(
+            "Reconnecting to remote server {} given the pooled connection is no longer active".format(
+                server_public_ip
+            )
+        )
+        close_ssh_pool_entry(entry)
+    start_time = time.time()
+    k = paramiko.RSAKey.from_private_key_file(entry["private_key"])
+    c = paramiko.SSHClient()
+    c.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    logging.info("Connecting to remote server {}".format(server_public_ip))
+    c.connect(
+        hostname=server_public_ip,
+        port=port,
+        username=username,
+        pkey=k,
+        timeout=SSH_CONNECT_TIMEOUT_SECS,
+        compress=SSH_COMPRESSION,
+    )
+    c.get_transport().set_keepalive(SSH_KEEPALIVE_INTERVAL_SECS)
+    entry["client"] = c
+    entry["handshakes"] = entry["handshakes"] + 1
+    entry["handshakes_duration"] = entry["handshakes_duration"] + (
+        time.time() - start_time
+    )
+    logging.info(
+        "Connected to remote server {} in {:.3f} secs".format(
+            server_public_ip, time.time() - start_time
+        )
+    )
+
+
+def get_pooled_ssh_client(server_public_ip, username, private_key, port=22):
+    """
+    Returns the SSHClient shared by every caller of the same host/port/user,
+    transparently reconnecting if the transport is no longer active.
+    """
+    entry = get_ssh_pool_entry(server_public_ip, username, private_key, port)
+    with entry["lock"]:
+        if is_ssh_client_active(entry["client"]):
+            entry["reuses"] = entry["reuses"] + 1
+        else:
+            ssh_pool_connect(entry, server_public_ip, username, port)
+        return entry["client"]
+
+
+def get_pooled_sftp_client(server_public_ip, username, private_key, port=22):
+    """
+    Returns an SFTPClient running on the pooled transport of host/port/user.
+    Each thread gets its own SFTP channel so that transfers can run concurrently.
+    """
+    client = get_pooled_ssh_client(server_public_ip, username, private_key, port)
+    entry = get_ssh_pool_entry(server_public_ip, username, private_key, port)
+    thread_id = threading.get_ident()
+    with entry["lock"]:
+        sftp = entry["sftp"].get(thread_id, None)
+        if (
+            sftp is None
+            or sftp.get_channel().closed
+            or sftp.get_channel().get_transport() != client.get_transport()
+        ):
+            entry["sftp"][thread_id] = client.open_sftp()
+        return entry["sftp"][thread_id]
+
+
+def close_pooled_sftp_clients(
+    server_public_ip, username, private_key, port=22, thread_ids=None
+):
+    """
+    Closes the SFTP channels of thread_ids ( all if None ). Called at the end of a
+    transfers batch given each open channel counts against sshd MaxSessions.
+    """
+    entry = get_ssh_pool_entry(server_public_ip, username, private_key, port)
+    with entry["lock"]:
+        for thread_id in list(entry["sftp"].keys()):
+            if thread_ids is not None and thread_id not in thread_ids:
+                continue
+            try:
+                entry["sftp"].pop(thread_id).close()
+            except Exception:
+                pass
+
+
+def is_ssh_transport_failure(transport, e):
+    """
+    True if e means the pooled transport is gone and a new handshake is required.
+    A ChannelException ( e.g. sshd MaxSessions ) or an SFTP IOError only affect
+    the channel in use, and the transport keeps serving the other threads.
+    """
+    if isinstance(e, paramiko.ChannelException):
+        return False
+    if transport is None or transport.is_active() is False:
+        return True
+    return isinstance(e, paramiko.SSHException)
+
+
+def invalidate_ssh_connection(server_public_ip, username, port=22, transport=None):
+    """
+    Closes the pooled connection. If transport is given, only if it's still the
+    pooled one, so that a connection re-established by another thread is kept.
+    """
+    key = get_ssh_pool_key(server_public_ip, port, username)
+    with _ssh_pool_lock:
+        entry = _ssh_pool.get(key, None)
+    if entry is not None:
+        with entry["lock"]:
+            if (
+                transport is not None
+                and entry["client"] is not None
+                and entry["client"].get_transport() is not transport
+            ):
+                return
+            close_ssh_pool_entry(entry)
+
+
+def run_with_ssh_reconnect(
+    fn, server_public_ip, username, private_key, port=22, sftp=False
+):
+    """
+    Calls fn with the pooled SSHClient ( or SFTPClient ). If the pooled transport
+    dropped in the meantime, reconnects and retries once. fn is called again on
+    retry, so it must be safe to repeat ( open a channel, put or get a file ).
+    Remote commands are never run through here, only their channel is opened.
+    """
+    get_client = get_pooled_sftp_client if sftp else get_pooled_ssh_client
+    client = get_client(server_public_ip, username, private_key, port)
+    try:
+        return fn(client)
+    except Exception as e:
+        if sftp:
+            transport = client.get_channel().get_transport()
+        else:
+            transport = client.get_transport()
+        if is_ssh_transport_failure(transport, e) is False:
+            raise
+        logging.warning(
+            "Pooled connection to {} failed with error: {}. Reconnecting.".format(
+                server_public_ip, e.__str__()
+            )
+        )
+        invalidate_ssh_connection(server_public_ip, username, port, transport)
+        return fn(get_client(server_public_ip, username, private_key, port))
+
+
+def close_ssh_pool_entry(entry):
+    for sftp in entry["sftp"].values():
+        try:
+            sftp.close()
+        except Exception:
+            pass
+    entry["sftp"] = {}
+    if entry["client"] is not None:
+        try:
+            entry["client"].close()
+        except Exception:
+            pass
+        entry["client"] = None
+
+
+def get_ssh_pool_stats():
+    """Returns one row per host with the handshakes done, reuses and estimated time saved"""
+    rows = []
+    with _ssh_pool_lock:
+        entries = list(_ssh_pool.items())
+    for (host, port, username), entry in entries:
+        avg_handshake = 0.0
+        if entry["handshakes"] > 0:
+            avg_handshake = entry["handshakes_duration"] / entry["handshakes"]
+        rows.append(
+            [
+                "{}@{}:{}".format(username, host, port),
+                entry["handshakes"],
+                entry["reuses"],
+                "{:.3f}".format(avg_handshake),
+                "{:.1f}".format(avg_handshake * entry["reuses"]),
+            ]
+        )
+    return rows
+
+
+def close_ssh_pool():
+    rows = get_ssh_pool_stats()
+    if len(rows) > 0:
+        writer = MarkdownTableWriter(
+            table_name="SSH connection pool",
+            headers=[
+                "Connection",
+                "Handshakes",
+                "Reuses",
+                "Avg handshake (secs)",
+                "Estimated time saved (secs)",
+            ],
+            value_matrix=rows,
+        )
+        writer.write_table()
+    with _ssh_pool_lock:
+        entries = list(_ssh_pool.values())
+        _ssh_pool.clear()
+    for entry in entries:
+        close_ssh_pool_entry(entry)
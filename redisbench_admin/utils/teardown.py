@@ -0,0 +1,144 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import atexit
+import concurrent.futures
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+import redis
+
+SHUTDOWN_CONFIRM_TIMEOUT_SECS = int(os.getenv("SHUTDOWN_CONFIRM_TIMEOUT_SECS", 30))
+SHUTDOWN_CONFIRM_INTERVAL_SECS = 0.05
+
+_removal_queue = queue.Queue()
+_removal_worker = None
+_removal_lock = threading.Lock()
+_tracked_dirs = []
+
+
+def shutdown_redis_conn(conn, timeout_secs, shutdown_kwargs):
+    """Sends SHUTDOWN and waits until the server stops replying. Returns True on exit."""
+    try:
+        conn.shutdown(**shutdown_kwargs)
+    except redis.exceptions.ConnectionError:
+        return True
+    except redis.exceptions.RedisError as e:
+        logging.warning("Shutdown failed with error: {}".format(e.__str__()))
+    deadline = time.time() + timeout_secs
+    while time.time() < deadline:
+        try:
+            conn.ping()
+        except redis.exceptions.ConnectionError:
+            return True
+        except redis.exceptions.RedisError:
+            pass
+        time.sleep(SHUTDOWN_CONFIRM_INTERVAL_SECS)
+    return False
+
+
+def shutdown_redis_conns(
+    redis_conns, timeout_secs=SHUTDOWN_CONFIRM_TIMEOUT_SECS, **shutdown_kwargs
+):
+    """
+    Shuts down all shards in parallel and confirms their exit.
+    Returns the number of shards that did not exit within the timeout.
+    """
+    if len(redis_conns) == 0:
+        return 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(redis_conns)) as pool:
+        exited = list(
+            pool.map(
+                lambda conn: shutdown_redis_conn(conn, timeout_secs, shutdown_kwargs),
+                redis_conns,
+            )
+        )
+    alive = 0
+    for shard_n, shard_exited in enumerate(exited):
+        if shard_exited is False:
+            alive = alive + 1
+            logging.warning(
+                "Shard #{} did not exit within {} secs of the shutdown.".format(
+                    shard_n + 1, timeout_secs
+                )
+            )
+    return alive
+
+
+def kill_redis_processes(redis_processes):
+    """Signals all processes at once without waiting for them"""
+    for redis_process in redis_processes:
+        if redis_process is not None:
+            redis_process.kill()
+
+
+def reap_redis_processes(redis_processes, timeout_secs=SHUTDOWN_CONFIRM_TIMEOUT_SECS):
+    deadline = time.time() + timeout_secs
+    for redis_process in [x for x in redis_processes if x is not None]:
+        try:
+            redis_process.wait(max(0, deadline - time.time()))
+        except Exception:
+            logging.warning(
+                "Redis process with pid={} did not exit within {} secs.".format(
+                    redis_process.pid, timeout_secs
+                )
+            )
+
+
+def track_temporary_dir(path):
+    """Keeps track of a setup temporary dir so that it's removed on tear-down"""
+    _tracked_dirs.append(path)
+
+
+def release_temporary_dirs():
+    """Schedules the removal of all tracked temporary dirs. Returns the scheduled paths."""
+    released = list(_tracked_dirs)
+    del _tracked_dirs[:]
+    for path in released:
+        schedule_dir_removal(path)
+    return released
+
+
+def _removal_worker_loop():
+    while True:
+        path = _removal_queue.get()
+        try:
+            start_time = time.time()
+            shutil.rmtree(path, ignore_errors=True)
+            logging.debug(
+                "Removed temporary dir {} in {:.3f} secs".format(
+                    path, time.time() - start_time
+                )
+            )
+        finally:
+            _removal_queue.task_done()
+
+
+def schedule_dir_removal(path):
+    """Removes the dir in a background worker, overlapping with the next setup"""
+    global _removal_worker
+    with _removal_lock:
+        if _removal_worker is None:
+            _removal_worker = threading.Thread(
+                target=_removal_worker_loop, name="temporary-dirs-removal", daemon=True
+            )
+            _removal_worker.start()
+            atexit.register(wait_for_pending_removals)
+    _removal_queue.put(path)
+
+
+def wait_for_pending_removals():
+    """Blocks until every scheduled removal is done. Called at suite end."""
+    if _removal_queue.unfinished_tasks > 0:
+        logging.info(
+            "Waiting for {} temporary dirs to be removed.".format(
+                _removal_queue.unfinished_tasks
+            )
+        )
+    _removal_queue.join()
@@ -6,13 +6,19 @@
 
 import csv
 import datetime as dt
+import errno
+import gzip
+import hashlib
 import json
 import logging
 import operator
 import os
 import os.path
+import shutil
+import subprocess
 import tarfile
 import time
+from contextlib import contextmanager
 from functools import reduce
 from urllib.parse import quote_plus
 from zipfile import ZipFile
@@ -165,45 +171,218 @@ def required_utilities(utility_list):
     return result
 
 
+# ordered from the most to the least specific suffix
+COMPRESSED_SUFFIXES = [
+    ".tar.gz",
+    ".tgz",
+    ".tar.zst",
+    ".zip",
+    ".tar",
+    ".gz",
+    ".zst",
+]
+DECOMPRESS_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def get_compression_suffix(compressed_filename: str):
+    compression_suffix = None
+    for suffix in COMPRESSED_SUFFIXES:
+        if compressed_filename.endswith(suffix):
+            compression_suffix = suffix
+            break
+    return compression_suffix
+
+
 def get_decompressed_filename(compressed_filename: str):
     uncompressed_filename = None
-    for suffix in [".zip", ".tar.gz", "tar"]:
-        if compressed_filename.endswith(suffix):
-            uncompressed_filename = compressed_filename[: -len(suffix)]
+    suffix = get_compression_suffix(compressed_filename)
+    if suffix is not None:
+        uncompressed_filename = compressed_filename[: -len(suffix)]
     return uncompressed_filename
 
 
+def file_sha256(filename, chunk_size=DECOMPRESS_CHUNK_SIZE):
+    sha = hashlib.sha256()
+    with open(filename, "rb") as fd:
+        for chunk in iter(lambda: fd.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+_file_sha256_cache = {}
+
+
+def file_sha256_cached(filename):
+    """file_sha256 memoized on the file path, size and modification time"""
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_sha256_cache:
+        _file_sha256_cache[key] = file_sha256(filename)
+    return _file_sha256_cache[key]
+
+
+def dict_sha256(input_dict):
+    # stable across runs given the keys are sorted prior to hashing
+    serialized = json.dumps(input_dict, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def external_decompressor_cmd(compressed_filename: str):
+    # pigz and zstd offload reading, checksumming and writing to extra threads
+    suffix = get_compression_suffix(compressed_filename)
+    command = None
+    if suffix in [".tar.gz", ".tgz", ".gz"]:
+        if whereis("pigz") is not None:
+            command = ["pigz", "-dc", compressed_filename]
+        elif whereis("gzip") is not None:
+            command = ["gzip", "-dc", compressed_filename]
+    if suffix in [".tar.zst", ".zst"]:
+        if whereis("zstd") is not None:
+            command = ["zstd", "-dc", "-T0", "-q", compressed_filename]
+    return command
+
+
+@contextmanager
+def decompressed_stream(compressed_filename: str):
+    """Yield a binary stream with the decompressed content of a .gz or .zst file"""
+    command = external_decompressor_cmd(compressed_filename)
+    if command is not None:
+        logging.info(
+            "Streaming decompression of {} via: {}".format(
+                compressed_filename, " ".join(command)
+            )
+        )
+        process = subprocess.Popen(command, stdout=subprocess.PIPE)
+        try:
+            yield process.stdout
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        # drain any trailing padding so the decompressor exits cleanly
+        while process.stdout.read(DECOMPRESS_CHUNK_SIZE):
+            pass
+        process.stdout.close()
+        if process.wait() != 0:
+            raise Exception(
+                "Decompression of {} failed with exit code {}".format(
+                    compressed_filename, process.returncode
+                )
+            )
+    elif compressed_filename.endswith("gz"):
+        with gzip.open(compressed_filename, "rb") as stream:
+            yield stream
+    else:
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception(
+                "Unable to decompress {}. Either the zstd binary or the zstandard python package is required.".format(
+                    compressed_filename
+                )
+            )
+        with open(compressed_filename, "rb") as fd:
+            with zstandard.ZstdDecompressor().stream_reader(fd) as stream:
+                yield stream
+
+
 def decompress_file(compressed_filename: str, path=None):
     uncompressed_filename = compressed_filename
     logging.warning("Decompressing {}...".format(compressed_filename))
-    if compressed_filename.endswith(".zip"):
+    suffix = get_compression_suffix(compressed_filename)
+    if suffix == ".zip":
         with ZipFile(compressed_filename, "r") as zipObj:
             zipObj.extractall(path)
-            suffix = ".zip"
-        uncompressed_filename = compressed_filename[: -len(suffix)]
-
-    elif compressed_filename.endswith(".tar.gz"):
-        tar = tarfile.open(compressed_filename, "r:gz")
-        tar.extractall(path)
-        tar.close()
-        suffix = ".tar.gz"
-        uncompressed_filename = compressed_filename[: -len(suffix)]
 
-    elif compressed_filename.endswith(".tar"):
+    elif suffix == ".tar":
         tar = tarfile.open(compressed_filename, "r:")
         tar.extractall(path)
         tar.close()
-        suffix = ".tar"
-        uncompressed_filename = compressed_filename[: -len(suffix)]
+
+    elif suffix in [".tar.gz", ".tgz", ".tar.zst"]:
+        # single pass: the archive members are written while the input is decompressed
+        with decompressed_stream(compressed_filename) as stream:
+            tar = tarfile.open(fileobj=stream, mode="r|")
+            tar.extractall(path)
+            tar.close()
+
+    elif suffix in [".gz", ".zst"]:
+        target_filename = os.path.basename(compressed_filename[: -len(suffix)])
+        if path is not None:
+            target_filename = "{}/{}".format(path, target_filename)
+        with decompressed_stream(compressed_filename) as stream:
+            with open(target_filename, "wb") as target_fd:
+                shutil.copyfileobj(stream, target_fd, DECOMPRESS_CHUNK_SIZE)
     else:
         logging.warning(
-            "Filename {} was not in a supported compression extension [zip|tar.gz|tar]".format(
-                compressed_filename
+            "Filename {} was not in a supported compression extension [{}]".format(
+                compressed_filename, "|".join([x[1:] for x in COMPRESSED_SUFFIXES])
             )
         )
+    if suffix is not None:
+        uncompressed_filename = compressed_filename[: -len(suffix)]
     return uncompressed_filename
 
 
+def decompress_file_cached(compressed_filename: str, cache_dir: str):
+    """
+    Decompress the file into a directory named after the archive sha256 within cache_dir.
+
+    Returns the decompressed path. When the archive holds a single file
+    the path of that file is returned instead of the directory.
+    """
+    archive_hash = file_sha256(compressed_filename)
+    cached_path = "{}/{}".format(cache_dir, archive_hash)
+    if os.path.isdir(cached_path):
+        logging.info(
+            "Reusing decompressed content of {} (sha256={}) located at {}".format(
+                compressed_filename, archive_hash, cached_path
+            )
+        )
+    else:
+        # decompress into a private dir and rename it so that partial results are never reused
+        inflight_path = "{}.{}.tmp".format(cached_path, os.getpid())
+        os.makedirs(inflight_path, exist_ok=True)
+        try:
+            decompress_file(compressed_filename, inflight_path)
+            os.rename(inflight_path, cached_path)
+            logging.info(
+                "Cached decompressed content of {} (sha256={}) into {}".format(
+                    compressed_filename, archive_hash, cached_path
+                )
+            )
+        except OSError as e:
+            shutil.rmtree(inflight_path, ignore_errors=True)
+            # another process cached the same archive in the meantime
+            if e.errno not in [errno.ENOTEMPTY, errno.EEXIST] or not os.path.isdir(
+                cached_path
+            ):
+                raise
+            logging.info(
+                "Reusing decompressed content of {} (sha256={}) cached concurrently at {}".format(
+                    compressed_filename, archive_hash, cached_path
+                )
+            )
+        except Exception:
+            shutil.rmtree(inflight_path, ignore_errors=True)
+            raise
+    entries = os.listdir(cached_path)
+    if len(entries) == 1 and os.path.isfile("{}/{}".format(cached_path, entries[0])):
+        cached_path = "{}/{}".format(cached_path, entries[0])
+    return cached_path
+
+
+def link_or_copy_file(src, dst):
+    # hardlinks avoid a second full copy of the dataset. redis-server always writes
+    # its RDB to a temp file and renames it, so the linked source is never modified
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
 def find_json_path(element, json_dict):
     return reduce(operator.getitem, element.split("."), json_dict)
 
@@ -352,34 +531,174 @@ def get_ts_metric_name(
     return ts_name
 
 
-def wait_for_conn(conn, retries=20, command="PING", should_be=True, initial_sleep=1):
-    """Wait until a given Redis connection is ready"""
+WAIT_FOR_CONN_MIN_INTERVAL_SECS = 0.01
+WAIT_FOR_CONN_MAX_INTERVAL_SECS = 0.08
+WAIT_FOR_CONN_BACKOFF = 2.0
+LOADING_PROGRESS_LOG_INTERVAL_SECS = 5
+LOADING_PROGRESS_CHECK_INTERVAL_SECS = 1
+# fail the wait if the dataset loading did not advance for this long. 0 disables it
+LOADING_STALL_TIMEOUT_SECS = int(os.getenv("LOADING_STALL_TIMEOUT_SECS", 60))
+
+
+def is_process_alive(process):
+    if not process:
+        return False
+    # Check if child process has terminated. Set and return returncode
+    # attribute
+    if process.poll() is None:
+        return True
+    return False
+
+
+def is_pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_server_exit_reason(process, pidfile=None):
+    """
+    Returns why the redis-server we're waiting for is gone, None while it's (or might
+    be) alive. A daemonized redis-server parent exits with 0 after forking, in that case
+    the daemon is tracked via its pidfile.
+    """
+    if process is None or is_process_alive(process):
+        return None
+    if process.returncode != 0:
+        return "Redis process with pid={} exited with code {}".format(
+            process.pid, process.returncode
+        )
+    if pidfile is None or not os.path.exists(pidfile):
+        return None
+    try:
+        with open(pidfile, "r") as fd:
+            daemon_pid = int(fd.read().strip())
+    except ValueError:
+        # the daemon is still writing it
+        return None
+    if is_pid_alive(daemon_pid):
+        return None
+    return "Daemonized redis process with pid={} (pidfile {}) is not running".format(
+        daemon_pid, pidfile
+    )
+
+
+def get_loading_progress(conn):
+    """Returns the dataset loading progress from INFO persistence, None if not loading"""
+    try:
+        persistence = conn.info("persistence")
+    except redis.exceptions.RedisError:
+        return None
+    if int(persistence.get("loading", 0)) != 1:
+        return None
+    loaded_bytes = int(persistence.get("loading_loaded_bytes", 0))
+    elapsed = time.time() - int(persistence.get("loading_start_time", time.time()))
+    rate = 0.0
+    if elapsed > 0:
+        rate = loaded_bytes / elapsed
+    return {
+        "loaded_bytes": loaded_bytes,
+        "total_bytes": int(persistence.get("loading_total_bytes", 0)),
+        "loaded_perc": float(persistence.get("loading_loaded_perc", 0.0)),
+        "eta_seconds": int(persistence.get("loading_eta_seconds", 0)),
+        "rate_bytes_sec": rate,
+    }
+
+
+def log_loading_progress(progress):
+    logging.info(
+        "Loading dataset: {:.1f}% ({:.1f} of {:.1f} MB) at {:.1f} MB/sec. ETA {} secs.".format(
+            progress["loaded_perc"],
+            progress["loaded_bytes"] / (1024.0 * 1024.0),
+            progress["total_bytes"] / (1024.0 * 1024.0),
+            progress["rate_bytes_sec"] / (1024.0 * 1024.0),
+            progress["eta_seconds"],
+        )
+    )
+
+
+def wait_for_conn(
+    conn,
+    retries=20,
+    command="PING",
+    should_be=True,
+    initial_sleep=0,
+    process=None,
+    pidfile=None,
+    loading_stall_secs=LOADING_STALL_TIMEOUT_SECS,
+):
+    """
+    Wait until a given Redis connection is ready. retries is the timeout in seconds.
+    Polls with a short exponential backoff, reports the dataset loading progress and
+    fails fast if the server is gone ( the given process exited with an error or the
+    daemon of its pidfile is not running ) or if the loading did not advance for
+    loading_stall_secs.
+    """
     result = False
     if initial_sleep > 0:
-        time.sleep(initial_sleep)  # give extra 1sec in case of RDB loading
-    while retries > 0 and result is False:
+        time.sleep(initial_sleep)
+    start_time = time.time()
+    deadline = start_time + retries
+    interval = WAIT_FOR_CONN_MIN_INTERVAL_SECS
+    last_progress_log = start_time
+    last_progress_check = start_time
+    last_loaded_bytes = None
+    last_loading_advance = start_time
+    while result is False and time.time() < deadline:
+        exit_reason = get_server_exit_reason(process, pidfile)
+        if exit_reason is not None:
+            logging.error("{} while waiting for it to be ready.".format(exit_reason))
+            return False
         try:
             if conn.execute_command(command) == should_be:
                 result = True
+                break
         except redis.exceptions.BusyLoadingError:
-            time.sleep(1)  # give extra 1sec in case of RDB loading
+            now = time.time()
+            if now - last_progress_check >= LOADING_PROGRESS_CHECK_INTERVAL_SECS:
+                last_progress_check = now
+                progress = get_loading_progress(conn)
+                if progress is not None:
+                    if (
+                        last_loaded_bytes is None
+                        or progress["loaded_bytes"] > last_loaded_bytes
+                    ):
+                        last_loaded_bytes = progress["loaded_bytes"]
+                        last_loading_advance = now
+                    elif (
+                        loading_stall_secs > 0
+                        and now - last_loading_advance >= loading_stall_secs
+                    ):
+                        logging.error(
+                            "Dataset loading did not advance from {} bytes for {:.0f} secs. Giving up.".format(
+                                last_loaded_bytes, now - last_loading_advance
+                            )
+                        )
+                        return False
+                    if now - last_progress_log >= LOADING_PROGRESS_LOG_INTERVAL_SECS:
+                        last_progress_log = now
+                        log_loading_progress(progress)
         except redis.ConnectionError as err:
-            logging.error(
-                "Catched error while waiting for connection {}. Retries available {}".format(
-                    err, retries
-                )
-            )
+            logging.debug("Catched error while waiting for connection {}".format(err))
         except redis.ResponseError as err:
             err1 = str(err)
             if not err1.startswith("DENIED"):
                 raise
-        time.sleep(1)
-        retries -= 1
+        time.sleep(interval)
+        interval = min(
+            interval * WAIT_FOR_CONN_BACKOFF, WAIT_FOR_CONN_MAX_INTERVAL_SECS
+        )
         logging.debug("Waiting for Redis")
-    if retries == 0:
-        logging.debug(
-            "Redis busy loading time surpassed the timeout of {} secs".format(retries)
+    if result is False:
+        logging.error(
+            "Redis was not ready after the timeout of {} secs".format(retries)
         )
+    else:
+        logging.debug("Redis ready after {:.3f} secs".format(time.time() - start_time))
     return result
 
 
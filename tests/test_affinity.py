@@ -0,0 +1,95 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import os
+import subprocess
+import sys
+
+from redisbench_admin.utils import affinity
+from redisbench_admin.utils.affinity import (
+    parse_cpu_list,
+    format_cpu_list,
+    get_setup_cpu_placement,
+    check_cpu_placement_collisions,
+    get_affinity_spawn_args,
+    get_cpu_placement_metadata_tags,
+)
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list(None) is None
+    assert parse_cpu_list(3) == [3]
+    assert parse_cpu_list("0-3,8") == [0, 1, 2, 3, 8]
+    assert parse_cpu_list([2, 1, 1]) == [1, 2]
+    assert format_cpu_list([0, 1, 2, 3, 8]) == "0-3,8"
+    assert format_cpu_list([5]) == "5"
+
+
+def test_get_setup_cpu_placement():
+    assert get_setup_cpu_placement({"name": "oss-standalone"}, 1) is None
+    setup_settings = {
+        "name": "oss-cluster-03-primaries",
+        "affinity": {
+            "shards": [{"cpus": "0-1"}, {"cpus": "2-3", "numa_node": 0}],
+            "client": {"cpus": "3-5"},
+        },
+    }
+    cpu_placement = get_setup_cpu_placement(setup_settings, 3)
+    assert cpu_placement["shards"][0] == {"cpus": [0, 1], "numa_node": None}
+    assert cpu_placement["shards"][1] == {"cpus": [2, 3], "numa_node": 0}
+    assert cpu_placement["shards"][2] is None
+    assert cpu_placement["client"]["cpus"] == [3, 4, 5]
+
+    collisions = check_cpu_placement_collisions(cpu_placement, list(range(8)))
+    assert collisions == ["shard #2 and client share cpu 3"]
+    collisions = check_cpu_placement_collisions(cpu_placement, list(range(4)))
+    assert len(collisions) == 2
+
+    # a concurrent test remaps the spec cpus into its assigned cores
+    remapped_placement = get_setup_cpu_placement(setup_settings, 3, [8, 9, 10, 11])
+    assert remapped_placement["shards"][0] == {"cpus": [8, 9], "numa_node": None}
+    assert remapped_placement["shards"][1] == {"cpus": [10, 11], "numa_node": 0}
+    assert remapped_placement["client"]["cpus"] == [8, 9, 11]
+    assert check_cpu_placement_collisions(remapped_placement, [8, 9, 10, 11]) == [
+        "shard #1 and client share cpu 8",
+        "shard #1 and client share cpu 9",
+        "shard #2 and client share cpu 11",
+    ]
+
+    metadata_tags = get_cpu_placement_metadata_tags(cpu_placement)
+    assert metadata_tags == {
+        "shard_1_cpus": "0-1",
+        "shard_2_cpus": "2-3",
+        "shard_2_numa_node": "0",
+        "client_cpus": "3-5",
+    }
+
+
+def test_get_affinity_spawn_args(tmpdir, monkeypatch):
+    assert get_affinity_spawn_args(None) == []
+    command = [
+        sys.executable,
+        "-c",
+        "import os; print(sorted(os.sched_getaffinity(0)))",
+    ]
+    command_prefix = get_affinity_spawn_args({"cpus": [0], "numa_node": None})
+    output = subprocess.check_output(command_prefix + command)
+    assert output.decode().strip() == "[0]"
+    # without taskset the affinity is set by a python exec wrapper
+    monkeypatch.setattr(affinity.shutil, "which", lambda x: None)
+    command_prefix = get_affinity_spawn_args({"cpus": [0], "numa_node": None})
+    assert command_prefix[0] == sys.executable
+    output = subprocess.check_output(command_prefix + command)
+    assert output.decode().strip() == "[0]"
+    # the process joins the cgroup prior to exec, keeping its pid
+    cgroup_path = str(tmpdir)
+    command_prefix = get_affinity_spawn_args(
+        {"cpus": None, "numa_node": None, "cgroup": cgroup_path}
+    )
+    output = subprocess.check_output(
+        command_prefix + [sys.executable, "-c", "import os; print(os.getpid())"]
+    )
+    with open(os.path.join(cgroup_path, "cgroup.procs"), "r") as fd:
+        assert fd.read().strip() == output.decode().strip()
@@ -22,6 +22,18 @@ def test_create_run_remote_arguments():
     assert args.github_actor == "gh.user"
 
 
+def test_run_remote_skip_measured():
+    parser = argparse.ArgumentParser(
+        description="test",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser = create_run_remote_arguments(parser)
+    # skipping already measured runs is opt-in on run-remote
+    assert parser.parse_args(args=[]).remote_skip_measured is False
+    args = parser.parse_args(args=["--remote_skip_measured"])
+    assert args.remote_skip_measured is True
+
+
 def test_create_run_local_arguments():
     parser = argparse.ArgumentParser(
         description="test",
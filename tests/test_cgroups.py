@@ -0,0 +1,104 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import os
+
+from redisbench_admin.utils.cgroups import (
+    is_cgroup_v2,
+    parse_memory_max,
+    parse_cpu_max,
+    get_setup_isolation_settings,
+    setup_isolation_cgroups,
+    add_cgroups_to_placement,
+    collect_cgroups_stats,
+    get_cgroups_stats_delta,
+)
+
+
+def test_parse_limits():
+    assert parse_memory_max("max") == "max"
+    assert parse_memory_max(1024) == "1024"
+    assert parse_memory_max("4g") == "{}".format(4 * 1024**3)
+    assert parse_memory_max("512MB") == "{}".format(512 * 1024**2)
+    assert parse_cpu_max("max") == "max"
+    assert parse_cpu_max("50000 100000") == "50000 100000"
+    assert parse_cpu_max(1.5) == "150000 100000"
+
+
+def test_get_setup_isolation_settings():
+    settings = get_setup_isolation_settings({"name": "oss-standalone"}, 1)
+    assert settings == {"shards": [{}], "client": {}}
+    settings = get_setup_isolation_settings(
+        {"isolation": {"shards": {"memory_max": "1g"}, "client": {"cpuset": "3"}}},
+        2,
+    )
+    assert settings["shards"] == [{"memory_max": "1g"}, {"memory_max": "1g"}]
+    assert settings["client"] == {"cpuset": "3"}
+    settings = get_setup_isolation_settings(
+        {"isolation": {"shards": [{"cpuset": "0"}]}}, 2
+    )
+    assert settings["shards"] == [{"cpuset": "0"}, {}]
+
+
+def test_setup_isolation_cgroups(tmpdir):
+    cgroup_root = str(tmpdir)
+    assert is_cgroup_v2(cgroup_root) is False
+    with open(os.path.join(cgroup_root, "cgroup.controllers"), "w") as fd:
+        fd.write("cpuset cpu io memory pids")
+    assert is_cgroup_v2(cgroup_root)
+    # in a real cgroup v2 hierarchy the kernel populates the child interface files
+    os.makedirs(os.path.join(cgroup_root, "redisbench-admin"))
+    with open(
+        os.path.join(cgroup_root, "redisbench-admin", "cgroup.controllers"), "w"
+    ) as fd:
+        fd.write("cpuset cpu memory")
+    isolation_settings = get_setup_isolation_settings(
+        {"isolation": {"shards": {"cpu_max": 1, "memory_max": "1g"}}}, 2
+    )
+    cgroups = setup_isolation_cgroups(
+        isolation_settings, "oss-cluster", "redisbench-admin", cgroup_root
+    )
+    assert len(cgroups["shards"]) == 2
+    with open(os.path.join(cgroup_root, "cgroup.subtree_control"), "r") as fd:
+        assert fd.read() == "+cpuset +cpu +memory"
+    with open(os.path.join(cgroups["shards"][1], "cpu.max"), "r") as fd:
+        assert fd.read() == "100000 100000"
+    with open(os.path.join(cgroups["shards"][1], "memory.max"), "r") as fd:
+        assert fd.read() == "{}".format(1024**3)
+    assert os.path.basename(cgroups["client"]) == "oss-cluster-client"
+
+    # concurrent tests use a nested parent each, enabling the controllers on every level
+    nested_parent = os.path.join(cgroup_root, "redisbench-admin", "parallel-slot-1")
+    os.makedirs(nested_parent)
+    with open(os.path.join(nested_parent, "cgroup.controllers"), "w") as fd:
+        fd.write("cpuset cpu memory")
+    nested_cgroups = setup_isolation_cgroups(
+        isolation_settings,
+        "oss-cluster",
+        "redisbench-admin/parallel-slot-1",
+        cgroup_root,
+    )
+    assert os.path.dirname(nested_cgroups["client"]) == nested_parent
+    with open(os.path.join(nested_parent, "cgroup.subtree_control"), "r") as fd:
+        assert fd.read() == "+cpuset +cpu +memory"
+
+    placement = add_cgroups_to_placement(None, cgroups, 2)
+    assert placement["shards"][0]["cgroup"] == cgroups["shards"][0]
+    assert placement["client"]["cgroup"] == cgroups["client"]
+    assert placement["client"]["cpus"] is None
+
+    stats_before = collect_cgroups_stats(cgroups)
+    with open(os.path.join(cgroups["client"], "cpu.stat"), "w") as fd:
+        fd.write("usage_usec 1500\nuser_usec 1000\nsystem_usec 500\n")
+    with open(os.path.join(cgroups["client"], "memory.stat"), "w") as fd:
+        fd.write("anon 4096\nfile 0\n")
+    stats = get_cgroups_stats_delta(stats_before, collect_cgroups_stats(cgroups))
+    assert stats["oss-cluster-client"]["cpu.stat"]["usage_usec"] == 1500
+    assert stats["oss-cluster-client"]["memory.stat"]["anon"] == 4096
+    assert stats["oss-cluster-shard-1"]["cpu.stat"] == {}
+    stats = get_cgroups_stats_delta(
+        collect_cgroups_stats(cgroups), collect_cgroups_stats(cgroups)
+    )
+    assert stats["oss-cluster-client"]["cpu.stat"]["usage_usec"] == 0
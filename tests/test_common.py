@@ -21,6 +21,7 @@ from redisbench_admin.run.common import (
     get_setup_type_and_primaries_count,
     merge_default_and_config_metrics,
     check_dbconfig_tool_requirement,
+    check_dbconfig_dataset_requirement,
     check_dbconfig_keyspacelen_requirement,
     dso_check,
     dbconfig_keyspacelen_check,
@@ -433,6 +434,21 @@ def test_check_dbconfig_tool_requirement():
         assert requires_tool_dbconfig == True
 
 
+def test_check_dbconfig_dataset_requirement():
+    with open(
+        "./tests/test_data/redis-benchmark-full-suite-1Mkeys-100B.yml", "r"
+    ) as yml_file:
+        benchmark_config = yaml.safe_load(yml_file)
+        requires_dataset = check_dbconfig_dataset_requirement(benchmark_config)
+        assert requires_dataset == False
+
+    with open("./tests/test_data/redis-benchmark.yml", "r") as yml_file:
+        benchmark_config = yaml.safe_load(yml_file)
+        requires_dataset = check_dbconfig_dataset_requirement(benchmark_config)
+        assert requires_dataset == True
+    assert check_dbconfig_dataset_requirement({"dbconfig": {"dataset": "a.rdb"}})
+
+
 def test_check_dbconfig_keyspacelen_requirement():
     with open(
         "./tests/test_data/redis-benchmark-full-suite-1Mkeys-100B.yml", "r"
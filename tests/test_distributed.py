@@ -0,0 +1,147 @@
+import json
+
+from redisbench_admin.run_remote.distributed import (
+    get_distributed_client_settings,
+    get_distributed_client_slots,
+    get_distributed_results_filename,
+    get_distribution_percentile,
+    is_distributed_client_run,
+    merge_latency_distributions,
+    merge_memtier_json_results,
+    merge_redis_benchmark_csv_results,
+)
+
+
+def test_get_distributed_client_settings():
+    assert get_distributed_client_settings({"clientconfig": {}}) == (1, 1)
+    benchmark_config = {
+        "clientconfig": {"distributed": {"hosts": 2, "processes_per_host": 4}}
+    }
+    assert get_distributed_client_settings(benchmark_config) == (2, 4)
+    benchmark_config = {
+        "clientconfig": [
+            {"tool": "memtier_benchmark"},
+            {"distributed": {"processes_per_host": 3}},
+        ]
+    }
+    assert get_distributed_client_settings(benchmark_config) == (1, 3)
+    try:
+        get_distributed_client_settings({"clientconfig": {"distributed": {"hosts": 0}}})
+        assert False
+    except Exception as e:
+        assert "hosts" in e.__str__()
+    try:
+        get_distributed_client_settings(
+            {"clientconfig": {"distributed": {"processes_per_host": 64}}}
+        )
+        assert False
+    except Exception as e:
+        assert "REMOTE_COMMANDS_MAX_PARALLEL" in e.__str__()
+    assert is_distributed_client_run("memtier_benchmark", 1, 1) is False
+    assert is_distributed_client_run("memtier_benchmark", 1, 2) is True
+    assert is_distributed_client_run("ycsb", 2, 2) is False
+
+
+def test_get_distributed_client_slots():
+    slots = get_distributed_client_slots(["10.0.0.1", "10.0.0.2"], 2, 2)
+    assert slots == [
+        [1, 1, "10.0.0.1"],
+        [1, 2, "10.0.0.1"],
+        [2, 1, "10.0.0.2"],
+        [2, 2, "10.0.0.2"],
+    ]
+    # more hosts requested than available
+    slots = get_distributed_client_slots(["10.0.0.1"], 3, 2)
+    assert slots == [[1, 1, "10.0.0.1"], [1, 2, "10.0.0.1"]]
+    assert (
+        get_distributed_results_filename("benchmark-result.json", 2, 3)
+        == "benchmark-result-client-2-3.json"
+    )
+
+
+def test_merge_latency_distributions():
+    fast = [
+        {"<=msec": 1.0, "percent": 50.0},
+        {"<=msec": 2.0, "percent": 100.0},
+    ]
+    slow = [
+        {"<=msec": 10.0, "percent": 50.0},
+        {"<=msec": 20.0, "percent": 100.0},
+    ]
+    merged = merge_latency_distributions([fast, slow], [1, 1])
+    assert merged == [
+        {"<=msec": 1.0, "percent": 25.0},
+        {"<=msec": 2.0, "percent": 50.0},
+        {"<=msec": 10.0, "percent": 75.0},
+        {"<=msec": 20.0, "percent": 100.0},
+    ]
+    assert get_distribution_percentile(merged, 50.0) == 2.0
+    assert get_distribution_percentile(merged, 99.0) == 20.0
+    # the slow process did 3x less requests
+    merged = merge_latency_distributions([fast, slow], [3, 1])
+    assert get_distribution_percentile(merged, 50.0) == 2.0
+    assert get_distribution_percentile(merged, 75.0) == 2.0
+    assert get_distribution_percentile(merged, 80.0) == 10.0
+    # same distribution on all processes
+    merged = merge_latency_distributions([fast, fast, fast], [1, 2, 3])
+    assert get_distribution_percentile(merged, 50.0) == 1.0
+    assert get_distribution_percentile(merged, 99.0) == 2.0
+
+
+def test_merge_memtier_json_results():
+    with open("./tests/test_data/memtier_benchmark_v1.3.1_result.json", "r") as fd:
+        result = json.load(fd)
+    merged = merge_memtier_json_results([result, result])
+    totals = result["ALL STATS"]["Totals"]
+    merged_totals = merged["ALL STATS"]["Totals"]
+    assert merged_totals["Ops/sec"] == 2 * totals["Ops/sec"]
+    assert merged_totals["Count"] == 2 * totals["Count"]
+    assert abs(merged_totals["Average Latency"] - totals["Average Latency"]) < 0.001
+    assert merged_totals["Max Latency"] == totals["Max Latency"]
+    assert "Histogram log format" not in merged_totals["Percentile Latencies"]
+    # the p50 of identical processes is the p50 of a single process
+    sets = result["ALL STATS"]["Sets"]
+    merged_sets = merged["ALL STATS"]["Sets"]
+    assert merged_sets["Ops/sec"] == 2 * sets["Ops/sec"]
+    assert (
+        abs(
+            merged_sets["Percentile Latencies"]["p50.00"]
+            - sets["Percentile Latencies"]["p50.00"]
+        )
+        < 0.1
+    )
+    merged_serie = merged_totals["Time-Serie"]
+    assert merged_serie["0"]["Count"] == 2 * totals["Time-Serie"]["0"]["Count"]
+    assert "p99.00" not in merged_serie["0"]
+    assert merged_serie["0"]["Max Latency"] == totals["Time-Serie"]["0"]["Max Latency"]
+    assert merged["ALL STATS"]["Runtime"] == result["ALL STATS"]["Runtime"]
+
+    # a slower process shifts the merged percentiles instead of being averaged
+    slow = json.loads(json.dumps(result))
+    slow["ALL STATS"]["Runtime"]["Finish time"] += 1000
+    for entry in slow["ALL STATS"]["SET"] + slow["ALL STATS"]["GET"]:
+        entry["<=msec"] = entry["<=msec"] * 10
+    merged = merge_memtier_json_results([result, slow])
+    merged_p99 = merged["ALL STATS"]["Totals"]["Percentile Latencies"]["p99.00"]
+    assert merged_p99 > 5 * totals["Percentile Latencies"]["p99.00"]
+    assert (
+        merged["ALL STATS"]["Runtime"]["Total duration"]
+        == result["ALL STATS"]["Runtime"]["Total duration"] + 1000
+    )
+
+
+def test_merge_redis_benchmark_csv_results():
+    with open("./tests/test_data/redis-benchmark-6.2.4-csv.out", "r") as fd:
+        csv_output = fd.read()
+    merged = merge_redis_benchmark_csv_results([csv_output, csv_output])
+    lines = merged.splitlines()
+    assert lines[0].startswith('"test","rps","avg_latency_ms"')
+    assert lines[1] == (
+        '"JSON.GET jsonsl-1 .","39840.640","0.183","0.104","0.183",'
+        '"0.239","0.287","0.351"'
+    )
+    # v6.0 outputs have no header
+    merged = merge_redis_benchmark_csv_results(
+        ['"SET","100.00"\n"GET","200.00"\n', '"SET","50.00"\n"GET","20.00"\n']
+    )
+    assert merged == '"SET","150.000"\n"GET","220.000"\n'
@@ -0,0 +1,269 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import argparse
+import os
+import threading
+import time
+
+import redis
+
+from redisbench_admin.env_pool import env_pool
+from redisbench_admin.env_pool.args import create_env_pool_arguments
+from redisbench_admin.env_pool.env_pool import (
+    acquire_env_lease,
+    check_env_leases,
+    destroy_pool_env,
+    drain_env_pool,
+    env_lease_heartbeat,
+    expire_dangling_leases,
+    get_env_lease_connection_vars,
+    get_env_pool_conn,
+    get_env_pool_env_keyname,
+    get_pool_env_verdict,
+    list_pool_envs,
+    parse_env_pool_remote,
+    register_pool_env,
+    release_env_lease,
+    renew_env_lease,
+    unregister_pool_env,
+    ENV_STATE_DESTROY_FAILED,
+    ENV_STATE_LEASED,
+    ENV_STATE_PROVISIONING,
+    ENV_STATE_READY,
+    ENV_STATE_RECYCLING,
+)
+from redisbench_admin.run_remote.terraform import terraform_destroy
+
+
+def get_env_pool_args(extra_args=[]):
+    parser = argparse.ArgumentParser(
+        description="test",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser = create_env_pool_arguments(parser)
+    return parser.parse_args(
+        args=["--remote", "oss-standalone:redisearch-m5"] + extra_args
+    )
+
+
+def test_parse_env_pool_remote():
+    assert parse_env_pool_remote("oss-standalone:redisearch-m5") == [
+        {"type": "oss-standalone"},
+        {"setup": "redisearch-m5"},
+    ]
+    try:
+        parse_env_pool_remote("redisearch-m5")
+        assert False
+    except Exception as e:
+        assert "<type>:<setup>" in e.__str__()
+
+
+def test_get_pool_env_verdict():
+    args = get_env_pool_args(
+        [
+            "--env-max-age-secs",
+            "1000",
+            "--env-max-leases",
+            "3",
+            "--provisioning-timeout-secs",
+            "100",
+        ]
+    )
+    now = 10000.0
+    env = {"state": ENV_STATE_READY, "created_at": now - 10, "leases": "0"}
+    assert get_pool_env_verdict(env, args, now) == "health-check"
+    env["state"] = ENV_STATE_RECYCLING
+    assert get_pool_env_verdict(env, args, now) == "recycle"
+    env["leases"] = "3"
+    assert get_pool_env_verdict(env, args, now) == "destroy"
+    # leased envs are never touched, even if old
+    env = {"state": ENV_STATE_LEASED, "created_at": now - 5000, "leases": "1"}
+    assert get_pool_env_verdict(env, args, now) == "keep"
+    env["state"] = ENV_STATE_READY
+    assert get_pool_env_verdict(env, args, now) == "destroy"
+    env = {"state": ENV_STATE_PROVISIONING, "created_at": now - 50}
+    assert get_pool_env_verdict(env, args, now) == "keep"
+    env["created_at"] = now - 500
+    assert get_pool_env_verdict(env, args, now) == "destroy"
+    # failed destroys are retried
+    env = {"state": ENV_STATE_DESTROY_FAILED, "created_at": now - 10, "leases": "0"}
+    assert get_pool_env_verdict(env, args, now) == "destroy"
+
+
+class FailingTerraform:
+    def __init__(self, working_dir=None, terraform_bin_path=None):
+        pass
+
+    def destroy(self, **kwargs):
+        return 1, "", "Error: timeout while waiting for state to become 'terminated'"
+
+
+class FakePoolConn:
+    def __init__(self):
+        self.updates = []
+
+    def hset(self, keyname, mapping=None):
+        self.updates.append([keyname, mapping])
+
+    def register_script(self, script):
+        def unreachable(keys=None, args=None):
+            raise redis.exceptions.ConnectionError("Connection refused")
+
+        return unreachable
+
+
+def test_destroy_pool_env_failed(tmpdir, monkeypatch):
+    monkeypatch.setattr(env_pool, "Terraform", FailingTerraform)
+    working_dir = tmpdir.mkdir("env1").strpath
+    conn = FakePoolConn()
+    env = {"remote_id": "setup1", "env_id": "env1", "tf_working_dir": working_dir}
+    assert destroy_pool_env(conn, env, "terraform") is False
+    # the env is kept, along with the terraform state to retry the destroy
+    assert os.path.exists(working_dir)
+    assert conn.updates == [
+        [
+            get_env_pool_env_keyname("setup1", "env1"),
+            {"state": ENV_STATE_DESTROY_FAILED},
+        ]
+    ]
+
+
+class FakeClaimConn:
+    def __init__(self, states):
+        self.states = states
+
+    def register_script(self, script):
+        def acquire(keys=None, args=None):
+            env_id = keys[1].split(":")[-1]
+            if self.states[env_id] != args[4]:
+                return 0
+            self.states[env_id] = ENV_STATE_LEASED
+            return 1
+
+        return acquire
+
+
+def test_drain_env_pool(monkeypatch):
+    listed = [
+        {"remote_id": "setup1", "env_id": "env1", "state": ENV_STATE_READY},
+        {"remote_id": "setup1", "env_id": "env2", "state": ENV_STATE_READY},
+        {"remote_id": "setup1", "env_id": "env3", "state": ENV_STATE_PROVISIONING},
+        {"remote_id": "setup1", "env_id": "env4", "state": ENV_STATE_DESTROY_FAILED},
+        {"remote_id": "setup1", "env_id": "env5", "state": ENV_STATE_LEASED},
+    ]
+    # env2 was leased by a job after the listing
+    conn = FakeClaimConn(
+        {
+            "env1": ENV_STATE_READY,
+            "env2": ENV_STATE_LEASED,
+            "env3": ENV_STATE_PROVISIONING,
+            "env4": ENV_STATE_DESTROY_FAILED,
+            "env5": ENV_STATE_LEASED,
+        }
+    )
+    destroyed = []
+    monkeypatch.setattr(env_pool, "list_pool_envs", lambda conn, remote_id: listed)
+    monkeypatch.setattr(
+        env_pool,
+        "destroy_pool_env",
+        lambda conn, env, terraform_bin_path: destroyed.append(env["env_id"]),
+    )
+    drain_env_pool(conn, "setup1", "terraform")
+    assert destroyed == ["env1", "env4"]
+
+
+def test_env_lease_lost():
+    lease = {
+        "conn": FakePoolConn(),
+        "remote_id": "setup1",
+        "env_id": "env1",
+        "lease_token": "token",
+        "ttl_secs": 0.3,
+        "released": threading.Event(),
+        "lost": threading.Event(),
+        "heartbeat": None,
+    }
+    remote_envs = {"setup1": lease, "setup2": "terraform-env"}
+    check_env_leases(remote_envs)
+    # the pool redis stays unreachable for longer than the lease ttl
+    env_lease_heartbeat(lease)
+    assert lease["lost"].is_set()
+    try:
+        check_env_leases(remote_envs)
+        assert False
+    except Exception as e:
+        assert "Lost the lease of env env1" in e.__str__()
+
+
+def test_env_lease():
+    try:
+        conn = get_env_pool_conn("localhost", 16379)
+        conn.ping()
+        remote_id = "test-env-lease"
+        for env in list_pool_envs(conn, remote_id):
+            unregister_pool_env(conn, remote_id, env["env_id"])
+        connection_vars = {
+            "username": "ubuntu",
+            "server_private_ip": "10.0.0.1",
+            "server_public_ip": "1.1.1.1",
+            "server_plaintext_port": 6379,
+            "client_private_ip": "10.0.0.2",
+            "client_public_ip": "2.2.2.2",
+        }
+        register_pool_env(
+            conn,
+            remote_id,
+            "env1",
+            dict(connection_vars, state=ENV_STATE_READY, created_at=1),
+        )
+        register_pool_env(
+            conn,
+            remote_id,
+            "env2",
+            dict(connection_vars, state=ENV_STATE_PROVISIONING, created_at=2),
+        )
+        lease = acquire_env_lease(conn, remote_id, "job1", 10)
+        assert lease["env_id"] == "env1"
+        assert get_env_lease_connection_vars(lease) == (
+            0,
+            "ubuntu",
+            "10.0.0.1",
+            "1.1.1.1",
+            6379,
+            "10.0.0.2",
+            "2.2.2.2",
+        )
+        # a single lease per env, and env2 is not ready
+        assert acquire_env_lease(conn, remote_id, "job2", 10) is None
+        assert renew_env_lease(lease) is True
+        envs = list_pool_envs(conn, remote_id)
+        assert envs[0]["state"] == ENV_STATE_LEASED
+        assert envs[0]["leased_by"] == "job1"
+        assert envs[0]["leases"] == "1"
+
+        # run-remote gives the leased envs back to the pool
+        remote_envs = {remote_id: lease}
+        terraform_destroy(remote_envs)
+        assert remote_envs == {}
+        assert list_pool_envs(conn, remote_id)[0]["state"] == ENV_STATE_RECYCLING
+        assert renew_env_lease(lease) is False
+        assert release_env_lease(lease) is False
+
+        # the lease of a job that died expires and the env is recycled
+        conn.hset(
+            get_env_pool_env_keyname(remote_id, "env1"),
+            "state",
+            ENV_STATE_READY,
+        )
+        lease = acquire_env_lease(conn, remote_id, "job3", 0.1)
+        assert expire_dangling_leases(conn, remote_id) == []
+        time.sleep(0.2)
+        assert expire_dangling_leases(conn, remote_id) == ["env1"]
+        assert list_pool_envs(conn, remote_id)[0]["state"] == ENV_STATE_RECYCLING
+        for env in list_pool_envs(conn, remote_id):
+            unregister_pool_env(conn, remote_id, env["env_id"])
+    except redis.exceptions.ConnectionError:
+        pass
@@ -0,0 +1,91 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import json
+import os
+
+from redisbench_admin.run.journal import (
+    get_journal_filename,
+    get_journal_test_key,
+    init_journal,
+    is_test_completed,
+    journal_test_start,
+    journal_test_failed,
+    journal_test_end,
+    journal_record_result,
+    journal_result_exported,
+    reexport_pending_results,
+)
+
+
+def test_get_journal_filename():
+    filename = get_journal_filename("./journals", "run-remote", ["b", "a"], "abc")
+    assert filename == get_journal_filename(
+        "./journals", "run-remote", ["a", "b"], "abc"
+    )
+    assert filename.endswith("-abc.json")
+    assert filename != get_journal_filename(
+        "./journals", "run-remote", ["a", "b"], "def"
+    )
+    assert filename != get_journal_filename("./journals", "run-remote", ["a"], "abc")
+    assert get_journal_filename("./journals", "run-remote", ["a"], None).endswith(
+        "-unknown-sha.json"
+    )
+
+
+def test_get_journal_test_key():
+    key = get_journal_test_key("test1", "oss-standalone", {"clientconfig": {}})
+    assert key.startswith("test1/oss-standalone/")
+    assert key != get_journal_test_key(
+        "test1", "oss-standalone", {"clientconfig": {"parameters": []}}
+    )
+
+
+def test_journal_resume(tmpdir):
+    journal_dir = str(tmpdir)
+    assert init_journal("", "run-local", ["test1"], "abc") is None
+    assert is_test_completed(None, "test1") is False
+
+    journal = init_journal(journal_dir, "run-local", ["test1", "test2"], "abc")
+    assert os.path.exists(journal["filename"])
+    journal_test_start(journal, "test1")
+    result_file = os.path.join(journal_dir, "test1.json")
+    with open(result_file, "w") as json_file:
+        json.dump({"ALL STATS": {}}, json_file)
+    pos = journal_record_result(journal, "test1", result_file, False, {})
+    assert pos == 0
+    journal_test_end(journal, "test1")
+    assert is_test_completed(journal, "test1")
+    # a failed test is never marked as completed
+    journal_test_start(journal, "test2")
+    journal_record_result(journal, "test2", result_file, True)
+    journal_record_result(journal, "test2", result_file, True)
+    # results without an export context never share it
+    test2_results = journal["tests"]["test2"]["results"]
+    test2_results[0]["export_context"]["setup_name"] = "oss-standalone"
+    assert test2_results[1]["export_context"] == {}
+    journal_test_failed(journal, "test2")
+    journal_test_end(journal, "test2")
+    assert is_test_completed(journal, "test2") is False
+
+    resumed = init_journal(
+        journal_dir, "run-local", ["test2", "test1"], "abc", resume=True
+    )
+    assert is_test_completed(resumed, "test1")
+    assert is_test_completed(resumed, "test2") is False
+    assert resumed["tests"]["test1"]["results"][0]["exported"] is False
+    journal_result_exported(resumed, "test1", 0)
+    assert resumed["tests"]["test1"]["results"][0]["exported"] is True
+
+    # a new run of the same suite starts from scratch
+    fresh = init_journal(journal_dir, "run-local", ["test1", "test2"], "abc")
+    assert is_test_completed(fresh, "test1") is False
+    # without a datasink nothing is re-exported
+    assert (
+        reexport_pending_results(
+            resumed, "test1", "test1", {}, [], None, None, None, None, None, None
+        )
+        == 0
+    )
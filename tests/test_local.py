@@ -8,6 +8,7 @@ from redisbench_admin.environments.oss_standalone import (
     spin_up_local_redis,
     generate_standalone_redis_server_args,
 )
+from redisbench_admin.utils.local import check_dataset_local_requirements
 
 
 #
@@ -196,3 +197,26 @@ def test_spin_up_local_redis():
         r = redis.Redis(host="localhost", port=port)
         assert r.ping() == True
         r.shutdown(nosave=True)
+
+
+def test_check_dataset_local_requirements_cluster_port(tmpdir):
+    dataset = str(tmpdir.join("dump.rdb"))
+    with open(dataset, "w") as fd:
+        fd.write("rdb")
+    dbdir = tmpdir.mkdir("dbdir")
+    check_dataset_local_requirements(
+        {"dbconfig": {"dataset": dataset}},
+        str(dbdir),
+        None,
+        str(tmpdir.join("datasets")),
+        "dbconfig",
+        2,
+        True,
+        False,
+        6479,
+    )
+    # the shards of a child run on a port range other than the default one
+    assert sorted(os.listdir(str(dbdir))) == [
+        "cluster-node-port-6479.rdb",
+        "cluster-node-port-6480.rdb",
+    ]
@@ -7,6 +7,7 @@ import yaml
 
 from redisbench_admin.run.memtier_benchmark.memtier_benchmark import (
     prepare_memtier_benchmark_command,
+    memtier_progress_line_to_metrics,
 )
 
 
@@ -30,3 +31,14 @@ def test_prepare_memtier_benchmark_command():
             == "FT.SEARCH idx 'text0=>[KNN $k @hnsw_vector $BLOB]' PARAMS 4 k 10 BLOB aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"
         )
         assert len(command_arr) == 17
+
+
+def test_memtier_progress_line_to_metrics():
+    metrics = memtier_progress_line_to_metrics(
+        "[RUN #1 50%,   5 secs]  4 threads:      922101 ops,  184008 (avg:  184008) ops/sec,"
+        " 7.55MB/sec (avg: 7.55MB/sec),  1.09 (avg:  1.09) msec latency"
+    )
+    assert metrics["secs"] == 5
+    assert metrics["ops/sec"] == 184008
+    assert metrics["avg msec latency"] == 1.09
+    assert memtier_progress_line_to_metrics("ALL STATS") is None
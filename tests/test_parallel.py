@@ -0,0 +1,97 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+from redisbench_admin.run_local.parallel import (
+    parse_cpus_request,
+    parse_memory_request,
+    get_test_resources_request,
+    pick_next_test,
+    get_child_command,
+)
+
+
+def test_parse_requests():
+    assert parse_cpus_request("2") == 2
+    assert parse_cpus_request(1.5) == 2
+    assert parse_cpus_request("500m") == 1
+    assert parse_cpus_request("3000m") == 3
+    assert parse_memory_request("1024") == 1024
+    assert parse_memory_request("10g") == 10 * 1024**3
+    assert parse_memory_request("10Gi") == 10 * 1024**3
+    assert parse_memory_request("512MB") == 512 * 1024**2
+
+
+def test_get_test_resources_request():
+    default_specs = {
+        "setups": [
+            {
+                "name": "oss-standalone",
+                "type": "oss-standalone",
+                "redis_topology": {"primaries": 1, "replicas": 0},
+                "resources": {"requests": {"cpus": "1", "memory": "10g"}},
+            },
+            {
+                "name": "oss-cluster-03-primaries",
+                "type": "oss-cluster",
+                "redis_topology": {"primaries": 3, "replicas": 0},
+                "resources": {"requests": {"cpus": "3", "memory": "30g"}},
+            },
+        ]
+    }
+    benchmark_config = {
+        "setups": ["oss-standalone", "oss-cluster-03-primaries"],
+        "clientconfig": {
+            "tool": "memtier_benchmark",
+            "parameters": [{"threads": 4}],
+        },
+    }
+    cores, memory = get_test_resources_request(benchmark_config, default_specs)
+    assert cores == 3 + 4
+    assert memory == 30 * 1024**3
+    benchmark_config["clientconfig"]["resources"] = {"requests": {"cpus": "2"}}
+    cores, _ = get_test_resources_request(benchmark_config, default_specs)
+    assert cores == 3 + 2
+    # backwards compatible standalone setup and single threaded client
+    cores, memory = get_test_resources_request({"clientconfig": {}}, None)
+    assert cores == 2
+    assert memory == 0
+
+
+def test_pick_next_test():
+    pending = [["a.yml", "a", 4, 100], ["b.yml", "b", 2, 10], ["c.yml", "c", 1, 0]]
+    assert pick_next_test(pending, [0, 1, 2, 3], 1000, 0) == 0
+    assert pick_next_test(pending, [0, 1], 1000, 1) == 1
+    # memory guard
+    assert pick_next_test(pending, [0, 1, 2, 3], 5, 1) == 2
+    assert pick_next_test(pending[:2], [0], 1000, 1) is None
+    # larger than the host runs alone
+    assert pick_next_test(pending[:1], [0, 1], 1000, 0) == 0
+
+
+def test_get_child_command():
+    command = get_child_command("a.yml", 6479)
+    assert command[-12:] == [
+        "--test",
+        "a.yml",
+        "--port",
+        "6479",
+        "--max-parallel-tests",
+        "1",
+        "--suite-shard",
+        "",
+        "--journal-dir",
+        "",
+        "--tests-durations-file",
+        "",
+    ]
+    command = get_child_command(
+        "a.yml", 6479, "", "", [2, 3, 4], "redisbench-admin/parallel-slot-1"
+    )
+    assert command[-4:] == [
+        "--parallel-test-cpus",
+        "2-4",
+        "--cgroup-parent",
+        "redisbench-admin/parallel-slot-1",
+    ]
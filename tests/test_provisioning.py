@@ -0,0 +1,66 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import threading
+
+from redisbench_admin.run_remote.provisioning import (
+    get_concurrent_vms,
+    get_plan_remote_ids,
+    get_remaining_remote_ids,
+    init_lookahead_provisioning,
+    lookahead_advance,
+    wait_for_lookahead_env,
+    wait_for_lookahead_envs,
+)
+
+
+def get_test_plan():
+    def remote(setup):
+        return {"remote": [{"type": "oss-standalone"}, {"setup": setup}]}
+
+    return {
+        "mixed": {
+            "default": {
+                "oss-standalone": {
+                    "benchmarks": {
+                        "test-1": remote("m5"),
+                        "test-2": remote("c5"),
+                        "test-3": {},
+                        "test-4": remote("m5"),
+                        "test-5": remote("r5"),
+                    }
+                }
+            }
+        }
+    }
+
+
+def test_get_plan_remote_ids():
+    plan_keys, plan_remote_ids, remote_configs = get_plan_remote_ids(get_test_plan())
+    assert plan_keys[0] == ("oss-standalone", "test-1")
+    assert len(plan_keys) == 5
+    assert plan_remote_ids == ["m5", "c5", None, "m5", "r5"]
+    assert list(remote_configs.keys()) == ["m5", "c5", "r5"]
+    assert remote_configs["m5"][1] == "test-1"
+
+
+def test_lookahead_provisioning():
+    assert init_lookahead_provisioning(get_test_plan(), 0, 4, {}, {}, []) is None
+    lookahead_advance(None, "oss-standalone", "test-1")
+    wait_for_lookahead_env(None, "m5")
+    wait_for_lookahead_envs(None)
+
+    remote_envs = {"m5": {}}
+    state = init_lookahead_provisioning(get_test_plan(), 2, 4, remote_envs, {}, [])
+    assert get_remaining_remote_ids(state, 0) == ["m5", "c5", "r5"]
+    assert get_remaining_remote_ids(state, 2) == ["m5", "r5"]
+    assert get_remaining_remote_ids(state, 4) == ["r5"]
+    assert get_concurrent_vms(state) == 2
+    state["inflight"]["c5"] = threading.Thread()
+    assert get_concurrent_vms(state) == 4
+    # the VMs budget is exhausted so r5 is not provisioned ahead of time
+    lookahead_advance(state, "oss-standalone", "test-2")
+    assert list(state["inflight"].keys()) == ["c5"]
+    assert state["stats"] == {}
@@ -0,0 +1,78 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import argparse
+
+from redisbench_admin.run.args import common_run_args
+from redisbench_admin.run.repetitions import (
+    extract_kpi_value,
+    compute_repetitions_stats,
+    is_repetitions_stable,
+    check_adaptive_repetitions_stop,
+    append_repetition_result,
+    get_repetitions_summary_row,
+    get_max_repetitions,
+)
+
+
+def get_adaptive_args(extra_args=[]):
+    parser = argparse.ArgumentParser(
+        description="test",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser = common_run_args(parser)
+    return parser.parse_args(args=["--adaptive-repetitions"] + extra_args)
+
+
+def test_extract_kpi_value():
+    results_dict = {"ALL STATS": {"Totals": {"Ops/sec": 1000.5}}}
+    assert extract_kpi_value(results_dict, "$.'ALL STATS'.Totals.'Ops/sec'") == 1000.5
+    assert extract_kpi_value(results_dict, "$.'ALL STATS'.Gets.'Ops/sec'") is None
+
+
+def test_compute_repetitions_stats():
+    mean, cv, ci = compute_repetitions_stats([])
+    assert mean is None and cv is None and ci is None
+    mean, cv, ci = compute_repetitions_stats([100.0])
+    assert mean == 100.0
+    assert cv is None
+    mean, cv, ci = compute_repetitions_stats([99.0, 100.0, 101.0])
+    assert mean == 100.0
+    assert abs(cv - 0.01) < 0.0001
+    # t(2) = 4.303
+    assert abs(ci - 4.303 * 0.01 / (3**0.5)) < 0.0001
+    assert is_repetitions_stable([99.0, 100.0, 101.0], 0.02, 0.0)
+    assert is_repetitions_stable([99.0, 100.0, 101.0], 0.0, 0.05)
+    assert is_repetitions_stable([99.0, 100.0, 101.0], 0.02, 0.01) is False
+    assert is_repetitions_stable([99.0, 100.0, 101.0], 0.0, 0.0) is False
+
+
+def test_check_adaptive_repetitions_stop():
+    args = get_adaptive_args(["--min-repetitions", "2", "--max-repetitions", "5"])
+    assert get_max_repetitions(args, 1) == 5
+    repetitions_state = {"repetitions": 0, "kpi_values": []}
+    for value in [1000.0, 1001.0]:
+        assert check_adaptive_repetitions_stop(args, "test", repetitions_state) is False
+        append_repetition_result(
+            args,
+            {"ALL STATS": {"Totals": {"Ops/sec": value}}},
+            repetitions_state,
+        )
+    assert check_adaptive_repetitions_stop(args, "test", repetitions_state)
+    row = get_repetitions_summary_row("oss-standalone", "test", repetitions_state)
+    assert row[0:4] == ["oss-standalone", "test", 2, "1000.500"]
+
+    # missing KPI values fall back to the fixed repetitions
+    repetitions_state = {"repetitions": 0, "kpi_values": []}
+    append_repetition_result(args, {}, repetitions_state)
+    assert check_adaptive_repetitions_stop(args, "test", repetitions_state, 3) is False
+    assert repetitions_state["kpi_missing"]
+    for _ in range(2):
+        append_repetition_result(args, {}, repetitions_state)
+    assert check_adaptive_repetitions_stop(args, "test", repetitions_state, 3)
+
+    args.adaptive_repetitions = False
+    assert get_max_repetitions(args, 1) == 1
+    assert check_adaptive_repetitions_stop(args, "test", repetitions_state) is False
@@ -0,0 +1,95 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import argparse
+import json
+import os
+
+from redisbench_admin.run.args import common_run_args
+from redisbench_admin.run.result_cache import (
+    get_redis_binary_fingerprint,
+    get_modules_fingerprint,
+    get_benchmark_tool_version,
+    compute_run_fingerprint,
+    lookup_measured_result,
+    record_measured_result,
+    check_already_measured,
+)
+from redisbench_admin.utils.utils import file_sha256
+
+
+def test_get_fingerprints(tmpdir):
+    module_file = os.path.join(str(tmpdir), "module.so")
+    with open(module_file, "w") as fd:
+        fd.write("module")
+    module_sha = file_sha256(module_file)
+    assert get_modules_fingerprint(None) == []
+    assert get_modules_fingerprint(module_file) == [module_sha]
+    assert get_modules_fingerprint(["{} ARG 1".format(module_file)]) == [
+        "{} ARG 1".format(module_sha)
+    ]
+    # unresolvable binaries are identified by name
+    assert get_redis_binary_fingerprint("non-existing-redis-server") == [
+        "non-existing-redis-server"
+    ]
+    assert get_redis_binary_fingerprint(module_file) == [module_sha]
+    tool_version = get_benchmark_tool_version(
+        {"clientconfig": {"tool": "non-existing-benchmark"}}
+    )
+    assert tool_version == {"tool": "non-existing-benchmark", "source": None}
+    # a tool resolved outside the PATH is fingerprinted by the binary the run uses
+    tool_binary = os.path.join(str(tmpdir), "non-existing-benchmark")
+    with open(tool_binary, "w") as fd:
+        fd.write("tool")
+    tool_version = get_benchmark_tool_version(
+        {"clientconfig": {"tool": "non-existing-benchmark"}}, True, tool_binary
+    )
+    assert tool_version["sha256"] == file_sha256(tool_binary)
+    assert get_benchmark_tool_version(
+        {"clientconfig": {"tool": "non-existing-benchmark"}}, False, tool_binary
+    ) == {"tool": "non-existing-benchmark", "source": None}
+    tool_version = get_benchmark_tool_version(
+        {"clientconfig": {"tool": "non-existing-benchmark"}}
+    )
+
+    benchmark_config = {"clientconfig": {"tool": "memtier_benchmark"}}
+    fingerprint = compute_run_fingerprint(
+        [], [module_sha], benchmark_config, tool_version, "oss-standalone", {}
+    )
+    assert fingerprint == compute_run_fingerprint(
+        [], [module_sha], benchmark_config, tool_version, "oss-standalone", {}
+    )
+    assert fingerprint != compute_run_fingerprint(
+        [], [], benchmark_config, tool_version, "oss-standalone", {}
+    )
+    assert fingerprint != compute_run_fingerprint(
+        [], [module_sha], benchmark_config, tool_version, "oss-cluster-3-primaries", {}
+    )
+
+
+def test_record_measured_result(tmpdir):
+    archive_dir = os.path.join(str(tmpdir), "archive")
+    result_file = os.path.join(str(tmpdir), "result.json")
+    with open(result_file, "w") as fd:
+        json.dump({"ALL STATS": {}}, fd)
+    assert lookup_measured_result("abc", archive_dir) is None
+    record_measured_result(
+        "abc", "test1", "oss-standalone", "sha1", [result_file], archive_dir
+    )
+    entry = lookup_measured_result("abc", archive_dir)
+    assert entry["test_name"] == "test1"
+    assert entry["git_sha"] == "sha1"
+    assert os.path.exists(os.path.join(archive_dir, "abc", "result.json"))
+
+    parser = argparse.ArgumentParser(
+        description="test",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser = common_run_args(parser)
+    args = parser.parse_args(args=["--results-archive-dir", archive_dir])
+    assert check_already_measured(args, "abc", "test1", "oss-standalone")
+    assert check_already_measured(args, "def", "test1", "oss-standalone") is False
+    args.force_rerun = True
+    assert check_already_measured(args, "abc", "test1", "oss-standalone") is False
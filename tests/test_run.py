@@ -6,7 +6,10 @@
 import datetime
 import time
 
-from redisbench_admin.run.run import calculate_client_tool_duration_and_check
+from redisbench_admin.run.run import (
+    calculate_client_tool_duration_and_check,
+    define_benchmark_plan,
+)
 
 
 def test_calculate_client_tool_duration_and_check():
@@ -18,3 +21,34 @@ def test_calculate_client_tool_duration_and_check():
         benchmark_end_time, benchmark_start_time, "benchmark", True
     )
     assert benchmark_duration_seconds >= sleep_time
+
+
+def test_define_benchmark_plan():
+    dbconfig = {"configuration-parameters": {"save": '""'}}
+    benchmark_definitions = {
+        "write-1": {"dbconfig": dbconfig, "clientconfig": {"tool": "memtier"}},
+        "write-2": {"dbconfig": dbconfig, "clientconfig": {"tool": "memtier"}},
+        "write-3": {
+            "dbconfig": {"dataset": "dump.rdb"},
+            "clientconfig": {"tool": "memtier"},
+        },
+        "read-1": {
+            "dbconfig": {"dataset": "dump.rdb"},
+            "clientconfig": {"tool": "memtier", "benchmark_type": "read-only"},
+        },
+    }
+    # by default each write test gets its own setup
+    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, None)
+    assert len(benchmark_runs_plan["mixed"].keys()) == 3
+    assert len(benchmark_runs_plan["read-only"].keys()) == 1
+
+    # when reusing write setups, tests with equal dbconfig are grouped
+    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, None, True)
+    assert len(benchmark_runs_plan["mixed"].keys()) == 2
+    assert len(benchmark_runs_plan["read-only"].keys()) == 1
+    for _, by_setup in benchmark_runs_plan["mixed"].items():
+        benchmarks = by_setup["oss-standalone"]["benchmarks"]
+        if "write-1" in benchmarks:
+            assert list(benchmarks.keys()) == ["write-1", "write-2"]
+        else:
+            assert list(benchmarks.keys()) == ["write-3"]
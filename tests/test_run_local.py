@@ -1,4 +1,6 @@
+import io
 import os
+import sys
 
 import argparse
 import redis
@@ -9,12 +11,56 @@ from redisbench_admin.run.args import REDIS_7
 from redisbench_admin.run_local.args import create_run_local_arguments
 from redisbench_admin.run_local.local_helpers import (
     check_benchmark_binaries_local_requirements,
+    run_local_benchmark,
+    stream_benchmark_output,
+    get_progress_line_parser,
 )
 from redisbench_admin.profilers.profilers_schema import get_profilers_rts_key_prefix
 from redisbench_admin.run_local.run_local import (
     run_local_command_logic,
 )
 from redisbench_admin.run.redistimeseries import datasink_profile_tabular_data
+from redisbench_admin.run.ycsb.ycsb import post_process_ycsb_results
+
+
+def test_run_local_benchmark():
+    ycsb_output = (
+        "Command line: -t -db site.ycsb.db.RedisClient\n"
+        "2022-03-01 10:00:10:123 10 sec: 1000 operations; 100.5 current ops/sec; [READ: Count=1]\r"
+        "2022-03-01 10:00:20:123 20 sec: 2000 operations; 100.0 current ops/sec; [READ: Count=1]\n"
+        "[OVERALL], RunTime(ms), 20000\n"
+        "[OVERALL], Throughput(ops/sec), 100.0\n"
+    )
+    stdout, _ = run_local_benchmark(
+        "ycsb",
+        [
+            sys.executable,
+            "-c",
+            "import sys; sys.stdout.write({})".format(repr(ycsb_output)),
+        ],
+    )
+    # the progress lines are consumed by the parser
+    assert stdout == [
+        "Command line: -t -db site.ycsb.db.RedisClient",
+        "[OVERALL], RunTime(ms), 20000",
+        "[OVERALL], Throughput(ops/sec), 100.0",
+    ]
+    results_dict = post_process_ycsb_results(stdout, 0, "")
+    assert results_dict["Tests"]["OVERALL"]["Throughput_ops_sec_"] == "100.0"
+
+
+def test_stream_benchmark_output():
+    output = io.BufferedReader(
+        io.BytesIO(
+            b'"test","rps"\nSET: rps=10.0 (overall: 10.0) avg_msec=0.1 (overall: 0.1)\r'
+            b'"SET","10.0"\n"GET","20.0"'
+        )
+    )
+    output_lines = stream_benchmark_output(
+        output, get_progress_line_parser("redis-benchmark"), 0, 4
+    )
+    assert output_lines == ['"test","rps"', '"SET","10.0"', '"GET","20.0"']
+    assert get_progress_line_parser("unknown-tool") is None
 
 
 def test_check_benchmark_binaries_local_requirements():
@@ -0,0 +1,88 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import argparse
+
+from redisbench_admin.run.scheduler import (
+    load_tests_durations_file,
+    merge_tests_durations_file,
+    store_tests_durations_file,
+)
+from redisbench_admin.run_remote.args import create_run_remote_arguments
+from redisbench_admin.run_remote.parallel import (
+    get_max_parallel_partitions,
+    get_partition_child_command,
+    get_partition_name,
+    get_remote_partitions,
+)
+
+
+def test_get_remote_partitions():
+    parser = argparse.ArgumentParser(
+        description="test",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser = create_run_remote_arguments(parser)
+    test_files = [
+        "./tests/test_data/redis-benchmark.yml",
+        "./tests/test_data/redisgraph-benchmark-go.yml",
+        "./tests/test_data/tsbs-devops-ingestion-scale100-4days-keyspace.yml",
+    ]
+    args = parser.parse_args(args=["--test", ",".join(test_files)])
+    partitions = get_remote_partitions(args)
+    assert list(partitions.keys()) == ["redistimeseries-m5", "redisgraph-r5"]
+    assert partitions["redistimeseries-m5"] == [
+        [test_files[0], "tsbs-scale100-single-groupby-1-8-1"],
+        [test_files[2], "tsbs-devops-ingestion-scale100-4days-keyspace"],
+    ]
+    partitions = get_remote_partitions(args, ["UPDATE-BASELINE"])
+    assert partitions == {"redisgraph-r5": [[test_files[1], "UPDATE-BASELINE"]]}
+
+
+def test_get_max_parallel_partitions():
+    assert get_max_parallel_partitions(0, 0, 4) == 4
+    assert get_max_parallel_partitions(2, 0, 4) == 2
+    assert get_max_parallel_partitions(8, 0, 4) == 4
+    # 2 VMs per remote setup
+    assert get_max_parallel_partitions(0, 4, 4) == 2
+    assert get_max_parallel_partitions(0, 1, 4) == 1
+
+
+def test_get_partition_child_command():
+    command = get_partition_child_command(
+        ["a.yml", "b.yml"], "./journals/m5", "./parallel-logs/m5-tests-durations.json"
+    )
+    assert command[-10:] == [
+        "--test",
+        "a.yml,b.yml",
+        "--max_parallel_remote_setups",
+        "1",
+        "--suite-shard",
+        "",
+        "--journal-dir",
+        "./journals/m5",
+        "--tests-durations-file",
+        "./parallel-logs/m5-tests-durations.json",
+    ]
+    assert get_partition_name(None) == "no-remote"
+
+
+def test_merge_tests_durations_file(tmpdir):
+    durations_filename = str(tmpdir.join("durations.json"))
+    store_tests_durations_file(
+        durations_filename,
+        {"a": {"benchmark_duration": 10}, "b": {"benchmark_duration": 20}},
+    )
+    partial_filename = str(tmpdir.join("m5-durations.json"))
+    # the children start from a copy of the shared file
+    store_tests_durations_file(
+        partial_filename,
+        {"a": {"benchmark_duration": 15}, "b": {"benchmark_duration": 1}},
+    )
+    merge_tests_durations_file(durations_filename, partial_filename, ["a"])
+    assert load_tests_durations_file(durations_filename) == {
+        "a": {"benchmark_duration": 15},
+        "b": {"benchmark_duration": 20},
+    }
@@ -0,0 +1,207 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import os
+import tempfile
+
+from redisbench_admin.run.run import define_benchmark_plan
+from redisbench_admin.run.scheduler import (
+    schedule_benchmark_plan,
+    estimate_benchmark_plan,
+    get_plan_groups,
+    get_setup_carry_overs,
+    schedule_benchmark_plan_and_estimate,
+    update_tests_durations_file,
+    load_tests_durations_file,
+    get_tests_durations,
+)
+
+default_specs = {
+    "setups": [
+        {
+            "name": "oss-standalone",
+            "type": "oss-standalone",
+            "redis_topology": {"primaries": 1, "replicas": 0},
+        },
+        {
+            "name": "oss-cluster-3-primaries",
+            "type": "oss-cluster",
+            "redis_topology": {"primaries": 3, "replicas": 0},
+        },
+    ]
+}
+
+
+def get_read_only_config(dataset_name, setups):
+    return {
+        "dbconfig": [{"dataset_name": dataset_name}, {"dataset": "dump.rdb"}],
+        "clientconfig": {"tool": "memtier", "benchmark_type": "read-only"},
+        "setups": setups,
+    }
+
+
+def test_get_plan_groups():
+    benchmark_definitions = {
+        "test-1": get_read_only_config("d1", ["oss-standalone"]),
+        "test-2": get_read_only_config("d2", ["oss-cluster-3-primaries"]),
+        "test-3": get_read_only_config(
+            "d3", ["oss-standalone", "oss-cluster-3-primaries"]
+        ),
+    }
+    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
+    groups = get_plan_groups(benchmark_runs_plan)
+    # the plan order is kept
+    assert [(x["dataset_name"], x["setup_name"]) for x in groups] == [
+        ("d1", "oss-standalone"),
+        ("d2", "oss-cluster-3-primaries"),
+        ("d3", "oss-standalone"),
+        ("d3", "oss-cluster-3-primaries"),
+    ]
+
+
+def test_schedule_benchmark_plan():
+    benchmark_definitions = {
+        "test-1": get_read_only_config("d1", ["oss-standalone"]),
+        "test-2": get_read_only_config("d2", ["oss-cluster-3-primaries"]),
+        "test-3": get_read_only_config(
+            "d3", ["oss-standalone", "oss-cluster-3-primaries"]
+        ),
+        "test-4": get_read_only_config("d4", ["oss-standalone"]),
+    }
+    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
+    # no consecutive groups share the topology on the original order
+    assert get_setup_carry_overs(benchmark_runs_plan) == {}
+
+    scheduled_plan = schedule_benchmark_plan(benchmark_runs_plan)
+    groups = get_plan_groups(scheduled_plan)
+    assert len(groups) == 5
+    assert [(x["dataset_name"], x["setup_name"]) for x in groups] == [
+        ("d1", "oss-standalone"),
+        ("d3", "oss-standalone"),
+        ("d3", "oss-cluster-3-primaries"),
+        ("d2", "oss-cluster-3-primaries"),
+        ("d4", "oss-standalone"),
+    ]
+    # consecutive groups with the same topology and configuration share the setup
+    assert get_setup_carry_overs(scheduled_plan) == {
+        ("read-only", "d1", "oss-standalone"): ("read-only", "d3", "oss-standalone"),
+        ("read-only", "d3", "oss-cluster-3-primaries"): (
+            "read-only",
+            "d2",
+            "oss-cluster-3-primaries",
+        ),
+    }
+
+
+def test_get_setup_carry_overs():
+    benchmark_definitions = {
+        "test-1": get_read_only_config("d1", ["oss-standalone"]),
+        "test-2": get_read_only_config("d2", ["oss-standalone"]),
+        "test-3": get_read_only_config("d3", ["oss-standalone"]),
+        "test-4": {
+            "clientconfig": {"tool": "memtier"},
+            "setups": ["oss-standalone"],
+        },
+    }
+    benchmark_definitions["test-2"]["dbconfig"].append(
+        {"configuration-parameters": [{"io-threads": 2}]}
+    )
+    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
+    # a different server configuration requires a new setup
+    # and write setups are only handed over when they are reused
+    assert get_setup_carry_overs(benchmark_runs_plan) == {}
+    carry_overs = get_setup_carry_overs(benchmark_runs_plan, True)
+    assert len(carry_overs) == 1
+    assert ("read-only", "d2", "oss-standalone") not in carry_overs.values()
+
+
+def test_schedule_benchmark_plan_and_estimate():
+    benchmark_definitions = {
+        "test-1": get_read_only_config("d1", ["oss-standalone"]),
+        "test-2": get_read_only_config("d2", ["oss-cluster-3-primaries"]),
+        "test-3": get_read_only_config("d3", ["oss-standalone"]),
+    }
+    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
+    tests_durations = {
+        "test-1": {"benchmark_duration": 60, "dataset_load_duration": 10},
+        "test-2": {"benchmark_duration": 60, "dataset_load_duration": 10},
+        "test-3": {"benchmark_duration": 60, "dataset_load_duration": 10},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        durations_filename = "{}/durations.json".format(tmpdir)
+        for test_name, test_durations in tests_durations.items():
+            update_tests_durations_file(
+                durations_filename,
+                test_name,
+                test_durations["benchmark_duration"],
+                test_durations["dataset_load_duration"],
+            )
+
+        class Args:
+            tests_durations_file = durations_filename
+            reuse_write_setups = False
+
+        scheduled_plan, plan_estimate = schedule_benchmark_plan_and_estimate(
+            Args(),
+            benchmark_runs_plan,
+            benchmark_definitions.keys(),
+            None,
+            "org",
+            "repo",
+            "ci",
+        )
+    assert [
+        (x["dataset_name"], x["setup_name"]) for x in get_plan_groups(scheduled_plan)
+    ] == [
+        ("d1", "oss-standalone"),
+        ("d3", "oss-standalone"),
+        ("d2", "oss-cluster-3-primaries"),
+    ]
+    # the unscheduled plan spins 3 setups, the d3 group reuses the d1 setup
+    assert plan_estimate["setup_spins"] == 2
+    assert plan_estimate["setup_spins_saved"] == 1
+    assert plan_estimate["total_duration_secs"] == 3 * (10 + 60)
+    assert plan_estimate["rows"][1][5] == "yes"
+
+
+def test_estimate_benchmark_plan():
+    benchmark_definitions = {
+        "test-1": get_read_only_config("d1", ["oss-standalone"]),
+        "test-2": get_read_only_config("d1", ["oss-standalone"]),
+        "test-3": {"clientconfig": {"tool": "memtier"}},
+    }
+    benchmark_runs_plan = define_benchmark_plan(benchmark_definitions, default_specs)
+    tests_durations = {
+        "test-1": {"benchmark_duration": 60, "dataset_load_duration": 10},
+        "test-2": {"benchmark_duration": 120},
+        "test-3": {"benchmark_duration": 30, "dataset_load_duration": 1},
+    }
+    plan_estimate = estimate_benchmark_plan(benchmark_runs_plan, tests_durations, 2)
+    # read-only setup is spinned once, the write test is spinned per repetition
+    assert plan_estimate["setup_spins"] == 3
+    assert plan_estimate["total_duration_secs"] == (10 + 60 * 2 + 120 * 2) + (
+        1 * 2 + 30 * 2
+    )
+    assert plan_estimate["tests_without_history"] == []
+
+    # the reused write setup is handed over from the read-only group
+    plan_estimate = estimate_benchmark_plan(benchmark_runs_plan, {}, 1, True)
+    assert plan_estimate["setup_spins"] == 1
+    assert len(plan_estimate["tests_without_history"]) == 3
+
+
+def test_update_tests_durations_file():
+    durations_filename = os.path.join(tempfile.mkdtemp(), "durations.json")
+    assert load_tests_durations_file(durations_filename) == {}
+    update_tests_durations_file(durations_filename, "test-1", 10, 5)
+    update_tests_durations_file(durations_filename, "test-1", 20, None)
+    update_tests_durations_file(durations_filename, "test-2", 30)
+    tests_durations = get_tests_durations(
+        durations_filename, None, ["test-1", "test-2"], "org", "repo", "ci"
+    )
+    assert tests_durations == {
+        "test-1": {"benchmark_duration": 20, "dataset_load_duration": 5},
+        "test-2": {"benchmark_duration": 30},
+    }
@@ -0,0 +1,121 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import copy
+import json
+import os
+
+import yaml
+
+from redisbench_admin.run import snapshots
+from redisbench_admin.run.result_cache import get_benchmark_tool_version
+from redisbench_admin.run.snapshots import (
+    get_tool_dataset_snapshot_key,
+    local_snapshot_store,
+    remote_snapshot_restore,
+    SNAPSHOT_METADATA_FILENAME,
+)
+
+
+def test_get_tool_dataset_snapshot_key():
+    with open("./tests/test_data/vecsim-memtier.yml", "r") as yml_file:
+        benchmark_config = yaml.safe_load(yml_file)
+    key = get_tool_dataset_snapshot_key(benchmark_config, "oss-standalone", 1)
+    assert len(key) == 64
+    # deterministic
+    assert key == get_tool_dataset_snapshot_key(
+        copy.deepcopy(benchmark_config), "oss-standalone", 1
+    )
+    # topology is part of the key
+    assert key != get_tool_dataset_snapshot_key(benchmark_config, "oss-cluster", 3)
+    # modules are part of the key
+    assert key != get_tool_dataset_snapshot_key(
+        benchmark_config, "oss-standalone", 1, ["./redisearch.so"]
+    )
+    # the dbconfig block is part of the key
+    changed_config = copy.deepcopy(benchmark_config)
+    changed_config["dbconfig"].append({"dataset_name": "other"})
+    assert key != get_tool_dataset_snapshot_key(changed_config, "oss-standalone", 1)
+
+
+def test_get_tool_dataset_snapshot_key_tool_version(tmpdir):
+    benchmark_config = {
+        "dbconfig": [{"tool": "memtier_benchmark"}, {"min-tool-version": "1.3.0"}]
+    }
+    tool_binary = str(tmpdir.join("memtier_benchmark"))
+    with open(tool_binary, "w") as fd:
+        fd.write("tool v1")
+    tool_version = get_benchmark_tool_version(
+        benchmark_config, True, tool_binary, "dbconfig"
+    )
+    key = get_tool_dataset_snapshot_key(
+        benchmark_config, "oss-standalone", 1, None, "dbconfig", tool_version
+    )
+    # a different loading tool binary with the same min version is another snapshot
+    with open(tool_binary, "w") as fd:
+        fd.write("tool v2")
+    assert key != get_tool_dataset_snapshot_key(
+        benchmark_config,
+        "oss-standalone",
+        1,
+        None,
+        "dbconfig",
+        get_benchmark_tool_version(benchmark_config, True, tool_binary, "dbconfig"),
+    )
+
+
+class FakeConn:
+    def __init__(self, rdb_dir):
+        self.rdb_dir = rdb_dir
+
+    def save(self):
+        with open("{}/dump.rdb".format(self.rdb_dir), "w") as fd:
+            fd.write("rdb")
+
+    def config_get(self, name):
+        if name == "dir":
+            return {"dir": self.rdb_dir}
+        return {"dbfilename": "dump.rdb"}
+
+
+def test_local_snapshot_store_concurrent(tmpdir):
+    snapshots_dir = str(tmpdir.mkdir("snapshots"))
+    conn = FakeConn(str(tmpdir.mkdir("dbdir")))
+    snapshot_dir = local_snapshot_store("key", [conn], 10, snapshots_dir)
+    metadata_file = "{}/{}".format(snapshot_dir, SNAPSHOT_METADATA_FILENAME)
+    first_metadata_inode = os.stat(metadata_file).st_ino
+    # a second run storing the same snapshot keeps the one other runs may be using
+    assert local_snapshot_store("key", [conn], 20, snapshots_dir) == snapshot_dir
+    assert os.stat(metadata_file).st_ino == first_metadata_inode
+    assert os.listdir(snapshots_dir) == ["key"]
+
+
+def test_remote_snapshot_restore_link_failure(tmpdir, monkeypatch):
+    metadata = {"shard_files": ["shard-1.rdb"], "load_duration_seconds": 10}
+    executed = []
+    reloads = []
+
+    def fake_execute_remote_commands(
+        server_public_ip, username, private_key, commands, port
+    ):
+        executed.extend(commands)
+        if commands[0].startswith("cat "):
+            return [[0, [json.dumps(metadata)], []]]
+        return [[1, [], ["cp: cannot create regular file: No space left on device"]]]
+
+    monkeypatch.setattr(
+        snapshots, "execute_remote_commands", fake_execute_remote_commands
+    )
+    monkeypatch.setattr(
+        snapshots, "debug_reload_rdb", lambda timeout, conns: reloads.append(conns)
+    )
+    conn = FakeConn(str(tmpdir))
+    # the snapshot is ignored and the dataset is loaded as usual
+    assert (
+        remote_snapshot_restore("key", [conn], 10, "10.0.0.1", "ubuntu", "key.pem", 22)
+        is None
+    )
+    assert len(executed) == 2
+    assert reloads == []
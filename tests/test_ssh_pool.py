@@ -0,0 +1,524 @@
+import os
+import shutil
+import subprocess
+import time
+
+import paramiko
+
+from redisbench_admin.utils import ssh_pool
+from redisbench_admin.utils.remote import (
+    execute_remote_commands,
+    execute_remote_commands_parallel,
+    copy_dir_to_remote_setup,
+    copy_files_to_remote_setup,
+    get_remote_file_sha256,
+    get_remote_dataset_cache_filename,
+    remote_dataset_cache_fetch,
+    remote_dataset_cache_link,
+    remote_dataset_cache_prune_command,
+    fetch_files_from_remote_setup,
+)
+from redisbench_admin.run_remote import distributed
+from redisbench_admin.run_remote.distributed import (
+    get_distributed_client_slots,
+    get_distributed_results_filename,
+    run_distributed_remote_benchmark,
+)
+from redisbench_admin.utils.utils import file_sha256
+from redisbench_admin.utils.ssh_pool import (
+    get_ssh_pool_entry,
+    get_pooled_ssh_client,
+    run_with_ssh_reconnect,
+    is_ssh_client_active,
+    get_ssh_pool_stats,
+    close_ssh_pool,
+)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+        self.sessions = 0
+        self.max_sessions = None
+        self.executed = 0
+
+    def is_active(self):
+        return self.active
+
+    def open_session(self):
+        if self.active is False:
+            raise EOFError()
+        if self.max_sessions is not None and self.sessions >= self.max_sessions:
+            raise paramiko.ChannelException(1, "Administratively prohibited")
+        self.sessions = self.sessions + 1
+        return FakeChannel(self)
+
+
+class FakeChannel:
+    def __init__(self, transport):
+        self.transport = transport
+        self.exit_status = None
+        self.output = None
+        self.secs = 0
+
+    def get_pty(self):
+        pass
+
+    def exec_command(self, command):
+        self.transport.executed = self.transport.executed + 1
+        if command.startswith("fake-sleep "):
+            # "fake-sleep <secs> <exit status>"
+            _, secs, exit_status = command.split(" ")
+            self.secs = float(secs)
+            self.exit_status = int(exit_status)
+            self.output = command
+            return
+        if command.startswith("fake-drop"):
+            # the transport drops while the command runs
+            self.transport.active = False
+            raise EOFError()
+        # the "remote" host is the local one
+        process = subprocess.run(command, shell=True, stdout=subprocess.PIPE)
+        self.exit_status = process.returncode
+        self.output = process.stdout.decode()
+
+    def makefile(self, mode):
+        return FakeStream(output=self.output)
+
+    def makefile_stderr(self, mode):
+        return FakeStream()
+
+    def recv_exit_status(self):
+        time.sleep(self.secs)
+        self.transport.sessions = self.transport.sessions - 1
+        return self.exit_status
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+        self.puts = []
+        self.gets = []
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+    def open_sftp(self):
+        return FakeSFTP(self)
+
+
+class FakeSFTP:
+    def __init__(self, client):
+        self.client = client
+
+    def get_channel(self):
+        return self
+
+    def get_transport(self):
+        return self.client.transport
+
+    @property
+    def closed(self):
+        return self.client.closed
+
+    def put(self, local_file, remote_file, callback=None):
+        self.client.puts.append(local_file)
+        shutil.copy(local_file, remote_file)
+
+    def get(self, remote_file, local_file, callback=None):
+        self.client.gets.append(remote_file)
+        shutil.copy(remote_file, local_file)
+
+    def close(self):
+        pass
+
+
+class FakeStream:
+    def __init__(self, output=None):
+        self.output = output
+
+    def readlines(self):
+        if self.output is None:
+            return []
+        return [self.output]
+
+
+def test_get_pooled_ssh_client():
+    entry = get_ssh_pool_entry("10.0.0.1", "ubuntu", "key.pem", "22")
+    assert get_ssh_pool_entry("10.0.0.1", "ubuntu", "key.pem", 22) is entry
+    client = FakeClient()
+    entry["client"] = client
+    entry["handshakes"] = 1
+    entry["handshakes_duration"] = 0.5
+    for _ in range(3):
+        assert get_pooled_ssh_client("10.0.0.1", "ubuntu", "key.pem", 22) is client
+    assert entry["reuses"] == 3
+    rows = get_ssh_pool_stats()
+    assert rows == [["ubuntu@10.0.0.1:22", 1, 3, "0.500", "1.5"]]
+    close_ssh_pool()
+    assert client.closed
+    assert get_ssh_pool_stats() == []
+
+
+def test_run_with_ssh_reconnect():
+    entry = get_ssh_pool_entry("10.0.0.2", "ubuntu", "key.pem", 22)
+    client = FakeClient()
+    entry["client"] = client
+    assert is_ssh_client_active(client)
+    assert (
+        run_with_ssh_reconnect(
+            lambda c: c.get_transport().is_active(), "10.0.0.2", "ubuntu", "key.pem"
+        )
+        is True
+    )
+    # a dropped transport is no longer handed out
+    client.transport.active = False
+    assert is_ssh_client_active(client) is False
+    assert is_ssh_client_active(None) is False
+    close_ssh_pool()
+
+
+def test_run_with_ssh_reconnect_failures(monkeypatch):
+    entry = get_ssh_pool_entry("10.0.0.7", "ubuntu", "key.pem", 22)
+    client = FakeClient()
+    entry["client"] = client
+    reconnects = []
+
+    def fake_ssh_pool_connect(entry, server_public_ip, username, port):
+        reconnects.append(server_public_ip)
+        entry["client"] = FakeClient()
+
+    monkeypatch.setattr(ssh_pool, "ssh_pool_connect", fake_ssh_pool_connect)
+
+    def raise_error(e):
+        raise e
+
+    # SFTP errors and channel limits don't affect the shared transport
+    for error in [
+        FileNotFoundError("missing"),
+        PermissionError("denied"),
+        paramiko.ChannelException(1, "Administratively prohibited"),
+    ]:
+        try:
+            run_with_ssh_reconnect(
+                lambda _: raise_error(error),
+                "10.0.0.7",
+                "ubuntu",
+                "key.pem",
+                sftp=True,
+            )
+            assert False
+        except type(error):
+            pass
+    assert client.closed is False
+    assert reconnects == []
+    # a command is never repeated, even if the transport dropped while it ran
+    try:
+        execute_remote_commands("10.0.0.7", "ubuntu", "key.pem", ["fake-drop"], 22)
+        assert False
+    except EOFError:
+        pass
+    assert client.transport.executed == 1
+    # opening the channel on a dropped transport reconnects and retries
+    entry["client"].transport.active = True
+    entry["client"].transport.open_session = lambda: raise_error(
+        paramiko.SSHException("dropped")
+    )
+    [[recv_exit_status, stdout, _]] = execute_remote_commands(
+        "10.0.0.7", "ubuntu", "key.pem", ["echo 1"], 22
+    )
+    assert recv_exit_status == 0
+    assert stdout == ["1\n"]
+    assert reconnects == ["10.0.0.7"]
+    close_ssh_pool()
+
+
+def test_execute_remote_commands_parallel():
+    entry = get_ssh_pool_entry("10.0.0.3", "ubuntu", "key.pem", 22)
+    entry["client"] = FakeClient()
+    assert (
+        execute_remote_commands_parallel("10.0.0.3", "ubuntu", "key.pem", [], 22) == []
+    )
+    commands = [
+        "fake-sleep 0.3 0",
+        "fake-sleep 0.1 1",
+        "fake-sleep 0.2 0",
+        "fake-sleep 0.3 0",
+    ]
+    start_time = time.time()
+    res = execute_remote_commands_parallel(
+        "10.0.0.3", "ubuntu", "key.pem", commands, 22
+    )
+    # concurrent, not the sum of the durations
+    assert time.time() - start_time < 0.8
+    assert [x[0] for x in res] == [0, 1, 0, 0]
+    assert [x[1] for x in res] == [[x] for x in commands]
+    assert res[1][3] >= 0.1
+    assert res[3][3] >= 0.3
+    close_ssh_pool()
+
+
+def test_copy_dir_to_remote_setup(tmpdir):
+    entry = get_ssh_pool_entry("10.0.0.4", "ubuntu", "key.pem", 22)
+    entry["client"] = FakeClient()
+    local_dir = tmpdir.mkdir("dbdir")
+    local_dir.join("dump.rdb").write("rdb")
+    local_dir.mkdir("appendonlydir").join("appendonly.aof").write("aof")
+    remote_dir = "{}/remote".format(tmpdir)
+    assert (
+        get_remote_file_sha256(
+            "10.0.0.4", "ubuntu", "key.pem", "{}/dump.rdb".format(remote_dir)
+        )
+        is None
+    )
+    copy_dir_to_remote_setup(
+        "10.0.0.4", "ubuntu", "key.pem", str(local_dir), remote_dir
+    )
+    remote_rdb = "{}/dump.rdb".format(remote_dir)
+    remote_aof = "{}/appendonlydir/appendonly.aof".format(remote_dir)
+    assert os.path.exists(remote_aof)
+    assert get_remote_file_sha256(
+        "10.0.0.4", "ubuntu", "key.pem", remote_rdb
+    ) == file_sha256(remote_rdb)
+    # identical files are skipped, changed ones are copied again
+    local_dir.join("dump.rdb").write("rdb v2")
+    entry["client"].puts = []
+    copy_dir_to_remote_setup(
+        "10.0.0.4", "ubuntu", "key.pem", str(local_dir), remote_dir
+    )
+    assert entry["client"].puts == [str(local_dir.join("dump.rdb"))]
+    with open(remote_rdb) as fd:
+        assert fd.read() == "rdb v2"
+    close_ssh_pool()
+
+
+def test_remote_dataset_cache(tmpdir):
+    entry = get_ssh_pool_entry("10.0.0.5", "ubuntu", "key.pem", 22)
+    entry["client"] = FakeClient()
+    cache_dir = str(tmpdir.join("cache"))
+    test_dir = tmpdir.mkdir("test")
+    dataset = str(tmpdir.join("dataset.rdb"))
+    with open(dataset, "w") as fd:
+        fd.write("rdb" * 100)
+    cached_dataset_file = remote_dataset_cache_fetch(
+        "10.0.0.5", "ubuntu", "key.pem", dataset, dataset, 22, cache_dir
+    )
+    assert cached_dataset_file == "{}/{}.rdb".format(cache_dir, file_sha256(dataset))
+    assert len(entry["client"].puts) == 1
+    # repeated tests on the same dataset skip the transfer
+    assert (
+        remote_dataset_cache_fetch(
+            "10.0.0.5", "ubuntu", "key.pem", dataset, dataset, 22, cache_dir
+        )
+        == cached_dataset_file
+    )
+    assert len(entry["client"].puts) == 1
+    remote_dataset_files = [
+        str(test_dir.join("dump-20000.rdb")),
+        str(test_dir.join("dump-20001.rdb")),
+    ]
+    remote_dataset_cache_link(
+        "10.0.0.5", "ubuntu", "key.pem", cached_dataset_file, remote_dataset_files
+    )
+    for remote_dataset_file in remote_dataset_files:
+        assert (
+            os.stat(remote_dataset_file).st_ino == os.stat(cached_dataset_file).st_ino
+        )
+    # a limit below the entry size evicts it, the test dir links keep the data
+    subprocess.run(
+        remote_dataset_cache_prune_command(cache_dir, 10), shell=True, check=True
+    )
+    assert os.path.exists(cached_dataset_file) is False
+    assert os.path.exists(remote_dataset_files[0])
+    close_ssh_pool()
+
+
+class TruncatingSFTP(FakeSFTP):
+    def put(self, local_file, remote_file, callback=None):
+        self.client.puts.append(local_file)
+        with open(local_file) as src, open(remote_file, "w") as dst:
+            dst.write(src.read()[:10])
+
+
+def test_remote_dataset_cache_partial_copy(tmpdir):
+    entry = get_ssh_pool_entry("10.0.0.6", "ubuntu", "key.pem", 22)
+    entry["client"] = FakeClient()
+    entry["client"].open_sftp = lambda: TruncatingSFTP(entry["client"])
+    cache_dir = str(tmpdir.join("cache"))
+    dataset = str(tmpdir.join("dataset.rdb"))
+    with open(dataset, "w") as fd:
+        fd.write("rdb" * 100)
+    try:
+        remote_dataset_cache_fetch(
+            "10.0.0.6", "ubuntu", "key.pem", dataset, dataset, 22, cache_dir
+        )
+        assert False
+    except Exception as e:
+        assert "Unable to transfer dataset" in e.__str__()
+    # neither the partial copy nor its inflight file are left on the cache
+    assert os.listdir(cache_dir) == []
+    close_ssh_pool()
+
+
+def test_remote_dataset_cache_link_failure(tmpdir):
+    entry = get_ssh_pool_entry("10.0.0.7", "ubuntu", "key.pem", 22)
+    entry["client"] = FakeClient()
+    cached_dataset_file = tmpdir.join("cached.rdb")
+    cached_dataset_file.write("rdb")
+    # the test dir does not exist, so both ln and cp fail
+    remote_dataset_files = [str(tmpdir.join("missing", "dump-20000.rdb"))]
+    try:
+        remote_dataset_cache_link(
+            "10.0.0.7",
+            "ubuntu",
+            "key.pem",
+            str(cached_dataset_file),
+            remote_dataset_files,
+        )
+        assert False
+    except Exception as e:
+        assert "Unable to link the cached dataset" in e.__str__()
+    close_ssh_pool()
+
+
+class FakeHeadResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+    def raise_for_status(self):
+        pass
+
+
+def test_remote_dataset_cache_filename_url_version(monkeypatch):
+    dataset = "https://example.com/dataset.rdb"
+    headers = {"ETag": '"v1"'}
+    monkeypatch.setattr(
+        "redisbench_admin.utils.remote.requests.head",
+        lambda url, allow_redirects, timeout: FakeHeadResponse(headers),
+    )
+    v1_filename = get_remote_dataset_cache_filename(dataset, None, "/cache")
+    assert v1_filename == get_remote_dataset_cache_filename(dataset, None, "/cache")
+    # a changed upstream file is fetched again under a new entry
+    headers["ETag"] = '"v2"'
+    assert v1_filename != get_remote_dataset_cache_filename(dataset, None, "/cache")
+
+
+def test_remote_dataset_cache_prune_command(tmpdir):
+    cache_dir = tmpdir.mkdir("cache")
+    for pos, name in enumerate(["old", "mid", "new"]):
+        cache_dir.join("{}.rdb".format(name)).write("x" * 100)
+        os.utime(str(cache_dir.join("{}.rdb".format(name))), (pos + 1, pos + 1))
+    subprocess.run(
+        remote_dataset_cache_prune_command(str(cache_dir), 250), shell=True, check=True
+    )
+    assert sorted(os.listdir(str(cache_dir))) == ["mid.rdb", "new.rdb"]
+
+
+def test_fetch_files_from_remote_setup(tmpdir):
+    entry = get_ssh_pool_entry("10.0.0.6", "ubuntu", "key.pem", 22)
+    entry["client"] = FakeClient()
+    remote_dir = tmpdir.mkdir("remote")
+    local_dir = tmpdir.mkdir("local")
+    remote_dir.join("small.json").write('{"a": 1}')
+    remote_dir.join("large.json").write('{"a": "%s"}' % ("x" * 2 * 1024 * 1024))
+    files = [
+        (str(local_dir.join(x)), str(remote_dir.join(x)))
+        for x in ["small.json", "large.json"]
+    ]
+    fetch_files_from_remote_setup("10.0.0.6", "ubuntu", "key.pem", files)
+    for local_file, remote_file in files:
+        with open(local_file) as local_fd, open(remote_file) as remote_fd:
+            assert local_fd.read() == remote_fd.read()
+    # the large file was compressed on the remote
+    assert sorted(entry["client"].gets) == sorted(
+        [files[0][1], "{}.fetch.gz".format(files[1][1])]
+    )
+    # no leftovers on either side
+    assert sorted(os.listdir(str(remote_dir))) == ["large.json", "small.json"]
+    assert sorted(os.listdir(str(local_dir))) == ["large.json", "small.json"]
+    # the batch SFTP channels don't stay open
+    assert entry["sftp"] == {}
+    close_ssh_pool()
+
+
+def test_copy_files_to_remote_setup_compressed(tmpdir):
+    entry = get_ssh_pool_entry("10.0.0.8", "ubuntu", "key.pem", 22)
+    entry["client"] = FakeClient()
+    local_dir = tmpdir.mkdir("local")
+    remote_dir = tmpdir.mkdir("remote")
+    local_dir.join("module.so").write("x" * 2 * 1024 * 1024)
+    local_dir.join("dump.rdb").write("y" * 2 * 1024 * 1024)
+    local_dir.join("small.so").write("z")
+    files = [
+        (str(local_dir.join(x)), str(remote_dir.join(x)))
+        for x in ["module.so", "dump.rdb", "small.so"]
+    ]
+    copy_files_to_remote_setup("10.0.0.8", "ubuntu", "key.pem", files)
+    for local_file, remote_file in files:
+        assert file_sha256(local_file) == file_sha256(remote_file)
+    # only the large compressible file went through gzip
+    assert sorted([os.path.basename(x) for x in entry["client"].puts]) == [
+        "dump.rdb",
+        "module.so.copy.gz",
+        "small.so",
+    ]
+    assert sorted(os.listdir(str(remote_dir))) == ["dump.rdb", "module.so", "small.so"]
+    assert entry["sftp"] == {}
+    close_ssh_pool()
+
+
+def test_run_distributed_remote_benchmark(tmpdir):
+    hosts = ["10.0.0.7", "10.0.0.8"]
+    for client_public_ip in hosts:
+        entry = get_ssh_pool_entry(client_public_ip, "ubuntu", "key.pem", 22)
+        entry["client"] = FakeClient()
+    default_start_delay = distributed.DISTRIBUTED_START_DELAY_SECS
+    distributed.DISTRIBUTED_START_DELAY_SECS = 0.5
+    slots = get_distributed_client_slots(hosts, 2, 2)
+    remote_results_files = []
+    commands = []
+    for host_n, process_n, _ in slots:
+        remote_results_file = get_distributed_results_filename(
+            str(tmpdir.join("remote.csv")), host_n, process_n
+        )
+        remote_results_files.append(remote_results_file)
+        commands.append(
+            'printf \'"SET","{}.00"\\n\' > {}'.format(
+                host_n * 10 + process_n, remote_results_file
+            )
+        )
+    start_time = time.time()
+    local_results_file = str(tmpdir.join("result.csv"))
+    remote_run_result, _, _ = run_distributed_remote_benchmark(
+        "redis-benchmark",
+        slots,
+        commands,
+        remote_results_files,
+        local_results_file,
+        "ubuntu",
+        "key.pem",
+    )
+    assert remote_run_result is True
+    # every process waited for the common start
+    assert time.time() - start_time >= 0.5
+    with open(local_results_file, "r") as fd:
+        assert fd.read() == '"SET","66.000"\n'
+
+    commands[1] = "exit 1"
+    remote_run_result, _, _ = run_distributed_remote_benchmark(
+        "redis-benchmark",
+        slots,
+        commands,
+        remote_results_files,
+        local_results_file,
+        "ubuntu",
+        "key.pem",
+    )
+    assert remote_run_result is False
+    distributed.DISTRIBUTED_START_DELAY_SECS = default_start_delay
+    close_ssh_pool()
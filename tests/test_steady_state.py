@@ -0,0 +1,57 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import json
+
+from redisbench_admin.run.steady_state import (
+    detect_warmup_end,
+    add_steady_state_kpis,
+    get_steady_state_metrics,
+    STEADY_STATE_METRICS,
+)
+
+
+def test_detect_warmup_end():
+    # not enough datapoints
+    assert detect_warmup_end([1, 100, 100]) == 0
+    # flat run
+    assert detect_warmup_end([100, 100, 100, 100, 100, 100]) == 0
+    # noisy run without warm-up
+    assert detect_warmup_end([100, 102, 98, 101, 99, 100, 101, 99]) == 0
+    # 2 seconds of ramp-up
+    assert detect_warmup_end([10, 50, 100, 102, 98, 101, 99, 100, 101, 99]) == 2
+    # the warm-up can't take more than half of the run
+    assert detect_warmup_end([10, 10, 10, 10, 10, 10, 100, 100]) <= 4
+
+
+def test_add_steady_state_kpis():
+    assert add_steady_state_kpis({}) is None
+    with open(
+        "./tests/test_data/memtier_benchmark_v1.3.1_result.json", "r"
+    ) as json_file:
+        results_dict = json.load(json_file)
+        totals = results_dict["ALL STATS"]["Totals"]
+        # simulate a cold first second
+        totals["Time-Serie"]["0"]["Count"] = 1000
+        warmup_end = add_steady_state_kpis(results_dict)
+        assert warmup_end == 1
+        steady_state = totals["Steady-State"]
+        assert steady_state["Warm-up seconds"] == 1
+        # the last datapoint only covers the remaining 0.869 secs of the run
+        assert abs(steady_state["Duration seconds"] - 9.869) < 0.001
+        assert steady_state["Ops/sec"] > totals["Ops/sec"]
+        assert "Average Latency" in steady_state
+        # per-second percentiles can't be aggregated into the window ones
+        assert "p50.00" not in steady_state
+        assert "Steady-State" in results_dict["ALL STATS"]["Sets"]
+        assert "Steady-State" in results_dict["ALL STATS"]["Gets"]
+
+
+def test_get_steady_state_metrics():
+    assert get_steady_state_metrics(None) == STEADY_STATE_METRICS
+    default_metrics = ["$.'ALL STATS'.Totals.'Ops/sec'", STEADY_STATE_METRICS[0]]
+    metrics = get_steady_state_metrics(default_metrics)
+    assert len(metrics) == len(STEADY_STATE_METRICS) + 1
+    assert metrics[0] == "$.'ALL STATS'.Totals.'Ops/sec'"
@@ -0,0 +1,123 @@
+#  BSD 3-Clause License
+#
+#  Copyright (c) 2021., Redis Labs Modules
+#  All rights reserved.
+#
+import argparse
+import json
+import os
+
+import pytest
+
+from redisbench_admin.run.args import common_run_args
+from redisbench_admin.run.suite_shard import (
+    parse_suite_shard,
+    partition_tests,
+    select_suite_shard_definitions,
+    suite_shard_test_status,
+    merge_suite_shards,
+    TEST_STATUS_COMPLETED,
+    TEST_STATUS_FAILED,
+)
+
+
+def test_parse_suite_shard():
+    assert parse_suite_shard("1/3") == (1, 3)
+    assert parse_suite_shard("3/3") == (3, 3)
+    with pytest.raises(Exception):
+        parse_suite_shard("4/3")
+    with pytest.raises(Exception):
+        parse_suite_shard("0/3")
+    with pytest.raises(Exception):
+        parse_suite_shard("a")
+
+
+def test_partition_tests():
+    tests_durations = {
+        "t1": {"benchmark_duration": 600},
+        "t2": {"benchmark_duration": 300, "dataset_load_duration": 100},
+        "t3": {"benchmark_duration": 300},
+        "t4": {"benchmark_duration": 200},
+    }
+    shards, shards_load = partition_tests(["t4", "t3", "t2", "t1"], tests_durations, 2)
+    assert shards == [["t1", "t4"], ["t2", "t3"]]
+    assert shards_load == [800, 700]
+    # deterministic regardless of the input order
+    assert partition_tests(["t1", "t2", "t3", "t4"], tests_durations, 2)[0] == shards
+    # tests without history use the default duration
+    shards, _ = partition_tests(["a", "b", "c"], {}, 2)
+    assert shards == [["a", "c"], ["b"]]
+
+
+def test_suite_shards_merge(tmpdir):
+    suite_shard_dir = str(tmpdir)
+    durations_file = os.path.join(suite_shard_dir, "durations.json")
+    with open(durations_file, "w") as fd:
+        json.dump({"t1": {"benchmark_duration": 600}}, fd)
+    parser = argparse.ArgumentParser(
+        description="test",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser = common_run_args(parser)
+    benchmark_definitions = {"t1": {}, "t2": {}, "t3": {}}
+    manifests = []
+    for shard in ["1/2", "2/2"]:
+        args = parser.parse_args(
+            args=[
+                "--suite-shard",
+                shard,
+                "--suite-shard-dir",
+                suite_shard_dir,
+                "--suite-shard-run-id",
+                "run1",
+                "--suite-shard-durations-file",
+                durations_file,
+            ]
+        )
+        definitions, manifest = select_suite_shard_definitions(
+            args, benchmark_definitions
+        )
+        assert list(definitions.keys()) == list(manifest["tests"].keys())
+        manifests.append(manifest)
+    assert list(manifests[0]["tests"].keys()) == ["t1"]
+    assert sorted(manifests[1]["tests"].keys()) == ["t2", "t3"]
+
+    # t3 was not run
+    suite_shard_test_status(manifests[0], "t1", TEST_STATUS_FAILED)
+    suite_shard_test_status(manifests[0], "t1", TEST_STATUS_COMPLETED)
+    suite_shard_test_status(manifests[1], "t2", TEST_STATUS_COMPLETED)
+    run_dir = os.path.join(suite_shard_dir, "run1")
+    assert os.path.dirname(manifests[0]["filename"]) == run_dir
+    ok, rows = merge_suite_shards(run_dir, 2, benchmark_definitions.keys())
+    assert ok is False
+    assert rows[0] == ["t1", "1/2", TEST_STATUS_FAILED, "OK"]
+    assert rows[2][3] == "NOT RUN"
+    suite_shard_test_status(manifests[1], "t3", TEST_STATUS_COMPLETED)
+    ok, _ = merge_suite_shards(run_dir, 2, benchmark_definitions.keys())
+    assert ok
+    # manifests of other runs or other shard counts are never merged
+    with open(os.path.join(suite_shard_dir, "suite-shard-1-of-2.json"), "w") as fd:
+        json.dump({"suite_shard": "1/2", "partition": "stale", "tests": {}}, fd)
+    with open(os.path.join(run_dir, "suite-shard-1-of-3.json"), "w") as fd:
+        json.dump({"suite_shard": "1/3", "partition": "stale", "tests": {}}, fd)
+    ok, _ = merge_suite_shards(run_dir, 2, benchmark_definitions.keys())
+    assert ok
+
+    # missing shard manifest
+    os.remove(manifests[1]["filename"])
+    ok, _ = merge_suite_shards(run_dir, 2, benchmark_definitions.keys())
+    assert ok is False
+
+    # a shard without the pinned durations snapshot would compute another partition
+    args = parser.parse_args(
+        args=[
+            "--suite-shard",
+            "1/2",
+            "--suite-shard-dir",
+            suite_shard_dir,
+            "--suite-shard-durations-file",
+            os.path.join(suite_shard_dir, "missing.json"),
+        ]
+    )
+    with pytest.raises(Exception):
+        select_suite_shard_definitions(args, benchmark_definitions)
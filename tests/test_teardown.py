@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+import redis
+
+from redisbench_admin.utils.teardown import (
+    shutdown_redis_conns,
+    kill_redis_processes,
+    reap_redis_processes,
+    track_temporary_dir,
+    release_temporary_dirs,
+    wait_for_pending_removals,
+)
+
+
+class ShutdownConn:
+    def __init__(self, pings_until_exit):
+        self.pings_until_exit = pings_until_exit
+        self.shutdown_kwargs = None
+
+    def shutdown(self, **kwargs):
+        self.shutdown_kwargs = kwargs
+
+    def ping(self):
+        if self.pings_until_exit <= 0:
+            raise redis.exceptions.ConnectionError("Connection refused")
+        self.pings_until_exit = self.pings_until_exit - 1
+        return True
+
+
+def test_shutdown_redis_conns():
+    conns = [ShutdownConn(0), ShutdownConn(3)]
+    assert shutdown_redis_conns(conns, 5, nosave=True) == 0
+    for conn in conns:
+        assert conn.shutdown_kwargs == {"nosave": True}
+        assert conn.pings_until_exit == 0
+    # never exits
+    assert shutdown_redis_conns([ShutdownConn(10000)], 0.2) == 1
+    assert shutdown_redis_conns([]) == 0
+
+
+def test_kill_and_reap_redis_processes():
+    processes = [
+        subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        for _ in range(2)
+    ]
+    kill_redis_processes(processes + [None])
+    reap_redis_processes(processes + [None], 10)
+    for process in processes:
+        assert process.returncode is not None
+
+
+def test_release_temporary_dirs(tmpdir):
+    dirs = []
+    for n in range(3):
+        temporary_dir = tmpdir.mkdir("setup-{}".format(n))
+        temporary_dir.join("dump.rdb").write("rdb")
+        track_temporary_dir(str(temporary_dir))
+        dirs.append(str(temporary_dir))
+    assert release_temporary_dirs() == dirs
+    assert release_temporary_dirs() == []
+    wait_for_pending_removals()
+    for temporary_dir in dirs:
+        assert os.path.exists(temporary_dir) is False
@@ -1,8 +1,27 @@
+import gzip
+import io
+import json
+import os
+import subprocess
+import tarfile
+import tempfile
+import time
 from unittest import TestCase
 
+import redis
+
+from redisbench_admin.utils import utils
 from redisbench_admin.utils.utils import (
     retrieve_local_or_remote_input_json,
     get_ts_metric_name,
+    get_decompressed_filename,
+    decompress_file,
+    decompress_file_cached,
+    whereis,
+    wait_for_conn,
+    get_loading_progress,
+    file_sha256,
+    file_sha256_cached,
 )
 
 
@@ -115,3 +134,173 @@ def test_get_ts_metric_name():
     ) == "ci.benchmarks.redislabs/by.branch/ci/redis/redis/test-1/{}/oss-standalone/unstable/rps/PING".format(
         build_variant_name
     )
+
+
+def test_get_decompressed_filename():
+    assert get_decompressed_filename("dataset.rdb.zst") == "dataset.rdb"
+    assert get_decompressed_filename("dataset.tar.gz") == "dataset"
+    assert get_decompressed_filename("dataset.tar.zst") == "dataset"
+    assert get_decompressed_filename("tool.zip") == "tool"
+    assert get_decompressed_filename("dump.rdb") is None
+
+
+def test_decompress_file():
+    content = b"REDIS0009" + os.urandom(1024)
+    tmpdir = tempfile.mkdtemp()
+    # single file gzip
+    gz_filename = "{}/dump.rdb.gz".format(tmpdir)
+    with gzip.open(gz_filename, "wb") as fd:
+        fd.write(content)
+    outdir = tempfile.mkdtemp()
+    assert decompress_file(gz_filename, outdir) == "{}/dump.rdb".format(tmpdir)
+    with open("{}/dump.rdb".format(outdir), "rb") as fd:
+        assert fd.read() == content
+
+    # tar.gz archive
+    tgz_filename = "{}/dataset.tar.gz".format(tmpdir)
+    with tarfile.open(tgz_filename, "w:gz") as tar:
+        info = tarfile.TarInfo("dataset.rdb")
+        info.size = len(content)
+        tar.addfile(info, io.BytesIO(content))
+    outdir = tempfile.mkdtemp()
+    decompress_file(tgz_filename, outdir)
+    with open("{}/dataset.rdb".format(outdir), "rb") as fd:
+        assert fd.read() == content
+
+    if whereis("zstd") is not None:
+        zst_filename = "{}/other.rdb.zst".format(tmpdir)
+        subprocess.check_call(
+            ["zstd", "-q", "-o", zst_filename, "{}/dataset.rdb".format(outdir)]
+        )
+        decompress_file(zst_filename, outdir)
+        with open("{}/other.rdb".format(outdir), "rb") as fd:
+            assert fd.read() == content
+
+
+def test_decompress_file_cached():
+    content = b"REDIS0009" + os.urandom(1024)
+    tmpdir = tempfile.mkdtemp()
+    cache_dir = tempfile.mkdtemp()
+    gz_filename = "{}/dump.rdb.gz".format(tmpdir)
+    with gzip.open(gz_filename, "wb") as fd:
+        fd.write(content)
+    cached_file = decompress_file_cached(gz_filename, cache_dir)
+    assert cached_file.startswith(cache_dir)
+    assert cached_file.endswith("dump.rdb")
+    with open(cached_file, "rb") as fd:
+        assert fd.read() == content
+    mtime = os.path.getmtime(cached_file)
+    # the second call reuses the cached content
+    assert decompress_file_cached(gz_filename, cache_dir) == cached_file
+    assert os.path.getmtime(cached_file) == mtime
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_decompress_file_cached_lost_race(monkeypatch):
+    content = b"REDIS0009" + os.urandom(1024)
+    tmpdir = tempfile.mkdtemp()
+    cache_dir = tempfile.mkdtemp()
+    gz_filename = "{}/dump.rdb.gz".format(tmpdir)
+    with gzip.open(gz_filename, "wb") as fd:
+        fd.write(content)
+    original_decompress_file = utils.decompress_file
+
+    def concurrent_decompress_file(compressed_filename, outdir):
+        # another process wins the race while we are decompressing
+        winner_dir = "{}/{}".format(cache_dir, file_sha256(compressed_filename))
+        os.makedirs(winner_dir)
+        original_decompress_file(compressed_filename, winner_dir)
+        original_decompress_file(compressed_filename, outdir)
+
+    monkeypatch.setattr(utils, "decompress_file", concurrent_decompress_file)
+    cached_file = decompress_file_cached(gz_filename, cache_dir)
+    with open(cached_file, "rb") as fd:
+        assert fd.read() == content
+    # the loser removed its own inflight dir
+    assert len(os.listdir(cache_dir)) == 1
+
+
+class LoadingConn:
+    def __init__(self, busy_polls):
+        self.busy_polls = busy_polls
+
+    def execute_command(self, *args):
+        if self.busy_polls > 0:
+            self.busy_polls = self.busy_polls - 1
+            raise redis.exceptions.BusyLoadingError("LOADING")
+        return True
+
+    def info(self, section):
+        return {
+            "loading": 1,
+            "loading_start_time": int(time.time()) - 2,
+            "loading_total_bytes": 4 * 1024 * 1024,
+            "loading_loaded_bytes": 2 * 1024 * 1024,
+            "loading_loaded_perc": 50.0,
+            "loading_eta_seconds": 2,
+        }
+
+
+def test_get_loading_progress():
+    progress = get_loading_progress(LoadingConn(1))
+    assert progress["loaded_perc"] == 50.0
+    assert progress["total_bytes"] == 4 * 1024 * 1024
+    assert progress["eta_seconds"] == 2
+    assert progress["rate_bytes_sec"] > 0
+    conn = LoadingConn(0)
+    conn.info = lambda section: {"loading": 0}
+    assert get_loading_progress(conn) is None
+
+
+def test_wait_for_conn():
+    start = time.time()
+    assert wait_for_conn(LoadingConn(5), 10) is True
+    # sub 100ms polling
+    assert time.time() - start < 1.0
+    # the process exited with an error, so we fail fast instead of waiting 10 secs
+    process = subprocess.Popen(["false"])
+    process.wait()
+    start = time.time()
+    assert wait_for_conn(LoadingConn(1000), 10, process=process) is False
+    assert time.time() - start < 1.0
+    # a daemonized parent exits with 0
+    process = subprocess.Popen(["true"])
+    process.wait()
+    assert wait_for_conn(LoadingConn(5), 10, process=process) is True
+
+
+def test_wait_for_conn_daemon_gone(tmpdir):
+    # the daemonized parent exited with 0 and the daemon of the pidfile is gone
+    daemon = subprocess.Popen(["true"])
+    daemon.wait()
+    pidfile = str(tmpdir.join("redis.pid"))
+    with open(pidfile, "w") as fd:
+        fd.write("{}\n".format(daemon.pid))
+    process = subprocess.Popen(["true"])
+    process.wait()
+    start = time.time()
+    assert (
+        wait_for_conn(LoadingConn(1000), 10, process=process, pidfile=pidfile) is False
+    )
+    assert time.time() - start < 1.0
+    # while the daemon is alive we keep waiting
+    with open(pidfile, "w") as fd:
+        fd.write("{}\n".format(os.getpid()))
+    assert wait_for_conn(LoadingConn(5), 10, process=process, pidfile=pidfile) is True
+
+
+def test_wait_for_conn_loading_stall():
+    # LoadingConn always reports the same loaded bytes
+    start = time.time()
+    assert wait_for_conn(LoadingConn(100000), 30, loading_stall_secs=1) is False
+    assert time.time() - start < 5.0
+
+
+def test_file_sha256_cached(tmpdir):
+    filename = str(tmpdir.join("dump.rdb"))
+    with open(filename, "w") as fd:
+        fd.write("rdb")
+    assert file_sha256_cached(filename) == file_sha256(filename)
+    with open(filename, "w") as fd:
+        fd.write("rdb v2 with a different size")
+    assert file_sha256_cached(filename) == file_sha256(filename)